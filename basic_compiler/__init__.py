@@ -1,22 +1,35 @@
-from .basic_emitter import Emitter
-from .basic_exceptions import (
-    LexerError,
-    TokenError,
-    ParserError,
-    SymbolTableError,
-)
-from .basic_lex import Lexer
-from .basic_symbol_set import SymbolTable
-from .basic_token import Token, TokenType
+import importlib
 
-__all__ = [
-    "Emitter",
-    "LexerError",
-    "TokenError",
-    "ParserError",
-    "SymbolTableError",
-    "Lexer",
-    "SymbolTable",
-    "Token",
-    "TokenType",
-]
+# Each name is imported from its module the first time it is used, so the
+# command line tools that import the package only load what they need
+_EXPORTS = {
+    "CompileOptions": "basic_api",
+    "CompileResult": "basic_api",
+    "compile_source": "basic_api",
+    "Emitter": "basic_emitter",
+    "LexerError": "basic_exceptions",
+    "TokenError": "basic_exceptions",
+    "ParserError": "basic_exceptions",
+    "SymbolTableError": "basic_exceptions",
+    "BackendError": "basic_exceptions",
+    "VMError": "basic_exceptions",
+    "Lexer": "basic_lex",
+    "SymbolKind": "basic_symbol_set",
+    "SymbolTable": "basic_symbol_set",
+    "Token": "basic_token",
+    "TokenType": "basic_token",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f"{__name__}.{_EXPORTS[name]}"), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
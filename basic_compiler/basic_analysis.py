@@ -0,0 +1,186 @@
+from typing import Dict, List, Optional, Set
+
+from basic_compiler.basic_ast import (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    CloseNode,
+    ContinueNode,
+    DimNode,
+    DoNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    InputNode,
+    LetNode,
+    LiteralNode,
+    NameNode,
+    OpenNode,
+    PrintNode,
+    ReturnNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+    walk,
+)
+
+_IO_NODES = {
+    PrintNode: "PRINT",
+    InputNode: "INPUT",
+    OpenNode: "OPEN",
+    CloseNode: "CLOSE",
+}
+
+SCALAR_TYPES = {"INT", "FLOAT", "BOOL"}
+
+_CONSTEXPR_TYPES = SCALAR_TYPES
+
+# Types whose const globals may be read inside a C++ constant expression
+_CONSTEXPR_GLOBAL_TYPES = {"INT", "BOOL"}
+
+_CONSTEXPR_NODES = (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ContinueNode,
+    DoNode,
+    ForNode,
+    GroupNode,
+    IfNode,
+    LetNode,
+    LiteralNode,
+    NameNode,
+    ReturnNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+)
+
+
+def local_names(func: FunctionNode) -> Set[str]:
+    """
+    :param func: The function to inspect
+    :return: The parameters, LET/DIM variables and FOR counters of the function
+    """
+    names = {param.name for param in func.params}
+    for node in walk(func.statements):
+        if isinstance(node, (LetNode, DimNode)):
+            names.add(node.name)
+        elif isinstance(node, ForNode):
+            names.add(node.var)
+    return names
+
+
+def find_impurity(func: FunctionNode, pure_functions: Set[str]) -> Optional[str]:
+    """
+    A function is pure when it does no I/O, only assigns to its own locals and
+    only calls itself or functions already known to be pure.
+
+    :param func: The function to check
+    :param pure_functions: Names of the functions already proven pure
+    :return: Why the function is impure, or None if it is pure
+    """
+    if any(param.mode == "ref" for param in func.params):
+        return "takes a BYREF parameter"
+
+    names = local_names(func)
+    for node in walk(func.statements):
+        if type(node) in _IO_NODES:
+            return f"uses {_IO_NODES[type(node)]}"
+        if isinstance(node, AssignNode) and node.name not in names:
+            return f"writes to global '{node.name}'"
+        if (
+            isinstance(node, CallNode)
+            and node.name != func.name
+            and node.name not in pure_functions
+        ):
+            return f"calls impure function '{node.name}'"
+    return None
+
+
+def modified_names(func: FunctionNode, ref_params: Dict[str, List[bool]]) -> Set[str]:
+    """
+    :param func: The function to inspect
+    :param ref_params: Function name -> which of its parameters are BYREF
+    :return: Names the body assigns, reads INPUT into or passes to a BYREF parameter
+    """
+    names = set()
+    for node in walk(func.statements):
+        if isinstance(node, (AssignNode, InputNode)):
+            names.add(node.name)
+        elif isinstance(node, CallNode):
+            for arg, by_ref in zip(node.args, ref_params.get(node.name, ())):
+                if by_ref and isinstance(arg, NameNode):
+                    names.add(arg.name)
+    return names
+
+
+def assign_param_modes(func: FunctionNode, ref_params: Dict[str, List[bool]]) -> None:
+    """
+    Pass STRING and user-type parameters that the body never modifies by const
+    reference instead of copying them; BYREF parameters and scalars keep their mode
+
+    :param func: The function whose parameters are updated
+    :param ref_params: Function name -> which of its parameters are BYREF
+    """
+    modified = modified_names(func, ref_params)
+    for param in func.params:
+        if (
+            param.mode == "value"
+            and param.param_type.upper() not in SCALAR_TYPES
+            and param.name not in modified
+        ):
+            param.mode = "const_ref"
+
+
+def is_constexpr(func: FunctionNode, constexpr_functions: Set[str]) -> bool:
+    """
+    Decide whether func can be emitted as a C++ constexpr function: scalar
+    signature and locals, no I/O, and it only reads its own locals, integral
+    CONST globals and calls itself or other constexpr functions.
+
+    :param func: The function to check
+    :param constexpr_functions: Names of the functions already emitted constexpr
+    """
+    if func.memo or func.is_constructor or func.name == "main":
+        return False
+    if func.return_type.upper() not in _CONSTEXPR_TYPES:
+        return False
+    if any(param.param_type.upper() not in _CONSTEXPR_TYPES for param in func.params):
+        return False
+
+    names = local_names(func)
+    for node in walk(func.statements):
+        if not isinstance(node, _CONSTEXPR_NODES):
+            return False
+        if not getattr(node, "constexpr_safe", True):
+            return False
+        if isinstance(node, LetNode) and (
+            node.construct or node.var_type.upper() not in _CONSTEXPR_TYPES
+        ):
+            return False
+        if isinstance(node, LiteralNode) and node.value_type == "STRING":
+            return False
+        if isinstance(node, AssignNode) and node.name not in names:
+            return False
+        if (
+            isinstance(node, NameNode)
+            and node.name not in names
+            and (
+                node.constant is None
+                or node.value_type not in _CONSTEXPR_GLOBAL_TYPES
+            )
+        ):
+            return False
+        if (
+            isinstance(node, CallNode)
+            and node.name != func.name
+            and node.name not in constexpr_functions
+        ):
+            return False
+    return True
@@ -0,0 +1,224 @@
+"""
+Library interface to the compiler:
+
+    result = compile_source(text)
+    if result.ok:
+        print(result.cpp)
+    else:
+        print(*result.diagnostics, sep="\\n")
+
+Nothing is written to disk unless CompileOptions.output names a file, and no
+process is started unless the options also ask to format, compile or run it.
+CompileOptions.pipe builds the program from memory into a private cache.
+With target="c" the program is generated as C99 instead of C++; the text is
+still in CompileResult.cpp. CompileOptions.source_map makes compiler
+messages, debuggers and profilers point at the BASIC source.
+With backend="vm" no C++ is generated: CompileResult.bytecode holds the
+program for basic_vm.Machine. With backend="python", CompileResult.pycode
+holds a Python code object that runs the program.
+Every call builds its own lexer, parser and emitter, so threads may compile
+at the same time. The compiler itself is imported by the first call, so a
+command line that is answered from a cache never loads it.
+"""
+
+import os
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, List, Optional, Union
+
+from basic_compiler.basic_argparser import DEFAULT_MAX_ERRORS, DEFAULT_STEP_BUDGET
+from basic_compiler.basic_exceptions import (
+    LexerError,
+    TokenError,
+    ParserError,
+    ParserErrors,
+    SymbolTableError,
+    BackendError,
+)
+from basic_compiler.basic_profile import profile_path
+from basic_compiler.basic_timings import PhaseTimer
+from basic_compiler.basic_trace import ParseTrace
+
+if TYPE_CHECKING:
+    from basic_compiler.basic_pycode import PythonProgram
+    from basic_compiler.basic_vm import BytecodeProgram
+
+
+@dataclass
+class CompileOptions:
+    # Step budget for evaluating pure function calls at compile time, 0 disables it
+    ctfe_steps: int = DEFAULT_STEP_BUDGET
+    # Parse without recursion, for very deep nesting
+    explicit_stack: bool = False
+    # Report up to this many errors in one pass, going on after each; 1 stops
+    # at the first, 0 reports all. With jobs > 1 only the first is reported
+    max_errors: int = DEFAULT_MAX_ERRORS
+    # Parse top-level blocks in this many processes
+    jobs: int = 1
+    # Record per-phase timings in CompileResult.timings
+    timings: bool = False
+    # The file sink: write the C++ here, then format, compile and run it as asked
+    output: Optional[str] = None
+    format: bool = False
+    compile: bool = False
+    execute: bool = False
+    # Instead of the file sink: compile from memory into the program cache
+    pipe: bool = False
+    # The optimization level g++ or the C compiler builds the program with
+    opt: int = 0
+    # "cpp", "vm" for bytecode or "python" for a Python code object instead of C++
+    backend: str = "cpp"
+    # The language the "cpp" backend generates: "cpp" or "c"
+    target: str = "cpp"
+    # Make the program count the runs of each line and write them to this
+    # file at exit, see basic_profile; profile_time also times them
+    profile_lines: Optional[str] = None
+    profile_time: bool = False
+    # Put #line directives naming this source file into the C++ and record
+    # where each line comes from in CompileResult.source_map
+    source_map: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args) -> "CompileOptions":
+        """
+        :param args: The options from basic_argparser.parse_args
+        """
+        return cls(
+            ctfe_steps=args.ctfe_steps,
+            opt=args.opt,
+            explicit_stack=args.explicit_stack,
+            max_errors=args.max_errors,
+            jobs=args.jobs,
+            timings=args.timings or args.timings_json is not None,
+            output=args.output,
+            format=args.format,
+            compile=args.compile,
+            execute=args.execute,
+            pipe=args.pipe,
+            backend=args.backend,
+            target=args.target,
+            profile_lines=profile_path(args.input) if args.profile_lines else None,
+            profile_time=args.profile_time,
+            source_map=os.path.abspath(args.input) if args.source_map else None,
+        )
+
+
+@dataclass
+class CompileResult:
+    # The generated C++ (or C for target "c"), None if compilation failed or
+    # the backend is not "cpp"
+    cpp: Optional[str]
+    # Compilation errors, one message each; after CompileOptions.max_errors
+    # errors a last one says the compiler stopped
+    diagnostics: List[str] = field(default_factory=list)
+    # One record per phase, see PhaseTimer.results
+    timings: List[dict] = field(default_factory=list)
+    # The program built with CompileOptions.pipe; if g++ fails, a diagnostic says so
+    program: Optional[str] = None
+    # The program compiled for the "vm" backend
+    bytecode: Optional["BytecodeProgram"] = None
+    # The program compiled for the "python" backend
+    pycode: Optional["PythonProgram"] = None
+    # With CompileOptions.source_map, see Emitter.source_map
+    source_map: Optional[dict] = None
+
+    @property
+    def ok(self) -> bool:
+        return not self.diagnostics
+
+
+def compile_source(
+    source: Union[str, List[str]],
+    options: CompileOptions = None,
+    cache=None,
+    trace: ParseTrace = None,
+    timer: PhaseTimer = None,
+    tool_output=None,
+) -> CompileResult:
+    """
+    Compile a BASIC program held in memory
+
+    :param source: The program text, or its lines with their line endings
+    :param options: CompileOptions() by default
+    :param cache: Reuses the tokens and trees of sources compiled before, see
+        basic_server.SourceCache
+    :param trace: Records the parser's productions
+    :param timer: Records the phases, instead of a timer made from options.timings
+    :param tool_output: Receives what clang-format and g++ print, the terminal by default
+    :return: The C++ text or the diagnostics, and the timings
+    """
+    from basic_compiler.basic_emitter import Emitter
+    from basic_compiler.basic_lex import Lexer
+    from basic_compiler.basic_parser import Parser
+
+    options = options or CompileOptions()
+    if isinstance(source, str):
+        source = source.splitlines(keepends=True)
+    # tracemalloc is process-wide, so concurrent calls cannot share it
+    timer = timer or PhaseTimer(enabled=options.timings, trace_memory=False)
+
+    try:
+        emitter = Emitter(options, timer, tool_output)
+        # A traced parse has to run even when the tree is cached
+        program = cache.program(source, options) if cache and not trace else None
+        if program is None:
+            lexer = cache.tokens(source) if cache else Lexer(source)
+            timer.accumulate(lexer, "get_token", "lex")
+            parser = Parser(
+                lexer,
+                emitter,
+                options.ctfe_steps,
+                trace,
+                explicit_stack=options.explicit_stack,
+                max_errors=options.max_errors,
+            )
+            with timer.phase("parse"):
+                if options.jobs > 1:
+                    from basic_compiler.basic_parallel import parse_parallel
+
+                    program = parse_parallel(
+                        source, options.jobs, options.ctfe_steps, options.explicit_stack
+                    )
+                else:
+                    program = parser.parse_program()
+            if cache:
+                cache.store(source, options, program)
+        if options.backend == "vm":
+            from basic_compiler.basic_vm import compile_program
+
+            with timer.phase("bytecode"):
+                result = CompileResult(None, bytecode=compile_program(program))
+        elif options.backend == "python":
+            from basic_compiler.basic_pycode import compile_python
+
+            with timer.phase("pycode"):
+                result = CompileResult(None, pycode=compile_python(program))
+        else:
+            with timer.phase("emit"):
+                if options.target == "c":
+                    from basic_compiler.basic_cgen import emit_c
+
+                    emit_c(program, emitter)
+                else:
+                    program.emit(emitter)
+            result = CompileResult(emitter.code())
+            if options.source_map is not None:
+                result.source_map = emitter.source_map()
+            if options.pipe:
+                result.program = emitter.compile_piped()
+            elif options.output is not None:
+                emitter.write_file()
+    except ParserErrors as e:
+        result = CompileResult(None, e.diagnostics)
+    except (LexerError, TokenError, ParserError, SymbolTableError, BackendError) as e:
+        result = CompileResult(None, [str(e)])
+    except RecursionError:
+        if options.explicit_stack:
+            message = "The program is nested too deeply to compile"
+        else:
+            message = (
+                "The program is nested too deeply to parse recursively;"
+                " compile it with --explicit-stack"
+            )
+        result = CompileResult(None, [message])
+    result.timings = timer.results()
+    return result
@@ -1,31 +1,204 @@
 import argparse
 
 
-def parse_args(argv: list):
-    parser = argparse.ArgumentParser(
-        description="Compiler for a basic language",
-        epilog="For more information, visit the documentation.",
-    )
-    parser.add_argument(
-        "-i", "--input", help="The source file to compile", required=True
-    )
-    parser.add_argument("-o", "--output", help="The output file", default="out.cpp")
+VERSION = "basic_compiler 1.0.0"
+# Step budget of basic_ctfe; defined here so the command line loads without it
+DEFAULT_STEP_BUDGET = 100_000
+# Errors reported before the compiler gives up
+DEFAULT_MAX_ERRORS = 20
+
+
+def add_compile_options(parser: argparse.ArgumentParser) -> None:
+    """
+    Add the options that apply to every program compiled, shared by basic_batch
+    """
     parser.add_argument(
         "-O",
         "--opt",
-        help="Optimization level (0-3)",
+        help="Optimization level (0-3) of g++ or the C compiler",
         type=int,
         choices=range(0, 4),
         default=0,
     )
+    parser.add_argument(
+        "--ctfe-steps",
+        help="Step budget for evaluating pure function calls at compile time (0 disables)",
+        type=int,
+        default=DEFAULT_STEP_BUDGET,
+    )
+    parser.add_argument(
+        "--max-errors",
+        help="Report up to N errors, going on after each, before stopping"
+        f" (default: {DEFAULT_MAX_ERRORS}; 1 stops at the first, 0 reports all)",
+        type=int,
+        default=DEFAULT_MAX_ERRORS,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--explicit-stack",
+        help="Parse nested blocks and expressions without recursion, for very deep nesting",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--target",
+        help="The language generated: cpp for g++, or c, plain C99 that gcc or"
+        " tcc ($CC) builds faster",
+        choices=["cpp", "c"],
+        default="cpp",
+    )
     parser.add_argument("--compile", help="Compile the output", action="store_true")
-    parser.add_argument("--execute", help="Execute the output", action="store_true")
     parser.add_argument("--format", help="Format the output", action="store_true")
     parser.add_argument(
         "-v", "--verbose", help="Increase output verbosity", action="store_true"
     )
+
+
+def build_parser(parser_class=argparse.ArgumentParser) -> argparse.ArgumentParser:
+    """
+    :param parser_class: ArgumentParser or a subclass that reports usage elsewhere
+    """
+    parser = parser_class(
+        prog="basic_compiler",
+        description="Compiler for a basic language",
+        epilog="For more information, visit the documentation.",
+    )
+    parser.add_argument(
+        "-i", "--input", help="The source file to compile", required=True
+    )
+    parser.add_argument(
+        "-o", "--output", help="The output file (default: out.cpp, or out.c with --target c)"
+    )
+    add_compile_options(parser)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Parse top-level FUNCTION, CLASS and STRUCT blocks in this many processes",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--trace",
+        help="Write the parser's production enter/exit events to this file as JSON lines",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--timings",
+        help="Report wall-clock time, CPU time and peak memory of each phase"
+        " (tracing Python allocations slows the Python phases down)",
+        action="store_true",
+    )
     parser.add_argument(
-        "-V", "--version", action="version", version="basic_compiler 1.0.0"
+        "--timings-json",
+        help="Write the phase timings to this file as JSON ('-' for stdout)",
+        metavar="FILE",
     )
+    parser.add_argument("--execute", help="Execute the output", action="store_true")
+    parser.add_argument(
+        "--bench",
+        help="Run the program N times instead of once, after warm-up runs, and report"
+        " its wall time, CPU time and peak memory",
+        type=int,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--bench-warmup",
+        help="Runs made before the measured ones with --bench (default: 1)",
+        type=int,
+        default=1,
+        metavar="N",
+    )
+    parser.add_argument(
+        "--bench-input",
+        help="The file the program reads on stdin with --bench",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--bench-against",
+        help="Also build and run the program with these options added, and compare,"
+        " such as --bench-against='-O2' or --bench-against='--backend vm'",
+        metavar="OPTIONS",
+    )
+    parser.add_argument(
+        "--bench-json",
+        help="Write the --bench results to this file as JSON ('-' for stdout)",
+        metavar="FILE",
+    )
+    parser.add_argument(
+        "--profile-lines",
+        help="Make the program count how often each line runs and write the counts"
+        " next to the input (<input>.lines) when it exits; --execute shows them"
+        " beside the source",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--profile-time",
+        help="With --profile-lines, also time each line",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--source-map",
+        help="Put #line directives naming the input into the output, so g++, gdb"
+        " and profilers report BASIC lines, build with -g, and write where each"
+        " output line comes from to <output>.map.json",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--backend",
+        help="cpp writes C++ for g++; vm runs the program on the bytecode machine"
+        " and python compiles it to a Python code object, both in this process"
+        " without the C++ toolchain",
+        choices=["cpp", "vm", "python"],
+        default="cpp",
+    )
+    parser.add_argument(
+        "--bytecode-dir",
+        help="Cache --backend vm bytecode in this directory instead of next to the source",
+        metavar="DIR",
+    )
+    parser.add_argument(
+        "--no-bytecode-cache",
+        help="Neither read nor write cached --backend vm bytecode",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--pipe",
+        help="Compile without writing the output: feed the C++ to g++ on stdin and"
+        " keep the program in a private cache ($BASIC_COMPILER_CACHE)",
+        action="store_true",
+    )
+    parser.add_argument("-V", "--version", action="version", version=VERSION)
 
-    return parser.parse_args(argv)
+    return parser
+
+
+def default_output(args):
+    """
+    Name the output after the target when -o was not given
+
+    :return: args
+    """
+    if args.output is None:
+        args.output = "out.c" if args.target == "c" else "out.cpp"
+    return args
+
+
+def check_args(parser: argparse.ArgumentParser, args):
+    """
+    Reject options that cannot be combined
+
+    :return: args
+    """
+    if args.source_map and args.format:
+        parser.error("--source-map cannot be combined with --format, which moves the lines it maps")
+    if args.max_errors < 0:
+        parser.error("--max-errors cannot be negative")
+    if args.bench is not None and args.bench < 1:
+        parser.error("--bench needs at least one run")
+    if args.bench_warmup < 0:
+        parser.error("--bench-warmup cannot be negative")
+    return args
+
+
+def parse_args(argv: list):
+    parser = build_parser()
+    return default_output(check_args(parser, parser.parse_args(argv)))
@@ -1,57 +1,806 @@
 from abc import ABC, abstractmethod
 
+from basic_compiler import basic_runtime
+
 
 class AbstractNode(ABC):
+    # The source line and column a statement starts on, counted from 1; set by
+    # the parser
+    line_number = None
+    column = None
+
     @abstractmethod
     def emit(self, emitter):
         pass
 
 
-class ProgramNode(AbstractNode):
+def walk(node):
+    """
+    Yield node and every node below it, without recursing through Python frames
+    """
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, AbstractNode):
+            yield item
+            # parts repeats the children of an expression next to their text
+            stack.extend(
+                reversed([value for key, value in vars(item).items() if key != "parts"])
+            )
+        elif isinstance(item, (list, tuple)):
+            stack.extend(reversed(item))
+
+
+def emit_body(emitter, statements):
+    """
+    Emit statements in order. Statements with bodies are BlockNodes, whose
+    emit_steps yields each body where it belongs; the bodies are emitted from an
+    explicit stack, so deeply nested blocks never recurse
+    """
+    # Each entry also tells if its statements are inside a function, where
+    # --profile-lines counts them
+    stack = [(iter(statements), False)]
+    while stack:
+        steps, in_function = stack[-1]
+        item = next(steps, None)
+        if item is None:
+            stack.pop()
+        elif isinstance(item, list):
+            stack.append((iter(item), in_function))
+        else:
+            if item.line_number is not None:
+                emitter.mark(item.line_number, item.column)
+            if in_function and item.line_number is not None and emitter.profile_lines:
+                emitter.emit_line(f"basic_lines.hit({item.line_number});")
+            if isinstance(item, BlockNode):
+                stack.append(
+                    (item.emit_steps(emitter), in_function or isinstance(item, FunctionNode))
+                )
+            else:
+                item.emit(emitter)
+
+
+class BlockNode(AbstractNode):
+    def emit(self, emitter):
+        emit_body(emitter, [self])
+
+    @abstractmethod
+    def emit_steps(self, emitter):
+        """
+        Emit the statement, yielding every list of nested statements at the
+        point where it is emitted
+        """
+
+
+class ProgramNode(BlockNode):
     def __init__(self):
         self.statements = []
 
     def add_statement(self, stmt):
         self.statements.append(stmt)
 
-    def emit(self, emitter):
+    def emit_steps(self, emitter):
+        lines = 0
+        for node in walk(self):
+            for name in getattr(node, "runtime", ()):
+                basic_runtime.require(emitter, name)
+            lines = max(lines, node.line_number or 0)
+
         emitter.emit_line("/* Begin Program */")
-        for stmt in self.statements:
-            stmt.emit(emitter)
+        if emitter.profile_lines:
+            basic_runtime.require(emitter, "basic_profile")
+            timed = "true" if emitter.profile_time else "false"
+            emitter.emit_line(
+                f"basic_profile basic_lines({cpp_string(emitter.profile_lines)},"
+                f" {lines + 1}, {timed});"
+            )
+        yield self.statements
+        emitter.mark(None)
         emitter.emit_line("/* End Program */")
 
 
-class ClassNode(AbstractNode):
+class ClassNode(BlockNode):
     def __init__(self, name):
         self.name = name
         self.members = []
 
-    def add_member(self, member):
-        self.members.append(member)
+    def add_member(self, member, access="private"):
+        self.members.append((access, member))
 
-    def emit(self, emitter):
+    def emit_steps(self, emitter):
         emitter.emit_line(f"class {self.name} {{")
-        for member in self.members:
-            member.emit(emitter)
+        for access, member in self.members:
+            emitter.emit_line(f"{access}:")
+            yield [member]
         emitter.emit_line("};")
 
 
-class FunctionNode(AbstractNode):
-    def __init__(self, name, params, return_type):
+class ParamNode(AbstractNode):
+    # How the argument is passed: "value", "const_ref" or "ref" (BYREF)
+    def __init__(self, name, param_type, mode="value"):
+        self.name = name
+        self.param_type = param_type
+        self.mode = mode
+
+    def declaration(self):
+        if self.mode == "ref":
+            return f"{self.param_type.lower()}& {self.name}"
+        if self.mode == "const_ref":
+            return f"const {self.param_type.lower()}& {self.name}"
+        return f"{self.param_type.lower()} {self.name}"
+
+    def emit(self, emitter):
+        emitter.emit(self.declaration())
+
+
+class FunctionNode(BlockNode):
+    def __init__(self, name, params, return_type, is_constructor=False):
         self.name = name
         self.params = params
         self.return_type = return_type
+        self.is_constructor = is_constructor
+        self.memo = False
+        self.memo_limit = None
+        self.constexpr = False
         self.statements = []
 
     def add_statement(self, stmt):
         self.statements.append(stmt)
 
+    def emit_steps(self, emitter):
+        params_str = ", ".join(param.declaration() for param in self.params)
+        if self.is_constructor:
+            emitter.emit_line(f"{self.name} ({params_str}) {{")
+        elif self.memo:
+            yield from self.emit_memo(emitter, params_str)
+            return
+        else:
+            # Counting lines is not a constant expression
+            specifier = "constexpr " if self.constexpr and not emitter.profile_lines else ""
+            emitter.emit_line(
+                f"{specifier}{self.return_type.lower()} {self.name}({params_str}) {{"
+            )
+        yield self.statements
+        emitter.emit_line("}")
+
+    def emit_memo(self, emitter, params_str):
+        """
+        Emit the body as <name>__impl and route every call, including the
+        recursive ones inside the body, through a cached <name> wrapper
+        """
+        return_type = self.return_type.lower()
+        arg_names = [param.name for param in self.params]
+        param_types = [param.param_type.lower() for param in self.params]
+
+        if len(self.params) == 1:
+            key_type, key = param_types[0], arg_names[0]
+        else:
+            key_type = f"std::tuple<{', '.join(param_types)}>"
+            key = f"std::make_tuple({', '.join(arg_names)})"
+
+        if self.memo_limit is not None:
+            cache_type = f"basic_memo_lru<{key_type}, {return_type}>"
+            cache_init = f"({self.memo_limit})"
+        elif param_types == ["int"]:
+            cache_type = f"basic_memo_dense<{return_type}>"
+            cache_init = ""
+        else:
+            cache_type = f"basic_memo_map<{key_type}, {return_type}>"
+            cache_init = ""
+
+        basic_runtime.require(emitter, cache_type.split("<")[0])
+
+        emitter.emit_line(f"{return_type} {self.name}({params_str});")
+        emitter.emit_line(f"{return_type} {self.name}__impl({params_str}) {{")
+        yield self.statements
+        emitter.emit_line("}")
+        # The wrapper comes from the header, not from the last statement
+        emitter.mark(self.line_number, self.column)
+        emitter.emit_line(f"{return_type} {self.name}({params_str}) {{")
+        emitter.emit_line(f"static {cache_type} {self.name}__cache{cache_init};")
+        emitter.emit_line(f"{return_type} cached;")
+        emitter.emit_line(f"if ({self.name}__cache.find({key}, cached)) {{")
+        emitter.emit_line("return cached;")
+        emitter.emit_line("}")
+        emitter.emit_line(
+            f"return {self.name}__cache.insert({key}, "
+            f"{self.name}__impl({', '.join(arg_names)}));"
+        )
+        emitter.emit_line("}")
+
+
+class StructNode(AbstractNode):
+    def __init__(self, name):
+        self.name = name
+        self.fields = []
+
+    def add_field(self, name, field_type):
+        self.fields.append((name, field_type))
+
+    def emit(self, emitter):
+        emitter.emit_line(f"struct {self.name} {{")
+        for name, field_type in self.fields:
+            emitter.emit_line(f"{field_type.lower()} {name};")
+        emitter.emit_line("};")
+
+
+class LetNode(AbstractNode):
+    def __init__(self, name, var_type, expr, construct=False):
+        self.name = name
+        self.var_type = var_type
+        self.expr = expr
+        self.construct = construct
+        self.const = False
+
     def emit(self, emitter):
-        params_str = ", ".join(self.params)
-        emitter.emit_line(f"{self.return_type} {self.name}({params_str}) {{")
-        for stmt in self.statements:
-            stmt.emit(emitter)
+        if self.const:
+            emitter.emit_line("const ")
+        if self.construct:
+            emitter.emit_line(f"{self.var_type.lower()} {self.name} {{")
+            if self.expr is not None:
+                emitter.emit_line(self.expr.code)
+            emitter.emit_line("}")
+        else:
+            emitter.emit_line(f"{self.var_type.lower()} {self.name} = ")
+            emitter.emit_line(self.expr.code)
+        emitter.emit_line(";")
+
+
+class DimNode(AbstractNode):
+    def __init__(self, name, var_type, size):
+        self.name = name
+        self.var_type = var_type
+        self.size = size
+        self.const = False
+
+    def emit(self, emitter):
+        if self.const:
+            emitter.emit_line("const ")
+        emitter.emit_line(f"{self.var_type.lower()} {self.name} [")
+        if self.size is not None:
+            emitter.emit_line(self.size.code)
+        emitter.emit_line("] = {};")
+
+
+class AssignNode(AbstractNode):
+    def __init__(self, name, expr):
+        self.name = name
+        self.expr = expr
+
+    def emit(self, emitter):
+        emitter.emit_line(f"{self.name} = ")
+        emitter.emit_line(self.expr.code)
+        emitter.emit_line(";")
+
+
+class IfNode(BlockNode):
+    def __init__(self):
+        self.branches = []
+        self.else_body = None
+
+    def add_branch(self, condition):
+        body = []
+        self.branches.append((condition, body))
+        return body
+
+    def add_else(self):
+        self.else_body = []
+        return self.else_body
+
+    def emit_steps(self, emitter):
+        for index, (condition, body) in enumerate(self.branches):
+            emitter.emit_line("if (" if index == 0 else "} else if (")
+            emitter.emit_line(condition.code)
+            emitter.emit_line(") {")
+            yield body
+        if self.else_body is not None:
+            emitter.emit_line("} else {")
+            yield self.else_body
+        emitter.emit_line("}")
+
+
+# Integer SWITCHes with at least this many cases spread over more than
+# SPARSE_SPAN_RATIO times as many values dispatch through a binary search
+SPARSE_MIN_CASES = 8
+SPARSE_SPAN_RATIO = 10
+
+_FNV_OFFSET = 0xCBF29CE484222325
+_FNV_PRIME = 0x100000001B3
+_MASK64 = (1 << 64) - 1
+
+
+def string_hash(data: bytes, seed: int) -> int:
+    """
+    64-bit FNV-1a of data, matching basic_str_hash in the generated code
+    """
+    value = _FNV_OFFSET ^ seed
+    for byte in data:
+        value = ((value ^ byte) * _FNV_PRIME) & _MASK64
+    return value
+
+
+def find_hash_seed(labels, max_seed=1 << 16):
+    """
+    :param labels: Encoded case labels
+    :return: A seed for which labels of the same length never share a hash
+    """
+    for seed in range(max_seed):
+        seen = set()
+        for label in labels:
+            key = (len(label), string_hash(label, seed))
+            if key in seen:
+                break
+            seen.add(key)
+        else:
+            return seed
+    raise ValueError("no collision-free hash seed for the case labels")
+
+
+class SwitchNode(BlockNode):
+    def __init__(self, expr):
+        self.expr = expr
+        self.cases = []
+        self.default_body = None
+        # "native" C++ switch, "string" length-then-hash or "search" binary search
+        self.strategy = "native"
+        self.values = None
+        self.seed = 0
+        self.runtime = set()
+
+    def add_case(self, label):
+        body = []
+        self.cases.append((label, body))
+        return body
+
+    def add_default(self):
+        self.default_body = []
+        return self.default_body
+
+    def set_values(self, values, value_type):
+        """
+        Pick the dispatch for case labels whose values are known at compile time
+
+        :param values: The value of every case label, in source order
+        :param value_type: "STRING" or the integral type of the SWITCH
+        """
+        self.values = values if value_type == "STRING" else [int(v) for v in values]
+        if value_type == "STRING":
+            self.strategy = "string"
+            self.seed = find_hash_seed([value.encode() for value in values])
+            self.runtime = {"basic_str_hash"}
+        elif (
+            len(self.values) >= SPARSE_MIN_CASES
+            and max(self.values) - min(self.values) + 1
+            > SPARSE_SPAN_RATIO * len(self.values)
+        ):
+            self.strategy = "search"
+            self.runtime = {"basic_search"}
+
+    def emit_steps(self, emitter):
+        if self.strategy == "native":
+            yield from self.emit_native(
+                emitter, self.expr.code, [label.code for label, _ in self.cases]
+            )
+            return
+
+        emitter.emit_line("{")
+        selector = emitter.unique_name("basic_case")
+        if self.strategy == "string":
+            self.emit_string_dispatch(emitter, selector)
+        else:
+            self.emit_search_dispatch(emitter, selector)
+        yield from self.emit_native(
+            emitter, selector, [str(i) for i in range(len(self.cases))]
+        )
+        emitter.emit_line("}")
+
+    def emit_native(self, emitter, selector, labels):
+        emitter.emit_line("switch (")
+        emitter.emit_line(selector)
+        emitter.emit_line(") {")
+        for label, (_, body) in zip(labels, self.cases):
+            emitter.emit_line("case ")
+            emitter.emit_line(label)
+            emitter.emit_line(":")
+            yield body
+            emitter.emit_line("break;")
+        if self.default_body is not None:
+            emitter.emit_line("default:")
+            yield self.default_body
+        emitter.emit_line("}")
+
+    def emit_string_dispatch(self, emitter, selector):
+        """
+        Map the subject to its case index: switch on the length, then on a hash
+        that is collision-free within each length, then confirm with one compare
+        """
+        subject = emitter.unique_name("basic_switch")
+        emitter.emit_line(f"const string& {subject} = {self.expr.code};")
+        emitter.emit_line(f"int {selector} = -1;")
+
+        by_length = {}
+        for index, value in enumerate(self.values):
+            by_length.setdefault(len(value.encode()), []).append((index, value))
+
+        emitter.emit_line(f"switch ({subject}.size()) {{")
+        for length, entries in sorted(by_length.items()):
+            emitter.emit_line(f"case {length}:")
+            if len(entries) == 1:
+                index, value = entries[0]
+                emitter.emit_line(
+                    f"if ({subject} == {cpp_string(value)}) {selector} = {index};"
+                )
+            else:
+                emitter.emit_line(f"switch (basic_str_hash({subject}, {self.seed}ULL)) {{")
+                for index, value in entries:
+                    emitter.emit_line(f"case {string_hash(value.encode(), self.seed)}ULL:")
+                    emitter.emit_line(
+                        f"if ({subject} == {cpp_string(value)}) {selector} = {index};"
+                    )
+                    emitter.emit_line("break;")
+                emitter.emit_line("}")
+            emitter.emit_line("break;")
+        emitter.emit_line("}")
+
+    def emit_search_dispatch(self, emitter, selector):
+        """
+        Map the subject to its case index through a sorted key table
+        """
+        order = sorted(range(len(self.values)), key=lambda i: self.values[i])
+        keys = emitter.unique_name("basic_keys")
+        cases = emitter.unique_name("basic_cases")
+        emitter.emit_line(
+            f"constexpr long long {keys}[] = {{"
+            + ", ".join(f"{self.values[i]}LL" for i in order)
+            + "};"
+        )
+        emitter.emit_line(
+            f"constexpr int {cases}[] = {{" + ", ".join(str(i) for i in order) + "};"
+        )
+        emitter.emit_line(
+            f"int {selector} = basic_search({keys}, {len(order)}, {self.expr.code});"
+        )
+        emitter.emit_line(f"{selector} = {selector} < 0 ? -1 : {cases}[{selector}];")
+
+
+class WhileNode(BlockNode):
+    def __init__(self, condition):
+        self.condition = condition
+        self.statements = []
+
+    def emit_steps(self, emitter):
+        emitter.emit_line("while (")
+        emitter.emit_line(self.condition.code)
+        emitter.emit_line(") {")
+        yield self.statements
         emitter.emit_line("}")
 
 
-# Define other nodes like StructNode, IfNode, LoopNode, etc. in the same manner
+class DoNode(BlockNode):
+    def __init__(self):
+        self.statements = []
+        self.condition = None
+
+    def emit_steps(self, emitter):
+        emitter.emit_line("do {")
+        yield self.statements
+        if self.condition is not None:
+            emitter.emit_line("} while (")
+            emitter.emit_line(self.condition.code)
+            emitter.emit_line(");")
+        else:
+            emitter.emit_line("} while (false);")
+
+
+class ForNode(BlockNode):
+    def __init__(self, var, start, end, step=None):
+        self.var = var
+        self.start = start
+        self.end = end
+        self.step = step
+        self.statements = []
+
+    def emit_steps(self, emitter):
+        emitter.emit_line(f"for ( int {self.var} = ")
+        emitter.emit_line(self.start.code)
+        emitter.emit_line(f"; {self.var} <= ")
+        emitter.emit_line(self.end.code)
+        if self.step is not None:
+            emitter.emit_line(f"; {self.var} += ")
+            emitter.emit_line(self.step.code)
+        else:
+            emitter.emit_line(f"; {self.var}++")
+        emitter.emit_line(") {")
+        yield self.statements
+        emitter.emit_line("}")
+
+
+class InputNode(AbstractNode):
+    def __init__(self, name):
+        self.name = name
+
+    def emit(self, emitter):
+        emitter.emit_line(f"cin >> {self.name};")
+
+
+class PrintNode(AbstractNode):
+    color_map = {
+        "BLACK": "30",
+        "WHITE": "37",
+        "RED": "31",
+        "ORANGE": "33",
+        "YELLOW": "33",
+        "GREEN": "32",
+        "BLUE": "34",
+        "INDIGO": "36",
+        "VIOLET": "35",
+    }
+
+    def __init__(self, expr, color=None):
+        self.expr = expr
+        self.color = color
+
+    def emit(self, emitter):
+        if self.color is not None:
+            emitter.emit_line(
+                f'cout << "\\033[1;{self.color_map[self.color]}m" << {self.expr.code}'
+                f' << "\\033[0m" << endl;'
+            )
+        else:
+            emitter.emit_line(f"cout << {self.expr.code} << endl;")
+
+
+class OpenNode(AbstractNode):
+    def __init__(self, file_name, mode, name):
+        self.file_name = file_name
+        self.mode = mode
+        self.name = name
+
+    def emit(self, emitter):
+        file_mode = "ios::in" if self.mode == "INPUT" else "ios::out"
+        emitter.emit_line(
+            f"fstream {self.name}({cpp_string(self.file_name)}, {file_mode});"
+        )
+
+
+class CloseNode(AbstractNode):
+    def __init__(self, name):
+        self.name = name
+
+    def emit(self, emitter):
+        emitter.emit_line(f"{self.name}.close();")
+
+
+class BreakNode(AbstractNode):
+    def emit(self, emitter):
+        emitter.emit_line("break;")
+
+
+class ContinueNode(AbstractNode):
+    def emit(self, emitter):
+        emitter.emit_line("continue;")
+
+
+class ReturnNode(AbstractNode):
+    def __init__(self, expr=None):
+        self.expr = expr
+
+    def emit(self, emitter):
+        emitter.emit_line("return ")
+        if self.expr is not None:
+            emitter.emit_line(self.expr.code)
+        emitter.emit_line(";")
+
+
+class CallStmtNode(AbstractNode):
+    def __init__(self, call):
+        self.call = call
+
+    def emit(self, emitter):
+        emitter.emit_line(f"{self.call.code};")
+
+
+# Expressions carry their C++ text in ``parts``, strings and child expressions
+# that ``code`` joins without recursing, so a deeply nested expression costs
+# memory linear in its size. Their BASIC type is in ``value_type`` ("INT", "FLOAT", "BOOL", "STRING", a user type,
+# or None when unknown). ``runtime`` names the basic_runtime support they need.
+# A FLOAT expression is ``single`` when C++ computes it in single precision:
+# FLOAT names and calls are floats, a FLOAT literal is a double, and an
+# operator gives a double as soon as one of its operands is one.
+
+_NUMERIC_TYPES = {"INT", "FLOAT", "BOOL"}
+
+_BOOL_OPS = {"&&", "||", "==", "!=", "<", ">", "<=", ">="}
+
+
+def binary_type(op, left_type, right_type):
+    if op in _BOOL_OPS:
+        return "BOOL"
+    if left_type == right_type == "STRING":
+        return "STRING" if op == "+" else None
+    if left_type not in _NUMERIC_TYPES or right_type not in _NUMERIC_TYPES:
+        return None
+    return "FLOAT" if "FLOAT" in (left_type, right_type) else "INT"
+
+
+def is_integral(value_type):
+    return value_type in ("INT", "BOOL")
+
+
+def float_operands(left, right):
+    """
+    :return: If C++ brings the operands of a binary operator to float: one
+        is single-precision and the other one too or an integer
+    """
+    return (left.single or right.single) and all(
+        operand.single or is_integral(operand.value_type) for operand in (left, right)
+    )
+
+
+def cpp_string(value):
+    escaped = (
+        value.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\n", "\\n")
+        .replace("\t", "\\t")
+        .replace("\r", "\\r")
+    )
+    return f'"{escaped}"'
+
+
+def join_parts(node):
+    """
+    :return: The C++ text of expression node
+    """
+    text = []
+    stack = [node]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, str):
+            text.append(item)
+        else:
+            stack.extend(reversed(item.parts))
+    return "".join(text)
+
+
+class ExprNode(AbstractNode):
+    parts = ()
+    value_type = None
+    single = False
+    runtime = ()
+    constexpr_safe = True
+
+    @property
+    def code(self):
+        return join_parts(self)
+
+    def emit(self, emitter):
+        emitter.emit(self.code)
+
+    def __str__(self):
+        return self.code
+
+
+class LiteralNode(ExprNode):
+    def __init__(self, value, value_type, text=None):
+        self.value = value
+        self.value_type = value_type
+        if value_type == "STRING":
+            self.parts = (cpp_string(value),)
+        elif value_type == "BOOL":
+            self.parts = ("true" if value else "false",)
+        else:
+            self.parts = (text if text is not None else str(value),)
+
+
+class NameNode(ExprNode):
+    # constant is the compile-time value of the CONST the name resolved to
+    def __init__(self, name, value_type=None, constant=None):
+        self.name = name
+        self.value_type = value_type
+        self.constant = constant
+        self.parts = (name,)
+        self.single = value_type == "FLOAT"
+
+
+class UnaryNode(ExprNode):
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+        self.parts = (op, operand)
+        if op == "!":
+            # NOT binds looser than a comparison, ! tighter
+            self.parts = ("!(", operand, ")")
+            self.value_type = "BOOL"
+        elif operand.value_type in _NUMERIC_TYPES:
+            self.value_type = "FLOAT" if operand.value_type == "FLOAT" else "INT"
+            self.single = operand.single
+
+
+class BinaryNode(ExprNode):
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+        self.parts = (left, f" {op} ", right)
+        self.value_type = binary_type(op, left.value_type, right.value_type)
+        self.single = self.value_type == "FLOAT" and float_operands(left, right)
+
+
+class ModNode(BinaryNode):
+    """
+    "%" is the C++ operator for integers and fmod for FLOAT operands; when the
+    operand types are not known here a template picks between them in C++
+    """
+
+    def __init__(self, left, right):
+        super().__init__("%", left, right)
+        # fmod is only the float overload for two floats
+        self.single = left.single and right.single
+        if self.value_type == "FLOAT":
+            self.parts = ("fmod(", left, ", ", right, ")")
+            self.runtime = ("<cmath>",)
+            self.constexpr_safe = False
+        elif self.value_type is None:
+            self.parts = ("basic_mod(", left, ", ", right, ")")
+            self.runtime = ("basic_mod",)
+            self.constexpr_safe = False
+
+
+class PowNode(BinaryNode):
+    """
+    Integer powers use exponentiation by squaring, unrolled into
+    multiplications for small constant exponents; pow() is only used for FLOAT
+    """
+
+    max_unrolled = 4
+
+    def __init__(self, base, exponent):
+        super().__init__("^", base, exponent)
+        # pow is only the float overload for two floats
+        self.single = base.single and exponent.single
+        if self.value_type == "INT":
+            if (
+                isinstance(exponent, LiteralNode)
+                and exponent.value_type == "INT"
+                and exponent.value <= self.max_unrolled
+                and isinstance(base, (NameNode, LiteralNode))
+            ):
+                if exponent.value == 0:
+                    self.parts = ("1",)
+                else:
+                    self.parts = (f"({' * '.join([base.code] * exponent.value)})",)
+            else:
+                self.parts = ("basic_ipow(", base, ", ", exponent, ")")
+                self.runtime = ("basic_ipow",)
+        elif self.value_type == "FLOAT":
+            self.parts = ("pow(", base, ", ", exponent, ")")
+            self.runtime = ("<cmath>",)
+            self.constexpr_safe = False
+        else:
+            self.parts = ("basic_pow(", base, ", ", exponent, ")")
+            self.runtime = ("basic_pow",)
+            self.constexpr_safe = False
+
+
+class GroupNode(ExprNode):
+    def __init__(self, expr):
+        self.expr = expr
+        self.parts = ("(", expr, ")")
+        self.value_type = expr.value_type
+        self.single = expr.single
+
+
+class CallNode(ExprNode):
+    def __init__(self, name, args, value_type=None):
+        self.name = name
+        self.args = args
+        self.value_type = value_type
+        self.single = value_type == "FLOAT"
+        parts = [name, "("]
+        for index, arg in enumerate(args):
+            if index:
+                parts.append(", ")
+            parts.append(arg)
+        parts.append(")")
+        self.parts = tuple(parts)
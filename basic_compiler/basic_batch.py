@@ -0,0 +1,273 @@
+"""
+Batch compilation of many programs in one run:
+
+    python -m basic_compiler.basic_batch 'tests/*.b' --manifest corpus.txt \
+        --output-dir build --compile -j 8 --cxx-jobs 8
+
+Inputs are file names or glob patterns ('**' recurses); a manifest lists one
+per line, relative to the manifest, with '#' starting a comment. Lexing,
+parsing and emitting run in a pool of -j processes. As soon as a program's C++
+is written, g++ builds it on one of --cxx-jobs threads, so the Python front
+end and the C++ compiler overlap.
+
+Diagnostics are printed per program in input order after the run, followed
+by a summary. The exit status is 1 if any program failed, otherwise 0.
+"""
+
+import argparse
+import glob
+import io
+import logging
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import List, NamedTuple
+
+from basic_compiler.basic_argparser import DEFAULT_MAX_ERRORS, VERSION, add_compile_options
+from basic_compiler.basic_emitter import compiler_command
+from basic_compiler.main import HEADER, compile_args, stream_logger
+
+
+class BatchResult(NamedTuple):
+    input: str
+    output: str
+    status: int
+    # What the front end, clang-format and g++ printed
+    diagnostics: str
+
+
+def read_manifest(path: str) -> List[str]:
+    """
+    :return: The inputs listed in the manifest, relative to its directory
+    """
+    base = os.path.dirname(path)
+    inputs = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                inputs.append(os.path.join(base, line))
+    return inputs
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    :param patterns: File names and glob patterns
+    :return: The matching files in order, each once. A pattern without glob
+        characters is kept even if the file does not exist, so it is reported
+    """
+    inputs = []
+    seen = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+        else:
+            matches = [pattern]
+        for match in matches:
+            key = os.path.normpath(match)
+            if key not in seen:
+                seen.add(key)
+                inputs.append(match)
+    return inputs
+
+
+def output_path(input: str, output_dir: str = None, target: str = "cpp") -> str:
+    """
+    :return: The C++ (or C) file for input: next to it, or in output_dir
+    """
+    stem = os.path.splitext(input)[0] + (".c" if target == "c" else ".cpp")
+    if output_dir is None:
+        return stem
+    return os.path.join(output_dir, os.path.basename(stem))
+
+
+def front_end(input: str, output: str, options: dict) -> BatchResult:
+    """
+    Lex, parse and emit one program. Runs in a worker process
+
+    :param options: The shared compile options, see add_compile_options
+    """
+    args = argparse.Namespace(
+        input=input,
+        output=output,
+        jobs=1,
+        trace=None,
+        timings=False,
+        timings_json=None,
+        execute=False,
+        pipe=False,
+        profile_lines=False,
+        profile_time=False,
+        source_map=False,
+        backend="cpp",
+        **{"target": "cpp", "max_errors": DEFAULT_MAX_ERRORS, **options},
+    )
+    # g++ runs in the batch process, on its own pool
+    args.compile = False
+    diagnostics = io.StringIO()
+    log = stream_logger(diagnostics, args.verbose)
+    try:
+        status = compile_args(args, log, tool_output=diagnostics, trace_memory=False)
+    except OSError as e:
+        log.error(f"Unexpected error:\n {e}")
+        status = 1
+    return BatchResult(input, output, status, diagnostics.getvalue())
+
+
+def build(result: BatchResult, target: str = "cpp", opt: int = 0) -> BatchResult:
+    """
+    Compile the C++ or C of a program whose front end succeeded
+
+    :param opt: The optimization level
+    """
+    process = subprocess.run(
+        compiler_command(result.output, target, opt=opt), capture_output=True, text=True
+    )
+    return result._replace(
+        status=process.returncode,
+        diagnostics=result.diagnostics + process.stdout + process.stderr,
+    )
+
+
+def compile_batch(
+    inputs: List[str],
+    options: dict,
+    output_dir: str = None,
+    jobs: int = None,
+    cxx_jobs: int = None,
+) -> List[BatchResult]:
+    """
+    :param inputs: The source files
+    :param options: The shared compile options, see add_compile_options
+    :param output_dir: Where the C++ files go, next to the sources by default
+    :param jobs: Front-end processes, one per CPU by default; 1 runs in this process
+    :param cxx_jobs: g++ processes run at the same time, one per CPU by default
+    :return: One result per input, in input order
+    """
+    jobs = jobs or os.cpu_count() or 1
+    cxx_jobs = cxx_jobs or os.cpu_count() or 1
+    target = options.get("target", "cpp")
+    outputs = [output_path(input, output_dir, target) for input in inputs]
+    results = [None] * len(inputs)
+    with ThreadPoolExecutor(max_workers=cxx_jobs) as builders:
+        builds = {}
+
+        def front_end_done(index: int, result: BatchResult) -> None:
+            results[index] = result
+            if result.status == 0 and options.get("compile"):
+                builds[index] = builders.submit(build, result, target, options.get("opt", 0))
+
+        if jobs == 1:
+            for index, input in enumerate(inputs):
+                front_end_done(index, front_end(input, outputs[index], options))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as front_ends:
+                futures = {
+                    front_ends.submit(front_end, input, outputs[index], options): index
+                    for index, input in enumerate(inputs)
+                }
+                for future in as_completed(futures):
+                    front_end_done(futures[future], future.result())
+
+        for index, future in builds.items():
+            results[index] = future.result()
+    return results
+
+
+def report(results: List[BatchResult], log: logging.Logger, verbose: bool = False) -> int:
+    """
+    Log each program's diagnostics and a summary
+
+    :return: The exit status
+    """
+    failed = 0
+    for result in results:
+        if result.status:
+            failed += 1
+        if result.diagnostics.strip() and (result.status or verbose):
+            log.info(f"== {result.input} ==\n{result.diagnostics.rstrip()}")
+    log.info(
+        f"{len(results) - failed} of {len(results)} programs compiled, {failed} failed"
+    )
+    return 1 if failed else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="basic_batch", description="Compile many BASIC programs in one run"
+    )
+    parser.add_argument(
+        "inputs", help="Source files or glob patterns", nargs="*", metavar="INPUT"
+    )
+    parser.add_argument(
+        "--manifest",
+        help="A file listing one source per line",
+        action="append",
+        default=[],
+    )
+    parser.add_argument(
+        "--output-dir", help="Write the C++ files here instead of next to the sources"
+    )
+    add_compile_options(parser)
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        help="Lex, parse and emit in this many processes (default: one per CPU)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument(
+        "--cxx-jobs",
+        help="Run at most this many g++ at once (default: one per CPU)",
+        type=int,
+        default=None,
+    )
+    parser.add_argument("-V", "--version", action="version", version=VERSION)
+    return parser
+
+
+def main(argv: list = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    patterns = list(args.inputs)
+    for manifest in args.manifest:
+        try:
+            patterns.extend(read_manifest(manifest))
+        except OSError as e:
+            parser.error(f"cannot read manifest: {e}")
+    inputs = expand_inputs(patterns)
+    if not inputs:
+        parser.error("no input files")
+
+    outputs = {}
+    for input in inputs:
+        output = output_path(input, args.output_dir, args.target)
+        if output in outputs:
+            parser.error(f"{input} and {outputs[output]} would both be written to {output}")
+        outputs[output] = input
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    options = {
+        name: getattr(args, name)
+        for name in (
+            "opt",
+            "ctfe_steps",
+            "max_errors",
+            "explicit_stack",
+            "target",
+            "compile",
+            "format",
+            "verbose",
+        )
+    }
+    logging.info(HEADER)
+    results = compile_batch(inputs, options, args.output_dir, args.jobs, args.cxx_jobs)
+    return report(results, logging.getLogger(), args.verbose)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
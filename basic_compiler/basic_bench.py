@@ -0,0 +1,174 @@
+"""
+Run a compiled program many times and summarize how long it takes, for
+``--bench``.
+
+A program built by the cpp backend runs as a child process; os.wait4 gives
+the CPU time and peak resident memory of each run. The vm and python
+backends run the program in this process, so their CPU time comes from
+getrusage of the process and their peak memory is that of the compiler too.
+Warm-up runs are made first and not counted. What the program prints is
+thrown away.
+
+On Linux the peak memory of a child includes what this process had resident
+when it started the child, as the kernel carries it over exec: a small
+program reports about the size of the compiler. Variants measured by the
+same process still compare.
+"""
+
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+class Sample(NamedTuple):
+    wall_s: float
+    cpu_s: float
+    # None where getrusage is not available
+    max_rss_kib: Optional[int]
+
+
+def _kib(max_rss: int) -> int:
+    # Linux reports KiB, macOS bytes
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def run_child(command: List[str], stdin_path: str = None) -> Sample:
+    """
+    Run a program once
+
+    :param stdin_path: The file the program reads, nothing by default
+    :raise ChildProcessError: If a signal killed the program
+    """
+    with open(stdin_path or os.devnull, "rb") as stdin, open(os.devnull, "wb") as devnull:
+        wall = time.perf_counter()
+        process = subprocess.Popen(command, stdin=stdin, stdout=devnull)
+        if hasattr(os, "wait4"):
+            _, status, usage = os.wait4(process.pid, 0)
+            wall = time.perf_counter() - wall
+            process.returncode = os.waitstatus_to_exitcode(status)
+            sample = Sample(wall, usage.ru_utime + usage.ru_stime, _kib(usage.ru_maxrss))
+        else:
+            process.wait()
+            sample = Sample(time.perf_counter() - wall, 0.0, None)
+    if process.returncode < 0:
+        raise ChildProcessError(f"The program was killed by signal {-process.returncode}")
+    return sample
+
+
+def run_here(run: Callable, stdin_path: str = None) -> Sample:
+    """
+    Run a program in this process once
+
+    :param run: Runs the program, called with its stdin and stdout
+    :param stdin_path: The file the program reads, nothing by default
+    """
+    with open(stdin_path or os.devnull) as stdin, open(os.devnull, "w") as devnull:
+        before = resource.getrusage(resource.RUSAGE_SELF) if resource else None
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        run(stdin, devnull)
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+    if before is None:
+        return Sample(wall, cpu, None)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = after.ru_utime + after.ru_stime - before.ru_utime - before.ru_stime
+    return Sample(wall, cpu, _kib(after.ru_maxrss))
+
+
+def percentile(values: List[float], share: float) -> float:
+    """
+    :param share: 0.95 for the 95th percentile
+    :return: The nearest-rank percentile of values
+    """
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(share * len(ordered)) - 1)]
+
+
+def summarize(label: str, samples: List[Sample]) -> dict:
+    """
+    :param label: Names the variant, such as "cpp -O2"
+    :return: The minimum, median and 95th percentile of the wall and CPU
+        times, the highest peak memory and the samples themselves
+    """
+    record = {"label": label, "runs": len(samples)}
+    for field in ("wall_s", "cpu_s"):
+        values = [getattr(sample, field) for sample in samples]
+        record[field] = {
+            "min": min(values),
+            "median": statistics.median(values),
+            "p95": percentile(values, 0.95),
+        }
+    rss = [sample.max_rss_kib for sample in samples if sample.max_rss_kib is not None]
+    record["max_rss_kib"] = max(rss) if rss else None
+    record["samples"] = [list(sample) for sample in samples]
+    return record
+
+
+def bench(label: str, run_once: Callable[[], Sample], runs: int, warmup: int = 1) -> dict:
+    """
+    :param run_once: Runs the program once, run_child or run_here bound to it
+    :param runs: How many runs are measured
+    :param warmup: How many runs come first and are not measured
+    :return: The summary of the measured runs, see summarize
+    """
+    for _ in range(warmup):
+        run_once()
+    return summarize(label, [run_once() for _ in range(runs)])
+
+
+# The rows of report(): the name, the field of the summary and its statistic
+_ROWS = [
+    (f"{kind} {statistic} ms", field, statistic)
+    for kind, field in (("wall", "wall_s"), ("cpu", "cpu_s"))
+    for statistic in ("min", "median", "p95")
+] + [("max rss KiB", "max_rss_kib", None)]
+
+
+def report(records: List[dict]) -> str:
+    """
+    :param records: One summary per variant; with two, a column compares the
+        second with the first
+    :return: A table of the variants side by side for people
+    """
+    compare = len(records) == 2
+    header = f"{'':<16}" + "".join(f"{record['label']:>14}" for record in records)
+    lines = [header + (f"{'ratio':>9}" if compare else "")]
+    for name, field, statistic in _ROWS:
+        values = [
+            record[field] if statistic is None else record[field][statistic] * 1000
+            for record in records
+        ]
+        line = f"{name:<16}"
+        for value in values:
+            if value is None:
+                line += f"{'-':>14}"
+            elif statistic is None:
+                line += f"{value:>14}"
+            else:
+                line += f"{value:>14.2f}"
+        if compare:
+            first, second = values
+            line += f"{second / first:>8.2f}x" if first and second is not None else f"{'-':>9}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def to_json(records: List[dict], **fields) -> str:
+    """
+    :param fields: Extra top-level fields, such as the input file
+    :return: A JSON record of the variants for machines
+    """
+    record = dict(fields)
+    record["variants"] = records
+    return json.dumps(record, indent=2)
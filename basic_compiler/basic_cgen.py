@@ -0,0 +1,1174 @@
+"""
+C backend: ``--target c`` translates the parsed program into C99 that needs
+only the C library, so gcc or tcc builds it without the C++ front end and the
+program prints through printf and fwrite instead of iostreams.
+
+STRINGs are immutable NUL-terminated ``basic_str`` (``const char *``):
+literals stay in static storage and a concatenation allocates a new string
+that lives until the program exits. STRUCTs become C structs. A CLASS
+becomes a struct of its fields, with its methods as functions named
+<class>_<method> that take the object as ``self``; the constructor is
+<class>_<class>. BYREF parameters are pointers. C has no overloading, so an
+overloaded function gets the types of its parameters appended to its name.
+
+Output is the C++ target's: FLOAT values print with %g as cout prints
+them, and BOOL prints as 1 or 0.
+"""
+
+from typing import List, Optional
+
+from basic_compiler.basic_ast import (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ClassNode,
+    CloseNode,
+    ContinueNode,
+    DimNode,
+    DoNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    InputNode,
+    LetNode,
+    LiteralNode,
+    ModNode,
+    NameNode,
+    OpenNode,
+    PowNode,
+    PrintNode,
+    ProgramNode,
+    ReturnNode,
+    StructNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+    cpp_string,
+    walk,
+)
+from basic_compiler.basic_exceptions import BackendError
+from basic_compiler.basic_vm import resolve_call, scalar_type
+
+ALLOC = """\
+static void *basic_alloc(size_t size) {
+    void *data = malloc(size);
+    if (data == NULL) {
+        fputs("Out of memory\\n", stderr);
+        exit(1);
+    }
+    return data;
+}
+"""
+
+STR = """\
+typedef const char *basic_str;
+"""
+
+CONCAT = """\
+static basic_str basic_concat(basic_str a, basic_str b) {
+    size_t a_size = strlen(a);
+    size_t b_size = strlen(b);
+    char *s = basic_alloc(a_size + b_size + 1);
+    memcpy(s, a, a_size);
+    memcpy(s + a_size, b, b_size + 1);
+    return s;
+}
+"""
+
+INPUT_INT = """\
+static void basic_input_int(int *value) {
+    if (scanf("%d", value) != 1) {
+        *value = 0;
+    }
+}
+"""
+
+INPUT_FLOAT = """\
+static void basic_input_float(float *value) {
+    if (scanf("%f", value) != 1) {
+        *value = 0;
+    }
+}
+"""
+
+INPUT_BOOL = """\
+static void basic_input_bool(bool *value) {
+    int n;
+    *value = scanf("%d", &n) == 1 && n == 1;
+}
+"""
+
+INPUT_STR = """\
+static void basic_input_str(basic_str *value) {
+    int c = getchar();
+    while (c != EOF && isspace(c)) {
+        c = getchar();
+    }
+    if (c == EOF) {
+        return;
+    }
+    size_t size = 0;
+    size_t capacity = 16;
+    char *s = basic_alloc(capacity);
+    while (c != EOF && !isspace(c)) {
+        if (size + 1 == capacity) {
+            char *grown = basic_alloc(capacity *= 2);
+            memcpy(grown, s, size);
+            free(s);
+            s = grown;
+        }
+        s[size++] = (char)c;
+        c = getchar();
+    }
+    if (c != EOF) {
+        ungetc(c, stdin);
+    }
+    s[size] = '\\0';
+    *value = s;
+}
+"""
+
+IPOW = """\
+static int basic_ipow(int base, long long exp) {
+    if (exp < 0) {
+        if (base == 1) {
+            return 1;
+        }
+        if (base == -1) {
+            return (exp & 1) ? -1 : 1;
+        }
+        return 0;
+    }
+    int result = 1;
+    while (exp) {
+        if (exp & 1) {
+            result *= base;
+        }
+        exp >>= 1;
+        if (exp) {
+            base *= base;
+        }
+    }
+    return result;
+}
+"""
+
+MEMO = """\
+typedef struct {
+    unsigned char *data;
+    size_t size;
+    size_t capacity;
+    unsigned char local[64];
+} basic_key;
+
+static void basic_key_init(basic_key *key) {
+    key->data = key->local;
+    key->size = 0;
+    key->capacity = sizeof key->local;
+}
+
+static void basic_key_add(basic_key *key, const void *data, size_t size) {
+    if (key->size + size > key->capacity) {
+        size_t capacity = 2 * (key->size + size);
+        unsigned char *grown = basic_alloc(capacity);
+        memcpy(grown, key->data, key->size);
+        if (key->data != key->local) {
+            free(key->data);
+        }
+        key->data = grown;
+        key->capacity = capacity;
+    }
+    memcpy(key->data + key->size, data, size);
+    key->size += size;
+}
+
+static void basic_key_free(basic_key *key) {
+    if (key->data != key->local) {
+        free(key->data);
+    }
+}
+
+typedef struct {
+    unsigned long long hash;
+    size_t size;
+    unsigned char *entry;
+} basic_memo_slot;
+
+/* An open-addressing table from argument bytes to result bytes. A table
+   with a limit is emptied when it is full */
+typedef struct {
+    basic_memo_slot *slots;
+    size_t capacity;
+    size_t count;
+    size_t limit;
+} basic_memo;
+
+static unsigned long long basic_key_hash(const basic_key *key) {
+    unsigned long long h = 0xcbf29ce484222325ULL;
+    for (size_t i = 0; i < key->size; i++) {
+        h = (h ^ key->data[i]) * 0x100000001b3ULL;
+    }
+    return h;
+}
+
+static basic_memo_slot *basic_memo_slot_for(basic_memo *memo, const basic_key *key,
+                                            unsigned long long hash) {
+    size_t mask = memo->capacity - 1;
+    for (size_t i = hash & mask;; i = (i + 1) & mask) {
+        basic_memo_slot *slot = &memo->slots[i];
+        if (slot->entry == NULL ||
+            (slot->hash == hash && slot->size == key->size &&
+             memcmp(slot->entry, key->data, key->size) == 0)) {
+            return slot;
+        }
+    }
+}
+
+static bool basic_memo_find(basic_memo *memo, const basic_key *key, void *value,
+                            size_t value_size) {
+    if (memo->count == 0) {
+        return false;
+    }
+    basic_memo_slot *slot = basic_memo_slot_for(memo, key, basic_key_hash(key));
+    if (slot->entry == NULL) {
+        return false;
+    }
+    memcpy(value, slot->entry + slot->size, value_size);
+    return true;
+}
+
+static void basic_memo_resize(basic_memo *memo, size_t capacity) {
+    basic_memo_slot *old = memo->slots;
+    size_t old_capacity = memo->capacity;
+    memo->slots = basic_alloc(capacity * sizeof *memo->slots);
+    memset(memo->slots, 0, capacity * sizeof *memo->slots);
+    memo->capacity = capacity;
+    for (size_t i = 0; i < old_capacity; i++) {
+        if (old[i].entry != NULL) {
+            size_t mask = capacity - 1;
+            size_t j = old[i].hash & mask;
+            while (memo->slots[j].entry != NULL) {
+                j = (j + 1) & mask;
+            }
+            memo->slots[j] = old[i];
+        }
+    }
+    free(old);
+}
+
+static void basic_memo_insert(basic_memo *memo, const basic_key *key,
+                              const void *value, size_t value_size) {
+    if (memo->limit && memo->count >= memo->limit) {
+        for (size_t i = 0; i < memo->capacity; i++) {
+            free(memo->slots[i].entry);
+            memo->slots[i].entry = NULL;
+        }
+        memo->count = 0;
+    }
+    if (2 * (memo->count + 1) > memo->capacity) {
+        basic_memo_resize(memo, memo->capacity ? 2 * memo->capacity : 16);
+    }
+    unsigned long long hash = basic_key_hash(key);
+    basic_memo_slot *slot = basic_memo_slot_for(memo, key, hash);
+    if (slot->entry == NULL) {
+        slot->hash = hash;
+        slot->size = key->size;
+        slot->entry = basic_alloc(key->size + value_size);
+        memcpy(slot->entry, key->data, key->size);
+        memo->count++;
+    }
+    memcpy(slot->entry + key->size, value, value_size);
+}
+"""
+
+PROFILE = """\
+typedef struct {
+    const char *path;
+    int lines;
+    bool timed;
+    unsigned long long *hits;
+    long long *nanos;
+    int last;
+    clock_t since;
+} basic_profile;
+
+static basic_profile basic_lines;
+
+/* A line is charged the processor time until the next line starts */
+static void basic_profile_charge(void) {
+    clock_t now = clock();
+    basic_lines.nanos[basic_lines.last] +=
+        (long long)((now - basic_lines.since) * (1e9 / CLOCKS_PER_SEC));
+    basic_lines.since = now;
+}
+
+static void basic_profile_write(void) {
+    if (basic_lines.timed) {
+        basic_profile_charge();
+    }
+    FILE *out = fopen(basic_lines.path, "w");
+    if (out == NULL) {
+        return;
+    }
+    fputs("# basic_compiler line profile: line hits nanoseconds\\n", out);
+    for (int line = 1; line < basic_lines.lines; line++) {
+        if (basic_lines.hits[line]) {
+            fprintf(out, "%d %llu %lld\\n", line, basic_lines.hits[line],
+                    basic_lines.nanos[line]);
+        }
+    }
+    fclose(out);
+}
+
+static void basic_profile_start(const char *path, int lines, bool timed) {
+    basic_lines.path = path;
+    basic_lines.lines = lines;
+    basic_lines.timed = timed;
+    basic_lines.hits = calloc(lines, sizeof *basic_lines.hits);
+    basic_lines.nanos = calloc(lines, sizeof *basic_lines.nanos);
+    if (basic_lines.hits == NULL || basic_lines.nanos == NULL) {
+        fputs("Out of memory\\n", stderr);
+        exit(1);
+    }
+    basic_lines.since = clock();
+    atexit(basic_profile_write);
+}
+
+static void basic_profile_hit(int line) {
+    basic_lines.hits[line]++;
+    if (basic_lines.timed) {
+        basic_profile_charge();
+        basic_lines.last = line;
+    }
+}
+"""
+
+# name -> (headers, snippets it depends on, code)
+SNIPPETS = {
+    "basic_alloc": (("<stdlib.h>",), (), ALLOC),
+    "basic_str": ((), (), STR),
+    "basic_concat": (("<string.h>",), ("basic_alloc", "basic_str"), CONCAT),
+    "basic_input_int": ((), (), INPUT_INT),
+    "basic_input_float": ((), (), INPUT_FLOAT),
+    "basic_input_bool": ((), (), INPUT_BOOL),
+    "basic_input_str": (
+        ("<ctype.h>", "<string.h>"),
+        ("basic_alloc", "basic_str"),
+        INPUT_STR,
+    ),
+    "basic_ipow": ((), (), IPOW),
+    "basic_memo": (("<string.h>",), ("basic_alloc",), MEMO),
+    "basic_profile": (("<stdlib.h>", "<time.h>"), (), PROFILE),
+}
+
+
+def require(emitter, name):
+    """
+    Make the snippet or the <header> called name available to the generated code
+    """
+    if name.startswith("<"):
+        emitter.include(name)
+        return
+
+    headers, depends, code = SNIPPETS[name]
+    emitter.include(*headers)
+    for dependency in depends:
+        require(emitter, dependency)
+    emitter.require(name, code)
+
+
+_C_TYPES = {"INT": "int", "FLOAT": "float", "BOOL": "bool", "STRING": "basic_str", "VOID": "void"}
+
+_DEFAULTS = {"INT": "0", "FLOAT": "0", "BOOL": "false", "STRING": '""'}
+
+_COLORS = {
+    "BLACK": "30",
+    "WHITE": "37",
+    "RED": "31",
+    "ORANGE": "33",
+    "YELLOW": "33",
+    "GREEN": "32",
+    "BLUE": "34",
+    "INDIGO": "36",
+    "VIOLET": "35",
+}
+
+_PRINT_FORMATS = {"INT": "%d", "BOOL": "%d", "FLOAT": "%g", "STRING": "%s"}
+
+_COMPARISONS = {"==", "!=", "<", ">", "<=", ">="}
+
+# Names the generated code or the C headers it includes already use; BASIC
+# names that collide are renamed with a trailing underscore
+_RESERVED = {
+    "EOF", "FILE", "NULL", "abs", "acos", "asin", "atan", "atan2", "atof",
+    "atoi", "basic_str", "bool", "cbrt", "ceil", "cos", "cosh", "div", "erf",
+    "exit", "exp", "fabs", "fclose", "floor", "fmod", "fopen", "fputs",
+    "free", "fwrite", "getchar", "hypot", "isspace", "j0", "j1", "jn",
+    "labs", "log", "log10", "log2", "malloc", "memcmp", "memcpy", "memset",
+    "pow", "printf", "putchar", "rand", "remainder", "restrict", "round",
+    "scanf", "self", "sin", "sinh", "size_t", "sqrt", "srand", "stderr",
+    "stdin", "stdout", "strcmp", "strlen", "tan", "tanh", "trunc", "ungetc",
+    "y0", "y1", "yn",
+}
+
+
+def c_name(name: str) -> str:
+    """
+    :return: The C identifier for a BASIC name
+    """
+    return name + "_" if name in _RESERVED else name
+
+
+def _c_literal(value, value_type: Optional[str]) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return cpp_string(value)
+    if isinstance(value, float):
+        # A FLOAT is a float, as the constant C++ names is
+        return f"{value!r}f" if value_type == "FLOAT" else repr(value)
+    return str(value)
+
+
+class _Variable:
+    def __init__(self, var_type: Optional[str], access: str = "{}"):
+        """
+        :param access: Formats the C expression that reads the variable
+            from its C name: "{}", "(*{})" for BYREF or "self->{}" for a field
+        """
+        self.var_type = scalar_type(var_type)
+        self.access = access
+
+
+class CTranslator:
+    """
+    Translates a ProgramNode into C99 written to an Emitter. Expressions and
+    blocks translate recursively
+    """
+
+    def __init__(self, emitter):
+        self._emitter = emitter
+        self._depth = 0
+        self._signatures = {}
+        self._c_names = {}
+        self._structs = {}
+        self._classes = {}
+        self._globals = {}
+        # For each CLASS, the signatures of its methods
+        self._methods_of = {}
+        # Per function being translated
+        self._scopes = []
+        self._class = None
+        self._lines = 0
+
+    def translate(self, program: ProgramNode) -> None:
+        """
+        :raise BackendError: If the program uses what C cannot express
+        """
+        functions = []
+        declarations = []
+        for stmt in program.statements:
+            if isinstance(stmt, FunctionNode):
+                self._signatures.setdefault(stmt.name, []).append((len(functions), stmt))
+                functions.append(stmt)
+            elif isinstance(stmt, StructNode):
+                self._structs[stmt.name] = stmt
+            elif isinstance(stmt, ClassNode):
+                self._classes[stmt.name] = stmt
+            elif isinstance(stmt, (LetNode, DimNode)):
+                declarations.append(stmt)
+            else:
+                raise BackendError(
+                    f"{type(stmt).__name__[:-4].upper()} is only allowed inside a function"
+                )
+        if not any(not node.params for _, node in self._signatures.get("main", ())):
+            raise BackendError("The program has no main() function")
+        self._lines = max(node.line_number or 0 for node in walk(program))
+        self._name_functions(self._signatures, "")
+        for class_node in self._classes.values():
+            signatures = self._methods_of[class_node.name] = {}
+            for index, method in enumerate(self._methods(class_node)):
+                signatures.setdefault(method.name, []).append((index, method))
+            self._name_functions(signatures, f"{class_node.name}_")
+
+        self._emit_line("/* Begin Program */")
+        for stmt in program.statements:
+            if isinstance(stmt, StructNode):
+                self._struct(stmt.name, [(name, field_type) for name, field_type in stmt.fields])
+            elif isinstance(stmt, ClassNode):
+                self._struct(stmt.name, self._fields(stmt))
+
+        initializers = []
+        for stmt in declarations:
+            self._mark(stmt)
+            initializers += self._global(stmt)
+        self._emitter.mark(None)
+        for stmt in program.statements:
+            if isinstance(stmt, ClassNode):
+                for method in self._methods(stmt):
+                    self._prototypes(method, stmt)
+            elif isinstance(stmt, FunctionNode) and self._c_names[id(stmt)] != "main":
+                self._prototypes(stmt)
+        if initializers:
+            self._emit_line("static void basic_init_globals(void);")
+
+        for stmt in program.statements:
+            if isinstance(stmt, ClassNode):
+                self._class_functions(stmt)
+            elif isinstance(stmt, FunctionNode):
+                self._function(stmt, initializers and stmt.name == "main" and not stmt.params)
+
+        if initializers:
+            self._emit_line("static void basic_init_globals(void) {")
+            self._depth += 1
+            for line in initializers:
+                self._emit_line(line)
+            self._depth -= 1
+            self._emit_line("}")
+        self._emitter.mark(None)
+        self._emit_line("/* End Program */")
+
+    # Output
+
+    def _emit_line(self, code: str) -> None:
+        self._emitter.emit_line("    " * self._depth + code)
+
+    def _mark(self, node) -> None:
+        """
+        Attribute the lines emitted next to the line of node, for the source map
+        """
+        if node.line_number is not None:
+            self._emitter.mark(node.line_number, node.column)
+
+    def _require(self, name: str) -> None:
+        require(self._emitter, name)
+
+    # Names and types
+
+    def _name_functions(self, signatures: dict, prefix: str) -> None:
+        for name, overloads in signatures.items():
+            for _, node in overloads:
+                if len(overloads) == 1:
+                    suffix = ""
+                else:
+                    types = [scalar_type(param.param_type) for param in node.params]
+                    suffix = "__" + "_".join(types or ["void"]).lower()
+                self._c_names[id(node)] = (
+                    f"{prefix}{name}{suffix}" if prefix or suffix else c_name(name)
+                )
+
+    def _methods(self, class_node: ClassNode) -> List[FunctionNode]:
+        return [member for _, member in class_node.members if isinstance(member, FunctionNode)]
+
+    def _fields(self, class_node: ClassNode) -> list:
+        return [
+            (member.name, member.var_type, member)
+            for _, member in class_node.members
+            if isinstance(member, (LetNode, DimNode))
+        ]
+
+    def _type(self, var_type: Optional[str]) -> str:
+        var_type = scalar_type(var_type)
+        if var_type in _C_TYPES:
+            if var_type == "STRING":
+                self._require("basic_str")
+            return _C_TYPES[var_type]
+        if var_type in self._structs or var_type in self._classes:
+            return var_type
+        raise BackendError(f"Unknown type {var_type}")
+
+    def _default(self, var_type: Optional[str]) -> str:
+        """
+        :return: A constant initializer for a value of var_type
+        """
+        var_type = scalar_type(var_type)
+        if var_type in _DEFAULTS:
+            return _DEFAULTS[var_type]
+        if var_type in self._structs:
+            fields = self._structs[var_type].fields
+            return "{" + ", ".join(self._default(field_type) for _, field_type in fields) + "}"
+        raise BackendError(f"A {var_type} has no default value")
+
+    def _declare(self, name: str, var_type: Optional[str], access: str = "{}") -> str:
+        variable = _Variable(var_type, access)
+        if self._scopes:
+            self._scopes[-1][name] = variable
+        else:
+            self._globals[name] = variable
+        return c_name(name)
+
+    def _lookup(self, name: str) -> _Variable:
+        for scope in reversed(self._scopes):
+            if name in scope:
+                return scope[name]
+        if self._class is not None:
+            for field_name, field_type, _ in self._fields(self._class):
+                if field_name == name:
+                    return _Variable(field_type, "self->{}")
+        if name in self._globals:
+            return self._globals[name]
+        raise BackendError(f"'{name}' is not a variable")
+
+    def _variable(self, name: str) -> str:
+        return self._lookup(name).access.format(c_name(name))
+
+    def _address(self, name: str) -> str:
+        """
+        :return: A pointer to the variable called name
+        """
+        variable = self._lookup(name)
+        if variable.access == "(*{})":
+            return c_name(name)
+        return "&" + variable.access.format(c_name(name))
+
+    # Declarations
+
+    def _struct(self, name: str, fields: list) -> None:
+        self._emit_line(f"typedef struct {name} {{")
+        self._depth += 1
+        for field in fields:
+            field_name, field_type = field[0], field[1]
+            size = ""
+            if len(field) > 2 and isinstance(field[2], DimNode):
+                size = f"[{self._constant_size(field[2])}]"
+            self._emit_line(f"{self._type(field_type)} {c_name(field_name)}{size};")
+        self._depth -= 1
+        self._emit_line(f"}} {name};")
+
+    def _global(self, node) -> List[str]:
+        """
+        Declare a global with a constant initializer when C allows one
+
+        :return: The statements that initialize it at the start of main
+        """
+        var_type = scalar_type(node.var_type)
+        const = "const " if node.const else ""
+        if isinstance(node, DimNode):
+            name = self._declare(node.name, None)
+            size = self._constant_size(node)
+            if var_type in _DEFAULTS and var_type != "STRING":
+                self._emit_line(f"{const}{self._type(var_type)} {name}[{size}] = {{0}};")
+                return []
+            self._emit_line(f"{self._type(var_type)} {name}[{size}];")
+            return self._fill(name, str(size), var_type)
+
+        name = self._declare(node.name, var_type)
+        if var_type in self._classes:
+            self._emit_line(f"{var_type} {name};")
+            return [self._construct(node, name)]
+        if node.expr is None:
+            self._emit_line(f"{const}{self._type(var_type)} {name} = {self._default(var_type)};")
+            return []
+        if _is_constant(node.expr):
+            self._emit_line(f"{const}{self._type(var_type)} {name} = {self._initializer(node)};")
+            return []
+        self._emit_line(f"{self._type(var_type)} {name};")
+        return [f"{name} = {self._initializer(node)};"]
+
+    def _initializer(self, node: LetNode) -> str:
+        var_type = scalar_type(node.var_type)
+        if node.expr is None:
+            return self._default(var_type)
+        if node.construct and var_type in self._structs:
+            # Aggregate initialization sets the first field
+            fields = self._structs[var_type].fields
+            items = [self._expr(node.expr)]
+            items += [self._default(field_type) for _, field_type in fields[1:]]
+            return "{" + ", ".join(items) + "}"
+        return self._expr(node.expr)
+
+    def _construct(self, node: LetNode, target: str) -> str:
+        """
+        :return: The call that initializes target, an object of a CLASS
+        """
+        name = scalar_type(node.var_type)
+        signatures = self._methods_of[name]
+        args = [] if node.expr is None else [node.expr]
+        if name not in signatures:
+            if args:
+                raise BackendError(f"CLASS {name} has no constructor")
+            return f"{name}__init(&{target});"
+        _, constructor = resolve_call(signatures, CallNode(name, args))
+        arguments = ["&" + target] + self._arguments(constructor, args)
+        return f"{self._c_names[id(constructor)]}({', '.join(arguments)});"
+
+    def _constant_size(self, node: DimNode) -> str:
+        if node.size is None:
+            return "1"
+        if not _is_constant(node.size):
+            raise BackendError(f"DIM {node.name} needs a constant size outside a function")
+        return self._expr(node.size)
+
+    def _fill(self, name: str, size: str, var_type: Optional[str]) -> List[str]:
+        """
+        :return: The statements that set every cell of array name to the default
+        """
+        index = self._emitter.unique_name("basic_i")
+        default = self._default(var_type)
+        if default.startswith("{"):
+            default = f"({var_type}){default}"
+        return [f"for (int {index} = 0; {index} < {size}; {index}++) {name}[{index}] = {default};"]
+
+    # Functions
+
+    def _prototype(self, node: FunctionNode, class_node: ClassNode = None, name: str = None) -> str:
+        """
+        :param name: The C name, the function's own by default
+        """
+        params = [f"{class_node.name} *self"] if class_node is not None else []
+        for param in node.params:
+            param_type = self._type(param.param_type)
+            if param.mode == "ref":
+                params.append(f"{param_type} *{c_name(param.name)}")
+            else:
+                params.append(f"{param_type} {c_name(param.name)}")
+        return_type = "void" if node.is_constructor else self._type(node.return_type)
+        name = name or self._c_names[id(node)]
+        if name == "main":
+            return f"int main({', '.join(params) or 'void'})"
+        return f"static {return_type} {name}({', '.join(params) or 'void'})"
+
+    def _prototypes(self, node: FunctionNode, class_node: ClassNode = None) -> None:
+        self._emit_line(self._prototype(node, class_node) + ";")
+        if node.memo:
+            name = self._c_names[id(node)] + "__impl"
+            self._emit_line(self._prototype(node, class_node, name) + ";")
+
+    def _class_functions(self, class_node: ClassNode) -> None:
+        self._class = class_node
+        try:
+            self._mark(class_node)
+            self._emit_line(f"static void {class_node.name}__init({class_node.name} *self) {{")
+            self._depth += 1
+            self._scopes = [{}]
+            for field_name, field_type, member in self._fields(class_node):
+                target = f"self->{c_name(field_name)}"
+                if isinstance(member, DimNode):
+                    size = self._constant_size(member)
+                    for line in self._fill(target, size, scalar_type(field_type)):
+                        self._emit_line(line)
+                elif scalar_type(field_type) in self._classes:
+                    self._emit_line(self._construct(member, target))
+                else:
+                    self._emit_line(f"{target} = {self._initializer(member)};")
+            self._scopes = []
+            self._depth -= 1
+            self._emit_line("}")
+            for method in self._methods(class_node):
+                self._function(method)
+        finally:
+            self._class = None
+
+    def _function(self, node: FunctionNode, init_globals: bool = False) -> None:
+        name = self._c_names[id(node)] + ("__impl" if node.memo else "")
+        self._mark(node)
+        self._emit_line(self._prototype(node, self._class, name) + " {")
+        self._depth += 1
+        self._scopes = [{}]
+        for param in node.params:
+            self._declare(param.name, param.param_type, "(*{})" if param.mode == "ref" else "{}")
+        if self._c_names[id(node)] == "main" and self._emitter.profile_lines:
+            self._require("basic_profile")
+            path = cpp_string(self._emitter.profile_lines)
+            timed = "true" if self._emitter.profile_time else "false"
+            self._emit_line(f"basic_profile_start({path}, {self._lines + 1}, {timed});")
+        if init_globals:
+            self._emit_line("basic_init_globals();")
+        if node.is_constructor:
+            self._emit_line(f"{self._class.name}__init(self);")
+        for stmt in node.statements:
+            self._stmt(stmt)
+        self._scopes = []
+        self._depth -= 1
+        self._emit_line("}")
+        if node.memo:
+            # The wrapper comes from the header, not from the last statement
+            self._emitter.mark(node.line_number, node.column)
+            self._memo_wrapper(node)
+
+    def _memo_wrapper(self, node: FunctionNode) -> None:
+        """
+        The body is <name>__impl; every call, including the recursive ones
+        inside the body, goes through a cached <name>
+        """
+        self._require("basic_memo")
+        name = self._c_names[id(node)]
+        return_type = self._type(node.return_type)
+        cache = f"{name}__cache"
+        limit = node.memo_limit or 0
+        args = (["self"] if self._class is not None else []) + [
+            c_name(param.name) for param in node.params
+        ]
+        self._emit_line(f"static basic_memo {cache} = {{NULL, 0, 0, {limit}}};")
+        self._emit_line(self._prototype(node, self._class) + " {")
+        self._depth += 1
+        self._emit_line("basic_key key;")
+        self._emit_line(f"{return_type} value;")
+        self._emit_line("basic_key_init(&key);")
+        for param in node.params:
+            for line in self._key_parts(c_name(param.name), scalar_type(param.param_type)):
+                self._emit_line(line)
+        self._emit_line(f"if (!basic_memo_find(&{cache}, &key, &value, sizeof value)) {{")
+        self._emit_line(f"    value = {name}__impl({', '.join(args)});")
+        self._emit_line(f"    basic_memo_insert(&{cache}, &key, &value, sizeof value);")
+        self._emit_line("}")
+        self._emit_line("basic_key_free(&key);")
+        self._emit_line("return value;")
+        self._depth -= 1
+        self._emit_line("}")
+
+    def _key_parts(self, value: str, value_type: str) -> List[str]:
+        """
+        :return: The statements that add value to the cache key: the bytes of
+            a number, the characters of a STRING, and a STRUCT field by field
+        """
+        if value_type == "STRING":
+            return [f"basic_key_add(&key, {value}, strlen({value}) + 1);"]
+        if value_type in self._structs:
+            lines = []
+            for field_name, field_type in self._structs[value_type].fields:
+                lines += self._key_parts(f"{value}.{c_name(field_name)}", scalar_type(field_type))
+            return lines
+        if value_type in _C_TYPES:
+            return [f"basic_key_add(&key, &{value}, sizeof {value});"]
+        raise BackendError(f"A {value_type} cannot be the argument of a MEMO function")
+
+    # Statements
+
+    def _stmt(self, node) -> None:
+        self._mark(node)
+        if self._emitter.profile_lines and node.line_number is not None:
+            self._emit_line(f"basic_profile_hit({node.line_number});")
+        getattr(self, "_" + type(node).__name__)(node)
+
+    def _block(self, statements: list) -> None:
+        self._depth += 1
+        self._scopes.append({})
+        try:
+            for stmt in statements:
+                self._stmt(stmt)
+        finally:
+            self._scopes.pop()
+            self._depth -= 1
+
+    def _LetNode(self, node: LetNode) -> None:
+        var_type = scalar_type(node.var_type)
+        const = "const " if node.const else ""
+        if var_type in self._classes:
+            name = self._declare(node.name, var_type)
+            self._emit_line(f"{var_type} {name};")
+            self._emit_line(self._construct(node, name))
+            return
+        # The initializer cannot see the variable it declares
+        value = self._initializer(node)
+        name = self._declare(node.name, var_type)
+        self._emit_line(f"{const}{self._type(var_type)} {name} = {value};")
+
+    def _DimNode(self, node: DimNode) -> None:
+        var_type = scalar_type(node.var_type)
+        c_type = self._type(var_type)
+        size = "1" if node.size is None else self._expr(node.size)
+        name = self._declare(node.name, None)
+        if node.size is not None and not _is_constant(node.size):
+            # A variable length array cannot have an initializer
+            self._emit_line(f"{c_type} {name}[{size}];")
+            for line in self._fill(name, size, var_type):
+                self._emit_line(line)
+        else:
+            self._emit_line(f"{c_type} {name}[{size}] = {{{self._default(var_type)}}};")
+            if var_type not in _DEFAULTS or var_type == "STRING":
+                for line in self._fill(name, size, var_type):
+                    self._emit_line(line)
+
+    def _AssignNode(self, node: AssignNode) -> None:
+        self._emit_line(f"{self._variable(node.name)} = {self._expr(node.expr)};")
+
+    def _IfNode(self, node: IfNode) -> None:
+        for index, (condition, body) in enumerate(node.branches):
+            keyword = "if" if index == 0 else "} else if"
+            self._emit_line(f"{keyword} ({self._expr(condition)}) {{")
+            self._block(body)
+        if node.else_body is not None:
+            self._emit_line("} else {")
+            self._block(node.else_body)
+        self._emit_line("}")
+
+    def _WhileNode(self, node: WhileNode) -> None:
+        self._emit_line(f"while ({self._expr(node.condition)}) {{")
+        self._block(node.statements)
+        self._emit_line("}")
+
+    def _DoNode(self, node: DoNode) -> None:
+        self._emit_line("do {")
+        self._block(node.statements)
+        condition = "0" if node.condition is None else self._expr(node.condition)
+        self._emit_line(f"}} while ({condition});")
+
+    def _ForNode(self, node: ForNode) -> None:
+        start = self._expr(node.start)
+        self._scopes.append({})
+        try:
+            var = self._declare(node.var, "INT")
+            end = self._expr(node.end)
+            step = f"{var}++" if node.step is None else f"{var} += {self._expr(node.step)}"
+            self._emit_line(f"for (int {var} = {start}; {var} <= {end}; {step}) {{")
+            self._block(node.statements)
+            self._emit_line("}")
+        finally:
+            self._scopes.pop()
+
+    def _SwitchNode(self, node: SwitchNode) -> None:
+        if node.strategy != "string":
+            if node.values is not None:
+                labels = [str(value) for value in node.values]
+            else:
+                labels = [self._expr(label) for label, _ in node.cases]
+            self._switch(self._expr(node.expr), labels, node)
+            return
+
+        # Map the subject to its case index: switch on the length, then compare
+        subject = self._emitter.unique_name("basic_switch")
+        selector = self._emitter.unique_name("basic_case")
+        self._require("<string.h>")
+        self._emit_line("{")
+        self._depth += 1
+        self._emit_line(f"basic_str {subject} = {self._expr(node.expr)};")
+        self._emit_line(f"int {selector} = -1;")
+        by_length = {}
+        for index, value in enumerate(node.values):
+            by_length.setdefault(len(value.encode()), []).append((index, value))
+        self._emit_line(f"switch (strlen({subject})) {{")
+        for length, entries in sorted(by_length.items()):
+            self._emit_line(f"case {length}:")
+            for position, (index, value) in enumerate(entries):
+                keyword = "if" if position == 0 else "else if"
+                self._emit_line(
+                    f"    {keyword} (memcmp({subject}, {cpp_string(value)}, {length}) == 0)"
+                    f" {selector} = {index};"
+                )
+            self._emit_line("    break;")
+        self._emit_line("}")
+        self._switch(selector, [str(index) for index in range(len(node.cases))], node)
+        self._depth -= 1
+        self._emit_line("}")
+
+    def _switch(self, selector: str, labels: List[str], node: SwitchNode) -> None:
+        # Each case is a block: C does not allow a declaration after a label
+        self._emit_line(f"switch ({selector}) {{")
+        for label, (_, body) in zip(labels, node.cases):
+            self._emit_line(f"case {label}: {{")
+            self._block(body)
+            self._emit_line("    break;")
+            self._emit_line("}")
+        if node.default_body is not None:
+            self._emit_line("default: {")
+            self._block(node.default_body)
+            self._emit_line("}")
+        self._emit_line("}")
+
+    def _InputNode(self, node: InputNode) -> None:
+        var_type = self._lookup(node.name).var_type
+        if var_type not in _PRINT_FORMATS:
+            raise BackendError(f"Cannot INPUT a {var_type}")
+        helper = f"basic_input_{'str' if var_type == 'STRING' else var_type.lower()}"
+        self._require(helper)
+        self._emit_line(f"{helper}({self._address(node.name)});")
+
+    def _PrintNode(self, node: PrintNode) -> None:
+        prefix, suffix = "", "\n"
+        if node.color is not None:
+            prefix, suffix = f"\033[1;{_COLORS[node.color]}m", "\033[0m\n"
+        value_type = self._value_type(node.expr)
+        if value_type not in _PRINT_FORMATS:
+            raise BackendError(f"Cannot PRINT a {value_type}")
+
+        if isinstance(node.expr, LiteralNode) or getattr(node.expr, "constant", None) is not None:
+            # The whole line is known: one fwrite
+            value = node.expr.value if isinstance(node.expr, LiteralNode) else node.expr.constant
+            if value_type == "FLOAT":
+                text = "%g" % value
+            elif value_type == "STRING":
+                text = value
+            else:
+                text = str(int(value))
+            line = prefix + text + suffix
+            self._emit_line(f"fwrite({cpp_string(line)}, 1, {len(line.encode())}, stdout);")
+            return
+        format = cpp_string(prefix + _PRINT_FORMATS[value_type] + suffix)
+        self._emit_line(f"printf({format}, {self._expr(node.expr)});")
+
+    def _OpenNode(self, node: OpenNode) -> None:
+        name = self._declare(node.name, None)
+        mode = '"r"' if node.mode == "INPUT" else '"w"'
+        self._emit_line(f"FILE *{name} = fopen({cpp_string(node.file_name)}, {mode});")
+
+    def _CloseNode(self, node: CloseNode) -> None:
+        name = self._variable(node.name)
+        self._emit_line(f"if ({name} != NULL) {{")
+        self._emit_line(f"    fclose({name});")
+        self._emit_line(f"    {name} = NULL;")
+        self._emit_line("}")
+
+    def _BreakNode(self, node: BreakNode) -> None:
+        self._emit_line("break;")
+
+    def _ContinueNode(self, node: ContinueNode) -> None:
+        self._emit_line("continue;")
+
+    def _ReturnNode(self, node: ReturnNode) -> None:
+        if node.expr is None:
+            self._emit_line("return;")
+        else:
+            self._emit_line(f"return {self._expr(node.expr)};")
+
+    def _CallStmtNode(self, node: CallStmtNode) -> None:
+        self._emit_line(f"{self._expr(node.call)};")
+
+    # Expressions
+
+    def _value_type(self, node) -> Optional[str]:
+        """
+        :return: The type of node; a call has the type of the overload it resolves to
+        """
+        if isinstance(node, CallNode):
+            return scalar_type(self._resolve(node)[0].return_type)
+        if isinstance(node, NameNode) and node.constant is None:
+            # An undeclared name has no type: it fails as a name first
+            self._lookup(node.name)
+        return scalar_type(node.value_type)
+
+    def _expr(self, node) -> str:
+        return getattr(self, "_" + type(node).__name__)(node)
+
+    def _LiteralNode(self, node: LiteralNode) -> str:
+        if node.value_type in ("STRING", "BOOL"):
+            return _c_literal(node.value, node.value_type)
+        return node.code
+
+    def _NameNode(self, node: NameNode) -> str:
+        if node.constant is not None:
+            return _c_literal(node.constant, node.value_type)
+        return self._variable(node.name)
+
+    def _GroupNode(self, node: GroupNode) -> str:
+        return f"({self._expr(node.expr)})"
+
+    def _UnaryNode(self, node: UnaryNode) -> str:
+        if scalar_type(node.operand.value_type) == "STRING":
+            raise BackendError(f"Cannot apply {node.op} to a STRING")
+        operand = self._expr(node.operand)
+        if node.op == "!":
+            return f"!({operand})"
+        # "- -x" must not become "--x"
+        separator = " " if operand[:1] in ("-", "+") else ""
+        return f"{node.op}{separator}{operand}"
+
+    def _BinaryNode(self, node: BinaryNode) -> str:
+        left = self._expr(node.left)
+        right = self._expr(node.right)
+        left_type = self._value_type(node.left)
+        right_type = self._value_type(node.right)
+        if left_type == "STRING" or right_type == "STRING":
+            if left_type != right_type:
+                raise BackendError(f"Cannot apply {node.op} to a {left_type} and a {right_type}")
+            if node.op == "+":
+                self._require("basic_concat")
+                return f"basic_concat({left}, {right})"
+            if node.op in _COMPARISONS:
+                self._require("<string.h>")
+                return f"(strcmp({left}, {right}) {node.op} 0)"
+            raise BackendError(f"Cannot apply {node.op} to STRINGs")
+        return f"{left} {node.op} {right}"
+
+    def _ModNode(self, node: ModNode) -> str:
+        if node.value_type == "INT":
+            return self._BinaryNode(node)
+        if node.value_type == "FLOAT":
+            self._require("<math.h>")
+            # std::fmod is the float overload for two floats, as fmodf is
+            function = "fmodf" if node.single else "fmod"
+            return f"{function}({self._expr(node.left)}, {self._expr(node.right)})"
+        raise BackendError("% needs INT or FLOAT operands")
+
+    def _PowNode(self, node: PowNode) -> str:
+        base = self._expr(node.left)
+        exponent = self._expr(node.right)
+        if node.value_type == "INT":
+            right = node.right
+            if (
+                isinstance(right, LiteralNode)
+                and right.value_type == "INT"
+                and right.value <= PowNode.max_unrolled
+                and isinstance(node.left, (NameNode, LiteralNode))
+            ):
+                if right.value == 0:
+                    return "1"
+                return f"({' * '.join([base] * right.value)})"
+            self._require("basic_ipow")
+            return f"basic_ipow({base}, {exponent})"
+        if node.value_type == "FLOAT":
+            self._require("<math.h>")
+            return f"{'powf' if node.single else 'pow'}({base}, {exponent})"
+        raise BackendError("^ needs INT or FLOAT operands")
+
+    def _resolve(self, node: CallNode):
+        """
+        :return: The function called, and the arguments C passes before the call's own
+        """
+        methods = self._methods_of[self._class.name] if self._class is not None else {}
+        if node.name in methods:
+            return resolve_call(methods, node)[1], ["self"]
+        return resolve_call(self._signatures, node)[1], []
+
+    def _CallNode(self, node: CallNode) -> str:
+        function, args = self._resolve(node)
+        args = args + self._arguments(function, node.args)
+        return f"{self._c_names[id(function)]}({', '.join(args)})"
+
+    def _arguments(self, function: FunctionNode, args: list) -> List[str]:
+        result = []
+        for param, arg in zip(function.params, args):
+            if param.mode == "ref":
+                if not isinstance(arg, NameNode):
+                    raise BackendError(f"BYREF {param.name} needs a variable")
+                result.append(self._address(arg.name))
+            else:
+                result.append(self._expr(arg))
+        return result
+
+
+def _is_constant(node) -> bool:
+    """
+    :return: If the C expression for node is a constant expression, which
+        is all C allows to initialize a global
+    """
+    for item in walk(node):
+        if isinstance(item, NameNode):
+            if item.constant is None:
+                return False
+        elif isinstance(item, (ModNode, PowNode)):
+            return False
+        elif isinstance(item, BinaryNode):
+            if "STRING" in (scalar_type(item.left.value_type), scalar_type(item.right.value_type)):
+                return False
+        elif not isinstance(item, (LiteralNode, GroupNode, UnaryNode)):
+            return False
+    return True
+
+
+def emit_c(program: ProgramNode, emitter) -> None:
+    """
+    Write program to emitter as C99
+
+    :raise BackendError: If the program uses what C cannot express, or
+        nests deeper than the translator recurses
+    """
+    try:
+        CTranslator(emitter).translate(program)
+    except RecursionError:
+        raise BackendError(
+            "The program is nested too deeply for the C target; compile it with --target cpp"
+        )
@@ -0,0 +1,76 @@
+"""
+Thin client for the compile server in basic_server.
+
+    python -m basic_compiler.basic_client -i program.b -o program.cpp --compile
+
+takes the same options as basic_compiler.main, forwards them with the working
+directory to the server and prints what the server answers. --execute runs
+the compiled program here, so it reads this terminal. Without a running
+server the client compiles in its own process.
+
+Only the standard library is imported up front, so a compile through the
+server starts as fast as Python itself does.
+"""
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+
+
+def default_socket_path() -> str:
+    """
+    :return: $BASIC_COMPILER_SOCKET, or a per-user socket in the temp directory
+    """
+    return os.environ.get("BASIC_COMPILER_SOCKET") or os.path.join(
+        tempfile.gettempdir(), f"basic_compiler-{os.getuid()}.sock"
+    )
+
+
+def send_json(stream, message: dict) -> None:
+    stream.write(json.dumps(message).encode() + b"\n")
+    stream.flush()
+
+
+def receive_json(stream) -> dict:
+    line = stream.readline()
+    if not line:
+        raise ConnectionError("connection closed before a message arrived")
+    return json.loads(line)
+
+
+def request(message: dict, socket_path: str = None) -> dict:
+    """
+    Send one request to the server and wait for its response
+
+    :raise OSError: If no server listens on socket_path
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path or default_socket_path())
+        with client.makefile("rwb") as stream:
+            send_json(stream, message)
+            return receive_json(stream)
+
+
+def main(argv: list = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        response = request({"command": "compile", "argv": argv, "cwd": os.getcwd()})
+    except OSError:
+        from basic_compiler.main import main as compile_here
+
+        sys.argv = [sys.argv[0]] + argv
+        compile_here()
+        return 0
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    if response["status"] == 0 and response.get("execute"):
+        subprocess.run([response["execute"]])
+    return response["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
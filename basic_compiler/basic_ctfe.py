@@ -0,0 +1,348 @@
+from typing import Dict
+
+from basic_compiler.basic_argparser import DEFAULT_STEP_BUDGET
+from basic_compiler.basic_ast import (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ContinueNode,
+    DoNode,
+    ExprNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    LetNode,
+    LiteralNode,
+    NameNode,
+    ReturnNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+    float_operands,
+)
+from basic_compiler.basic_numeric import (
+    INT_MAX,
+    INT_MIN,
+    float_div,
+    float_mod,
+    float_pow,
+    int_div,
+    int_mod,
+    int_pow,
+    to_float32,
+)
+
+
+class NotConstant(Exception):
+    """
+    Raised when an expression cannot be evaluated at compile time
+    """
+
+
+class _Break(Exception):
+    pass
+
+
+class _Continue(Exception):
+    pass
+
+
+class _Return(Exception):
+    def __init__(self, value):
+        self.value = value
+
+
+def coerce(value, value_type: str):
+    """
+    Convert a value the way C++ converts it on assignment to value_type
+    """
+    value_type = value_type.upper()
+    if value_type == "INT":
+        if isinstance(value, str):
+            raise NotConstant("STRING assigned to INT")
+        value = int(value)
+        if not INT_MIN <= value <= INT_MAX:
+            raise NotConstant("INT overflow")
+        return value
+    if value_type == "FLOAT":
+        if isinstance(value, str):
+            raise NotConstant("STRING assigned to FLOAT")
+        return to_float32(float(value))
+    if value_type == "BOOL":
+        return bool(value)
+    if value_type == "STRING":
+        if not isinstance(value, str):
+            raise NotConstant("non-STRING assigned to STRING")
+        return value
+    raise NotConstant(f"unsupported type {value_type}")
+
+
+def to_literal(value, value_type: str) -> LiteralNode:
+    """
+    Build the literal that replaces a call evaluated at compile time
+    """
+    value = coerce(value, value_type)
+    if isinstance(value, float):
+        text = repr(value)
+        if text in ("inf", "-inf", "nan"):
+            raise NotConstant("non-finite FLOAT")
+        # A float literal, as the call it replaces gives a float
+        literal = LiteralNode(value, "FLOAT", text + "f")
+        literal.single = True
+        return literal
+    return LiteralNode(value, value_type.upper())
+
+
+def _arith(op, left, right):
+    if isinstance(left, str) or isinstance(right, str):
+        if op == "+" and isinstance(left, str) and isinstance(right, str):
+            return left + right
+        raise NotConstant(f"STRING operand for {op}")
+
+    is_float = isinstance(left, float) or isinstance(right, float)
+    if op == "+":
+        result = left + right
+    elif op == "-":
+        result = left - right
+    elif op == "*":
+        result = left * right
+    elif op == "/":
+        if right == 0:
+            raise NotConstant("division by zero")
+        if is_float:
+            result = float_div(left, right)
+        elif left == INT_MIN and right == -1:
+            raise NotConstant("INT overflow")
+        else:
+            result = int_div(left, right)
+    elif op == "%":
+        if right == 0:
+            raise NotConstant("division by zero")
+        result = float_mod(left, right) if is_float else int_mod(left, right)
+    elif op == "^":
+        if is_float:
+            result = float_pow(left, right)
+        else:
+            left, right = int(left), int(right)
+            if right >= 0 and abs(left) > 1 and (
+                right >= 32 or not INT_MIN <= left**right <= INT_MAX
+            ):
+                raise NotConstant("INT overflow")
+            result = int_pow(left, right)
+    else:
+        raise NotConstant(f"unsupported operator {op}")
+
+    if not is_float and not INT_MIN <= result <= INT_MAX:
+        raise NotConstant("INT overflow")
+    return result
+
+
+_COMPARISONS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    ">": lambda a, b: a > b,
+    "<=": lambda a, b: a <= b,
+    ">=": lambda a, b: a >= b,
+}
+
+
+class Interpreter:
+    def __init__(
+        self,
+        functions: Dict[str, FunctionNode],
+        step_budget: int = DEFAULT_STEP_BUDGET,
+    ):
+        """
+        :param functions: The pure functions that may be called at compile time
+        :param step_budget: Statements and loop iterations allowed per evaluation
+        """
+        self._functions = functions
+        self._step_budget = step_budget
+        self._steps = 0
+        self._results = {}
+
+    def call(self, name: str, args: list):
+        """
+        Evaluate a call with constant arguments, remembering both results and
+        failures so a call site repeated across the program is tried once
+
+        :return: The coerced return value
+        :raise NotConstant: If the call cannot be evaluated within the budget
+        """
+        key = (name, tuple(args))
+        if key not in self._results:
+            self._steps = 0
+            try:
+                self._results[key] = (True, self._call(name, args))
+            except (NotConstant, RecursionError) as e:
+                self._results[key] = (False, str(e))
+        ok, result = self._results[key]
+        if not ok:
+            raise NotConstant(result)
+        return result
+
+    def evaluate(self, expr: ExprNode, env: dict = None):
+        """
+        Evaluate an expression that only refers to constants and env
+
+        :raise NotConstant: If the expression depends on run-time values
+        """
+        self._steps = 0
+        try:
+            return self._eval(expr, env or {})
+        except RecursionError:
+            raise NotConstant("recursion too deep")
+
+    def _tick(self):
+        self._steps += 1
+        if self._steps > self._step_budget:
+            raise NotConstant("step budget exceeded")
+
+    def _call(self, name: str, args: list):
+        func = self._functions.get(name)
+        if func is None:
+            raise NotConstant(f"'{name}' is not a compile-time function")
+        if len(args) != len(func.params):
+            raise NotConstant(f"'{name}' called with wrong argument count")
+
+        env = {
+            param.name: [param.param_type, coerce(arg, param.param_type)]
+            for param, arg in zip(func.params, args)
+        }
+        try:
+            self._exec_body(func.statements, env)
+        except (_Break, _Continue):
+            raise NotConstant(f"BREAK or CONTINUE outside a loop in '{name}'")
+        except _Return as ret:
+            if ret.value is None:
+                raise NotConstant(f"'{name}' returned no value")
+            return coerce(ret.value, func.return_type)
+        raise NotConstant(f"'{name}' ended without RETURN")
+
+    def _exec_body(self, statements, env):
+        for stmt in statements:
+            self._exec(stmt, env)
+
+    def _exec(self, stmt, env):
+        self._tick()
+        if isinstance(stmt, LetNode):
+            if stmt.construct:
+                raise NotConstant("constructor call")
+            value = coerce(self._eval(stmt.expr, env), stmt.var_type)
+            env[stmt.name] = [stmt.var_type, value]
+        elif isinstance(stmt, AssignNode):
+            if stmt.name not in env:
+                raise NotConstant(f"assignment to '{stmt.name}'")
+            slot = env[stmt.name]
+            slot[1] = coerce(self._eval(stmt.expr, env), slot[0])
+        elif isinstance(stmt, IfNode):
+            for condition, body in stmt.branches:
+                if self._eval(condition, env):
+                    self._exec_body(body, env)
+                    return
+            if stmt.else_body is not None:
+                self._exec_body(stmt.else_body, env)
+        elif isinstance(stmt, WhileNode):
+            while self._eval(stmt.condition, env):
+                if self._loop_body(stmt.statements, env):
+                    break
+        elif isinstance(stmt, DoNode):
+            while True:
+                if self._loop_body(stmt.statements, env):
+                    break
+                if stmt.condition is None or not self._eval(stmt.condition, env):
+                    break
+        elif isinstance(stmt, ForNode):
+            step = self._eval(stmt.step, env) if stmt.step is not None else 1
+            env[stmt.var] = ["INT", coerce(self._eval(stmt.start, env), "INT")]
+            while env[stmt.var][1] <= self._eval(stmt.end, env):
+                if self._loop_body(stmt.statements, env):
+                    break
+                env[stmt.var][1] = coerce(env[stmt.var][1] + step, "INT")
+            del env[stmt.var]
+        elif isinstance(stmt, SwitchNode):
+            self._exec_switch(stmt, env)
+        elif isinstance(stmt, ReturnNode):
+            raise _Return(None if stmt.expr is None else self._eval(stmt.expr, env))
+        elif isinstance(stmt, BreakNode):
+            raise _Break()
+        elif isinstance(stmt, ContinueNode):
+            raise _Continue()
+        elif isinstance(stmt, CallStmtNode):
+            self._eval(stmt.call, env)
+        else:
+            raise NotConstant(f"unsupported statement {type(stmt).__name__}")
+
+    def _loop_body(self, statements, env) -> bool:
+        """
+        :return: True if the loop hit BREAK
+        """
+        self._tick()
+        try:
+            self._exec_body(statements, env)
+        except _Break:
+            return True
+        except _Continue:
+            pass
+        return False
+
+    def _exec_switch(self, stmt, env):
+        value = self._eval(stmt.expr, env)
+        body = stmt.default_body
+        for label, case_body in stmt.cases:
+            if self._eval(label, env) == value:
+                body = case_body
+                break
+        if body is not None:
+            try:
+                self._exec_body(body, env)
+            except _Break:
+                pass
+
+    def _eval(self, expr, env):
+        if isinstance(expr, LiteralNode):
+            return expr.value
+        if isinstance(expr, NameNode):
+            if expr.name in env:
+                return env[expr.name][1]
+            if expr.constant is not None:
+                return expr.constant
+            raise NotConstant(f"'{expr.name}' is not constant")
+        if isinstance(expr, GroupNode):
+            return self._eval(expr.expr, env)
+        if isinstance(expr, UnaryNode):
+            operand = self._eval(expr.operand, env)
+            if expr.op == "!":
+                return not operand
+            if isinstance(operand, str):
+                raise NotConstant(f"STRING operand for {expr.op}")
+            return -operand if expr.op == "-" else operand
+        if isinstance(expr, BinaryNode):
+            if expr.op == "&&":
+                return bool(self._eval(expr.left, env)) and bool(
+                    self._eval(expr.right, env)
+                )
+            if expr.op == "||":
+                return bool(self._eval(expr.left, env)) or bool(
+                    self._eval(expr.right, env)
+                )
+            left = self._eval(expr.left, env)
+            right = self._eval(expr.right, env)
+            if expr.op in _COMPARISONS:
+                if isinstance(left, str) != isinstance(right, str):
+                    raise NotConstant("STRING compared with a number")
+                if float_operands(expr.left, expr.right):
+                    left, right = to_float32(left), to_float32(right)
+                return _COMPARISONS[expr.op](left, right)
+            if expr.single:
+                # Computed in float as C++ does, not in double
+                return to_float32(_arith(expr.op, to_float32(left), to_float32(right)))
+            return _arith(expr.op, left, right)
+        if isinstance(expr, CallNode):
+            self._tick()
+            return self._call(expr.name, [self._eval(arg, env) for arg in expr.args])
+        raise NotConstant(f"unsupported expression {type(expr).__name__}")
@@ -1,45 +1,324 @@
-import subprocess
+import json
+import os
 
 from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_ast import cpp_string
+from basic_compiler.basic_exceptions import BackendError
+from basic_compiler.basic_timings import PhaseTimer
+
+
+def program_path(output: str) -> str:
+    """
+    :param output: The generated C++ or C file
+    :return: The program built from it
+    """
+    return os.path.splitext(output)[0]
+
+
+def c_compiler() -> str:
+    """
+    :return: The C compiler for --target c: $CC, gcc by default (tcc works too)
+    """
+    return os.environ.get("CC") or "gcc"
+
+
+def compiler_flags(debug: bool = False, opt: int = 0) -> list:
+    """
+    :param debug: Build with debugging information, so debuggers and profilers
+        find the source lines
+    :param opt: The optimization level, -O
+    """
+    return (["-g"] if debug else []) + ([f"-O{opt}"] if opt else [])
+
+
+def compiler_command(
+    output: str, target: str = "cpp", debug: bool = False, opt: int = 0
+) -> list:
+    """
+    :param output: The generated C++ or C file
+    :param target: "cpp" or "c"
+    :param debug: Build with debugging information, see compiler_flags
+    :param opt: The optimization level
+    :return: The command line that builds the program next to it
+    """
+    flags = compiler_flags(debug, opt)
+    if target == "c":
+        return [c_compiler(), "-std=c99", *flags, output, "-o", program_path(output), "-lm"]
+    return ["g++", *flags, output, "-o", program_path(output)]
+
+
+# g++ reads the program from stdin; the binary name is appended
+PIPE_COMMAND = ["g++", "-x", "c++", "-", "-o"]
+
+
+def pipe_command(target: str = "cpp", debug: bool = False, opt: int = 0) -> list:
+    """
+    :param debug: Build with debugging information, see compiler_flags
+    :param opt: The optimization level
+    :return: The command that builds the program read from stdin, the
+        binary name to be appended
+    """
+    if target == "c":
+        command = [c_compiler(), "-std=c99", "-x", "c", "-", "-lm", "-o"]
+    else:
+        command = PIPE_COMMAND
+    return command[:-1] + compiler_flags(debug, opt) + ["-o"]
+
+
+SOURCE_MAP_SUFFIX = ".map.json"
+
+
+def source_map_path(output: str) -> str:
+    """
+    :return: The source map written with the generated C++ or C file output
+    """
+    return output + SOURCE_MAP_SUFFIX
+
+
+def program_cache_dir() -> str:
+    """
+    :return: The directory of programs built with --pipe, readable only by
+        this user: $BASIC_COMPILER_CACHE, or basic_compiler under the user's cache
+    """
+    path = os.environ.get("BASIC_COMPILER_CACHE") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"),
+        "basic_compiler",
+    )
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    return path
 
 
 class Emitter:
-    def __init__(self, args: parse_args):
+    def __init__(self, args: parse_args, timer: PhaseTimer = None, output=None):
+        """
+        :param args: The command line options, or CompileOptions
+        :param timer: Times writing, formatting, compiling and running the output
+        :param output: Receives what clang-format and g++ print, instead of the terminal
+        """
         self._args = args
-        self._header = (
-            "#include <iostream>\n"
-            "#include <string>\n"
-            "#include <fstream>\n"
-            "using namespace std;\n\n"
-        )
-        self._code = ""
+        self._timer = timer or PhaseTimer()
+        self._output = output
+        self._target = getattr(args, "target", "cpp")
+        self._opt = getattr(args, "opt", 0)
+        # With --profile-lines, the file the program writes its line counts to
+        self.profile_lines = getattr(args, "profile_lines", None)
+        self.profile_time = getattr(args, "profile_time", False)
+        # With --source-map, the source file the #line directives name
+        self.source_file = getattr(args, "source_map", None)
+        if self._target == "c":
+            self._header = "#include <stdio.h>\n#include <stdbool.h>\n\n"
+        else:
+            self._header = (
+                "#include <iostream>\n"
+                "#include <string>\n"
+                "#include <fstream>\n"
+                "using namespace std;\n\n"
+            )
+        # The code in pieces, joined by code(): adding to one string would
+        # copy it each time
+        self._code = []
+        self._length = 0
+        # (offset in the code, source line, column) where the code of a line starts
+        self._marks = []
+        self._required = set()
+        self._unique = 0
 
     def emit(self, code):
-        self._code += code
+        self._code.append(code)
+        self._length += len(code)
 
     def emit_line(self, code):
         if code is not None:
-            self._code += code + "\n"
+            self._code.append(code + "\n")
+            self._length += len(code) + 1
 
     def emit_header(self, code):
         self._header += code + "\n"
 
+    def require(self, name, code):
+        if name not in self._required:
+            self._required.add(name)
+            self.emit_header(code)
+
+    def include(self, *headers):
+        for header in headers:
+            self.require(header, f"#include {header}")
+
+    def mark(self, line, column=None):
+        """
+        Attribute the lines emitted next to a source line, with a source map
+
+        :param line: Counted from 1; None for code that comes from no line
+        :param column: Where the statement starts on the line, counted from 1
+        """
+        if self.source_file is not None:
+            self._marks.append((self._length, line, column))
+
+    def unique_name(self, prefix):
+        self._unique += 1
+        return f"{prefix}{self._unique}"
+
+    def code(self) -> str:
+        """
+        :return: The C++ or C emitted so far, with #line directives when there
+            is a source map
+        """
+        return self._render()[0]
+
+    def source_map(self) -> dict:
+        """
+        :return: Where each line of code() comes from, as JSON:
+            {"version": 1, "file": the generated file, "source": the source file,
+             "mappings": [[generated line, source line, source column], ...]},
+            lines counted from 1; lines that come from no source line are left out
+        """
+        return self._source_map(self._render()[1])
+
+    def _source_map(self, mappings: list) -> dict:
+        return {
+            "version": 1,
+            "file": self._generated_name(),
+            "source": self.source_file,
+            "mappings": mappings,
+        }
+
+    def _generated_name(self) -> str:
+        output = getattr(self._args, "output", None)
+        if output is None or getattr(self._args, "pipe", False):
+            # What g++ calls a program read from stdin
+            return "<stdin>"
+        return output
+
+    def _render(self):
+        """
+        Put a #line directive before every line the compiler would otherwise
+        attribute to the wrong line: the first line of a statement, each of its
+        continuation lines, and generated code that follows it
+
+        :return: The code and the records of its source map
+        """
+        code = "".join(self._code)
+        if self.source_file is None:
+            return self._header + code, []
+        parts = [self._header]
+        number = self._header.count("\n")
+        mappings = []
+        marks = iter(self._marks)
+        mark = next(marks, None)
+        line = column = None
+        # The line the compiler assumes for the next line, None while it is
+        # the line in the generated file
+        presumed = None
+        offset = 0
+        for text in code.split("\n")[:-1]:
+            while mark is not None and mark[0] <= offset:
+                _, line, column = mark
+                mark = next(marks, None)
+            offset += len(text) + 1
+            if line != presumed:
+                if line is None:
+                    name = self._generated_name()
+                    parts.append(f"#line {number + 2} {cpp_string(name)}\n")
+                else:
+                    parts.append(f"#line {line} {cpp_string(self.source_file)}\n")
+                number += 1
+            number += 1
+            parts.append(text + "\n")
+            if line is None:
+                presumed = None
+            else:
+                mappings.append([number, line, column])
+                presumed = line + 1
+        parts.append(code[offset:])
+        return "".join(parts), mappings
+
+    def run_tool(self, command, input=None) -> int:
+        """
+        :param input: Text for the tool's stdin
+        :return: The tool's exit status
+        """
+        # Loaded when a tool first runs, not with every compilation
+        import subprocess
+
+        if self._output is None:
+            return subprocess.run(command, input=input, text=True).returncode
+        result = subprocess.run(command, input=input, capture_output=True, text=True)
+        self._output.write(result.stdout + result.stderr)
+        return result.returncode
+
+    def build(self, command, input=None) -> None:
+        """
+        Run g++ or the C compiler
+
+        :param input: The code, when the compiler reads it from stdin
+        :raise BackendError: If the compiler fails, so nothing is run
+        """
+        name = os.path.basename(command[0])
+        with self._timer.phase(name):
+            status = self.run_tool(command, input=input)
+        if status != 0:
+            raise BackendError(f"{name} failed with status {status}")
+
+    def execute(self, program):
+        import subprocess
+
+        with self._timer.phase("execute"):
+            subprocess.run([os.path.abspath(program)])
+
     def write_file(self):
-        with open(self._args.output, "w") as output_file:
-            output_file.write(self._header + self._code)
+        with self._timer.phase("write"):
+            code, mappings = self._render()
+            with open(self._args.output, "w") as output_file:
+                output_file.write(code)
+            if self.source_file is not None:
+                with open(source_map_path(self._args.output), "w") as map_file:
+                    json.dump(self._source_map(mappings), map_file)
 
         if self._args.format:
-            subprocess.run(["clang-format", "-i", self._args.output])
+            with self._timer.phase("clang-format"):
+                self.run_tool(["clang-format", "-i", self._args.output])
 
         if self._args.compile:
-            subprocess.run(
-                [
-                    "g++",
-                    f"{self._args.output}",
-                    "-o",
-                    self._args.output.replace(".cpp", ""),
-                ]
+            self.build(
+                compiler_command(
+                    self._args.output, self._target, self.source_file is not None, self._opt
+                )
             )
 
         if self._args.execute:
-            subprocess.run([f"./{self._args.output.replace('.cpp', '')}"], shell=True)
+            self.execute(program_path(self._args.output))
+
+    def compile_piped(self):
+        """
+        Build the program without writing the C++ anywhere: g++ (or the C
+        compiler) reads it from stdin and writes the binary into
+        program_cache_dir(), named by the hash of the code, so an unchanged
+        program is not compiled again and concurrent compilations never share
+        a file name. Runs it if asked.
+
+        :return: The path of the program
+        :raise BackendError: If the compiler fails
+        """
+        import hashlib
+        import tempfile
+
+        code = self.code()
+        command = pipe_command(self._target, self.source_file is not None, self._opt)
+        key = "\0".join(command) + "\0" + code
+        cache_dir = program_cache_dir()
+        program = os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+        if not os.path.exists(program):
+            # Build under a name of our own, then publish it atomically
+            fd, building = tempfile.mkstemp(dir=cache_dir, prefix="building-")
+            os.close(fd)
+            try:
+                self.build(command + [building], input=code)
+                os.replace(building, program)
+            finally:
+                if os.path.exists(building):
+                    os.unlink(building)
+
+        if self._args.execute:
+            self.execute(program)
+        return program
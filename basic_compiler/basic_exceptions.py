@@ -6,9 +6,30 @@ class ParserError(Exception):
     pass
 
 
+class ParserErrors(ParserError):
+    """
+    Every error found by a parser that recovers from errors, one message each
+    """
+
+    def __init__(self, diagnostics):
+        super().__init__(diagnostics)
+        self.diagnostics = diagnostics
+
+    def __str__(self):
+        return "\n".join(self.diagnostics)
+
+
 class TokenError(Exception):
     pass
 
 
 class SymbolTableError(Exception):
     pass
+
+
+class BackendError(Exception):
+    pass
+
+
+class VMError(Exception):
+    pass
@@ -1,13 +1,24 @@
-from typing import List, Optional
+import re
+from typing import List, Optional, Union
 from basic_compiler.basic_token import Token, TokenType
 from basic_compiler.basic_exceptions import LexerError
 
+# The characters of a string literal up to its end or an escape
+_STRING_RUN = re.compile(r'[^"\\\0]*')
+_ESCAPE_CHARS = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
+
 
 class Lexer:
-    def __init__(self, sources: List[str]) -> None:
+    def __init__(self, sources: List[str], start: int = 0, end: int = None) -> None:
+        """
+        :param sources: The source lines
+        :param start: First line to tokenize; tokens keep their line numbers in sources
+        :param end: Line to stop before, the end of sources by default
+        """
         self._sources = sources
-        self._line_number = 0
-        self._line_text = sources[0] if sources else ""
+        self._end = len(sources) if end is None else end
+        self._line_number = start
+        self._line_text = sources[start] if start < self._end else ""
         self._cur_pos = -1
         self._cur_char = ""
         self._next_char()
@@ -34,7 +45,7 @@ class Lexer:
         self._cur_pos += 1
         while self._cur_pos >= len(self._line_text):
             self._line_number += 1
-            if self._line_number >= len(self._sources):
+            if self._line_number >= self._end:
                 self._cur_char = "\0"
                 return
             self._line_text = self._sources[self._line_number]
@@ -51,6 +62,12 @@ class Lexer:
         self._skip_whitespace()
         self._skip_comment()
 
+        column = self._cur_pos
+        token = self._lex_token()
+        token.column = column
+        return token
+
+    def _lex_token(self) -> Optional[Token]:
         if self._cur_char == "\0":
             return Token("", TokenType.EOF, self._line_number, self._line_text)
         if self._cur_char == "\n":
@@ -112,22 +129,25 @@ class Lexer:
 
     def _lex_string(self) -> Token:
         self._next_char()
-        start_pos = self._cur_pos
-        string_value = ""
+        # Collected in pieces and joined once, as adding to a string may copy it
+        parts = []
 
         while self._cur_char != '"' and self._cur_char != "\0":
             if self._cur_char == "\\":
                 self._next_char()
-                escape_chars = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", '"': '"'}
-                string_value += escape_chars.get(self._cur_char, self._cur_char)
-            else:
-                string_value += self._cur_char
+                parts.append(_ESCAPE_CHARS.get(self._cur_char, self._cur_char))
+                self._next_char()
+                continue
+            # Take the characters up to the next quote or backslash at once
+            end = _STRING_RUN.match(self._line_text, self._cur_pos).end()
+            parts.append(self._line_text[self._cur_pos:end])
+            self._cur_pos = end - 1
             self._next_char()
 
         if self._cur_char != '"':
             self.abort("Unterminated string literal")
         self._next_char()
-        return Token(string_value, TokenType.STRING, self._line_number, self._line_text)
+        return Token("".join(parts), TokenType.STRING, self._line_number, self._line_text)
 
     def _lex_number(self) -> Token:
         start_pos = self._cur_pos
@@ -172,4 +192,58 @@ class Lexer:
             self._next_char()
 
     def abort(self, message: str) -> None:
-        raise LexerError(f"Line {self._line_number + 1}: {message}")
+        """
+        Raise a LexerError at the current character. The lexer steps past it
+        first, so the next get_token goes on after the error
+        """
+        location = f"Line {self._line_number + 1}"
+        if self._cur_char != "\0":
+            location += f", column {self._cur_pos + 1}"
+            self._next_char()
+        raise LexerError(f"{location}: {message}")
+
+
+class TokenStream:
+    """
+    Replays the tokens of a source lexed earlier through the Lexer interface.
+    A lexer error is raised at the same point of the token sequence where the
+    Lexer raised it, and the tokens after it follow as they did from the Lexer.
+    """
+
+    def __init__(self, items: List[Union[Token, LexerError]]) -> None:
+        """
+        :param items: The tokens up to EOF, with each lexer error in its place
+        """
+        self._items = items
+        self._pos = 0
+
+    @classmethod
+    def tokenize(cls, sources: List[str]) -> "TokenStream":
+        """
+        :param sources: The source lines
+        :return: A stream over every token and lexer error of sources
+        """
+        lexer = Lexer(sources)
+        items = []
+        while not items or getattr(items[-1], "token_type", None) != TokenType.EOF:
+            try:
+                items.append(lexer.get_token())
+            except LexerError as e:
+                items.append(e)
+        return cls(items)
+
+    def replay(self) -> "TokenStream":
+        """
+        :return: A new stream over the same tokens, from the start
+        """
+        return TokenStream(self._items)
+
+    def get_token(self) -> Optional[Token]:
+        item = self._items[self._pos]
+        # EOF repeats
+        if self._pos < len(self._items) - 1:
+            self._pos += 1
+        if isinstance(item, LexerError):
+            # A fresh exception, as replays may run in several threads
+            raise LexerError(*item.args)
+        return item
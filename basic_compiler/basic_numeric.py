@@ -0,0 +1,96 @@
+"""
+The C++ numeric rules a BASIC program runs by, for everything that evaluates
+it without C++: compile-time evaluation (basic_ctfe) and the vm and python
+backends. INT is a 32-bit int that wraps, "/" and "%" on integers truncate
+toward zero, and FLOAT is a single-precision float.
+"""
+
+import math
+import struct
+
+INT_MIN = -(2**31)
+INT_MAX = 2**31 - 1
+
+_FLOAT32 = struct.Struct("f")
+
+
+def wrap_int(value: int) -> int:
+    return ((value - INT_MIN) & 0xFFFFFFFF) + INT_MIN
+
+
+def to_float32(value) -> float:
+    """
+    Round to the single-precision float a FLOAT holds in C++
+    """
+    try:
+        return _FLOAT32.unpack(_FLOAT32.pack(value))[0]
+    except OverflowError:
+        return math.copysign(math.inf, value)
+
+
+def to_int(value) -> int:
+    """
+    Convert to INT as C++ converts a number on assignment to an int
+    """
+    if isinstance(value, float):
+        if math.isnan(value) or math.isinf(value):
+            # What x86 produces for a conversion out of range
+            return INT_MIN
+        value = int(value)
+    return wrap_int(value) if not INT_MIN <= value <= INT_MAX else int(value)
+
+
+def int_div(left: int, right: int) -> int:
+    """
+    :raise ZeroDivisionError: If right is 0
+    """
+    if right == 0:
+        raise ZeroDivisionError
+    quotient = left // right
+    if quotient < 0 and quotient * right != left:
+        quotient += 1
+    return quotient if INT_MIN <= quotient <= INT_MAX else wrap_int(quotient)
+
+
+def int_mod(left: int, right: int) -> int:
+    """
+    :raise ZeroDivisionError: If right is 0
+    """
+    if right == 0:
+        raise ZeroDivisionError
+    remainder = abs(left) % abs(right)
+    return -remainder if left < 0 else remainder
+
+
+def int_pow(base: int, exp: int) -> int:
+    if exp < 0:
+        if base == 1:
+            return 1
+        if base == -1:
+            return -1 if exp & 1 else 1
+        return 0
+    return wrap_int(pow(base, exp, 1 << 32))
+
+
+def float_div(left, right) -> float:
+    if right == 0:
+        if left == 0 or math.isnan(left):
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1.0, right)
+    return left / right
+
+
+def float_mod(left, right) -> float:
+    try:
+        return math.fmod(left, right)
+    except ValueError:
+        return math.nan
+
+
+def float_pow(base, exp) -> float:
+    try:
+        return math.pow(base, exp)
+    except OverflowError:
+        return math.inf
+    except ValueError:
+        return math.nan
@@ -0,0 +1,200 @@
+"""
+Parallel front-end: top-level FUNCTION, CLASS and STRUCT blocks are parsed in
+a process pool and merged back in source order.
+
+1. A line scan splits the source into block spans and the global statements
+   between them.
+2. The main process parses the global statements and declares every block's
+   header in source order, so each worker starts from the same global symbols
+   a sequential parse would have built.
+3. Workers lex and parse the block spans.
+4. The main process analyses the returned functions in source order (purity,
+   constexpr, MEMO checks) and assembles the program.
+
+Errors are reported for the earliest failing line, whichever process found it,
+so the result does not depend on scheduling. A tree nested too deeply for
+pickle to send back, which --explicit-stack parses, is parsed again in the
+main process. Calls into functions defined in
+other blocks are not evaluated at compile time; the C++ compiler still sees
+them as constexpr.
+"""
+
+import pickle
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from basic_compiler.basic_ast import ClassNode, FunctionNode, ProgramNode
+from basic_compiler.basic_ctfe import DEFAULT_STEP_BUDGET
+from basic_compiler.basic_exceptions import (
+    LexerError,
+    ParserError,
+    SymbolTableError,
+    TokenError,
+)
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+
+_BLOCK_START = re.compile(
+    r"\s*(?:(?:MEMO\s*(?:\(\s*\d+\s*\))?\s+)?(FUNCTION)|(CLASS)|(STRUCT))\b"
+)
+_BLOCK_END = {
+    "FUNCTION": re.compile(r"\s*ENDFUNCTION\b"),
+    "CLASS": re.compile(r"\s*ENDCLASS\b"),
+    "STRUCT": re.compile(r"\s*ENDSTRUCT\b"),
+}
+
+_ERRORS = (LexerError, TokenError, ParserError, SymbolTableError)
+
+# (is_block, first line, line after the last)
+Segment = Tuple[bool, int, int]
+
+
+def split_blocks(source: List[str]) -> Optional[List[Segment]]:
+    """
+    :param source: The source lines
+    :return: Block spans and the global statement runs between them in order,
+        or None if a block is not closed
+    """
+    segments = []
+    globals_start = 0
+    line = 0
+    while line < len(source):
+        match = _BLOCK_START.match(source[line])
+        if match is None:
+            line += 1
+            continue
+
+        end_pattern = _BLOCK_END[next(group for group in match.groups() if group)]
+        end = line + 1
+        while end < len(source) and not end_pattern.match(source[end]):
+            end += 1
+        if end == len(source):
+            return None
+
+        if globals_start < line:
+            segments.append((False, globals_start, line))
+        segments.append((True, line, end + 1))
+        line = globals_start = end + 1
+
+    if globals_start < len(source):
+        segments.append((False, globals_start, len(source)))
+    return segments
+
+
+_worker_parser = None
+_worker_source = None
+
+
+def _init_worker(source: List[str], parser: Parser) -> None:
+    global _worker_parser, _worker_source
+    _worker_source = source
+    _worker_parser = parser
+
+
+def _parse_span(parser: Parser, source: List[str], span: Tuple[int, int]):
+    """
+    :return: The block at span
+    """
+    # Globals declared after the block stay invisible to it
+    parser.set_horizon(span[0])
+    parser.set_lexer(Lexer(source, *span))
+    return parser.stmt()
+
+
+def _parse_block(span: Tuple[int, int]):
+    """
+    :return: ("ok", pickled node), ("deep", None) if the node is nested too
+        deeply to pickle, or ("error", exception) for the block at span
+    """
+    try:
+        node = _parse_span(_worker_parser, _worker_source, span)
+    except _ERRORS as e:
+        return "error", e
+    try:
+        # Pickled here, as the pool would fail on it and lose every result
+        return "ok", pickle.dumps(node, pickle.HIGHEST_PROTOCOL)
+    except RecursionError:
+        return "deep", None
+
+
+def parse_parallel(
+    source: List[str],
+    jobs: int,
+    ctfe_steps: int = DEFAULT_STEP_BUDGET,
+    explicit_stack: bool = False,
+) -> ProgramNode:
+    """
+    Parse source with up to jobs worker processes
+
+    :param source: The source lines
+    :param jobs: Worker processes for the block spans
+    :param ctfe_steps: Step budget for compile-time evaluation
+    :param explicit_stack: Parse nesting without recursion, see Parser
+    :return: The same program a sequential Parser builds, minus calls folded
+        across blocks
+    :raise ParserError: Or another compile error, for the earliest failing line
+    """
+    segments = split_blocks(source)
+    if segments is None or jobs <= 1:
+        return Parser(
+            Lexer(source), None, ctfe_steps, explicit_stack=explicit_stack
+        ).parse_program()
+
+    parser = Parser(
+        Lexer([]),
+        None,
+        ctfe_steps,
+        defer_analysis=True,
+        explicit_stack=explicit_stack,
+    )
+    global_nodes = {}
+    first_error = None
+    for index, (is_block, start, end) in enumerate(segments):
+        try:
+            if is_block:
+                parser.set_lexer(Lexer(source, start, start + 1))
+                parser.declare_header()
+            else:
+                parser.set_lexer(Lexer(source, start, end))
+                global_nodes[index] = parser.parse_program().statements
+        except _ERRORS as e:
+            first_error = (index, e)
+            segments = segments[:index]
+            break
+
+    blocks = [(start, end) for is_block, start, end in segments if is_block]
+    # The workers get a copy of the parser with every global declared
+    with ProcessPoolExecutor(
+        max_workers=jobs, initializer=_init_worker, initargs=(source, parser)
+    ) as pool:
+        chunk_size = max(1, len(blocks) // (jobs * 4))
+        results = iter(list(pool.map(_parse_block, blocks, chunksize=chunk_size)))
+
+    program = ProgramNode()
+    for index, (is_block, start, end) in enumerate(segments):
+        if not is_block:
+            for stmt in global_nodes[index]:
+                program.add_statement(stmt)
+            continue
+
+        status, node = next(results)
+        if status == "error":
+            raise node
+        if status == "deep":
+            # Unpickling does not recurse, pickling does
+            node = _parse_span(parser, source, (start, end))
+            parser.set_horizon(None)
+        else:
+            node = pickle.loads(node)
+        if isinstance(node, FunctionNode):
+            parser.finish_function(node, in_class=False)
+        elif isinstance(node, ClassNode):
+            for _, member in node.members:
+                if isinstance(member, FunctionNode):
+                    parser.finish_function(member, in_class=True)
+        program.add_statement(node)
+
+    if first_error is not None:
+        raise first_error[1]
+    return program
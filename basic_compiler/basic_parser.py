@@ -1,15 +1,186 @@
 import logging
-from typing import Optional
-
+from typing import Callable, List, Optional
+
+from basic_compiler.basic_analysis import (
+    SCALAR_TYPES,
+    assign_param_modes,
+    find_impurity,
+    is_constexpr,
+)
+from basic_compiler.basic_ast import (
+    AbstractNode,
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ClassNode,
+    CloseNode,
+    ContinueNode,
+    DimNode,
+    DoNode,
+    ExprNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    InputNode,
+    LetNode,
+    LiteralNode,
+    ModNode,
+    NameNode,
+    OpenNode,
+    ParamNode,
+    PowNode,
+    PrintNode,
+    ProgramNode,
+    ReturnNode,
+    StructNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+)
+from basic_compiler.basic_ctfe import (
+    DEFAULT_STEP_BUDGET,
+    Interpreter,
+    NotConstant,
+    coerce,
+    to_literal,
+)
 from basic_compiler.basic_emitter import Emitter
-from basic_compiler.basic_exceptions import ParserError
+from basic_compiler.basic_exceptions import (
+    LexerError,
+    ParserError,
+    ParserErrors,
+    SymbolTableError,
+)
 from basic_compiler.basic_lex import Lexer
-from basic_compiler.basic_symbol_set import SymbolTable
+from basic_compiler.basic_symbol_set import (
+    ASSIGNABLE_KINDS,
+    CALLABLE_KINDS,
+    SymbolKind,
+    SymbolTable,
+)
 from basic_compiler.basic_token import Token, TokenType
+from basic_compiler.basic_trace import ParseTrace
+
+
+# Binding powers, weakest first. NOT applies to a comparison and a leading
+# sign to a power, so -2 ^ 2 is -(2 ^ 2) as in the grammar in README.md
+_BP_OR = 1
+_BP_AND = 2
+_BP_NOT = 3
+_BP_COMPARISON = 4
+_BP_SUM = 5
+_BP_PRODUCT = 6
+_BP_SIGN = 7
+_BP_POW = 8
+_BP_ATOM = 9
+
+# Infix operator token -> (C++ operator, binding power, binding power of the
+# right operand). Left-associative operators bind their right operand one
+# level tighter; "^" takes a signed factor, which makes it right-associative.
+_INFIX_OPS = {
+    TokenType.OR: ("||", _BP_OR, _BP_OR + 1),
+    TokenType.AND: ("&&", _BP_AND, _BP_AND + 1),
+    TokenType.EQ: ("==", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.NOTEQ: ("!=", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.LT: ("<", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.LTEQ: ("<=", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.GT: (">", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.GTEQ: (">=", _BP_COMPARISON, _BP_COMPARISON + 1),
+    TokenType.PLUS: ("+", _BP_SUM, _BP_SUM + 1),
+    TokenType.MINUS: ("-", _BP_SUM, _BP_SUM + 1),
+    TokenType.MULT: ("*", _BP_PRODUCT, _BP_PRODUCT + 1),
+    TokenType.DIV: ("/", _BP_PRODUCT, _BP_PRODUCT + 1),
+    TokenType.MOD: ("%", _BP_PRODUCT, _BP_PRODUCT + 1),
+    TokenType.POW: ("^", _BP_POW, _BP_SIGN),
+}
+
+_SIGN_OPS = {TokenType.PLUS: "+", TokenType.MINUS: "-"}
+
+# Suspended work of Parser.expr_explicit, kept on its stack
+_FRAME_PREFIX = 0  # NOT or a sign waiting for its operand
+_FRAME_INFIX = 1  # an infix operator waiting for its right operand
+_FRAME_GROUP = 2  # "(" waiting for the expression before ")"
+_FRAME_CALL = 3  # a call waiting for its next argument
+
+# Statements that open a block, and the tokens that close one. Recovering from
+# an error skips to the end of the line or to one of _BLOCK_ENDS, and skips the
+# whole block when the error is in the line that opens it.
+_BLOCK_STARTS = {
+    TokenType.IF,
+    TokenType.SWITCH,
+    TokenType.WHILE,
+    TokenType.DO,
+    TokenType.FOR,
+    TokenType.FUNCTION,
+    TokenType.MEMO,
+    TokenType.CLASS,
+    TokenType.STRUCT,
+}
+_BLOCK_ENDS = {
+    TokenType.ENDIF,
+    TokenType.ENDSWITCH,
+    TokenType.ENDWHILE,
+    TokenType.ENDDO,
+    TokenType.ENDFOR,
+    TokenType.ENDFUNCTION,
+    TokenType.ENDCLASS,
+    TokenType.ENDSTRUCT,
+}
+# What a statement that fails can raise
+_STATEMENT_ERRORS = (LexerError, ParserError, SymbolTableError)
+# Parameter types a MEMO cache can hash and compare
+_MEMO_KEY_TYPES = SCALAR_TYPES | {"STRING"}
+
+
+def infix_node(op: str, left: ExprNode, right: ExprNode) -> ExprNode:
+    """
+    :param op: The C++ operator from _INFIX_OPS
+    """
+    if op == "%":
+        return ModNode(left, right)
+    if op == "^":
+        return PowNode(left, right)
+    return BinaryNode(op, left, right)
+
+
+def at_line(node: AbstractNode, token: Token) -> AbstractNode:
+    """
+    Record where in the source a statement starts
+
+    :param token: Its first token
+    """
+    node.line_number = token.line_number + 1
+    node.column = token.column + 1
+    return node
 
 
 class Parser:
-    def __init__(self, lexer: Lexer, emitter: Emitter = None):
+    def __init__(
+        self,
+        lexer: Lexer,
+        emitter: Emitter = None,
+        ctfe_steps: int = DEFAULT_STEP_BUDGET,
+        trace: Optional[ParseTrace] = None,
+        defer_analysis: bool = False,
+        explicit_stack: bool = False,
+        max_errors: int = 1,
+    ):
+        """
+        :param lexer: The token source
+        :param emitter: Receives the generated C++
+        :param ctfe_steps: Step budget for evaluating calls at compile time, 0 disables it
+        :param trace: Records the productions as they are parsed; None costs nothing
+        :param defer_analysis: Leave finish_function to the caller, which sees
+            functions this parser does not
+        :param explicit_stack: Parse nested blocks and expressions on explicit
+            stacks instead of Python frames, for machine-generated deep nesting
+        :param max_errors: Collect up to this many errors, recovering after each,
+            and raise them together as ParserErrors; 1 raises the first error
+            as it is found, 0 collects every error
+        """
         self._lexer = lexer
         self._emitter = emitter
 
@@ -57,28 +228,96 @@ class Parser:
 
         self._declaration_tokens = {TokenType.LET, TokenType.DIM, TokenType.CONST}
 
+        # Generators of the statements with nested bodies, driven by run_block
+        self._block_stmts = {
+            TokenType.IF: self.if_block,
+            TokenType.SWITCH: self.switch_block,
+            TokenType.WHILE: self.while_block,
+            TokenType.DO: self.do_block,
+            TokenType.FOR: self.for_block,
+        }
+        self._explicit_stack = explicit_stack
+        if explicit_stack:
+            self.expr = self.expr_explicit
+
+        # Functions whose bodies do no I/O and write no globals
+        self._pure_functions = set()
+
+        # Compile-time evaluation: pure free functions and functions emitted
+        # constexpr. CONST values known at compile time live on their symbols.
+        self._ctfe_functions = {}
+        self._constexpr_functions = set()
+        self._interpreter = (
+            Interpreter(self._ctfe_functions, ctfe_steps)
+            if ctfe_steps > 0
+            else None
+        )
+        # Evaluates CONST initializers and CASE labels even when CTFE is off
+        self._evaluator = self._interpreter or Interpreter({})
+        self._class_name = None
+
+        # For every function which of its parameters are BYREF
+        self._ref_params = {}
+        self._defer_analysis = defer_analysis
+
+        self._max_errors = max_errors
+        # The errors recorded, one message each
+        self._diagnostics = []
+        # Every error found, including those not recorded
+        self._errors = 0
+        # The line of the last error recorded
+        self._error_line = None
+
         self._current_token = None
         self._peek_token = None
         self.next_token()
         self.next_token()
 
-    def program(self) -> None:
+        if trace is not None:
+            trace.install(self)
+
+    def program(self) -> ProgramNode:
+        """
+        Parse the whole source, then emit it and write the output file
+        """
+        program = self.parse_program()
+        program.emit(self._emitter)
+        self._emitter.write_file()
+        return program
+
+    def set_horizon(self, line_number: int) -> None:
+        """
+        Hide global declarations made after line_number
+        """
+        self._symbol_table.set_horizon(line_number)
+
+    def set_lexer(self, lexer: Lexer) -> None:
+        """
+        Continue parsing from another token source, keeping every declaration
+        """
+        self._lexer = lexer
+        self.next_token()
+        self.next_token()
+
+    def parse_program(self) -> ProgramNode:
         """
         program -> {stmt}
         """
-        logging.debug("PROGRAM")
 
+        program = ProgramNode()
         while self.check_token(TokenType.NEWLINE):
             # Skip any leading newlines
             self.next_token()
 
         while not self.check_token(TokenType.EOF):
             # Parse all the stmts
-            self.stmt()
+            program.add_statement(self.statement(self.stmt))
 
-        self._emitter.write_file()
+        if self._diagnostics:
+            raise ParserErrors(list(self._diagnostics))
+        return program
 
-    def stmt(self) -> None:
+    def stmt(self) -> AbstractNode:
         """
         stmt ->
             class_stmt
@@ -87,23 +326,22 @@ class Parser:
             | normal_stmt
             | declaration_stmt
         """
-        logging.debug("STMT")
 
+        tmp_token = self._current_token
         if self.check_token(TokenType.CLASS):
-            self.class_stmt()
-        elif self.check_token(TokenType.FUNCTION):
-            self.func_stmt()
+            return at_line(self.class_stmt(), tmp_token)
+        elif self.check_token(TokenType.FUNCTION) or self.check_token(TokenType.MEMO):
+            return at_line(self.func_stmt(), tmp_token)
         elif self.check_token(TokenType.STRUCT):
-            self.struct_stmt()
+            return at_line(self.struct_stmt(), tmp_token)
         elif self.is_normal_stmt(self._current_token.token_type):
-            self.normal_stmt()
+            return self.normal_stmt()
         elif self.is_declaration_stmt(self._current_token.token_type):
-            self.declaration_stmt()
+            return self.declaration_stmt()
         else:
-            self.abort(f"Invalid statement at {self._current_token.token_text}"
-                       f" {self._current_token.line_number}: {self._current_token.line_text}")
+            self.abort(f"Invalid statement at {self._current_token.token_text}")
 
-    def class_stmt(self) -> None:
+    def class_stmt(self) -> ClassNode:
         """
         class_stmt ->
             "CLASS" ident nl
@@ -111,60 +349,145 @@ class Parser:
             func_stmt | declaration_stmt }
             "ENDCLASS" nl
         """
-        logging.debug("STMT-CLASS")
 
+        tmp_class_token = self._current_token
         self.next_token()
         class_name = self._current_token.token_text
-        self._symbol_table.insert(self._current_token)
+        self.declare(self._current_token, SymbolKind.CLASS)
         self.match(TokenType.IDENT)
-        self._emitter.emit_line(f"class {class_name} {{")
+        class_node = ClassNode(class_name)
+        self._class_name = class_name
+        self._symbol_table.push_scope("CLASS", class_name)
         self.nl()
 
-        while not self.check_token(TokenType.ENDCLASS):
-            access_modifier = "private"
-            if self.check_token(TokenType.PUBLIC) or self.check_token(
-                TokenType.PRIVATE
-            ):
-                access_modifier = self._current_token.token_text.lower()
-                self.next_token()
-                self.nl()
-            self._emitter.emit_line(f"{access_modifier}:")
-
-            if self.check_token(TokenType.FUNCTION):
-                self.func_stmt()
-            elif self.is_declaration_stmt(self._current_token.token_type):
-                self.declaration_stmt()
-            else:
-                self.abort(
-                    f"Invalid statement in class at {self._current_token.token_text}"
-                    f" {self._current_token.line_number}: {self._current_token.line_text}"
-                )
+        while not self.block_ends(TokenType.ENDCLASS, tmp_class_token):
+            self.statement(self.class_member, class_node)
 
         self.match(TokenType.ENDCLASS)
         self.nl()
-        self._emitter.emit_line("};")
+        self._symbol_table.pop_scope()
+        self._class_name = None
+        return class_node
+
+    def class_member(self, class_node: ClassNode) -> AbstractNode:
+        """
+        Parse a member of class_node and add it
+
+        :return: The member
+        """
+        access_modifier = "private"
+        if self.check_token(TokenType.PUBLIC) or self.check_token(TokenType.PRIVATE):
+            access_modifier = self._current_token.token_text.lower()
+            self.next_token()
+            self.nl()
+
+        # The member is a statement of its own, which recovers from its first
+        # token rather than the access modifier: a broken FUNCTION is skipped
+        # as a whole block. An ENDCLASS in its place is an error of the member
+        # the class recovers from, so the ENDCLASS is not dropped
+        if self.check_token(TokenType.ENDCLASS):
+            tmp_member = self.member_stmt()
+        else:
+            tmp_member = self.statement(self.member_stmt)
+        if tmp_member is not None:
+            class_node.add_member(tmp_member, access_modifier)
+        return tmp_member
+
+    def member_stmt(self) -> AbstractNode:
+        """
+        member_stmt -> func_stmt | declaration_stmt
+        """
+        if self.check_token(TokenType.FUNCTION):
+            tmp_token = self._current_token
+            return at_line(self.func_stmt(), tmp_token)
+        elif self.is_declaration_stmt(self._current_token.token_type):
+            return self.declaration_stmt()
+        else:
+            self.abort(f"Invalid statement in class at {self._current_token.token_text}")
 
-    def func_stmt(self) -> None:
+    def func_stmt(self) -> FunctionNode:
         """
         func_stmt ->
-            "FUNCTION" ident "(" [ param_list ] ")" [ "AS" type ] nl
+            func_header nl
             { normal_stmt | declaration_stmt }
             "ENDFUNCTION" nl
         """
-        logging.debug("STMT-FUNC")
 
-        self.next_token()
-        tmp_func_name = self._current_token.token_text
-        if self._symbol_table.get_line_text(tmp_func_name) is None:
-            self._symbol_table.insert(self._current_token)
+        (
+            tmp_func_token,
+            tmp_param_list,
+            tmp_param_tokens,
+            tmp_func_return_type,
+            tmp_memo,
+            tmp_memo_limit,
+        ) = self.func_header()
+        tmp_func_name = tmp_func_token.token_text
+        self.nl()
+
+        tmp_is_constructor = (
+            self._symbol_table.kind(tmp_func_name) == SymbolKind.CLASS
+        )
+        if not tmp_is_constructor:
+            self.declare_function(tmp_func_token, tmp_param_list, tmp_func_return_type)
+
+        self._symbol_table.push_scope("FUNCTION", tmp_func_name)
+        for tmp_param, tmp_param_token in zip(tmp_param_list, tmp_param_tokens):
+            self._symbol_table.insert(
+                tmp_param_token, SymbolKind.PARAMETER, tmp_param.param_type
+            )
+
+        func_node = FunctionNode(
+            tmp_func_name, tmp_param_list, tmp_func_return_type, tmp_is_constructor
+        )
+        func_node.token = tmp_func_token
+        func_node.memo = tmp_memo
+        func_node.memo_limit = tmp_memo_limit
+
+        tmp_errors = self._errors
+        while not self.block_ends(TokenType.ENDFUNCTION, tmp_func_token):
+            func_node.add_statement(self.statement(self.normal_or_declaration_stmt))
+
+        self.match(TokenType.ENDFUNCTION)
+        self._symbol_table.pop_scope()
+        # A body with errors has None for each statement that failed
+        if not self._defer_analysis and self._errors == tmp_errors:
+            self.finish_function(func_node, self._class_name is not None)
+        self.nl()
+        return func_node
+
+    def func_header(self):
+        """
+        func_header ->
+            [ "MEMO" [ "(" int ")" ] ] "FUNCTION" ident "(" [ param_list ] ")" [ "AS" type ]
+
+        :return: The name token, parameters, parameter name tokens, return type,
+            whether it is MEMO and the MEMO cache size
+        """
+        tmp_memo = False
+        tmp_memo_limit = None
+        if self.check_token(TokenType.MEMO):
+            tmp_memo = True
+            self.next_token()
+            if self.check_token(TokenType.LPAREN):
+                self.next_token()
+                tmp_limit_token = self._current_token
+                self.match(TokenType.INT)
+                tmp_memo_limit = int(tmp_limit_token.token_text)
+                self.match(TokenType.RPAREN)
+                if tmp_memo_limit <= 0:
+                    self.abort("MEMO cache size must be positive")
+
+        self.match(TokenType.FUNCTION)
+        tmp_func_token = self._current_token
         tmp_func_return_type = "void"
-        tmp_param_list = ""
+        tmp_param_list = []
         self.match(TokenType.IDENT)
         self.match(TokenType.LPAREN)
 
+        tmp_param_tokens = []
         if not self.check_token(TokenType.RPAREN):
             # Read the parameter list
-            tmp_param_list = self.param_list()
+            tmp_param_list = self.param_list(tmp_param_tokens)
 
         self.match(TokenType.RPAREN)
 
@@ -174,117 +497,185 @@ class Parser:
                 tmp_func_return_type = self._current_token.token_text
                 self.next_token()
             else:
-                self.abort(f"Invalid type at {self._current_token.token_text}"
-                           f" {self._current_token.line_number}: {self._current_token.line_text}")
+                self.abort(f"Invalid type at {self._current_token.token_text}")
+
+        return (
+            tmp_func_token,
+            tmp_param_list,
+            tmp_param_tokens,
+            tmp_func_return_type,
+            tmp_memo,
+            tmp_memo_limit,
+        )
 
-        self.nl()
+    def declare(self, token: Token, kind: SymbolKind, symbol_type: str = None):
+        """
+        Declare token's identifier in the current scope, unless this very token
+        was already declared by a declaration pass over the top-level headers
+        """
+        tmp_symbol = self._symbol_table.find_local(token.token_text)
         if (
-            self._symbol_table.get_line_text(tmp_func_name) is not None
-            and self._symbol_table.get_line_text(tmp_func_name).find("CLASS") != -1
+            tmp_symbol is not None
+            and tmp_symbol.kind == kind
+            and tmp_symbol.token.line_number == token.line_number
         ):
-            self._emitter.emit_line(f"{tmp_func_name} ({tmp_param_list}) {{")
-        else:
-            self._emitter.emit_line(
-                f"{tmp_func_return_type.lower()} {tmp_func_name}({tmp_param_list}) {{"
+            return tmp_symbol
+        return self._symbol_table.insert(token, kind, symbol_type)
+
+    def declare_function(
+        self, token: Token, params: List[ParamNode], return_type: str
+    ) -> None:
+        tmp_symbol = self._symbol_table.find_local(token.token_text)
+        if tmp_symbol is None or tmp_symbol.kind != SymbolKind.FUNCTION:
+            # Functions may be overloaded, anything else may not share the name
+            self._symbol_table.insert(token, SymbolKind.FUNCTION, return_type)
+        self._ref_params[token.token_text] = [param.mode == "ref" for param in params]
+
+    def declare_header(self) -> None:
+        """
+        Declare the CLASS, STRUCT or FUNCTION whose header is the current line,
+        without parsing its body
+        """
+        if self.check_token(TokenType.CLASS) or self.check_token(TokenType.STRUCT):
+            tmp_kind = (
+                SymbolKind.CLASS if self.check_token(TokenType.CLASS) else SymbolKind.STRUCT
             )
-
-        while not self.check_token(TokenType.ENDFUNCTION):
-            self.normal_or_declaration_stmt()
-
-        self.match(TokenType.ENDFUNCTION)
+            self.next_token()
+            self.declare(self._current_token, tmp_kind)
+            self.match(TokenType.IDENT)
+        else:
+            tmp_func_token, tmp_param_list, _, tmp_return_type, _, _ = self.func_header()
+            self.declare_function(tmp_func_token, tmp_param_list, tmp_return_type)
         self.nl()
-        self._emitter.emit_line("}")
 
-    def param_list(self) -> str:
+    def finish_function(self, func_node: FunctionNode, in_class: bool) -> None:
+        """
+        Analyse a parsed function once every function before it is known:
+        choose parameter passing, prove purity, register it for compile-time
+        evaluation and constexpr, and check its MEMO contract
+
+        :param func_node: The function to analyse
+        :param in_class: If it is a class method
+        """
+        tmp_func_name = func_node.name
+        tmp_func_token = func_node.token
+        assign_param_modes(func_node, self._ref_params)
+
+        impurity = find_impurity(func_node, self._pure_functions)
+        if impurity is None:
+            self._pure_functions.add(tmp_func_name)
+            if not in_class and not func_node.is_constructor:
+                self._ctfe_functions[tmp_func_name] = func_node
+                if is_constexpr(func_node, self._constexpr_functions):
+                    func_node.constexpr = True
+                    self._constexpr_functions.add(tmp_func_name)
+        if func_node.memo:
+            if func_node.is_constructor or func_node.return_type.upper() == "VOID":
+                self.abort(f"MEMO function '{tmp_func_name}' must return a value", tmp_func_token)
+            if impurity is not None:
+                self.abort(
+                    f"MEMO function '{tmp_func_name}' is not pure: it {impurity}", tmp_func_token
+                )
+            for tmp_param in func_node.params:
+                if tmp_param.param_type.upper() not in _MEMO_KEY_TYPES:
+                    self.abort(
+                        f"MEMO function '{tmp_func_name}' cannot cache its"
+                        f" {tmp_param.param_type} parameter {tmp_param.name}",
+                        tmp_func_token,
+                    )
+
+    def param_list(self, tokens: List[Token] = None) -> List[ParamNode]:
         """
         param_list ->
-            expr [AS type] { "," expr (AS type) }
+            [ "BYREF" ] ident "AS" type { "," [ "BYREF" ] ident "AS" type }
+
+        :param tokens: Receives the name token of every parameter
         """
-        logging.debug("PARAM-LIST")
 
-        tmp_param_list = ""
-        tmp_type = ""
-        tmp_expr = self.expr()
+        tmp_param_list = []
+        while True:
+            tmp_mode = "value"
+            if self.check_token(TokenType.BYREF):
+                tmp_mode = "ref"
+                self.next_token()
+            tmp_ident = self._current_token.token_text
+            if tokens is not None:
+                tokens.append(self._current_token)
+            self.match(TokenType.IDENT)
+            self.match(TokenType.AS)
 
-        if self.check_token(TokenType.AS):
-            self.next_token()
             if self.is_type(self._current_token.token_type):
-                tmp_type = self._current_token.token_text
+                tmp_param_list.append(
+                    ParamNode(tmp_ident, self._current_token.token_text, tmp_mode)
+                )
                 self.next_token()
             else:
-                self.abort(f"Invalid type at {self._current_token.token_text}"
-                           f" {self._current_token.line_number}: {self._current_token.line_text}")
+                self.abort(f"Invalid type at {self._current_token.token_text}")
 
-        tmp_param_list += f"{tmp_type.lower()} {tmp_expr}"
-
-        if self.check_token(TokenType.COMMA):
+            if not self.check_token(TokenType.COMMA):
+                return tmp_param_list
             self.next_token()
-            tmp_param_list += ", " + self.param_list()
-
-        return tmp_param_list
 
-    def struct_stmt(self) -> None:
+    def struct_stmt(self) -> StructNode:
         """
         struct_stmt ->
             "STRUCT" ident nl
             { ident "AS" type nl }
             "ENDSTRUCT" nl
         """
-        logging.debug("STMT-STRUCT")
 
+        tmp_struct_token = self._current_token
         self.next_token()
-        self._emitter.emit_line(f"struct {self._current_token.token_text} {{")
-        self._symbol_table.insert(self._current_token)
+        struct_node = StructNode(self._current_token.token_text)
+        self.declare(self._current_token, SymbolKind.STRUCT)
         self.match(TokenType.IDENT)
         self.nl()
 
-        while not self.check_token(TokenType.ENDSTRUCT):
-            tmp_ident = self._current_token.token_text
-            tmp_type = ""
-            self.match(TokenType.IDENT)
-            self.match(TokenType.AS)
+        while not self.block_ends(TokenType.ENDSTRUCT, tmp_struct_token):
+            self.statement(self.struct_field, struct_node)
 
-            if self.is_type(self._current_token.token_type):
-                tmp_type = self._current_token.token_text
-                self.next_token()
-            else:
-                self.abort(f"Invalid type at {self._current_token.token_text}"
-                           f" {self._current_token.line_number}: {self._current_token.line_text}")
+        self.match(TokenType.ENDSTRUCT)
+        self.nl()
+        return struct_node
 
-            self._emitter.emit_line(f"{tmp_type.lower()} {tmp_ident};")
-            self.nl()
+    def struct_field(self, struct_node: StructNode) -> None:
+        """
+        Parse a field of struct_node and add it:
+            ident "AS" type nl
+        """
+        tmp_ident = self._current_token.token_text
+        tmp_type = ""
+        self.match(TokenType.IDENT)
+        self.match(TokenType.AS)
 
-        self.match(TokenType.ENDSTRUCT)
+        if self.is_type(self._current_token.token_type):
+            tmp_type = self._current_token.token_text
+            self.next_token()
+        else:
+            self.abort(f"Invalid type at {self._current_token.token_text}")
+
+        struct_node.add_field(tmp_ident, tmp_type)
         self.nl()
-        self._emitter.emit_line("};")
 
-    def normal_stmt(self) -> None:
+    def normal_stmt(self) -> AbstractNode:
         """
         Parse a normal statement.
         """
-        logging.debug("STMT-NORMAL")
 
+        tmp_token = self._current_token
         if self._current_token.token_type in self._normal_tokens_map:
-            self._normal_tokens_map[self._current_token.token_type]()
+            return at_line(self._normal_tokens_map[self._current_token.token_type](), tmp_token)
         elif self._current_token.token_type == TokenType.IDENT:
-            if self._symbol_table.find(self._current_token.token_text) is not None:
-                tmp_token_text = self._symbol_table.lookup(
-                    self._current_token.token_text
-                ).line_text
-                if (
-                    tmp_token_text.find("CLASS") != -1
-                    or tmp_token_text.find("FUNCTION") != -1
-                    or tmp_token_text.find("STRUCT") != -1
-                    or tmp_token_text.find("RETURN") != -1
-                ):
-                    self.function_call()
-                else:
-                    self.id_let_stmt()
+            tmp_kind = self._symbol_table.kind(self._current_token.token_text)
+            if tmp_kind in CALLABLE_KINDS:
+                return at_line(self.call_stmt(), tmp_token)
+            elif tmp_kind is not None:
+                return at_line(self.id_let_stmt(), tmp_token)
+            self.abort(f"Variable {self._current_token.token_text} not declared")
         else:
-            self.abort(f"Invalid statement at {self._current_token.token_text}"
-                       f" {self._current_token.line_number}: {self._current_token.line_text}")
+            self.abort(f"Invalid statement at {self._current_token.token_text}")
 
-    def declaration_stmt(self) -> None:
+    def declaration_stmt(self) -> AbstractNode:
         """
         declaration_stmt ->
             ident "=" expr nl
@@ -292,133 +683,127 @@ class Parser:
             | "DIM" ident "AS" type [ "(" expr ")" ] nl
             | "CONST" ( "LET" | "DIM" ) ident "AS" type [ "(" expr ")" ] "=" expr nl
         """
-        logging.debug("STMT-DECLARATION")
 
+        tmp_token = self._current_token
         if self.check_token(TokenType.IDENT):
-            self.id_let_stmt()
+            return at_line(self.id_let_stmt(), tmp_token)
         elif self.check_token(TokenType.LET):
-            self.let_stmt()
+            return at_line(self.let_stmt(), tmp_token)
         elif self.check_token(TokenType.DIM):
-            self.dim_stmt()
+            return at_line(self.dim_stmt(), tmp_token)
         elif self.check_token(TokenType.CONST):
-            self.const_stmt()
+            return at_line(self.const_stmt(), tmp_token)
         else:
-            self.abort(
-                f"Invalid declaration statement at {self._current_token.token_text}"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Invalid declaration statement at {self._current_token.token_text}")
 
-    def id_let_stmt(self) -> None:
+    def id_let_stmt(self) -> AssignNode:
         """
         ident "=" expr nl
         """
-        logging.debug("STMT-ID-LET")
 
-        if self._symbol_table.lookup(self._current_token.token_text):
-            self._emitter.emit_line(f"{self._current_token.token_text} = ")
-            self.next_token()
-            self.match(TokenType.ASSIGN)
-            self._emitter.emit_line(self.expr())
-            self.nl()
-            self._emitter.emit_line(";")
-        else:
-            self.abort(
-                f"Variable {self._current_token.token_text} not declared"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+        tmp_symbol = self._symbol_table.lookup(self._current_token.token_text)
+        if tmp_symbol.kind not in ASSIGNABLE_KINDS:
+            self.abort(f"Cannot assign to {tmp_symbol.kind.name.lower()} {tmp_symbol.name}")
+        tmp_ident = self._current_token.token_text
+        self.next_token()
+        self.match(TokenType.ASSIGN)
+        assign_node = AssignNode(tmp_ident, self.expr())
+        self.nl()
+        return assign_node
 
-    def let_stmt(self) -> None:
+    def let_stmt(self, kind: SymbolKind = SymbolKind.VARIABLE) -> LetNode:
         """
         "LET" ident "AS" type "=" expr nl
         | LET ident "AS" type(expr) nl
         """
-        logging.debug("STMT-LET")
 
         self.next_token()
         tmp_ident = self._current_token.token_text
-        self._symbol_table.insert(self._current_token)
+        tmp_token = self._current_token
 
         self.match(TokenType.IDENT)
         self.match(TokenType.AS)
 
-        if self.is_type(self._current_token.token_type):
-            tmp_type = self._current_token.token_text
-            self.next_token()
+        if not self.is_type(self._current_token.token_type):
+            self.abort(f"Invalid type at {self._current_token.token_text}")
 
-            if self.check_token(TokenType.LPAREN):
-                self.next_token()
-                self._emitter.emit_line(f"{tmp_type.lower()} {tmp_ident} {{")
-                self._emitter.emit_line(self.expr())
-                self.match(TokenType.RPAREN)
-                self._emitter.emit_line("}")
-            else:
-                self._emitter.emit_line(f"{tmp_type.lower()} {tmp_ident} = ")
-                self.match(TokenType.ASSIGN)
-                self._emitter.emit_line(self.expr())
+        tmp_type = self._current_token.token_text
+        self._symbol_table.insert(tmp_token, kind, tmp_type)
+        self.next_token()
+
+        if self.check_token(TokenType.LPAREN):
+            self.next_token()
+            tmp_expr = None
+            if not self.check_token(TokenType.RPAREN):
+                tmp_expr = self.expr()
+            self.match(TokenType.RPAREN)
+            let_node = LetNode(tmp_ident, tmp_type, tmp_expr, construct=True)
+        else:
+            self.match(TokenType.ASSIGN)
+            let_node = LetNode(tmp_ident, tmp_type, self.expr())
 
         self.nl()
-        self._emitter.emit_line(";")
+        return let_node
 
-    def dim_stmt(self) -> None:
+    def dim_stmt(self, kind: SymbolKind = SymbolKind.VARIABLE) -> DimNode:
         """
         "DIM" ident "AS" type [ "(" expr ")" ] nl
         """
-        logging.debug("STMT-DIM")
 
         self.next_token()
         tmp_ident = self._current_token.token_text
-        self._symbol_table.insert(self._current_token)
+        tmp_token = self._current_token
         self.match(TokenType.IDENT)
         self.match(TokenType.AS)
 
-        if self.is_type(self._current_token.token_type):
-            tmp_type = self._current_token.token_text
-            self._emitter.emit_line(f"{tmp_type.lower()} {tmp_ident} [")
-            self.next_token()
+        if not self.is_type(self._current_token.token_type):
+            self.abort(f"Invalid type at {self._current_token.token_text}")
+
+        tmp_type = self._current_token.token_text
+        # Arrays have no scalar type for expressions to use
+        self._symbol_table.insert(tmp_token, kind)
+        self.next_token()
 
+        tmp_size = None
         if self.check_token(TokenType.LPAREN):
             self.next_token()
-            self._emitter.emit_line(self.expr())
+            tmp_size = self.expr()
             self.match(TokenType.RPAREN)
 
         self.nl()
-        self._emitter.emit_line("] = {};")
+        return DimNode(tmp_ident, tmp_type, tmp_size)
 
-    def const_stmt(self) -> None:
+    def const_stmt(self) -> AbstractNode:
         """
         "CONST" ( "LET" | "DIM" ) ident "AS" type [ "(" expr ")" ] "=" expr nl
         """
-        logging.debug("STMT-CONST")
 
-        self._emitter.emit_line("const ")
         self.next_token()
         if self.check_token(TokenType.LET):
-            self.let_stmt()
+            const_node = self.let_stmt(SymbolKind.CONSTANT)
         elif self.check_token(TokenType.DIM):
-            self.dim_stmt()
+            const_node = self.dim_stmt(SymbolKind.CONSTANT)
         else:
-            self.abort(
-                f"Invalid constant statement at {self._current_token.token_text}"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Invalid constant statement at {self._current_token.token_text}")
+        const_node.const = True
+        if isinstance(const_node, LetNode) and not const_node.construct:
+            self.record_constant(const_node)
+        return const_node
 
-    def decision_stmt(self) -> None:
+    def decision_stmt(self) -> AbstractNode:
         """
         decision_stmt ->
             if_stmt
             | switch_stmt
         """
         if self.check_token(TokenType.IF):
-            self.if_stmt()
+            return self.if_stmt()
         elif self.check_token(TokenType.SWITCH):
-            self.switch_stmt()
+            return self.switch_stmt()
         else:
-            self.abort(
-                f"Invalid decision statement at {self._current_token.token_text}"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Invalid decision statement at {self._current_token.token_text}")
 
-    def if_stmt(self) -> None:
+    def if_stmt(self) -> IfNode:
         """
         if_stmt ->
             "IF" expr "THEN" nl
@@ -427,37 +812,46 @@ class Parser:
             [ "ELSE" nl { normal_stmt } ]
             "ENDIF" nl
         """
-        logging.debug("STMT-IF")
 
+        return self.run_block(self.if_block())
+
+    def if_block(self):
+        """
+        Parse if_stmt, yielding to run_block for each statement of its bodies
+        """
+
+        tmp_if_token = self._current_token
         self.next_token()
-        self._emitter.emit_line("if (")
+        if_node = IfNode()
 
-        self._emitter.emit_line(self.expr())
+        tmp_body = if_node.add_branch(self.expr())
         self.match(TokenType.THEN)
         self.nl()
-        self._emitter.emit_line(") {")
+        self._symbol_table.push_scope("BLOCK")
 
-        while not self.check_token(TokenType.ENDIF):
+        while not self.block_ends(TokenType.ENDIF, tmp_if_token):
             if self.check_token(TokenType.ELIF):
+                self._symbol_table.pop_scope()
                 self.next_token()
-                self._emitter.emit_line("} else if (")
-
-                self._emitter.emit_line(self.expr())
-                self._emitter.emit_line(") {")
+                tmp_body = if_node.add_branch(self.expr())
                 self.match(TokenType.THEN)
                 self.nl()
+                self._symbol_table.push_scope("BLOCK")
             elif self.check_token(TokenType.ELSE):
+                self._symbol_table.pop_scope()
                 self.next_token()
                 self.nl()
-                self._emitter.emit_line("} else {")
+                tmp_body = if_node.add_else()
+                self._symbol_table.push_scope("BLOCK")
             else:
-                self.normal_stmt()
+                tmp_body.append((yield self.normal_stmt))
 
+        self._symbol_table.pop_scope()
         self.match(TokenType.ENDIF)
         self.nl()
-        self._emitter.emit_line("}")
+        return if_node
 
-    def switch_stmt(self) -> None:
+    def switch_stmt(self) -> SwitchNode:
         """
         switch_stmt ->
             "SWITCH" expr nl
@@ -465,45 +859,90 @@ class Parser:
             [ "DEFAULT" nl { normal_stmt } ]
             "ENDSWITCH" nl
         """
-        logging.debug("STMT-SWITCH")
 
+        return self.run_block(self.switch_block())
+
+    def switch_block(self):
+        """
+        Parse switch_stmt, yielding to run_block for each statement of its bodies
+        """
+
+        tmp_switch_token = self._current_token
         self.next_token()
-        self._emitter.emit_line("switch (")
-        self._emitter.emit_line(self.expr())
+        switch_node = SwitchNode(self.expr())
         self.nl()
-        self._emitter.emit_line(") {")
 
-        while not self.check_token(TokenType.ENDSWITCH):
+        tmp_label_tokens = []
+        while not self.block_ends(TokenType.ENDSWITCH, tmp_switch_token):
             if self.check_token(TokenType.CASE):
                 self.next_token()
-                self._emitter.emit_line("case ")
-                self._emitter.emit_line(self.expr())
+                tmp_label_tokens.append(self._current_token)
+                tmp_body = switch_node.add_case(self.expr())
                 self.nl()
-                self._emitter.emit_line(":")
 
-                while not self.check_token(TokenType.CASE) and not self.check_token(
-                    TokenType.DEFAULT
+                while (
+                    not self.check_token(TokenType.CASE)
+                    and not self.check_token(TokenType.DEFAULT)
+                    and not self.block_ends(TokenType.ENDSWITCH, tmp_switch_token)
                 ):
-                    self.normal_stmt()
-                    self._emitter.emit_line("break;")
+                    tmp_body.append((yield self.normal_stmt))
             elif self.check_token(TokenType.DEFAULT):
                 self.next_token()
                 self.nl()
-                self._emitter.emit_line("default:")
+                tmp_body = switch_node.add_default()
 
-                while not self.check_token(TokenType.ENDSWITCH):
-                    self.normal_stmt()
+                while not self.block_ends(TokenType.ENDSWITCH, tmp_switch_token):
+                    tmp_body.append((yield self.normal_stmt))
             else:
-                self.abort(
-                    f"Invalid switch statement at {self._current_token.token_text}"
-                    f" {self._current_token.line_number}: {self._current_token.line_text}"
-                )
+                self.abort(f"Invalid switch statement at {self._current_token.token_text}")
 
         self.match(TokenType.ENDSWITCH)
+        self.check_switch(switch_node, tmp_switch_token, tmp_label_tokens)
         self.nl()
-        self._emitter.emit_line("}")
+        return switch_node
+
+    def check_switch(self, switch_node: SwitchNode, token, label_tokens) -> None:
+        """
+        Verify the CASE labels at compile time and choose how the SWITCH
+        dispatches: STRING labels must be constant, labels must match the type of
+        the SWITCH and no value may appear twice
 
-    def loop_stmt(self) -> None:
+        :param switch_node: The parsed SWITCH
+        :param token: The SWITCH token, for diagnostics
+        :param label_tokens: The first token of each CASE label, for diagnostics
+        """
+        tmp_labels = [label for label, _ in switch_node.cases]
+        tmp_type = switch_node.expr.value_type
+        tmp_is_string = tmp_type == "STRING" or (
+            tmp_type is None
+            and any(label.value_type == "STRING" for label in tmp_labels)
+        )
+        if tmp_type == "FLOAT":
+            self.abort("SWITCH needs an INT, BOOL or STRING expression", token)
+
+        tmp_values = []
+        for tmp_label, tmp_token in zip(tmp_labels, label_tokens):
+            if (tmp_label.value_type == "STRING") != tmp_is_string or (
+                tmp_label.value_type == "FLOAT"
+            ):
+                self.abort(f"CASE {tmp_label.code} does not match the SWITCH type", tmp_token)
+            try:
+                tmp_value = self._evaluator.evaluate(tmp_label)
+            except NotConstant:
+                if tmp_is_string:
+                    self.abort(f"CASE {tmp_label.code} is not a constant", tmp_token)
+                # The C++ compiler checks integral labels it can see through
+                return
+            if tmp_value in tmp_values:
+                self.abort(f"Duplicate CASE {tmp_label.code}", tmp_token)
+            tmp_values.append(tmp_value)
+
+        # A STRING SWITCH dispatches on a hash even without CASE labels, as
+        # C++ cannot switch on a std::string
+        if tmp_values or tmp_is_string:
+            switch_node.set_values(tmp_values, "STRING" if tmp_is_string else "INT")
+
+    def loop_stmt(self) -> AbstractNode:
         """
         loop_stmt ->
             "WHILE" expr nl { normal_stmt |  declaration_stmt } "ENDWHILE" nl
@@ -511,107 +950,163 @@ class Parser:
             | "FOR" ident "AS" type "=" expr "TO" expr [ "STEP" expr ] nl { normal_stmt | declaration_stmt } "ENDFOR" nl
         """
         if self.check_token(TokenType.WHILE):
-            self.while_stmt()
+            return self.while_stmt()
         elif self.check_token(TokenType.DO):
-            self.do_stmt()
+            return self.do_stmt()
         elif self.check_token(TokenType.FOR):
-            self.for_stmt()
+            return self.for_stmt()
         else:
-            self.abort(f"Invalid loop statement at {self._current_token.token_text}"
-                       f" {self._current_token.line_number}: {self._current_token.line_text}")
+            self.abort(f"Invalid loop statement at {self._current_token.token_text}")
 
-    def while_stmt(self) -> None:
+    def while_stmt(self) -> WhileNode:
         """
         "WHILE" expr nl { normal_stmt | declaration_stmt } "ENDWHILE" nl
         """
-        logging.debug("STMT-WHILE")
 
+        return self.run_block(self.while_block())
+
+    def while_block(self):
+        """
+        Parse while_stmt, yielding to run_block for each statement of its body
+        """
+
+        tmp_while_token = self._current_token
         self.next_token()
-        self._emitter.emit_line("while (")
-        self._emitter.emit_line(self.expr())
+        while_node = WhileNode(self.expr())
         self.nl()
-        self._emitter.emit_line(") {")
 
-        while not self.check_token(TokenType.ENDWHILE):
-            self.normal_or_declaration_stmt()
+        self._symbol_table.push_scope("BLOCK")
+        while not self.block_ends(TokenType.ENDWHILE, tmp_while_token):
+            while_node.statements.append((yield self.normal_or_declaration_stmt))
+        self._symbol_table.pop_scope()
 
         self.match(TokenType.ENDWHILE)
         self.nl()
-        self._emitter.emit_line("}")
+        return while_node
 
-    def do_stmt(self) -> None:
+    def do_stmt(self) -> DoNode:
         """
         "DO" nl { normal_stmt | declaration_stmt } "ENDDO" [ "WHILE" expr ] nl
         """
-        logging.debug("STMT-DO")
 
+        return self.run_block(self.do_block())
+
+    def do_block(self):
+        """
+        Parse do_stmt, yielding to run_block for each statement of its body
+        """
+
+        tmp_do_token = self._current_token
         self.next_token()
         self.nl()
-        self._emitter.emit_line("do {")
-
-        while not self.check_token(TokenType.ENDDO):
-            if self.is_normal_stmt(self._current_token.token_type):
-                self.normal_stmt()
-            elif self.is_declaration_stmt(self._current_token.token_type):
-                self.declaration_stmt()
-            elif self._symbol_table.equals(
-                self._current_token.token_text, TokenType.IDENT
-            ):
-                self.id_let_stmt()
-            else:
-                self.abort(
-                    f"Invalid statement at {self._current_token.token_text}\n"
-                    f" {self._current_token.line_number}: {self._current_token.line_text}"
-                )
+        do_node = DoNode()
+
+        self._symbol_table.push_scope("BLOCK")
+        while not self.block_ends(TokenType.ENDDO, tmp_do_token):
+            do_node.statements.append((yield self.normal_or_declaration_stmt))
+        self._symbol_table.pop_scope()
 
         self.match(TokenType.ENDDO)
 
         if self.check_token(TokenType.WHILE):
             self.next_token()
-            self._emitter.emit_line("} while (")
-            self._emitter.emit_line(self.expr())
-            self._emitter.emit_line(");")
-        else:
-            self._emitter.emit_line("} while (false);")
+            do_node.condition = self.expr()
 
         self.nl()
+        return do_node
 
-    def for_stmt(self) -> None:
+    def for_stmt(self) -> ForNode:
         """
         "FOR" ident "=" expr "TO" expr [ "STEP" expr ] nl { normal_stmt | declaration_stmt } "ENDFOR" nl
         """
-        logging.debug("STMT-FOR")
 
+        return self.run_block(self.for_block())
+
+    def for_block(self):
+        """
+        Parse for_stmt, yielding to run_block for each statement of its body
+        """
+
+        tmp_for_token = self._current_token
         self.next_token()
         tmp_ident = self._current_token.token_text
+        tmp_token = self._current_token
         self.match(TokenType.IDENT)
-        self._emitter.emit_line(f"for ( int {tmp_ident} = ")
 
         self.match(TokenType.ASSIGN)
-        self._emitter.emit_line(self.expr())
+        tmp_start = self.expr()
         self.match(TokenType.TO)
-        self._emitter.emit_line(f"; {tmp_ident} <= ")
-        self._emitter.emit_line(self.expr())
+        tmp_end = self.expr()
 
+        tmp_step = None
         if self.check_token(TokenType.STEP):
             self.next_token()
-            self._emitter.emit_line(f"; {tmp_ident} += ")
-            self._emitter.emit_line(self.expr())
-        else:
-            self._emitter.emit_line(f"; {tmp_ident}++")
-
-        self._emitter.emit_line(") {")
+            tmp_step = self.expr()
 
+        for_node = ForNode(tmp_ident, tmp_start, tmp_end, tmp_step)
         self.nl()
 
-        while not self.check_token(TokenType.ENDFOR):
-            self.normal_or_declaration_stmt()
+        # The counter is declared in the for-init, so it lives in the loop's scope
+        self._symbol_table.push_scope("BLOCK")
+        self._symbol_table.insert(tmp_token, SymbolKind.VARIABLE, "INT")
+        while not self.block_ends(TokenType.ENDFOR, tmp_for_token):
+            for_node.statements.append((yield self.normal_or_declaration_stmt))
+        self._symbol_table.pop_scope()
 
         self.match(TokenType.ENDFOR)
         self.nl()
-        self._emitter.emit_line("}")
+        return for_node
+
+    def run_block(self, block) -> AbstractNode:
+        """
+        Drive the generator of a statement with nested bodies. It yields the
+        method that parses the next statement of a body and is sent the node
+        back. With an explicit stack, a statement that opens another block is
+        parsed by pushing that block's generator here instead of recursing.
+
+        :param block: A generator from one of the *_block methods
+        :return: The parsed statement
+        """
+        tmp_stack = [block]
+        # The first token of each nested block and the scope it started in
+        tmp_tokens = [None]
+        tmp_scopes = [None]
+        tmp_node = None
+        while True:
+            try:
+                tmp_parse = tmp_stack[-1].send(tmp_node)
+            except StopIteration as stop:
+                tmp_stack.pop()
+                tmp_scopes.pop()
+                tmp_token = tmp_tokens.pop()
+                if not tmp_stack:
+                    return stop.value
+                tmp_node = at_line(stop.value, tmp_token)
+                continue
+            except ParserErrors:
+                raise
+            except _STATEMENT_ERRORS as e:
+                # The outermost block is a statement of the caller, which recovers
+                if len(tmp_stack) == 1 or self._max_errors == 1:
+                    raise
+                # A nested block fails as a statement of its parent would
+                tmp_stack.pop()
+                self.recover(e, tmp_tokens.pop(), tmp_scopes.pop())
+                tmp_node = None
+                continue
+
+            tmp_block = self._explicit_stack and self._block_stmts.get(
+                self._current_token.token_type
+            )
+            if tmp_block:
+                tmp_tokens.append(self._current_token)
+                tmp_scopes.append(self._symbol_table.scope)
+                tmp_stack.append(tmp_block())
+                tmp_node = None
+            else:
+                tmp_node = self.statement(tmp_parse)
 
-    def io_stmt(self) -> None:
+    def io_stmt(self) -> AbstractNode:
         """
         io_stmt ->
             "INPUT" ident nl
@@ -619,70 +1114,48 @@ class Parser:
             | "OPEN" string "FOR" ( "INPUT" | "OUTPUT" ) "AS" ident nl
             | "CLOSE" ident nl
         """
-        logging.debug("STMT-IO")
 
         if self.check_token(TokenType.INPUT):
-            self.input_stmt()
+            return self.input_stmt()
         elif self.check_token(TokenType.PRINT):
-            self.print_stmt()
+            return self.print_stmt()
         elif self.check_token(TokenType.OPEN):
-            self.open_stmt()
+            return self.open_stmt()
         elif self.check_token(TokenType.CLOSE):
-            self.close_stmt()
+            return self.close_stmt()
         else:
-            self.abort(f"Invalid io statement at {self._current_token.token_text}"
-                       f" {self._current_token.line_number}: {self._current_token.line_text}")
+            self.abort(f"Invalid io statement at {self._current_token.token_text}")
 
-    def input_stmt(self) -> None:
+    def input_stmt(self) -> InputNode:
         """
         "INPUT" ident nl
         """
-        logging.debug("STMT-INPUT")
 
         self.next_token()
-        self._emitter.emit_line(f"cin >> {self._current_token.token_text};")
+        input_node = InputNode(self._current_token.token_text)
         self.match(TokenType.IDENT)
         self.nl()
+        return input_node
 
-    def print_stmt(self) -> None:
+    def print_stmt(self) -> PrintNode:
         """
         "PRINT" [color] (expr | string) nl
         """
-        logging.debug("STMT-PRINT")
 
         self.next_token()
         tmp_color = None
         if self.is_color(self._current_token.token_type):
-            tmp_color = self._current_token.token_text
+            tmp_color = self._current_token.token_type.name
             self.next_token()
 
-        tmp_expr = self.expr()
-        if tmp_expr is not None:
-            if tmp_color is not None:
-                color_map = {
-                    "BLACK": "30",
-                    "WHITE": "37",
-                    "RED": "31",
-                    "ORANGE": "33",
-                    "YELLOW": "33",
-                    "GREEN": "32",
-                    "BLUE": "34",
-                    "INDIGO": "36",
-                    "VIOLET": "35",
-                }
-                self._emitter.emit_line(
-                    f'cout << "\\033[1;{color_map[tmp_color]}m" << {tmp_expr} << "\\033[0m" << endl;'
-                )
-            else:
-                self._emitter.emit_line(f"cout << {tmp_expr} << endl;")
-
+        print_node = PrintNode(self.expr(), tmp_color)
         self.nl()
+        return print_node
 
-    def open_stmt(self) -> None:
+    def open_stmt(self) -> OpenNode:
         """
         "OPEN" string "FOR" ("INPUT" | "OUTPUT") "AS" ident nl
         """
-        logging.debug("STMT-OPEN")
 
         self.next_token()
         tmp_file_name = self._current_token.token_text
@@ -690,326 +1163,342 @@ class Parser:
         self.match(TokenType.STRING)
         self.match(TokenType.FOR)
 
-        if self.check_token(TokenType.INPUT):
-            tmp_file_mode = "ios::in"
-        elif self.check_token(TokenType.OUTPUT):
-            tmp_file_mode = "ios::out"
+        if self.check_token(TokenType.INPUT) or self.check_token(TokenType.OUTPUT):
+            tmp_file_mode = self._current_token.token_type.name
         else:
-            self.abort(
-                f"Expected INPUT or OUTPUT, got {self._current_token.token_type}"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Expected INPUT or OUTPUT, got {self._current_token.token_type}")
         self.next_token()
 
         self.match(TokenType.AS)
-        tmp_ident = self._current_token.token_text
-        self._emitter.emit_line(
-            f'fstream {tmp_ident}("{tmp_file_name}", {tmp_file_mode});'
-        )
+        open_node = OpenNode(tmp_file_name, tmp_file_mode, self._current_token.token_text)
         self.match(TokenType.IDENT)
         self.nl()
+        return open_node
 
-    def close_stmt(self) -> None:
+    def close_stmt(self) -> CloseNode:
         """
         "CLOSE" ident nl
         """
-        logging.debug("STMT-CLOSE")
 
         self.next_token()
-        self._emitter.emit_line(f"{self._current_token.token_text}.close();")
+        close_node = CloseNode(self._current_token.token_text)
         self.match(TokenType.IDENT)
         self.nl()
+        return close_node
 
-    def jump_stmt(self) -> None:
+    def jump_stmt(self) -> AbstractNode:
         """
         jump_stmt ->
             "BREAK" nl
             | "CONTINUE" nl
             | "RETURN" [ expr ] nl
         """
-        logging.debug("STMT-JUMP")
 
         if self.check_token(TokenType.BREAK):
-            self.break_stmt()
+            return self.break_stmt()
         elif self.check_token(TokenType.CONTINUE):
-            self.continue_stmt()
+            return self.continue_stmt()
         elif self.check_token(TokenType.RETURN):
-            self.return_stmt()
+            return self.return_stmt()
         else:
-            self.abort(f"Invalid jump statement at {self._current_token.token_text}"
-                       f" {self._current_token.line_number}: {self._current_token.line_text}")
+            self.abort(f"Invalid jump statement at {self._current_token.token_text}")
 
-    def break_stmt(self) -> None:
+    def break_stmt(self) -> BreakNode:
         """
         "BREAK" nl
         """
-        logging.debug("STMT-BREAK")
 
         self.next_token()
-        self._emitter.emit_line("break;")
         self.nl()
+        return BreakNode()
 
-    def continue_stmt(self) -> None:
+    def continue_stmt(self) -> ContinueNode:
         """
         "CONTINUE" nl
         """
-        logging.debug("STMT-CONTINUE")
 
         self.next_token()
-        self._emitter.emit_line("continue;")
         self.nl()
+        return ContinueNode()
 
-    def return_stmt(self) -> None:
+    def return_stmt(self) -> ReturnNode:
         """
         "RETURN" nl
         | "RETURN" expr nl
-        | "RETURN" function_call nl
         """
-        logging.debug("STMT-RETURN")
 
         self.next_token()
-        self._emitter.emit_line("return ")
-
+        tmp_expr = None
         if not self.check_token(TokenType.NEWLINE):
-            if self.check_token(TokenType.IDENT):
-                tmp_line = self._symbol_table.lookup(
-                    self._current_token.token_text
-                ).line_text
-                if (
-                    tmp_line.find("CLASS") != -1
-                    or tmp_line.find("FUNCTION") != -1
-                    or tmp_line.find("STRUCT") != -1
-                ):
-                    tmp_func_call = self.function_call()
-                    if tmp_func_call is not None:
-                        self._emitter.emit_line(tmp_func_call)
-                else:
-                    self._emitter.emit_line(self.expr())
+            tmp_expr = self.expr()
 
         self.nl()
-        self._emitter.emit_line(";")
+        return ReturnNode(tmp_expr)
 
-    def expr(self) -> Optional[str]:
+    def expr(self, min_bp: int = 0) -> ExprNode:
         """
         expr -> logical_expr
-        """
-        logging.debug("EXPR")
 
-        return self.logical_expr()
+        Precedence climbing over _INFIX_OPS: a single loop per binding power
+        replaces one method per grammar level. Operands of infix operators
+        bind at least as tightly as min_bp.
 
-    def logical_expr(self) -> Optional[str]:
-        """
-        logical_expr -> logical_term {"OR" logical_term}
+        :param min_bp: The weakest operator that may continue this expression
         """
-        logging.debug("LOGICAL-EXPR")
-
-        tmp_str = ""
-        tmp_logical_term = self.logical_term()
-        if tmp_logical_term is not None:
-            tmp_str += tmp_logical_term
-
-        while self.check_token(TokenType.OR):
+        tmp_token = self._current_token
+        if tmp_token.token_type == TokenType.NOT and min_bp <= _BP_NOT:
             self.next_token()
-            tmp_logical_term = self.logical_term()
-            if tmp_logical_term is not None:
-                tmp_str += f" || {tmp_logical_term}"
-
-        return tmp_str
-
-    def logical_term(self) -> Optional[str]:
-        """
-        logical_term -> logical_factor {"AND" logical_factor}
-        """
-        logging.debug("LOGICAL-TERM")
-
-        tmp_str = ""
-        tmp_logical_factor = self.logical_factor()
-        if tmp_logical_factor is not None:
-            tmp_str += tmp_logical_factor
-
-        while self.check_token(TokenType.AND):
+            tmp_node = UnaryNode("!", self.expr(_BP_COMPARISON))
+            tmp_left_bp = _BP_NOT
+        elif tmp_token.token_type in _SIGN_OPS and min_bp <= _BP_SIGN:
             self.next_token()
-            tmp_logical_factor = self.logical_factor()
-            if tmp_logical_factor is not None:
-                tmp_str += f" && {tmp_logical_factor}"
-
-        return tmp_str
-
-    def logical_factor(self) -> Optional[str]:
-        """
-        logical_factor -> ["NOT"] comparison
-        """
-        logging.debug("LOGICAL-FACTOR")
-
-        tmp_str = ""
-        if self.check_token(TokenType.NOT):
-            tmp_str += "!"
+            tmp_node = UnaryNode(_SIGN_OPS[tmp_token.token_type], self.expr(_BP_POW))
+            tmp_left_bp = _BP_SIGN
+        else:
+            tmp_node = self.arith_base()
+            tmp_left_bp = _BP_ATOM
+
+        while True:
+            tmp_op = _INFIX_OPS.get(self._current_token.token_type)
+            if tmp_op is None:
+                break
+            tmp_text, tmp_bp, tmp_rhs_bp = tmp_op
+            # Comparisons do not chain and only compare arithmetic operands:
+            # in a < b < c or NOT a == b > c the caller rejects the second one
+            if tmp_bp < min_bp or (
+                tmp_bp == _BP_COMPARISON and tmp_left_bp <= _BP_COMPARISON
+            ):
+                break
             self.next_token()
+            tmp_node = infix_node(tmp_text, tmp_node, self.expr(tmp_rhs_bp))
+            tmp_left_bp = tmp_bp
 
-        tmp_comparison = self.comparison()
-        if tmp_comparison is not None:
-            tmp_str += tmp_comparison
-
-        return tmp_str
+        return tmp_node
 
-    def comparison(self) -> Optional[str]:
+    def expr_explicit(self, min_bp: int = 0) -> ExprNode:
         """
-        arith_expr [("==" | "!=" | "<" | ">" | "<=" | ">=") arith_expr]
-        """
-        logging.debug("COMPARISON")
+        expr -> logical_expr
 
-        tmp_str = ""
-        tmp_arith_expr = self.arith_expr()
-        if tmp_arith_expr is not None:
-            tmp_str += tmp_arith_expr
+        The same precedence climbing as expr, with the pending operators,
+        parentheses and calls on a list instead of the Python stack, so the
+        nesting depth is only limited by memory. Used with explicit_stack.
 
-        if self.is_cmp_op(self._current_token):
-            if self._current_token.token_type == TokenType.GT:
-                tmp_str += " > "
-            elif self._current_token.token_type == TokenType.LT:
-                tmp_str += " < "
+        :param min_bp: The weakest operator that may continue this expression
+        """
+        tmp_stack = []
+        while True:
+            # Descend through prefixes, "(" and calls to the leftmost operand
+            tmp_token = self._current_token
+            if tmp_token.token_type == TokenType.NOT and min_bp <= _BP_NOT:
+                self.next_token()
+                tmp_stack.append((_FRAME_PREFIX, "!", min_bp, _BP_NOT))
+                min_bp = _BP_COMPARISON
+                continue
+            if tmp_token.token_type in _SIGN_OPS and min_bp <= _BP_SIGN:
+                self.next_token()
+                tmp_stack.append(
+                    (_FRAME_PREFIX, _SIGN_OPS[tmp_token.token_type], min_bp, _BP_SIGN)
+                )
+                min_bp = _BP_POW
+                continue
+            if tmp_token.token_type == TokenType.LPAREN:
+                self.next_token()
+                tmp_stack.append((_FRAME_GROUP, min_bp))
+                min_bp = 0
+                continue
+            if tmp_token.token_type == TokenType.IDENT and self.check_peek(
+                [TokenType.LPAREN]
+            ):
+                self.next_token()
+                self.next_token()
+                if not self.check_token(TokenType.RPAREN):
+                    tmp_stack.append((_FRAME_CALL, tmp_token, [], min_bp))
+                    min_bp = 0
+                    continue
+                self.next_token()
+                tmp_node = self.call_node(tmp_token, [])
             else:
-                tmp_str += f" {self._current_token.token_text} "
-            self.next_token()
-
-            tmp_arith_expr = self.arith_expr()
-            if tmp_arith_expr is not None:
-                tmp_str += tmp_arith_expr
-
-        return tmp_str
+                tmp_node = self.arith_base()
+            tmp_left_bp = _BP_ATOM
+
+            # Ascend: extend the operand with infix operators and finish the
+            # suspended frames it completes, until one needs another operand
+            while True:
+                tmp_op = _INFIX_OPS.get(self._current_token.token_type)
+                if tmp_op is not None and not (
+                    tmp_op[1] < min_bp
+                    or (tmp_op[1] == _BP_COMPARISON and tmp_left_bp <= _BP_COMPARISON)
+                ):
+                    self.next_token()
+                    tmp_stack.append((_FRAME_INFIX, tmp_node, tmp_op, min_bp))
+                    min_bp = tmp_op[2]
+                    break
+                if not tmp_stack:
+                    return tmp_node
+
+                tmp_frame = tmp_stack.pop()
+                if tmp_frame[0] == _FRAME_PREFIX:
+                    _, tmp_text, min_bp, tmp_left_bp = tmp_frame
+                    tmp_node = UnaryNode(tmp_text, tmp_node)
+                elif tmp_frame[0] == _FRAME_INFIX:
+                    _, tmp_lhs, (tmp_text, tmp_left_bp, _), min_bp = tmp_frame
+                    tmp_node = infix_node(tmp_text, tmp_lhs, tmp_node)
+                elif tmp_frame[0] == _FRAME_GROUP:
+                    self.match(TokenType.RPAREN)
+                    tmp_node = GroupNode(tmp_node)
+                    min_bp = tmp_frame[1]
+                    tmp_left_bp = _BP_ATOM
+                else:
+                    _, tmp_call_token, tmp_args, min_bp = tmp_frame
+                    tmp_args.append(tmp_node)
+                    if self.check_token(TokenType.COMMA):
+                        self.next_token()
+                        tmp_stack.append(tmp_frame)
+                        min_bp = 0
+                        break
+                    self.match(TokenType.RPAREN)
+                    tmp_node = self.call_node(tmp_call_token, tmp_args)
+                    tmp_left_bp = _BP_ATOM
 
-    def arith_expr(self) -> Optional[str]:
+    def arith_base(self) -> ExprNode:
         """
-        arith_expr -> arith_term {("+" | "-") arith_term}
+        arith_base -> "(" expr ")" | bool | int | float | string | ident | function_call
         """
-        logging.debug("ARITH-EXPR")
 
-        tmp_str = ""
-        tmp_arith_term = self.arith_term()
-        if tmp_arith_term is not None:
-            tmp_str += tmp_arith_term
-
-        while self.check_token(TokenType.PLUS) or self.check_token(TokenType.MINUS):
-            tmp_str += f" {self._current_token.token_text} "
+        tmp_token = self._current_token
+        if self.check_token(TokenType.LPAREN):
             self.next_token()
+            tmp_node = GroupNode(self.expr())
+            self.match(TokenType.RPAREN)
+            return tmp_node
+        elif self.check_token(TokenType.STRING):
+            self.next_token()
+            return LiteralNode(tmp_token.token_text, "STRING")
+        elif self.check_token(TokenType.INT):
+            self.next_token()
+            return LiteralNode(int(tmp_token.token_text), "INT", tmp_token.token_text)
+        elif self.check_token(TokenType.FLOAT):
+            self.next_token()
+            return LiteralNode(
+                float(tmp_token.token_text), "FLOAT", tmp_token.token_text
+            )
+        elif self.check_token(TokenType.TRUE) or self.check_token(TokenType.FALSE):
+            self.next_token()
+            return LiteralNode(tmp_token.token_type == TokenType.TRUE, "BOOL")
+        elif self.check_token(TokenType.IDENT):
+            if self.check_peek([TokenType.LPAREN]):
+                return self.function_call()
+            self.next_token()
+            tmp_symbol = self._symbol_table.find(tmp_token.token_text)
+            if tmp_symbol is None:
+                return NameNode(tmp_token.token_text)
+            return NameNode(tmp_token.token_text, tmp_symbol.type, tmp_symbol.value)
 
-            tmp_arith_term = self.arith_term()
-            if tmp_arith_term is not None:
-                tmp_str += tmp_arith_term
-
-        return tmp_str
+        self.abort(f"Expected expression at {tmp_token.token_text}", tmp_token)
 
-    def arith_term(self) -> Optional[str]:
+    def function_call(self) -> CallNode:
         """
-        arith_term -> arith_factor {("*" | "/") arith_factor}
+        function_call -> ident "(" [expr {"," expr}] ")"
         """
-        logging.debug("ARITH-TERM")
 
-        tmp_str = ""
-        tmp_arith_factor = self.arith_factor()
-        if tmp_arith_factor is not None:
-            tmp_str += tmp_arith_factor
+        tmp_token = self._current_token
+        tmp_name = self._current_token.token_text
+        self.match(TokenType.IDENT)
+        self.match(TokenType.LPAREN)
 
-        while self.check_token(TokenType.MULT) or self.check_token(TokenType.DIV):
-            tmp_str += f" {self._current_token.token_text} "
-            self.next_token()
+        tmp_args = []
+        if not self.check_token(TokenType.RPAREN):
+            tmp_args.append(self.expr())
+            while self.check_token(TokenType.COMMA):
+                self.next_token()
+                tmp_args.append(self.expr())
 
-            tmp_arith_factor = self.arith_factor()
-            if tmp_arith_factor is not None:
-                tmp_str += tmp_arith_factor
+        self.match(TokenType.RPAREN)
+        return self.call_node(tmp_token, tmp_args)
 
-        return tmp_str
+    def call_node(self, token: Token, args: List[ExprNode]) -> ExprNode:
+        """
+        Check the arguments of a parsed call and fold it if it is constant
 
-    def arith_factor(self) -> Optional[str]:
+        :param token: The name of the function
+        :param args: The parsed arguments
         """
-        arith_factor -> ["+" | "-"] arith_base
+        tmp_name = token.token_text
+        for tmp_arg, tmp_by_ref in zip(args, self._ref_params.get(tmp_name, ())):
+            if tmp_by_ref and not isinstance(tmp_arg, NameNode):
+                self.abort(
+                    f"BYREF argument of '{tmp_name}' must be a variable, got {tmp_arg.code}", token
+                )
+        return self.fold_call(CallNode(tmp_name, args, self.return_type(tmp_name)))
+
+    def fold_call(self, call_node: CallNode) -> ExprNode:
         """
-        logging.debug("ARITH-FACTOR")
+        Replace a call to a pure function whose arguments are all constant by
+        the value the function returns, computed now within the step budget
 
-        tmp_str = ""
-        if self.check_token(TokenType.PLUS) or self.check_token(TokenType.MINUS):
-            tmp_str += self._current_token.token_text
-            self.next_token()
+        :param call_node: The call to fold
+        :return: A literal holding the result, or call_node if it must run at run time
+        """
+        func_node = self._ctfe_functions.get(call_node.name)
+        if self._interpreter is None or func_node is None:
+            return call_node
+        # An argument that is still a call could not be folded itself
+        if any(isinstance(arg, CallNode) for arg in call_node.args):
+            return call_node
 
-        tmp_arith_base = self.arith_base()
-        if tmp_arith_base is not None:
-            tmp_str += tmp_arith_base
-        return tmp_str
+        try:
+            tmp_args = [self._interpreter.evaluate(arg) for arg in call_node.args]
+            tmp_value = self._interpreter.call(call_node.name, tmp_args)
+            return to_literal(tmp_value, func_node.return_type)
+        except NotConstant as e:
+            logging.debug("CTFE %s: %s", call_node, e)
+            return call_node
 
-    def arith_base(self) -> Optional[str]:
+    def return_type(self, name: str):
         """
-        arith_base -> "(" expr ")" | bool | int | float | string | ident
+        :return: The declared return type of function name, if it is known
         """
-        logging.debug("ARITH-BASE")
+        tmp_symbol = self._symbol_table.find(name)
+        if tmp_symbol is None or tmp_symbol.kind != SymbolKind.FUNCTION:
+            return None
+        return tmp_symbol.type
 
-        if self.check_token(TokenType.LPAREN):
-            self.next_token()
-            expr_str = f"({self.expr()})"
-            self.match(TokenType.RPAREN)
-            return expr_str
-        elif self.check_token(TokenType.STRING):
-            result = f'"{self._current_token.token_text}"'
-            self.next_token()
-            return result
-        elif (
-            self.check_token(TokenType.BOOL)
-            or self.check_token(TokenType.INT)
-            or self.check_token(TokenType.FLOAT)
-            or self.check_token(TokenType.TRUE)
-            or self.check_token(TokenType.FALSE)
-        ):
-            result = self._current_token.token_text
-            self.next_token()
-            return result
-        elif self.check_token(TokenType.IDENT):
-            result = self._current_token.token_text
-            self.next_token()
-            return result
-
-    def function_call(self) -> Optional[str]:
+    def record_constant(self, let_node: LetNode) -> None:
         """
-        function_call -> ident "(" [expr {"," expr}] ")" nl
+        Remember the value of a CONST whose initializer is known at compile time
         """
-        logging.debug("FUNCTION-CALL")
-
-        # self._emitter.emit_line(f"{self._current_token.token_text}(")
-        tmp_str = f"{self._current_token.token_text}("
-        self.match(TokenType.IDENT)
-        self.match(TokenType.LPAREN)
+        try:
+            tmp_value = self._evaluator.evaluate(let_node.expr)
+            self._symbol_table.lookup(let_node.name).value = coerce(
+                tmp_value, let_node.var_type
+            )
+        except NotConstant:
+            pass
 
-        if not self.check_token(TokenType.RPAREN):
-            tmp_str += self.param_list()
+    def call_stmt(self) -> CallStmtNode:
+        """
+        call_stmt -> function_call nl
+        """
 
-        self.match(TokenType.RPAREN)
+        call_node = CallStmtNode(self.function_call())
         self.nl()
-        # self._emitter.emit_line(");")
-        tmp_str += ");"
-
-        return tmp_str
+        return call_node
 
-    def normal_or_declaration_stmt(self) -> None:
+    def normal_or_declaration_stmt(self) -> AbstractNode:
         """
         normal_or_declaration_stmt -> normal_stmt | declaration_stmt
         """
+        tmp_token = self._current_token
         if self.is_normal_stmt(self._current_token.token_type):
-            self.normal_stmt()
+            return self.normal_stmt()
         elif self.is_declaration_stmt(self._current_token.token_type):
-            self.declaration_stmt()
-        elif self._symbol_table.equals(self._current_token.token_text, TokenType.IDENT):
-            tmp_line = self._symbol_table.get_line_text(self._current_token.token_text)
-            if (
-                tmp_line.find("CLASS") != -1
-                or tmp_line.find("FUNCTION") != -1
-                or tmp_line.find("STRUCT") != -1
-            ):
-                self._emitter.emit_line(self.function_call())
-            else:
-                self.id_let_stmt()
+            return self.declaration_stmt()
+        elif self._symbol_table.kind(self._current_token.token_text) in CALLABLE_KINDS:
+            return at_line(self.call_stmt(), tmp_token)
+        elif self._symbol_table.kind(self._current_token.token_text) is not None:
+            return at_line(self.id_let_stmt(), tmp_token)
         else:
-            self.abort(
-                f"Invalid statement at {self._current_token.token_text}\n"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Invalid statement at {self._current_token.token_text}")
 
     def check_token(self, token_type: TokenType) -> bool:
         """
@@ -1036,10 +1525,7 @@ class Parser:
         :param token_type: The token type to match
         """
         if not self.check_token(token_type):
-            self.abort(
-                f"Expected {token_type}, got {self._current_token.token_type}"
-                f" {self._current_token.line_number}: {self._current_token.line_text}"
-            )
+            self.abort(f"Expected {token_type}, got {self._current_token.token_type}")
         self.next_token()
 
     def next_token(self) -> None:
@@ -1047,7 +1533,141 @@ class Parser:
         Advance the current token and the peek token
         """
         self._current_token = self._peek_token
-        self._peek_token = self._lexer.get_token()
+        try:
+            self._peek_token = self._lexer.get_token()
+        except LexerError as e:
+            self._peek_token = self.lexer_error(e)
+
+    def lexer_error(self, error: LexerError) -> Token:
+        """
+        Report a lexer error and lex on after it, as the lexer steps past the
+        character it could not read
+
+        :return: The token after the error
+        """
+        if self._max_errors == 1:
+            raise error
+        tmp_errors = [error]
+        while True:
+            try:
+                tmp_token = self._lexer.get_token()
+                break
+            except LexerError as e:
+                tmp_errors.append(e)
+        # The token after an error is on the error's line, a NEWLINE at the latest
+        for tmp_error in tmp_errors:
+            self.report(tmp_error, tmp_token)
+        return tmp_token
+
+    def statement(self, parse: Callable[..., AbstractNode], *args) -> Optional[AbstractNode]:
+        """
+        Parse a statement with parse(*args). When errors are collected, an error
+        in it is reported and parsing goes on after it, see recover
+
+        :return: The statement, or None if it has an error
+        """
+        if self._max_errors == 1:
+            return parse(*args)
+        tmp_token = self._current_token
+        tmp_scope = self._symbol_table.scope
+        try:
+            return parse(*args)
+        except ParserErrors:
+            # The collected errors, once there are too many
+            raise
+        except _STATEMENT_ERRORS as e:
+            self.recover(e, tmp_token, tmp_scope)
+            return None
+
+    def recover(self, error: Exception, token: Token, scope) -> None:
+        """
+        Report an error in the statement that starts at token, then skip to
+        where the next statement can start (panic mode): past the end of the
+        line or up to a block terminator, or past the end of the block if the
+        error is inside one
+
+        :param scope: The scope the statement started in, which is restored
+        :raise ParserErrors: At the end of the file, where there is nothing left
+            to recover for
+        """
+        self._errors += 1
+        self.report(error, self._current_token)
+        while self._symbol_table.scope is not scope:
+            self._symbol_table.pop_scope()
+        if self.check_token(TokenType.EOF):
+            raise ParserErrors(list(self._diagnostics))
+
+        # An error that leaves a block is in a line of the block itself: its
+        # header, an ELIF, ELSE, CASE or DEFAULT line, or the line that ends it
+        tmp_words = self._current_token.line_text.split(None, 1)
+        tmp_in_block = token.token_type in _BLOCK_STARTS and (
+            not tmp_words or Token.check_if_keyword(tmp_words[0]) not in _BLOCK_ENDS
+        )
+        if self._current_token is token:
+            # Nothing of the statement was read: drop its first token
+            self.next_token()
+        while not (
+            self.check_token(TokenType.NEWLINE)
+            or self.check_token(TokenType.EOF)
+            or self._current_token.token_type in _BLOCK_ENDS
+        ):
+            self.next_token()
+        self.nl()
+        if tmp_in_block:
+            self.skip_block()
+
+    def skip_block(self) -> None:
+        """
+        Skip the rest of a block and the line that ends it, with the blocks
+        nested in it
+        """
+        tmp_depth = 1
+        while tmp_depth and not self.check_token(TokenType.EOF):
+            if self._current_token.token_type in _BLOCK_STARTS:
+                tmp_depth += 1
+            elif self._current_token.token_type in _BLOCK_ENDS:
+                tmp_depth -= 1
+            while not self.check_token(TokenType.NEWLINE) and not self.check_token(TokenType.EOF):
+                self.next_token()
+            self.nl()
+
+    def report(self, error: Exception, token: Token) -> None:
+        """
+        Record an error found at token, or raise it if errors are not collected.
+        Only the first error of a line is recorded: the others on it mostly
+        follow from the first
+
+        :raise ParserErrors: Once max_errors errors are recorded
+        """
+        if self._max_errors == 1:
+            raise error
+        # Errors raised at a token carry it, and its place in their message
+        tmp_token = getattr(error, "token", None)
+        tmp_message = str(error).strip()
+        if tmp_token is None:
+            tmp_token = token
+            if not isinstance(error, LexerError):
+                # Lexer errors carry their own place
+                tmp_message = f"{token.location()}: {tmp_message}"
+        if tmp_token.line_number == self._error_line:
+            return
+        self._error_line = tmp_token.line_number
+        self._diagnostics.append(tmp_message)
+        if len(self._diagnostics) == self._max_errors:
+            raise ParserErrors(
+                self._diagnostics + [f"Stopped after {self._max_errors} errors"]
+            )
+
+    def block_ends(self, token_type: TokenType, token: Token) -> bool:
+        """
+        :param token_type: The token type that ends the block
+        :param token: The first token of the block, where a missing end is reported
+        :return: If the current token ends the block
+        :raise ParserError: At the end of the file, which leaves the block open
+        """
+        if self.check_token(TokenType.EOF):
+            self.abort(f"Missing {token_type.name}", token)
+        return self.check_token(token_type)
 
     def is_normal_stmt(self, token_type: TokenType) -> bool:
         """
@@ -1083,22 +1703,18 @@ class Parser:
         """
         nl -> ("\n" | "\r\n")+
         """
-        logging.debug("NL")
 
         while self.check_token(TokenType.NEWLINE):
             self.next_token()
 
-    @staticmethod
-    def is_cmp_op(token: Token) -> bool:
-        return token.token_type in [
-            TokenType.EQ,
-            TokenType.NOTEQ,
-            TokenType.GT,
-            TokenType.GTEQ,
-            TokenType.LT,
-            TokenType.LTEQ,
-        ]
-
-    @staticmethod
-    def abort(message: str):
-        raise ParserError(message)
+    def abort(self, message: str, token: Optional[Token] = None):
+        """
+        :param token: Where the error is, the current token by default
+        :raise ParserError: With the place of the error in front of message,
+            and the token as its token
+        """
+        tmp_token = token or self._current_token
+        # A message that ends in the text of a NEWLINE token ends there
+        tmp_error = ParserError(f"{tmp_token.location()}: {message}".rstrip())
+        tmp_error.token = tmp_token
+        raise tmp_error
@@ -0,0 +1,102 @@
+"""
+Line profiles of programs built with ``--profile-lines``.
+
+The generated program counts how often each BASIC line starts and, with
+``--profile-time``, how long it runs until the next line starts (the time of
+the calls it makes is charged to the lines of the functions called). At exit
+it writes one record per line that ran:
+
+    # basic_compiler line profile: line hits nanoseconds
+    12 1000000 5300000
+
+render() turns a profile into an annotated listing of the source:
+
+    python -m basic_compiler.basic_profile program.b
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, List, NamedTuple
+
+SUFFIX = ".lines"
+
+
+class LineProfile(NamedTuple):
+    hits: int
+    nanoseconds: int
+
+
+def profile_path(input: str) -> str:
+    """
+    :return: The profile of the program built from input: next to it, named
+        after it
+    """
+    return os.path.abspath(os.path.splitext(input)[0] + SUFFIX)
+
+
+def read_profile(path: str) -> Dict[int, LineProfile]:
+    """
+    :return: For every line that ran, how often and how long
+    :raise ValueError: If the file is not a line profile
+    """
+    profile = {}
+    with open(path) as f:
+        for record in f:
+            if record.startswith("#") or not record.strip():
+                continue
+            line, hits, nanoseconds = map(int, record.split())
+            profile[line] = LineProfile(hits, nanoseconds)
+    return profile
+
+
+def render(source: List[str], profile: Dict[int, LineProfile]) -> str:
+    """
+    :param source: The program's lines
+    :return: The source with the hits, milliseconds and share of the time of
+        each line beside it; the time columns only when the lines were timed
+    """
+    total = sum(line.nanoseconds for line in profile.values())
+    timed = total > 0
+    header = f"{'Line':>6} {'Hits':>12}"
+    if timed:
+        header += f" {'Time (ms)':>12} {'%Time':>6}"
+    rows = [header + "  Source"]
+    for number, text in enumerate(source, start=1):
+        text = text.rstrip("\r\n")
+        line = profile.get(number)
+        if line is None:
+            counts = f"{'':>12}" + (f" {'':>12} {'':>6}" if timed else "")
+        else:
+            counts = f"{line.hits:>12}"
+            if timed:
+                counts += (
+                    f" {line.nanoseconds / 1e6:>12.3f}"
+                    f" {100 * line.nanoseconds / total:>6.1f}"
+                )
+        rows.append(f"{number:>6} {counts}  {text}".rstrip())
+    return "\n".join(rows) + "\n"
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="basic_profile",
+        description="Show the line profile of a program built with --profile-lines",
+    )
+    parser.add_argument("input", help="The source file")
+    parser.add_argument(
+        "--profile", help="The profile (default: the source's name with .lines)", metavar="FILE"
+    )
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+    try:
+        with open(args.input) as f:
+            source = f.readlines()
+        profile = read_profile(args.profile or profile_path(args.input))
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    sys.stdout.write(render(source, profile))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
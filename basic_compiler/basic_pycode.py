@@ -0,0 +1,899 @@
+"""
+Python backend: ``--backend python`` translates the parsed program into a
+Python ``ast.Module``, compiles it with ``compile()`` and runs the code object
+in this process. The program runs as ordinary Python functions, so it is much
+faster than a tree-walking interpreter and starts without g++ or a child
+process.
+
+Each BASIC function becomes a Python function and each variable a Python
+local, renamed per declaration so block scoping survives. Statements keep
+their BASIC line numbers, so a runtime error can say where it happened.
+PRINT writes to the output stream's buffer. FOR becomes a ``range`` loop
+when its counter, bound and step cannot change while it runs. DIM of INT
+and FLOAT is stored in ``array.array``.
+
+The semantics are the VM's (see basic_vm): INT wraps at 32 bits, FLOAT
+arithmetic is rounded to single precision where C++ computes in float, BYREF
+is copy-in/copy-out, and a CLASS cannot be instantiated.
+"""
+
+import array
+import ast
+import builtins
+import sys
+from typing import Dict, List, Optional
+
+from basic_compiler.basic_ast import (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ClassNode,
+    CloseNode,
+    ContinueNode,
+    DimNode,
+    DoNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    InputNode,
+    LetNode,
+    LiteralNode,
+    NameNode,
+    OpenNode,
+    PrintNode,
+    ProgramNode,
+    ReturnNode,
+    StructNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+    float_operands,
+    walk,
+)
+from basic_compiler.basic_exceptions import BackendError, VMError
+from basic_compiler.basic_numeric import (
+    INT_MIN,
+    float_div,
+    float_mod,
+    float_pow,
+    int_div,
+    int_mod,
+    int_pow,
+    to_float32,
+    to_int,
+)
+from basic_compiler.basic_vm import (
+    MAX_CALL_DEPTH,
+    InputReader,
+    arith,
+    format_value,
+    resolve_call,
+    scalar_type,
+)
+
+_SCALAR_DEFAULTS = {"INT": 0, "FLOAT": 0.0, "BOOL": False, "STRING": ""}
+
+_COLORS = {
+    "BLACK": "30",
+    "WHITE": "37",
+    "RED": "31",
+    "ORANGE": "33",
+    "YELLOW": "33",
+    "GREEN": "32",
+    "BLUE": "34",
+    "INDIGO": "36",
+    "VIOLET": "35",
+}
+
+_COMPARISON_OPS = {
+    "<": ast.Lt,
+    "<=": ast.LtE,
+    ">": ast.Gt,
+    ">=": ast.GtE,
+    "==": ast.Eq,
+    "!=": ast.NotEq,
+}
+_NATIVE_OPS = {"+": ast.Add, "-": ast.Sub, "*": ast.Mult}
+_INT_HELPERS = {"/": "_int_div", "%": "_int_mod", "^": "_int_pow"}
+_FLOAT_HELPERS = {"/": "_float_div", "%": "_float_mod", "^": "_float_pow"}
+_ARRAY_TYPECODES = {"INT": "i", "FLOAT": "f"}
+
+# All the generated code needs from builtins
+_BUILTINS = {
+    name: getattr(builtins, name)
+    for name in ("range", "str", "int", "bool", "len", "iter", "next", "KeyError")
+}
+
+_NUMERIC = ("INT", "BOOL", "FLOAT")
+_INTEGRAL = ("INT", "BOOL")
+
+
+def _load(name: str) -> ast.Name:
+    return ast.Name(name, ast.Load())
+
+
+def _store(name: str) -> ast.Name:
+    return ast.Name(name, ast.Store())
+
+
+def _const(value) -> ast.Constant:
+    return ast.Constant(value)
+
+
+def _call(function: str, *args: ast.expr) -> ast.Call:
+    return ast.Call(_load(function), list(args), [])
+
+
+def _wrapped(expr: ast.expr) -> ast.expr:
+    """
+    :return: expr wrapped to a 32-bit INT, without a function call
+    """
+    shifted = ast.BinOp(expr, ast.Add(), _const(-INT_MIN))
+    masked = ast.BinOp(shifted, ast.BitAnd(), _const(0xFFFFFFFF))
+    return ast.BinOp(masked, ast.Add(), _const(INT_MIN))
+
+
+def _body(statements: List[ast.stmt]) -> List[ast.stmt]:
+    return statements or [ast.Pass()]
+
+
+def _negate(value):
+    if isinstance(value, str):
+        raise VMError("Cannot negate a STRING")
+    return to_int(-value) if isinstance(value, int) else -value
+
+
+def _open(file_name: str, mode: str):
+    try:
+        return open(file_name, "r" if mode == "INPUT" else "w")
+    except OSError:
+        # An fstream that failed to open is still a closed stream
+        return None
+
+
+def _close(handle) -> None:
+    if handle is not None:
+        handle.close()
+
+
+class _Variable:
+    def __init__(self, python_name: str, var_type: Optional[str], is_global: bool):
+        self.python_name = python_name
+        self.var_type = scalar_type(var_type)
+        self.is_global = is_global
+
+
+class _Loop:
+    # A loop, or a SWITCH translated to a one-pass loop so BREAK can leave it
+    def __init__(self, continue_prefix=None, switch_flag=None, is_switch=False):
+        """
+        :param continue_prefix: Makes the statements that run before CONTINUE
+        :param switch_flag: The variable that tells the code after the SWITCH
+            to continue the loop around it
+        """
+        self.continue_prefix = continue_prefix
+        self.switch_flag = switch_flag
+        self.is_switch = is_switch
+
+
+def _writes(statements: list, name: str) -> bool:
+    """
+    :return: If statements may assign name, directly or as a BYREF argument
+    """
+    for node in walk(statements):
+        if isinstance(node, (AssignNode, InputNode)) and node.name == name:
+            return True
+        if isinstance(node, (LetNode, DimNode, OpenNode)) and node.name == name:
+            return True
+        if isinstance(node, CallNode) and any(
+            isinstance(arg, NameNode) and arg.name == name for arg in node.args
+        ):
+            return True
+    return False
+
+
+def _jumps_out(statements: list, node_type: type) -> bool:
+    """
+    :return: If statements hold a node_type (BREAK or CONTINUE) that is not
+        inside a nested loop, or for BREAK, a nested SWITCH
+    """
+    stack = list(statements)
+    while stack:
+        node = stack.pop()
+        if isinstance(node, node_type):
+            return True
+        if isinstance(node, (WhileNode, DoNode, ForNode)):
+            continue
+        if isinstance(node, IfNode):
+            for _, body in node.branches:
+                stack.extend(body)
+            stack.extend(node.else_body or ())
+        elif isinstance(node, SwitchNode) and node_type is not BreakNode:
+            for _, body in node.cases:
+                stack.extend(body)
+            stack.extend(node.default_body or ())
+    return False
+
+
+class PythonProgram:
+    def __init__(self, code, main: str, function_names: Dict[str, str]):
+        """
+        :param code: The module's code object
+        :param main: The Python name of main
+        :param function_names: The BASIC name of each Python function
+        """
+        self.code = code
+        self.main = main
+        self.function_names = function_names
+
+    def run(self, stdin=None, stdout=None) -> int:
+        """
+        Run main()
+
+        :return: What main returned, as the exit status
+        :raise VMError: If the program divides an integer by zero or recurses
+            too deeply
+        """
+        stdout = stdout or sys.stdout
+        reader = InputReader(stdin or sys.stdin, stdout)
+        namespace = {
+            "__builtins__": _BUILTINS,
+            "_write": stdout.write,
+            "_read": reader.read_value,
+            "_format": format_value,
+            "_to_int": to_int,
+            "_to_float32": to_float32,
+            "_int_div": int_div,
+            "_int_mod": int_mod,
+            "_int_pow": int_pow,
+            "_float_div": float_div,
+            "_float_mod": float_mod,
+            "_float_pow": float_pow,
+            "_arith": arith,
+            "_negate": _negate,
+            "_open": _open,
+            "_close": _close,
+            "_array": array.array,
+        }
+        limit = sys.getrecursionlimit()
+        # From 3.11 calls between Python functions do not use the C stack
+        if sys.version_info >= (3, 11):
+            sys.setrecursionlimit(max(limit, MAX_CALL_DEPTH))
+        try:
+            exec(self.code, namespace)
+            status = namespace[self.main]()
+        except ZeroDivisionError:
+            raise VMError(f"Integer division by zero {self._location()}")
+        except RecursionError:
+            raise VMError(f"Calls nested too deeply {self._location()}")
+        finally:
+            sys.setrecursionlimit(limit)
+            stdout.flush()
+        return status & 0xFF if isinstance(status, int) else 0
+
+    def _location(self) -> str:
+        """
+        :return: Where the exception being handled was raised in the program
+        """
+        traceback = sys.exc_info()[2]
+        where = None
+        while traceback is not None:
+            frame = traceback.tb_frame
+            if frame.f_code.co_filename == self.code.co_filename:
+                where = (frame.f_code.co_name, traceback.tb_lineno)
+            traceback = traceback.tb_next
+        if where is None:
+            return "in the program"
+        name = self.function_names.get(where[0], where[0])
+        return f"in '{name}' at line {where[1]}"
+
+
+class PythonTranslator:
+    """
+    Translates a ProgramNode into a Python module. Expressions and blocks
+    translate recursively; compile() itself limits how deeply they nest
+    """
+
+    def __init__(self):
+        self._signatures = {}
+        self._python_names = {}
+        self._function_names = {}
+        self._structs = {}
+        self._classes = set()
+        self._globals = {}
+        # Per function being translated
+        self._scopes = []
+        self._used = set()
+        self._assigned_globals = set()
+        self._loops = []
+        self._function = None
+        self._temps = 0
+
+    def translate(self, program: ProgramNode) -> ast.Module:
+        """
+        :return: A module that defines the functions and initializes the
+            globals; main is called by PythonProgram.run
+        :raise BackendError: If the program uses what the backend cannot run
+        """
+        functions = []
+        declarations = []
+        for stmt in program.statements:
+            if isinstance(stmt, FunctionNode):
+                overloads = self._signatures.setdefault(stmt.name, [])
+                python_name = f"f{len(overloads)}_{stmt.name}"
+                overloads.append((len(functions), stmt))
+                self._python_names[id(stmt)] = python_name
+                self._function_names[python_name] = stmt.name
+                functions.append(stmt)
+            elif isinstance(stmt, StructNode):
+                self._structs[stmt.name] = stmt
+            elif isinstance(stmt, ClassNode):
+                self._classes.add(stmt.name)
+            elif isinstance(stmt, (LetNode, DimNode)):
+                declarations.append(stmt)
+            else:
+                raise BackendError(
+                    f"{type(stmt).__name__[:-4].upper()} is only allowed inside a function"
+                )
+        if not any(not node.params for _, node in self._signatures.get("main", ())):
+            raise BackendError("The program has no main() function")
+
+        body = []
+        self._start(None)
+        for stmt in declarations:
+            body += self._stmt(stmt)
+        definitions = []
+        for node in functions:
+            definitions += self._function_def(node)
+        return ast.Module(definitions + body, [])
+
+    def main(self) -> str:
+        return next(
+            self._python_names[id(node)]
+            for _, node in self._signatures["main"]
+            if not node.params
+        )
+
+    # Names
+
+    def _start(self, function: Optional[FunctionNode]) -> None:
+        self._function = function
+        self._scopes = [{}] if function is not None else []
+        self._used = set()
+        self._assigned_globals = set()
+        self._loops = []
+
+    def _declare(self, name: str, var_type: Optional[str]) -> _Variable:
+        if not self._scopes:
+            variable = _Variable(f"g_{name}", var_type, True)
+            self._globals[name] = variable
+            return variable
+        python_name = f"v_{name}"
+        count = 1
+        while python_name in self._used:
+            count += 1
+            python_name = f"v{count}_{name}"
+        self._used.add(python_name)
+        variable = _Variable(python_name, var_type, False)
+        self._scopes[-1][name] = variable
+        return variable
+
+    def _lookup(self, name: str) -> _Variable:
+        for scope in reversed(self._scopes):
+            if name in scope:
+                return scope[name]
+        if name in self._globals:
+            return self._globals[name]
+        raise BackendError(f"'{name}' is not a variable")
+
+    def _target(self, variable: _Variable) -> ast.Name:
+        if variable.is_global and self._function is not None:
+            self._assigned_globals.add(variable.python_name)
+        return _store(variable.python_name)
+
+    def _temp(self) -> str:
+        self._temps += 1
+        return f"t{self._temps}"
+
+    def _block(self, statements: list) -> List[ast.stmt]:
+        self._scopes.append({})
+        try:
+            result = []
+            for stmt in statements:
+                result += self._stmt(stmt)
+            return _body(result)
+        finally:
+            self._scopes.pop()
+
+    # Types
+
+    def _default(self, var_type: Optional[str]):
+        if var_type in _SCALAR_DEFAULTS:
+            return _SCALAR_DEFAULTS[var_type]
+        if var_type in self._structs:
+            return tuple(
+                self._default(scalar_type(field_type))
+                for _, field_type in self._structs[var_type].fields
+            )
+        if var_type in self._classes:
+            raise BackendError(
+                f"Objects of CLASS {var_type} cannot be created by the python backend"
+            )
+        raise BackendError(f"Unknown type {var_type}")
+
+    def _converted(self, node, to_type: Optional[str]) -> ast.expr:
+        """
+        :return: The value of node, converted as C++ converts it on
+            assignment to to_type
+        """
+        expr = self._expr(node)
+        from_type = scalar_type(node.value_type)
+        to_type = scalar_type(to_type)
+        if to_type == "INT" and from_type not in _INTEGRAL:
+            return _call("_to_int", expr)
+        if to_type == "INT" and from_type == "BOOL":
+            return _call("int", expr)
+        if to_type == "FLOAT" and not (
+            from_type == "FLOAT" and isinstance(node, (NameNode, CallNode))
+        ):
+            return _call("_to_float32", expr)
+        if to_type == "BOOL" and from_type != "BOOL":
+            return _call("bool", expr)
+        return expr
+
+    # Functions
+
+    def _function_def(self, node: FunctionNode) -> List[ast.stmt]:
+        python_name = self._python_names[id(node)]
+        self._start(node)
+        params = [self._declare(param.name, param.param_type) for param in node.params]
+        body = []
+        for stmt in node.statements:
+            body += self._stmt(stmt)
+        # Falling off the end returns the type's default; main returns 0
+        return_type = scalar_type(node.return_type)
+        default = (
+            self._default(return_type)
+            if return_type in _SCALAR_DEFAULTS or return_type in self._structs
+            else None
+        )
+        body.append(self._return(_const(default)))
+        if self._assigned_globals:
+            body.insert(0, ast.Global(sorted(self._assigned_globals)))
+
+        arguments = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(param.python_name) for param in params],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        )
+        if not node.memo:
+            return [ast.FunctionDef(python_name, arguments, body, [], None)]
+
+        # MEMO: the body becomes an implementation function behind a cache
+        implementation = f"m_{python_name}"
+        self._function_names[implementation] = node.name
+        cache = f"c_{python_name}"
+        key = ast.Tuple([_load(param.python_name) for param in params], ast.Load())
+        lookup = ast.Try(
+            [ast.Return(ast.Subscript(_load(cache), key, ast.Load()))],
+            [ast.ExceptHandler(_load("KeyError"), None, [ast.Pass()])],
+            [],
+            [],
+        )
+        compute = ast.Assign(
+            [_store("r")],
+            _call(implementation, *[_load(param.python_name) for param in params]),
+        )
+        store = [ast.Assign([ast.Subscript(_load(cache), key, ast.Store())], _load("r"))]
+        if node.memo_limit is not None:
+            # Results of a pure function: which ones are kept changes only the speed
+            evict = ast.Delete(
+                [
+                    ast.Subscript(
+                        _load(cache),
+                        _call("next", _call("iter", _load(cache))),
+                        ast.Del(),
+                    )
+                ]
+            )
+            full = ast.Compare(
+                _call("len", _load(cache)), [ast.GtE()], [_const(node.memo_limit)]
+            )
+            store.insert(0, ast.If(full, [evict], []))
+        wrapper_args = ast.arguments(
+            posonlyargs=[],
+            args=[ast.arg(param.python_name) for param in params],
+            kwonlyargs=[],
+            kw_defaults=[],
+            defaults=[],
+        )
+        return [
+            ast.FunctionDef(implementation, arguments, body, [], None),
+            ast.Assign([_store(cache)], ast.Dict([], [])),
+            ast.FunctionDef(
+                python_name,
+                wrapper_args,
+                [lookup, compute, *store, ast.Return(_load("r"))],
+                [],
+                None,
+            ),
+        ]
+
+    def _ref_params(self) -> List[str]:
+        return [
+            self._scopes[0][param.name].python_name
+            for param in self._function.params
+            if param.mode == "ref"
+        ]
+
+    def _return(self, value: ast.expr) -> ast.Return:
+        """
+        A function with BYREF parameters returns their values after its own
+        """
+        refs = self._ref_params() if self._function is not None else []
+        if not refs:
+            return ast.Return(value)
+        return ast.Return(ast.Tuple([value, *map(_load, refs)], ast.Load()))
+
+    # Statements
+
+    def _stmt(self, node) -> List[ast.stmt]:
+        statements = getattr(self, "_" + type(node).__name__)(node)
+        if node.line_number is not None:
+            for stmt in statements:
+                stmt.lineno = stmt.end_lineno = node.line_number
+        return statements
+
+    def _LetNode(self, node: LetNode) -> List[ast.stmt]:
+        var_type = scalar_type(node.var_type)
+        if var_type in _SCALAR_DEFAULTS:
+            value = (
+                _const(_SCALAR_DEFAULTS[var_type])
+                if node.expr is None
+                else self._converted(node.expr, var_type)
+            )
+        else:
+            default = self._default(var_type)
+            if node.expr is None:
+                value = _const(default)
+            else:
+                # Aggregate initialization sets the first field
+                first = self._converted(node.expr, self._structs[var_type].fields[0][1])
+                value = ast.Tuple([first, *map(_const, default[1:])], ast.Load())
+        variable = self._declare(node.name, var_type)
+        return [ast.Assign([self._target(variable)], value)]
+
+    def _DimNode(self, node: DimNode) -> List[ast.stmt]:
+        var_type = scalar_type(node.var_type)
+        default = self._default(var_type)
+        size = _const(0) if node.size is None else self._converted(node.size, "INT")
+        if var_type in _ARRAY_TYPECODES:
+            cell = _call(
+                "_array",
+                _const(_ARRAY_TYPECODES[var_type]),
+                ast.Tuple([_const(default)], ast.Load()),
+            )
+        else:
+            cell = ast.List([_const(default)], ast.Load())
+        variable = self._declare(node.name, None)
+        return [ast.Assign([self._target(variable)], ast.BinOp(cell, ast.Mult(), size))]
+
+    def _AssignNode(self, node: AssignNode) -> List[ast.stmt]:
+        variable = self._lookup(node.name)
+        value = self._converted(node.expr, variable.var_type)
+        return [ast.Assign([self._target(variable)], value)]
+
+    def _IfNode(self, node: IfNode) -> List[ast.stmt]:
+        orelse = self._block(node.else_body) if node.else_body is not None else []
+        for condition, body in reversed(node.branches):
+            orelse = [ast.If(self._expr(condition), self._block(body), orelse)]
+        return orelse
+
+    def _loop_body(self, statements: list, loop: _Loop) -> List[ast.stmt]:
+        self._loops.append(loop)
+        try:
+            return self._block(statements)
+        finally:
+            self._loops.pop()
+
+    def _WhileNode(self, node: WhileNode) -> List[ast.stmt]:
+        body = self._loop_body(node.statements, _Loop())
+        return [ast.While(self._expr(node.condition), body, [])]
+
+    def _DoNode(self, node: DoNode) -> List[ast.stmt]:
+        if node.condition is None:
+            # ENDDO without WHILE runs the body once; CONTINUE ends it
+            body = self._loop_body(node.statements, _Loop(lambda: [ast.Break()]))
+            return [ast.While(_const(True), body + [ast.Break()], [])]
+
+        def test() -> List[ast.stmt]:
+            # CONTINUE in a do-while goes to the condition
+            return [ast.If(ast.UnaryOp(ast.Not(), self._expr(node.condition)), [ast.Break()], [])]
+
+        body = self._loop_body(node.statements, _Loop(test))
+        return [ast.While(_const(True), body + test(), [])]
+
+    def _ForNode(self, node: ForNode) -> List[ast.stmt]:
+        start = self._converted(node.start, "INT")
+        self._scopes.append({})
+        try:
+            counter = self._declare(node.var, "INT")
+            if self._counts_up(node):
+                # Counter, bound and step are fixed: for (i = a; i <= b; i += s)
+                # visits exactly range(a, b + 1, s)
+                stop = ast.BinOp(self._expr(node.end), ast.Add(), _const(1))
+                args = [start, stop]
+                if node.step is not None:
+                    args.append(self._expr(node.step))
+                body = self._loop_body(node.statements, _Loop())
+                return [ast.For(self._target(counter), _call("range", *args), body, [])]
+
+            def increment() -> List[ast.stmt]:
+                if node.step is None:
+                    step = _const(1)
+                    value = _wrapped(ast.BinOp(_load(counter.python_name), ast.Add(), step))
+                elif scalar_type(node.step.value_type) in _INTEGRAL:
+                    step = self._expr(node.step)
+                    value = _wrapped(ast.BinOp(_load(counter.python_name), ast.Add(), step))
+                else:
+                    step = self._expr(node.step)
+                    value = _call(
+                        "_to_int",
+                        ast.BinOp(_load(counter.python_name), ast.Add(), step),
+                    )
+                return [ast.Assign([self._target(counter)], value)]
+
+            test = ast.Compare(_load(counter.python_name), [ast.LtE()], [self._expr(node.end)])
+            body = self._loop_body(node.statements, _Loop(increment))
+            return [
+                ast.Assign([self._target(counter)], start),
+                ast.While(test, body + increment(), []),
+            ]
+        finally:
+            self._scopes.pop()
+
+    def _counts_up(self, node: ForNode) -> bool:
+        """
+        :return: If the loop can be a range: its step is a positive INT
+            constant, its bound an INT that the body cannot change, and the
+            body does not assign the counter
+        """
+        step = node.step
+        if step is not None:
+            value = step.value if isinstance(step, LiteralNode) else getattr(step, "constant", None)
+            if not (isinstance(step, (LiteralNode, NameNode)) and type(value) is int and value > 0):
+                return False
+        end = node.end
+        if scalar_type(end.value_type) != "INT":
+            return False
+        if isinstance(end, NameNode) and end.constant is None:
+            variable = self._lookup(end.name)
+            if variable.is_global or _writes(node.statements, end.name):
+                return False
+        elif not isinstance(end, LiteralNode) and not (
+            isinstance(end, NameNode) and end.constant is not None
+        ):
+            return False
+        return not _writes(node.statements, node.var)
+
+    def _SwitchNode(self, node: SwitchNode) -> List[ast.stmt]:
+        subject = self._temp()
+        cases = []
+        for index, (label, body) in enumerate(node.cases):
+            value = _const(node.values[index]) if node.values is not None else self._expr(label)
+            cases.append((ast.Compare(_load(subject), [ast.Eq()], [value]), body))
+
+        bodies = [body for _, body in node.cases] + [node.default_body or []]
+        wrapped = any(_jumps_out(body, BreakNode) for body in bodies)
+        flag = None
+        if wrapped and any(_jumps_out(body, ContinueNode) for body in bodies):
+            flag = self._temp()
+
+        if wrapped:
+            self._loops.append(_Loop(switch_flag=flag, is_switch=True))
+        try:
+            orelse = self._block(node.default_body) if node.default_body is not None else []
+            # An if/elif chain: the first of equal labels wins, as in C++
+            for test, body in reversed(cases):
+                orelse = [ast.If(test, self._block(body), orelse)]
+        finally:
+            if wrapped:
+                self._loops.pop()
+
+        statements = [ast.Assign([_store(subject)], self._expr(node.expr))]
+        if not wrapped:
+            return statements + orelse
+        if flag is not None:
+            statements.append(ast.Assign([_store(flag)], _const(False)))
+        statements.append(ast.While(_const(True), orelse + [ast.Break()], []))
+        if flag is not None:
+            statements.append(ast.If(_load(flag), self._continue(), []))
+        return statements
+
+    def _InputNode(self, node: InputNode) -> List[ast.stmt]:
+        variable = self._lookup(node.name)
+        value = _call("_read", _const(variable.var_type), _load(variable.python_name))
+        return [ast.Assign([self._target(variable)], value)]
+
+    def _PrintNode(self, node: PrintNode) -> List[ast.stmt]:
+        text = self._text(node.expr)
+        if node.color is not None:
+            text = ast.BinOp(_const(f"\033[1;{_COLORS[node.color]}m"), ast.Add(), text)
+            suffix = "\033[0m\n"
+        else:
+            suffix = "\n"
+        return [ast.Expr(_call("_write", ast.BinOp(text, ast.Add(), _const(suffix))))]
+
+    def _text(self, node) -> ast.expr:
+        """
+        :return: The text cout prints for the value of node
+        """
+        value_type = scalar_type(node.value_type)
+        expr = self._expr(node)
+        if value_type == "STRING":
+            return expr
+        if value_type == "INT":
+            return _call("str", expr)
+        if value_type == "FLOAT":
+            return ast.BinOp(_const("%g"), ast.Mod(), expr)
+        if value_type == "BOOL":
+            return ast.IfExp(expr, _const("1"), _const("0"))
+        return _call("_format", expr)
+
+    def _OpenNode(self, node: OpenNode) -> List[ast.stmt]:
+        variable = self._declare(node.name, None)
+        value = _call("_open", _const(node.file_name), _const(node.mode))
+        return [ast.Assign([self._target(variable)], value)]
+
+    def _CloseNode(self, node: CloseNode) -> List[ast.stmt]:
+        return [ast.Expr(_call("_close", _load(self._lookup(node.name).python_name)))]
+
+    def _BreakNode(self, node: BreakNode) -> List[ast.stmt]:
+        if not self._loops:
+            raise BackendError("BREAK outside a loop or SWITCH")
+        return [ast.Break()]
+
+    def _ContinueNode(self, node: ContinueNode) -> List[ast.stmt]:
+        if not any(not loop.is_switch for loop in self._loops):
+            raise BackendError("CONTINUE outside a loop")
+        return self._continue()
+
+    def _continue(self) -> List[ast.stmt]:
+        """
+        CONTINUE the innermost loop. Inside a SWITCH translated to a loop, set
+        its flag and leave it; the code after the SWITCH continues
+        """
+        loop = self._loops[-1]
+        if loop.is_switch:
+            return [ast.Assign([_store(loop.switch_flag)], _const(True)), ast.Break()]
+        prefix = loop.continue_prefix() if loop.continue_prefix else []
+        return prefix + [ast.Continue()]
+
+    def _ReturnNode(self, node: ReturnNode) -> List[ast.stmt]:
+        return_type = scalar_type(self._function.return_type)
+        if node.expr is None:
+            default = _SCALAR_DEFAULTS.get(return_type)
+            return [self._return(_const(default))]
+        return [self._return(self._converted(node.expr, return_type))]
+
+    def _CallStmtNode(self, node: CallStmtNode) -> List[ast.stmt]:
+        return [ast.Expr(self._expr(node.call))]
+
+    # Expressions
+
+    def _expr(self, node) -> ast.expr:
+        return getattr(self, "_" + type(node).__name__)(node)
+
+    def _LiteralNode(self, node: LiteralNode) -> ast.expr:
+        return _const(node.value)
+
+    def _NameNode(self, node: NameNode) -> ast.expr:
+        if node.constant is not None:
+            return _const(node.constant)
+        return _load(self._lookup(node.name).python_name)
+
+    def _GroupNode(self, node: GroupNode) -> ast.expr:
+        return self._expr(node.expr)
+
+    def _UnaryNode(self, node: UnaryNode) -> ast.expr:
+        operand = self._expr(node.operand)
+        if node.op == "!":
+            return ast.UnaryOp(ast.Not(), operand)
+        if node.op == "+":
+            return operand
+        operand_type = scalar_type(node.operand.value_type)
+        if operand_type in _INTEGRAL:
+            return _wrapped(ast.UnaryOp(ast.USub(), operand))
+        if operand_type == "FLOAT":
+            return ast.UnaryOp(ast.USub(), operand)
+        return _call("_negate", operand)
+
+    def _BinaryNode(self, node: BinaryNode) -> ast.expr:
+        left = self._expr(node.left)
+        right = self._expr(node.right)
+        if node.op in ("&&", "||"):
+            op = ast.And() if node.op == "&&" else ast.Or()
+            expr = ast.BoolOp(op, [left, right])
+            if scalar_type(node.left.value_type) == scalar_type(node.right.value_type) == "BOOL":
+                return expr
+            return _call("bool", expr)
+        if float_operands(node.left, node.right):
+            left = self._float_operand(node.left, left)
+            right = self._float_operand(node.right, right)
+        if node.op in _COMPARISON_OPS:
+            return ast.Compare(left, [_COMPARISON_OPS[node.op]()], [right])
+
+        left_type = scalar_type(node.left.value_type)
+        right_type = scalar_type(node.right.value_type)
+        if left_type in _INTEGRAL and right_type in _INTEGRAL:
+            if node.op in _NATIVE_OPS:
+                return _wrapped(ast.BinOp(left, _NATIVE_OPS[node.op](), right))
+            return _call(_INT_HELPERS[node.op], left, right)
+        if left_type in _NUMERIC and right_type in _NUMERIC:
+            if node.op in _NATIVE_OPS:
+                expr = ast.BinOp(left, _NATIVE_OPS[node.op](), right)
+            else:
+                expr = _call(_FLOAT_HELPERS[node.op], left, right)
+            # Computed in float as C++ does, not in double
+            return _call("_to_float32", expr) if node.single else expr
+        if left_type == right_type == "STRING" and node.op == "+":
+            return ast.BinOp(left, ast.Add(), right)
+        return _call("_arith", _const(node.op), left, right)
+
+    _ModNode = _BinaryNode
+    _PowNode = _BinaryNode
+
+    def _float_operand(self, node, expr: ast.expr) -> ast.expr:
+        """
+        :return: expr rounded to float if it is the integer operand of a float
+            operator; a float operand holds a float already
+        """
+        if scalar_type(node.value_type) in _INTEGRAL:
+            return _call("_to_float32", expr)
+        return expr
+
+    def _CallNode(self, node: CallNode) -> ast.expr:
+        _, function = resolve_call(self._signatures, node)
+        args = []
+        refs = []
+        for position, (param, arg) in enumerate(zip(function.params, node.args)):
+            if param.mode == "ref":
+                refs.append((position, self._lookup(arg.name)))
+                args.append(self._expr(arg))
+            else:
+                args.append(self._converted(arg, param.param_type))
+        call = _call(self._python_names[id(function)], *args)
+        if not any(param.mode == "ref" for param in function.params):
+            return call
+
+        # (t := f(x), x := t[1], t[0])[-1] copies BYREF arguments back
+        result = self._temp()
+        items = [ast.NamedExpr(_store(result), call)]
+        for index, (_, variable) in enumerate(refs, start=1):
+            value = ast.Subscript(_load(result), _const(index), ast.Load())
+            items.append(ast.NamedExpr(self._target(variable), value))
+        items.append(ast.Subscript(_load(result), _const(0), ast.Load()))
+        return ast.Subscript(ast.Tuple(items, ast.Load()), _const(-1), ast.Load())
+
+
+def compile_python(program: ProgramNode, filename: str = "<basic>") -> PythonProgram:
+    """
+    :param filename: Names the program in the code object
+    :raise BackendError: If the program uses what the backend cannot run, or
+        nests deeper than Python compiles
+    """
+    translator = PythonTranslator()
+    try:
+        module = ast.fix_missing_locations(translator.translate(program))
+        code = compile(module, filename, "exec")
+    except (RecursionError, SyntaxError, MemoryError) as e:
+        raise BackendError(
+            f"The program is nested too deeply for the python backend ({e});"
+            " run it with --backend vm"
+        )
+    return PythonProgram(code, translator.main(), dict(translator._function_names))
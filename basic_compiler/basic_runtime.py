@@ -0,0 +1,280 @@
+"""
+C++ support code that generated programs pull in on demand.
+
+Each snippet is emitted into the header at most once through ``require``, so
+programs that do not use a feature pay nothing for it.
+"""
+
+MEMO_HASH = """\
+struct basic_memo_hash {
+    template <typename T>
+    size_t operator()(const T &key) const {
+        return std::hash<T>{}(key);
+    }
+
+    template <typename... Ts>
+    size_t operator()(const std::tuple<Ts...> &key) const {
+        size_t seed = 0;
+        std::apply(
+            [&seed](const Ts &...item) {
+                ((seed ^= std::hash<Ts>{}(item) + 0x9e3779b97f4a7c15ULL +
+                          (seed << 6) + (seed >> 2)),
+                 ...);
+            },
+            key);
+        return seed;
+    }
+};
+"""
+
+MEMO_MAP = """\
+template <typename K, typename V>
+class basic_memo_map {
+  public:
+    bool find(const K &key, V &value) const {
+        auto it = table_.find(key);
+        if (it == table_.end()) {
+            return false;
+        }
+        value = it->second;
+        return true;
+    }
+
+    V insert(const K &key, const V &value) {
+        table_[key] = value;
+        return value;
+    }
+
+  private:
+    std::unordered_map<K, V, basic_memo_hash> table_;
+};
+"""
+
+MEMO_LRU = """\
+template <typename K, typename V>
+class basic_memo_lru {
+  public:
+    explicit basic_memo_lru(size_t limit) : limit_(limit) {}
+
+    bool find(const K &key, V &value) {
+        auto it = index_.find(key);
+        if (it == index_.end()) {
+            return false;
+        }
+        order_.splice(order_.begin(), order_, it->second);
+        value = it->second->second;
+        return true;
+    }
+
+    V insert(const K &key, const V &value) {
+        auto it = index_.find(key);
+        if (it != index_.end()) {
+            it->second->second = value;
+            order_.splice(order_.begin(), order_, it->second);
+            return value;
+        }
+        order_.emplace_front(key, value);
+        index_[key] = order_.begin();
+        if (index_.size() > limit_) {
+            index_.erase(order_.back().first);
+            order_.pop_back();
+        }
+        return value;
+    }
+
+  private:
+    size_t limit_;
+    std::list<std::pair<K, V>> order_;
+    std::unordered_map<K, typename std::list<std::pair<K, V>>::iterator,
+                       basic_memo_hash>
+        index_;
+};
+"""
+
+MEMO_DENSE = """\
+template <typename V>
+class basic_memo_dense {
+  public:
+    static constexpr long long limit = 1 << 20;
+
+    bool find(long long key, V &value) const {
+        if (key >= 0 && key < (long long)filled_.size()) {
+            if (!filled_[key]) {
+                return false;
+            }
+            value = values_[key];
+            return true;
+        }
+        return sparse_.find(key, value);
+    }
+
+    V insert(long long key, const V &value) {
+        if (key < 0 || key >= limit) {
+            return sparse_.insert(key, value);
+        }
+        if (key >= (long long)filled_.size()) {
+            filled_.resize(key + 1, false);
+            values_.resize(key + 1);
+        }
+        filled_[key] = true;
+        values_[key] = value;
+        return value;
+    }
+
+  private:
+    std::vector<bool> filled_;
+    std::vector<V> values_;
+    basic_memo_map<long long, V> sparse_;
+};
+"""
+
+IPOW = """\
+template <typename T>
+constexpr T basic_ipow(T base, long long exp) {
+    if (exp < 0) {
+        if (base == 1) {
+            return 1;
+        }
+        if (base == -1) {
+            return (exp & 1) ? -1 : 1;
+        }
+        return 0;
+    }
+    T result = 1;
+    while (exp) {
+        if (exp & 1) {
+            result *= base;
+        }
+        exp >>= 1;
+        if (exp) {
+            base *= base;
+        }
+    }
+    return result;
+}
+"""
+
+POW = """\
+template <typename B, typename E>
+auto basic_pow(B base, E exp) {
+    if constexpr (std::is_integral_v<B> && std::is_integral_v<E>) {
+        return basic_ipow(base, (long long)exp);
+    } else {
+        return std::pow(base, exp);
+    }
+}
+"""
+
+MOD = """\
+template <typename A, typename B>
+auto basic_mod(A a, B b) {
+    if constexpr (std::is_integral_v<A> && std::is_integral_v<B>) {
+        return a % b;
+    } else {
+        return std::fmod(a, b);
+    }
+}
+"""
+
+STR_HASH = """\
+constexpr unsigned long long basic_str_hash(std::string_view s,
+                                            unsigned long long seed) {
+    unsigned long long h = 0xcbf29ce484222325ULL ^ seed;
+    for (unsigned char c : s) {
+        h = (h ^ c) * 0x100000001b3ULL;
+    }
+    return h;
+}
+"""
+
+SEARCH = """\
+constexpr int basic_search(const long long *keys, int n, long long key) {
+    int lo = 0;
+    int hi = n;
+    while (lo < hi) {
+        int mid = lo + (hi - lo) / 2;
+        if (keys[mid] < key) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo < n && keys[lo] == key ? lo : -1;
+}
+"""
+
+PROFILE = """\
+struct basic_profile {
+    const char *path;
+    bool timed;
+    std::vector<unsigned long long> hits;
+    std::vector<long long> nanos;
+    int last = 0;
+    std::chrono::steady_clock::time_point since = std::chrono::steady_clock::now();
+
+    basic_profile(const char *path, int lines, bool timed)
+        : path(path), timed(timed), hits(lines), nanos(lines) {}
+
+    void hit(int line) {
+        hits[line]++;
+        if (timed) {
+            charge();
+            last = line;
+        }
+    }
+
+    // A line is charged the time until the next line starts
+    void charge() {
+        auto now = std::chrono::steady_clock::now();
+        nanos[last] +=
+            std::chrono::duration_cast<std::chrono::nanoseconds>(now - since).count();
+        since = now;
+    }
+
+    ~basic_profile() {
+        if (timed) {
+            charge();
+        }
+        std::ofstream out(path);
+        out << "# basic_compiler line profile: line hits nanoseconds\\n";
+        for (size_t line = 1; line < hits.size(); line++) {
+            if (hits[line]) {
+                out << line << ' ' << hits[line] << ' ' << nanos[line] << '\\n';
+            }
+        }
+    }
+};
+"""
+
+# name -> (headers, snippets it depends on, code)
+SNIPPETS = {
+    "basic_memo_hash": (("<functional>", "<tuple>"), (), MEMO_HASH),
+    "basic_memo_map": (("<unordered_map>",), ("basic_memo_hash",), MEMO_MAP),
+    "basic_memo_lru": (
+        ("<list>", "<unordered_map>", "<utility>"),
+        ("basic_memo_hash",),
+        MEMO_LRU,
+    ),
+    "basic_memo_dense": (("<vector>",), ("basic_memo_map",), MEMO_DENSE),
+    "basic_ipow": ((), (), IPOW),
+    "basic_pow": (("<cmath>", "<type_traits>"), ("basic_ipow",), POW),
+    "basic_mod": (("<cmath>", "<type_traits>"), (), MOD),
+    "basic_str_hash": (("<string_view>",), (), STR_HASH),
+    "basic_search": ((), (), SEARCH),
+    "basic_profile": (("<chrono>", "<vector>"), (), PROFILE),
+}
+
+
+def require(emitter, name):
+    """
+    Make the snippet or the <header> called name available to the generated code
+    """
+    if name.startswith("<"):
+        emitter.include(name)
+        return
+
+    headers, depends, code = SNIPPETS[name]
+    emitter.include(*headers)
+    for dependency in depends:
+        require(emitter, dependency)
+    emitter.require(name, code)
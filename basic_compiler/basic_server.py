@@ -0,0 +1,356 @@
+"""
+Compile server: a daemon that keeps the compiler imported and answers compile
+requests over a Unix socket, so a build that compiles many files pays for
+Python startup, imports and argument parsing once.
+
+    python -m basic_compiler.basic_server [--socket PATH] [--workers N]
+                                          [--idle-timeout SECONDS]
+
+Requests are served by a pool of threads. The tokens and syntax trees of the
+sources compiled recently are kept in memory by content hash, so unchanged
+files skip lexing and parsing. The server exits after --idle-timeout seconds
+without requests, or when basic_server --stop asks it to.
+
+Protocol: the client sends one JSON object per connection, terminated by a
+newline, and reads one JSON object back:
+
+    {"command": "compile", "argv": [...], "cwd": "/abs/dir"}
+        -> {"status": 0, "stdout": "...", "stderr": "...", "execute": "/abs/program"}
+    {"command": "stats"}  -> {"status": 0, "stats": {...}}
+    {"command": "stop"}   -> {"status": 0}
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+from basic_compiler.basic_argparser import build_parser, check_args, default_output
+from basic_compiler.basic_ast import ProgramNode
+from basic_compiler.basic_client import default_socket_path, receive_json, request, send_json
+from basic_compiler.basic_emitter import program_path
+from basic_compiler.basic_lex import TokenStream
+from basic_compiler.main import HEADER, compile_file, stream_logger
+
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_CACHE_SIZE = 256
+
+
+class SourceCache:
+    """
+    Tokens and syntax trees of recently compiled sources, least recently used
+    first out. Entries are keyed by the SHA-256 of the source; a tree is also
+    keyed by the options that change what the parser builds.
+
+    Cached trees are shared between requests, so emitting must not modify them.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_SIZE):
+        self._max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(source: List[str]) -> str:
+        return hashlib.sha256("".join(source).encode()).hexdigest()
+
+    @staticmethod
+    def _parse_options(args) -> tuple:
+        return args.ctfe_steps, args.explicit_stack, args.jobs > 1
+
+    def _entry(self, digest: str) -> dict:
+        """
+        The caller holds the lock
+        """
+        entry = self._entries.get(digest)
+        if entry is None:
+            entry = self._entries[digest] = {"tokens": None, "programs": {}}
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        else:
+            self._entries.move_to_end(digest)
+        return entry
+
+    def tokens(self, source: List[str]) -> TokenStream:
+        """
+        :return: The tokens of source, lexed now if this content was not lexed before
+        """
+        digest = self._digest(source)
+        with self._lock:
+            tokens = self._entry(digest)["tokens"]
+        if tokens is None:
+            # Lex outside the lock; two requests may lex the same new source
+            tokens = TokenStream.tokenize(source)
+            with self._lock:
+                self._entry(digest)["tokens"] = tokens
+        return tokens.replay()
+
+    def program(self, source: List[str], args) -> Optional[ProgramNode]:
+        """
+        :return: The tree parsed before from the same source with the same options
+        """
+        digest = self._digest(source)
+        with self._lock:
+            program = self._entry(digest)["programs"].get(self._parse_options(args))
+            if program is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return program
+
+    def store(self, source: List[str], args, program: ProgramNode) -> None:
+        digest = self._digest(source)
+        with self._lock:
+            self._entry(digest)["programs"][self._parse_options(args)] = program
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class _RequestExit(Exception):
+    def __init__(self, status: int, stdout: str, stderr: str):
+        super().__init__(status)
+        self.status = status
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class _RequestArgumentParser(argparse.ArgumentParser):
+    """
+    Collects help, version and usage errors for the client instead of printing
+    them on the server's terminal and exiting the server
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stdout = []
+        self._stderr = []
+
+    def _print_message(self, message, file=None):
+        if message:
+            (self._stderr if file is sys.stderr else self._stdout).append(message)
+
+    def exit(self, status=0, message=None):
+        if message:
+            self._stderr.append(message)
+        raise _RequestExit(status, "".join(self._stdout), "".join(self._stderr))
+
+
+def _absolute(cwd: str, path: Optional[str]) -> Optional[str]:
+    if path is None or path == "-":
+        return path
+    return os.path.join(cwd, path)
+
+
+class CompileServer:
+    def __init__(
+        self,
+        socket_path: str = None,
+        workers: int = None,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        """
+        :param socket_path: Where to listen, default_socket_path() by default
+        :param workers: Requests compiled at the same time, one per CPU by default
+        :param idle_timeout: Seconds without a request before the server exits
+        :param cache_size: Sources whose tokens and trees are kept
+        """
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.cache = SourceCache(cache_size)
+        self._workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._active = 0
+        self._last_request = time.monotonic()
+        self._stopping = threading.Event()
+        self._socket = None
+
+    def bind(self) -> None:
+        """
+        Listen on the socket, replacing a stale socket file left by a server
+        that is no longer running
+
+        :raise OSError: If another server already listens there
+        """
+        if os.path.exists(self.socket_path):
+            try:
+                request({"command": "stats"}, self.socket_path)
+            except OSError:
+                os.unlink(self.socket_path)
+            else:
+                raise OSError(f"A compile server already listens on {self.socket_path}")
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            self._socket.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        self._socket.listen()
+        # Wake up regularly to notice the idle timeout and stop requests
+        self._socket.settimeout(min(1.0, self.idle_timeout))
+
+    def serve_forever(self) -> None:
+        if self._socket is None:
+            self.bind()
+        try:
+            with ThreadPoolExecutor(max_workers=self._workers) as pool:
+                while not self._stopping.is_set():
+                    try:
+                        connection, _ = self._socket.accept()
+                    except socket.timeout:
+                        if self._idle():
+                            break
+                        continue
+                    connection.settimeout(None)
+                    with self._lock:
+                        self._active += 1
+                    pool.submit(self._handle, connection)
+        finally:
+            self._socket.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _idle(self) -> bool:
+        with self._lock:
+            return (
+                self._active == 0
+                and time.monotonic() - self._last_request > self.idle_timeout
+            )
+
+    def _handle(self, connection: socket.socket) -> None:
+        try:
+            with connection, connection.makefile("rwb") as stream:
+                try:
+                    response = self.dispatch(receive_json(stream))
+                except Exception as e:
+                    response = {"status": 1, "stdout": "", "stderr": f"Unexpected error:\n {e}\n"}
+                send_json(stream, response)
+        except OSError:
+            # The client went away; nobody is left to tell
+            pass
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_request = time.monotonic()
+
+    def dispatch(self, message: dict) -> dict:
+        command = message.get("command", "compile")
+        if command == "compile":
+            return self.compile(message["argv"], message["cwd"])
+        if command == "stats":
+            return {"status": 0, "stats": self.cache.stats()}
+        if command == "stop":
+            self.stop()
+            return {"status": 0}
+        return {"status": 2, "stdout": "", "stderr": f"Unknown command {command!r}\n"}
+
+    def compile(self, argv: List[str], cwd: str) -> dict:
+        """
+        Compile as basic_compiler.main would in directory cwd, collecting its output
+
+        :return: The exit status, the output and the program the client should run
+        """
+        try:
+            parser = build_parser(_RequestArgumentParser)
+            args = default_output(check_args(parser, parser.parse_args(argv)))
+        except _RequestExit as e:
+            return {"status": e.status, "stdout": e.stdout, "stderr": e.stderr}
+
+        for name in ("input", "output", "trace", "timings_json", "bytecode_dir"):
+            setattr(args, name, _absolute(cwd, getattr(args, name)))
+        # The program reads and writes the client's terminal, not the server's
+        execute = args.execute
+        args.execute = False
+
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        log = stream_logger(stderr, args.verbose)
+        log.info(HEADER)
+
+        try:
+            status, result = compile_file(
+                args,
+                log,
+                stdout=stdout,
+                tool_output=stderr,
+                cache=self.cache,
+                trace_memory=False,
+                # A --backend vm or python program runs here; the client's
+                # terminal is not ours to read
+                stdin=io.StringIO(),
+            )
+        except OSError as e:
+            log.error(f"Unexpected error:\n {e}")
+            status, result = 1, None
+        if execute and result is not None and result.cpp is not None:
+            execute = result.program if args.pipe else program_path(args.output)
+        else:
+            execute = None
+        return {
+            "status": status,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+            "execute": execute,
+        }
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="basic_server", description="Serve compile requests over a Unix socket"
+    )
+    parser.add_argument("--socket", help="The socket to listen on", default=None)
+    parser.add_argument(
+        "--workers", help="Requests compiled at the same time", type=int, default=None
+    )
+    parser.add_argument(
+        "--idle-timeout",
+        help="Exit after this many seconds without a request",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+    )
+    parser.add_argument(
+        "--cache-size",
+        help="Sources whose tokens and trees are kept in memory",
+        type=int,
+        default=DEFAULT_CACHE_SIZE,
+    )
+    parser.add_argument(
+        "--stop", help="Ask the server on the socket to exit", action="store_true"
+    )
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    if args.stop:
+        try:
+            request({"command": "stop"}, args.socket)
+        except OSError:
+            print("No compile server is running", file=sys.stderr)
+            return 1
+        return 0
+
+    server = CompileServer(args.socket, args.workers, args.idle_timeout, args.cache_size)
+    try:
+        server.bind()
+    except OSError as e:
+        print(e, file=sys.stderr)
+        return 1
+    server.serve_forever()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
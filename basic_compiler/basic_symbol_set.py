@@ -1,35 +1,154 @@
-from basic_compiler.basic_token import Token, TokenType
-from basic_compiler.basic_exceptions import SymbolTableError
+from enum import Enum, auto
 from typing import Optional
 
+from basic_compiler.basic_exceptions import SymbolTableError
+from basic_compiler.basic_token import Token
+
+_UNRESOLVED = object()
+
+
+class SymbolKind(Enum):
+    VARIABLE = auto()
+    CONSTANT = auto()
+    PARAMETER = auto()
+    FUNCTION = auto()
+    CLASS = auto()
+    STRUCT = auto()
+
+
+# Identifiers of these kinds start a call statement rather than an assignment
+CALLABLE_KINDS = {SymbolKind.FUNCTION, SymbolKind.CLASS, SymbolKind.STRUCT}
+
+# Identifiers of these kinds may be assigned to
+ASSIGNABLE_KINDS = {SymbolKind.VARIABLE, SymbolKind.PARAMETER}
+
+
+class Symbol:
+    def __init__(self, token: Token, kind: SymbolKind, symbol_type: Optional[str], scope):
+        self.name = token.token_text
+        self.token = token
+        self.kind = kind
+        # Declared BASIC type in upper case, or None for functions and types
+        self.type = symbol_type.upper() if symbol_type else None
+        self.scope = scope
+        # Value of a CONSTANT known at compile time, None otherwise
+        self.value = None
+
+    def __repr__(self):
+        return f"Symbol({self.name!r}, {self.kind.name}, {self.type!r})"
+
+
+class Scope:
+    def __init__(self, kind: str, name: Optional[str], parent: Optional["Scope"]):
+        """
+        :param kind: "GLOBAL", "FUNCTION", "CLASS" or "BLOCK"
+        :param name: The function or class name, if any
+        :param parent: The enclosing scope
+        """
+        self.kind = kind
+        self.name = name
+        self.parent = parent
+        self.depth = parent.depth + 1 if parent else 0
+        self.symbols = {}
+
 
 class SymbolTable:
+    """
+    Symbols by name in a chain of nested scopes. Resolving a name walks the
+    chain once; the result is cached until a declaration of that name is added
+    or the scope holding it is popped.
+    """
+
     def __init__(self):
-        self._symbols = {}
+        self._scope = Scope("GLOBAL", None, None)
+        self._resolved = {}
+        self._horizon = None
+
+    @property
+    def scope(self) -> Scope:
+        return self._scope
 
-    def insert(self, token: Token) -> None:
+    def set_horizon(self, line_number: Optional[int]) -> None:
+        """
+        Treat global symbols declared after line_number as not declared yet, for
+        parsing one block after all global declarations were made; None shows all
+        """
+        self._horizon = line_number
+        self._resolved.clear()
+
+    def push_scope(self, kind: str, name: Optional[str] = None) -> Scope:
+        self._scope = Scope(kind, name, self._scope)
+        return self._scope
+
+    def pop_scope(self) -> Scope:
+        scope = self._scope
+        if scope.parent is None:
+            raise SymbolTableError("Cannot leave the global scope.")
+        for name in scope.symbols:
+            self._resolved.pop(name, None)
+        self._scope = scope.parent
+        return scope
+
+    def insert(
+        self,
+        token: Token,
+        kind: SymbolKind = SymbolKind.VARIABLE,
+        symbol_type: Optional[str] = None,
+    ) -> Symbol:
+        """
+        Declare token's identifier in the current scope; inner scopes may
+        shadow outer declarations
+
+        :raise SymbolTableError: If the current scope already declares it, with
+            token as its token
+        """
         name = token.token_text
-        if name in self._symbols:
-            raise SymbolTableError(
-                f"{token.line_number + 1}: {token.line_text}\nVariable '{name}' already declared."
-            )
-        self._symbols[name] = token
-
-    def lookup(self, name: str) -> Token:
-        if name not in self._symbols:
+        if name in self._scope.symbols:
+            error = SymbolTableError(f"{token.location()}: Variable '{name}' already declared.")
+            error.token = token
+            raise error
+        symbol = Symbol(token, kind, symbol_type, self._scope)
+        self._scope.symbols[name] = symbol
+        self._resolved.pop(name, None)
+        return symbol
+
+    def lookup(self, name: str) -> Symbol:
+        symbol = self.find(name)
+        if symbol is None:
             raise SymbolTableError(f"Variable '{name}' not declared.")
-        return self._symbols[name]
+        return symbol
 
-    def find(self, name: str) -> Optional[Token]:
-        return self._symbols.get(name)
+    def find(self, name: str) -> Optional[Symbol]:
+        symbol = self._resolved.get(name, _UNRESOLVED)
+        if symbol is _UNRESOLVED:
+            scope = self._scope
+            while scope is not None and name not in scope.symbols:
+                scope = scope.parent
+            symbol = scope.symbols[name] if scope is not None else None
+            if (
+                symbol is not None
+                and self._horizon is not None
+                and symbol.scope.parent is None
+                and symbol.token.line_number > self._horizon
+            ):
+                symbol = None
+            self._resolved[name] = symbol
+        return symbol
 
-    def equals(self, name: str, token_type: TokenType) -> bool:
-        token = self._symbols.get(name)
-        return token.token_type == token_type if token else False
+    def find_local(self, name: str) -> Optional[Symbol]:
+        """
+        :return: The declaration of name in the current scope only
+        """
+        return self._scope.symbols.get(name)
 
-    def get_line_text(self, name: str) -> Optional[str]:
-        token = self._symbols.get(name)
-        return token.line_text if token else None
+    def kind(self, name: str) -> Optional[SymbolKind]:
+        symbol = self.find(name)
+        return symbol.kind if symbol else None
 
     def __repr__(self):
-        return repr(self._symbols)
+        chain = []
+        scope = self._scope
+        while scope is not None:
+            chain.append(f"{scope.kind}:{scope.name}:{list(scope.symbols.values())}")
+            scope = scope.parent
+        return " <- ".join(chain)
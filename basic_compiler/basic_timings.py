@@ -0,0 +1,184 @@
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _max_rss_kib(children: bool = False) -> Optional[int]:
+    if resource is None:
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    max_rss = resource.getrusage(who).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return max_rss // 1024 if sys.platform == "darwin" else max_rss
+
+
+def _child_cpu() -> float:
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+class PhaseTimer:
+    """
+    Wall-clock, CPU and memory usage of each compiler phase.
+
+    CPU time of child processes (clang-format, g++, the compiled program) is
+    counted in the phase that waited for them. Python allocations are traced
+    with tracemalloc only while the timer is enabled.
+    """
+
+    def __init__(self, enabled: bool = False, trace_memory: bool = True):
+        """
+        :param enabled: Record anything at all
+        :param trace_memory: Trace Python allocations; tracemalloc is process-wide,
+            so timers running in several threads at once leave it off
+        """
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.phases = []
+        self._accumulated = {}
+        self._start = None
+        if self.trace_memory:
+            tracemalloc.start()
+        if enabled:
+            self._start = (time.perf_counter(), time.process_time(), _child_cpu())
+
+    @contextmanager
+    def phase(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        child_cpu = _child_cpu()
+        try:
+            yield
+        finally:
+            self.phases.append(
+                {
+                    "name": name,
+                    "wall_s": time.perf_counter() - wall,
+                    "cpu_s": time.process_time() - cpu,
+                    "child_cpu_s": _child_cpu() - child_cpu,
+                    "py_peak_bytes": (
+                        tracemalloc.get_traced_memory()[1] if self.trace_memory else None
+                    ),
+                    "max_rss_kib": _max_rss_kib(),
+                    "child_max_rss_kib": _max_rss_kib(children=True),
+                }
+            )
+
+    def accumulate(self, obj, method_name: str, name: str) -> None:
+        """
+        Time every call of obj.method_name under the phase name. Used for the
+        lexer, whose tokens are pulled lazily while parsing; the time is taken
+        out of the phase that encloses the calls when the report is built.
+        """
+        if not self.enabled:
+            return
+
+        method = getattr(obj, method_name)
+        totals = self._accumulated.setdefault(name, [0.0, 0.0])
+
+        def timed(*args, **kwargs):
+            wall = time.perf_counter()
+            cpu = time.process_time()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                totals[0] += time.perf_counter() - wall
+                totals[1] += time.process_time() - cpu
+
+        setattr(obj, method_name, timed)
+
+    def results(self, within: str = "parse") -> List[dict]:
+        """
+        :param within: The phase that the accumulated calls ran inside
+        :return: One record per phase, accumulated ones listed before within
+        """
+        results = []
+        for phase in self.phases:
+            if phase["name"] == within:
+                phase = dict(phase)
+                for name, (wall, cpu) in self._accumulated.items():
+                    results.append(
+                        {
+                            "name": name,
+                            "wall_s": wall,
+                            "cpu_s": cpu,
+                            "child_cpu_s": 0.0,
+                            "py_peak_bytes": None,
+                            "max_rss_kib": None,
+                            "child_max_rss_kib": None,
+                        }
+                    )
+                    phase["wall_s"] -= wall
+                    phase["cpu_s"] -= cpu
+            results.append(phase)
+        return results
+
+    def total(self) -> dict:
+        wall, cpu, child_cpu = self._start
+        return {
+            "name": "total",
+            "wall_s": time.perf_counter() - wall,
+            "cpu_s": time.process_time() - cpu,
+            "child_cpu_s": _child_cpu() - child_cpu,
+            "py_peak_bytes": (
+                max((phase["py_peak_bytes"] for phase in self.phases), default=0)
+                if self.trace_memory
+                else None
+            ),
+            "max_rss_kib": _max_rss_kib(),
+            "child_max_rss_kib": _max_rss_kib(children=True),
+        }
+
+    def stop(self) -> None:
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def report(self) -> str:
+        """
+        :return: A table of the phases for people
+        """
+        lines = [
+            f"{'phase':<14}{'wall ms':>10}{'cpu ms':>10}{'child ms':>10}"
+            f"{'py peak KiB':>13}{'rss KiB':>10}{'child rss KiB':>15}"
+        ]
+        for phase in self.results() + [self.total()]:
+            py_peak = phase["py_peak_bytes"]
+            rss = phase["max_rss_kib"]
+            child_rss = phase["child_max_rss_kib"]
+            lines.append(
+                f"{phase['name']:<14}"
+                f"{phase['wall_s'] * 1000:>10.2f}"
+                f"{phase['cpu_s'] * 1000:>10.2f}"
+                f"{phase['child_cpu_s'] * 1000:>10.2f}"
+                f"{'-' if py_peak is None else py_peak // 1024:>13}"
+                f"{'-' if rss is None else rss:>10}"
+                f"{'-' if child_rss is None else child_rss:>15}"
+            )
+        return "\n".join(lines)
+
+    def to_json(self, **fields) -> str:
+        """
+        :param fields: Extra top-level fields, such as the input file
+        :return: A JSON record of the phases for machines
+        """
+        record = dict(fields)
+        record["timestamp"] = time.time()
+        record["phases"] = self.results()
+        record["total"] = self.total()
+        return json.dumps(record, indent=2)
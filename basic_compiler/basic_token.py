@@ -80,6 +80,8 @@ class TokenType(Enum):
     ENDCLASS = auto()
     FUNCTION = auto()
     ENDFUNCTION = auto()
+    MEMO = auto()
+    BYREF = auto()
     PUBLIC = auto()
     PRIVATE = auto()
     STRUCT = auto()
@@ -107,6 +109,17 @@ class Token:
     token_type: TokenType
     line_number: int = 0
     line_text: str = ""
+    # Where the token starts in line_text, counted from 0
+    column: int = 0
+
+    def location(self) -> str:
+        """
+        :return: Where the token is for a diagnostic, counted from 1 like the
+            lexer's errors: the line only at the end of the file
+        """
+        if self.token_type == TokenType.EOF:
+            return f"Line {self.line_number + 1}"
+        return f"Line {self.line_number + 1}, column {self.column + 1}"
 
     @staticmethod
     def check_if_keyword(token_text: str) -> Optional[TokenType]:
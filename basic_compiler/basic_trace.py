@@ -0,0 +1,143 @@
+import json
+import time
+from collections import deque
+from typing import Callable, List, NamedTuple, Optional
+
+# Parser method -> production name recorded in the trace
+PRODUCTIONS = {
+    "parse_program": "PROGRAM",
+    "stmt": "STMT",
+    "class_stmt": "STMT-CLASS",
+    "func_stmt": "STMT-FUNC",
+    "param_list": "PARAM-LIST",
+    "struct_stmt": "STMT-STRUCT",
+    "normal_stmt": "STMT-NORMAL",
+    "declaration_stmt": "STMT-DECLARATION",
+    "id_let_stmt": "STMT-ID-LET",
+    "let_stmt": "STMT-LET",
+    "dim_stmt": "STMT-DIM",
+    "const_stmt": "STMT-CONST",
+    "if_stmt": "STMT-IF",
+    "switch_stmt": "STMT-SWITCH",
+    "while_stmt": "STMT-WHILE",
+    "do_stmt": "STMT-DO",
+    "for_stmt": "STMT-FOR",
+    "io_stmt": "STMT-IO",
+    "input_stmt": "STMT-INPUT",
+    "print_stmt": "STMT-PRINT",
+    "open_stmt": "STMT-OPEN",
+    "close_stmt": "STMT-CLOSE",
+    "jump_stmt": "STMT-JUMP",
+    "break_stmt": "STMT-BREAK",
+    "continue_stmt": "STMT-CONTINUE",
+    "return_stmt": "STMT-RETURN",
+    "expr": "EXPR",
+    "arith_base": "ARITH-BASE",
+    "function_call": "FUNCTION-CALL",
+    "call_stmt": "STMT-CALL",
+    "nl": "NL",
+}
+
+
+class TraceEvent(NamedTuple):
+    kind: str  # "enter" or "exit"
+    production: str
+    line_number: int
+    token: str
+    time_ns: int
+
+
+class ParseTrace:
+    """
+    Records production enter/exit events of a Parser into a ring buffer.
+
+    A Parser built without a trace runs its grammar methods directly; install
+    shadows them with recording wrappers on that one instance only, so the
+    untraced path pays nothing.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1 << 16,
+        echo: Optional[Callable[[str], None]] = None,
+        clock: Callable[[], int] = time.perf_counter_ns,
+    ):
+        """
+        :param capacity: Events kept; older events are dropped first
+        :param echo: Called with the production name on every enter, e.g. logging.debug
+        :param clock: Nanosecond timestamp source
+        """
+        self._events = deque(maxlen=capacity)
+        self._echo = echo
+        self._clock = clock
+        self.dropped = 0
+
+    def install(self, parser) -> None:
+        for method_name, production in PRODUCTIONS.items():
+            method = getattr(parser, method_name, None)
+            if method is not None:
+                setattr(parser, method_name, self._wrap(parser, method, production))
+        # normal_stmt dispatches through methods bound at construction
+        parser._normal_tokens_map = {
+            token_type: getattr(parser, method.__name__)
+            for token_type, method in parser._normal_tokens_map.items()
+        }
+
+    def _wrap(self, parser, method, production):
+        def traced(*args, **kwargs):
+            self.record("enter", production, parser._current_token)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record("exit", production, parser._current_token)
+
+        traced.__wrapped__ = method
+        return traced
+
+    def record(self, kind: str, production: str, token) -> None:
+        if len(self._events) == self._events.maxlen:
+            self.dropped += 1
+        if kind == "enter" and self._echo is not None:
+            self._echo(production)
+        self._events.append(
+            TraceEvent(
+                kind,
+                production,
+                token.line_number,
+                token.token_text,
+                self._clock(),
+            )
+        )
+
+    def events(self) -> List[TraceEvent]:
+        return list(self._events)
+
+    def productions(self) -> List[str]:
+        """
+        :return: The entered productions in order, as the old debug log listed them
+        """
+        return [event.production for event in self._events if event.kind == "enter"]
+
+    def timings(self) -> dict:
+        """
+        :return: Production -> [calls, inclusive nanoseconds] over the buffered events
+        """
+        totals = {}
+        stack = []
+        for event in self._events:
+            if event.kind == "enter":
+                stack.append(event)
+            elif stack and stack[-1].production == event.production:
+                start = stack.pop()
+                entry = totals.setdefault(event.production, [0, 0])
+                entry[0] += 1
+                entry[1] += event.time_ns - start.time_ns
+        return totals
+
+    def export(self, path: str) -> None:
+        """
+        Write the buffered events to path, one JSON object per line
+        """
+        with open(path, "w") as trace_file:
+            for event in self._events:
+                trace_file.write(json.dumps(event._asdict()) + "\n")
@@ -0,0 +1,1220 @@
+"""
+Bytecode backend: ``--backend vm`` compiles the parsed program for a stack
+machine and runs it in this process, so a program starts without C++, g++ or
+a child process.
+
+Every function becomes a flat ``array("i")`` of (opcode, operand) pairs and a
+list of constants. Jumps name the index of their target's opcode; operands
+that need more than an int (call sites, SWITCH tables, I/O targets) index the
+constants. Locals live in a list indexed by slot, assigned per declaration at
+compile time, so the machine never looks a name up.
+
+The machine follows the C++ the program would compile to: INT is 32 bits and
+wraps, "/" and "%" on integers truncate toward zero, FLOAT is a float and a
+FLOAT literal a double, so arithmetic is rounded to single precision exactly
+where C++ computes in float (see basic_numeric), PRINT formats like ``cout``
+and BREAK inside a SWITCH leaves the SWITCH. Integer division by zero stops the program with VMError
+where the C++ program would crash.
+
+CLASS declarations are accepted but an object of a CLASS cannot be created;
+the language has no way to call a method on it anyway.
+"""
+
+import array
+import bisect
+import re
+import sys
+from typing import Dict, List, Optional
+
+from basic_compiler.basic_ast import (
+    AssignNode,
+    BinaryNode,
+    BreakNode,
+    CallNode,
+    CallStmtNode,
+    ClassNode,
+    CloseNode,
+    ContinueNode,
+    DimNode,
+    DoNode,
+    ForNode,
+    FunctionNode,
+    GroupNode,
+    IfNode,
+    InputNode,
+    LetNode,
+    LiteralNode,
+    NameNode,
+    OpenNode,
+    PrintNode,
+    ProgramNode,
+    ReturnNode,
+    StructNode,
+    SwitchNode,
+    UnaryNode,
+    WhileNode,
+    float_operands,
+)
+from basic_compiler.basic_exceptions import BackendError, VMError
+from basic_compiler.basic_numeric import (
+    INT_MAX,
+    INT_MIN,
+    float_div,
+    float_mod,
+    float_pow,
+    int_div,
+    int_mod,
+    int_pow,
+    to_float32,
+    to_int,
+    wrap_int,
+)
+
+# Opcodes, most frequent first: the machine tests them in this order
+LOAD = 0  # push local slot
+CONST = 1  # push constant
+STORE = 2  # pop into local slot
+JUMP_IF_FALSE = 3  # pop, jump to operand if false
+JUMP = 4
+INC = 5  # add 1 to the INT in local slot
+ADD_INT = 6
+SUB_INT = 7
+MUL_INT = 8
+LT = 9
+LE = 10
+GT = 11
+GE = 12
+EQ = 13
+NE = 14
+CALL = 15  # constant: (function index, BYREF write-backs)
+RETURN = 16
+LOAD_GLOBAL = 17
+STORE_GLOBAL = 18
+JUMP_IF_TRUE = 19
+ADD_FLOAT = 20
+SUB_FLOAT = 21
+MUL_FLOAT = 22
+DIV_FLOAT = 23
+DIV_INT = 24
+MOD_INT = 25
+MOD_FLOAT = 26
+POW_INT = 27
+POW_FLOAT = 28
+CONCAT = 29
+BINARY = 30  # operand types unknown until run time; operand indexes _GENERIC_OPS
+NEG_INT = 31
+NEG_FLOAT = 32
+NEG = 33
+NOT = 34
+CONVERT = 35  # operand: TO_INT, TO_FLOAT or TO_BOOL
+SWITCH = 36  # constant: ({case value: target}, default target)
+PRINT = 37  # constant: ANSI color code or None
+INPUT = 38  # constant: (is global, slot, type)
+OPEN = 39  # constant: (file name, mode, is global, slot)
+CLOSE = 40  # constant: (is global, slot)
+POP = 41
+NEW_ARRAY = 42  # pop the size; constant: the element's default value
+BUILD = 43  # pop operand values into a STRUCT value
+
+OPCODE_NAMES = {
+    value: name for name, value in list(globals().items()) if name.isupper() and isinstance(value, int)
+}
+
+TO_INT = 0
+TO_FLOAT = 1
+TO_BOOL = 2
+
+_GENERIC_OPS = ["+", "-", "*", "/", "%", "^"]
+
+# Deeper calls stop the program where the C++ program would overflow its stack
+MAX_CALL_DEPTH = 200_000
+
+_SCALAR_DEFAULTS = {"INT": 0, "FLOAT": 0.0, "BOOL": False, "STRING": ""}
+
+_COLORS = {
+    "BLACK": "30",
+    "WHITE": "37",
+    "RED": "31",
+    "ORANGE": "33",
+    "YELLOW": "33",
+    "GREEN": "32",
+    "BLUE": "34",
+    "INDIGO": "36",
+    "VIOLET": "35",
+}
+
+_COMPARISON_OPS = {"<": LT, "<=": LE, ">": GT, ">=": GE, "==": EQ, "!=": NE}
+_INT_OPS = {"+": ADD_INT, "-": SUB_INT, "*": MUL_INT, "/": DIV_INT, "%": MOD_INT, "^": POW_INT}
+_FLOAT_OPS = {
+    "+": ADD_FLOAT,
+    "-": SUB_FLOAT,
+    "*": MUL_FLOAT,
+    "/": DIV_FLOAT,
+    "%": MOD_FLOAT,
+    "^": POW_FLOAT,
+}
+
+
+class BytecodeFunction:
+    def __init__(self, name: str, param_count: int, memo: bool = False, memo_limit: int = None):
+        self.name = name
+        self.param_count = param_count
+        # Parameters take the first slots
+        self.local_count = 0
+        self.memo = memo
+        self.memo_limit = memo_limit
+        self.code = array.array("i")
+        self.consts = []
+        # Line table: the statement starting at code index line_starts[i] is
+        # on source line line_numbers[i]
+        self.line_starts = array.array("i")
+        self.line_numbers = array.array("i")
+
+    def line_at(self, pc: int) -> Optional[int]:
+        """
+        :return: The source line of the instruction at code index pc
+        """
+        index = bisect.bisect_right(self.line_starts, pc) - 1
+        return self.line_numbers[index] if index >= 0 else None
+
+    def disassemble(self) -> str:
+        lines = [f"{self.name}({self.param_count} params, {self.local_count} locals):"]
+        for pc in range(0, len(self.code), 2):
+            op, arg = self.code[pc], self.code[pc + 1]
+            detail = f" ; {self.consts[arg]!r}" if op in _CONST_OPERANDS else ""
+            lines.append(f"{pc:6} {OPCODE_NAMES[op]:<14}{arg}{detail}")
+        return "\n".join(lines)
+
+
+_CONST_OPERANDS = {CONST, CALL, SWITCH, PRINT, INPUT, OPEN, CLOSE, NEW_ARRAY}
+
+
+class BytecodeProgram:
+    def __init__(self, functions: List[BytecodeFunction], global_count: int, entry: int):
+        """
+        :param functions: Every function, the entry among them
+        :param global_count: Global variable slots
+        :param entry: The function that initializes the globals and calls main
+        """
+        self.functions = functions
+        self.global_count = global_count
+        self.entry = entry
+
+    def disassemble(self) -> str:
+        return "\n\n".join(function.disassemble() for function in self.functions)
+
+
+def scalar_type(value_type: Optional[str]) -> Optional[str]:
+    """
+    :return: "INT", "FLOAT", "BOOL" or "STRING" for a scalar type, else value_type
+    """
+    if value_type is not None and value_type.upper() in _SCALAR_DEFAULTS:
+        return value_type.upper()
+    return value_type
+
+
+class _Label:
+    def __init__(self):
+        self.target = None
+        self.uses = []
+
+
+class _Variable:
+    def __init__(self, is_global: bool, slot: int, var_type: Optional[str]):
+        self.is_global = is_global
+        self.slot = slot
+        self.var_type = scalar_type(var_type)
+
+
+class BytecodeCompiler:
+    """
+    Compiles a ProgramNode. Nodes are compiled from an explicit work list of
+    nodes and callbacks, so deeply nested programs do not recurse.
+    """
+
+    def __init__(self):
+        self._functions = []
+        self._signatures = {}
+        self._structs = {}
+        self._classes = set()
+        self._globals = {}
+        self._global_count = 0
+        # Per function being compiled
+        self._function = None
+        self._return_type = None
+        # The names each open block declared, and the variables each name
+        # resolves to, innermost last, so a lookup does not scan the blocks
+        self._scopes = []
+        self._visible = {}
+        self._breaks = []
+        self._continues = []
+
+    def compile(self, program: ProgramNode) -> BytecodeProgram:
+        """
+        :raise BackendError: If the program uses what the machine cannot run
+        """
+        entry = BytecodeFunction("<globals>", 0)
+        bodies = []
+        for stmt in program.statements:
+            if isinstance(stmt, FunctionNode):
+                function = BytecodeFunction(
+                    stmt.name, len(stmt.params), stmt.memo, stmt.memo_limit
+                )
+                self._signatures.setdefault(stmt.name, []).append(
+                    (len(self._functions), stmt)
+                )
+                self._functions.append(function)
+                bodies.append((function, stmt))
+            elif isinstance(stmt, StructNode):
+                self._structs[stmt.name] = stmt
+            elif isinstance(stmt, ClassNode):
+                self._classes.add(stmt.name)
+            elif not isinstance(stmt, (LetNode, DimNode)):
+                raise BackendError(
+                    f"{type(stmt).__name__[:-4].upper()} is only allowed inside a function"
+                )
+
+        main = [index for index, node in self._signatures.get("main", ()) if not node.params]
+        if not main:
+            raise BackendError("The program has no main() function")
+
+        # Globals first, so the functions know their slots
+        self._start(entry, None)
+        self._run([stmt for stmt in program.statements if isinstance(stmt, (LetNode, DimNode))])
+        self._emit(CALL, self._const((main[0], ())))
+        self._emit(RETURN)
+        entry.code = array.array("i", self._code)
+        self._functions.append(entry)
+
+        for function, node in bodies:
+            self._compile_function(function, node)
+        return BytecodeProgram(self._functions, self._global_count, len(self._functions) - 1)
+
+    def _compile_function(self, function: BytecodeFunction, node: FunctionNode) -> None:
+        self._start(function, node.return_type)
+        for param in node.params:
+            self._declare(param.name, param.param_type)
+        self._run(node.statements)
+        # Falling off the end returns the type's default; main returns 0
+        self._emit(CONST, self._const(self._default(self._return_type, none_for_other=True)))
+        self._emit(RETURN)
+        function.code = array.array("i", self._code)
+
+    def _start(self, function: BytecodeFunction, return_type: Optional[str]) -> None:
+        self._function = function
+        self._code = []
+        self._const_index = {}
+        self._return_type = scalar_type(return_type)
+        self._scopes = [[]] if return_type is not None else []
+        self._visible = {}
+        self._breaks = []
+        self._continues = []
+
+    def _run(self, items: list) -> None:
+        """
+        Compile nodes and run callbacks in order; a node's handler returns the
+        items that compile it. None items are skipped
+        """
+        stack = list(reversed(items))
+        while stack:
+            item = stack.pop()
+            if item is None:
+                continue
+            line_number = getattr(item, "line_number", None)
+            if line_number is not None:
+                self._line(line_number)
+            if callable(item):
+                more = item()
+            else:
+                more = getattr(self, "_" + type(item).__name__)(item)
+            if more:
+                stack.extend(reversed(more))
+
+    # Emitting
+
+    def _emit(self, op: int, arg: int = 0) -> None:
+        self._code.append(op)
+        self._code.append(arg)
+
+    def _line(self, line_number: int) -> None:
+        """
+        Record that the code emitted next comes from line_number
+        """
+        function = self._function
+        pc = len(self._code)
+        if function.line_starts and function.line_starts[-1] == pc:
+            function.line_numbers[-1] = line_number
+        elif not function.line_numbers or function.line_numbers[-1] != line_number:
+            function.line_starts.append(pc)
+            function.line_numbers.append(line_number)
+
+    def _const(self, value) -> int:
+        try:
+            key = (type(value), value)
+            hash(key)
+        except TypeError:
+            key = None
+        if key is not None and key in self._const_index:
+            return self._const_index[key]
+        self._function.consts.append(value)
+        index = len(self._function.consts) - 1
+        if key is not None:
+            self._const_index[key] = index
+        return index
+
+    def _jump(self, op: int, label: _Label) -> None:
+        self._emit(op, -1 if label.target is None else label.target)
+        if label.target is None:
+            label.uses.append(len(self._code) - 1)
+
+    def _mark(self, label: _Label) -> None:
+        label.target = len(self._code)
+        for use in label.uses:
+            self._code[use] = label.target
+
+    def _then(self, op: int, arg: int = 0):
+        return lambda: self._emit(op, arg)
+
+    # Names
+
+    def _declare(self, name: str, var_type: Optional[str]) -> _Variable:
+        if self._scopes:
+            variable = _Variable(False, self._function.local_count, var_type)
+            self._function.local_count += 1
+            self._scopes[-1].append(name)
+            self._visible.setdefault(name, []).append(variable)
+        else:
+            variable = _Variable(True, self._global_count, var_type)
+            self._global_count += 1
+            self._globals[name] = variable
+        return variable
+
+    def _lookup(self, name: str) -> _Variable:
+        if name in self._visible:
+            return self._visible[name][-1]
+        if name in self._globals:
+            return self._globals[name]
+        raise BackendError(f"'{name}' is not a variable")
+
+    def _load(self, variable: _Variable) -> None:
+        self._emit(LOAD_GLOBAL if variable.is_global else LOAD, variable.slot)
+
+    def _store(self, variable: _Variable) -> None:
+        self._emit(STORE_GLOBAL if variable.is_global else STORE, variable.slot)
+
+    def _enter_scope(self) -> None:
+        self._scopes.append([])
+
+    def _exit_scope(self) -> None:
+        for name in self._scopes.pop():
+            variables = self._visible[name]
+            variables.pop()
+            if not variables:
+                del self._visible[name]
+
+    def _push_scope(self):
+        return self._enter_scope
+
+    def _pop_scope(self):
+        return self._exit_scope
+
+    # Types
+
+    def _default(self, var_type: Optional[str], none_for_other: bool = False):
+        if var_type in _SCALAR_DEFAULTS:
+            return _SCALAR_DEFAULTS[var_type]
+        if var_type in self._structs:
+            return tuple(
+                self._default(scalar_type(field_type))
+                for _, field_type in self._structs[var_type].fields
+            )
+        if var_type in self._classes:
+            raise BackendError(f"Objects of CLASS {var_type} cannot be created by the VM backend")
+        if none_for_other:
+            return None
+        raise BackendError(f"Unknown type {var_type}")
+
+    def _convert(self, node, to_type: Optional[str]):
+        """
+        :return: A callback that converts the value of node as C++ converts it
+            on assignment to to_type
+        """
+        from_type = scalar_type(node.value_type)
+        to_type = scalar_type(to_type)
+        if to_type == "INT" and from_type not in ("INT", "BOOL"):
+            return self._then(CONVERT, TO_INT)
+        if to_type == "FLOAT" and not (
+            from_type == "FLOAT" and isinstance(node, (NameNode, CallNode))
+        ):
+            return self._then(CONVERT, TO_FLOAT)
+        if to_type == "BOOL" and from_type != "BOOL":
+            return self._then(CONVERT, TO_BOOL)
+        return None
+
+    def _assign(self, node, variable_of):
+        """
+        :param variable_of: Returns the variable once node is compiled, so a
+            declaration does not see itself in its initializer
+        """
+
+        def store():
+            variable = variable_of()
+            convert = self._convert(node, variable.var_type)
+            if convert:
+                convert()
+            self._store(variable)
+
+        return [node, store]
+
+    # Statements
+
+    def _LetNode(self, node: LetNode):
+        var_type = scalar_type(node.var_type)
+        if not node.construct:
+            return self._assign(node.expr, lambda: self._declare(node.name, var_type))
+
+        if var_type in _SCALAR_DEFAULTS:
+            if node.expr is None:
+                self._emit(CONST, self._const(_SCALAR_DEFAULTS[var_type]))
+                self._store(self._declare(node.name, var_type))
+                return None
+            return self._assign(node.expr, lambda: self._declare(node.name, var_type))
+
+        default = self._default(var_type)
+        if node.expr is None:
+            self._emit(CONST, self._const(default))
+            self._store(self._declare(node.name, var_type))
+            return None
+
+        # Aggregate initialization sets the first field
+        field_type = scalar_type(self._structs[var_type].fields[0][1])
+
+        def build():
+            convert = self._convert(node.expr, field_type)
+            if convert:
+                convert()
+            for value in default[1:]:
+                self._emit(CONST, self._const(value))
+            self._emit(BUILD, len(default))
+            self._store(self._declare(node.name, var_type))
+
+        return [node.expr, build]
+
+    def _DimNode(self, node: DimNode):
+        var_type = scalar_type(node.var_type)
+        default = self._default(var_type)
+
+        def allocate():
+            self._emit(NEW_ARRAY, self._const(default))
+            self._store(self._declare(node.name, None))
+
+        if node.size is None:
+            self._emit(CONST, self._const(0))
+            return [allocate]
+        return [node.size, self._convert(node.size, "INT"), allocate]
+
+    def _AssignNode(self, node: AssignNode):
+        return self._assign(node.expr, lambda: self._lookup(node.name))
+
+    def _IfNode(self, node: IfNode):
+        end = _Label()
+        items = []
+        for condition, body in node.branches:
+            skip = _Label()
+            items += [
+                condition,
+                lambda skip=skip: self._jump(JUMP_IF_FALSE, skip),
+                self._push_scope(),
+                *body,
+                self._pop_scope(),
+                lambda: self._jump(JUMP, end),
+                lambda skip=skip: self._mark(skip),
+            ]
+        if node.else_body is not None:
+            items += [self._push_scope(), *node.else_body, self._pop_scope()]
+        items.append(lambda: self._mark(end))
+        return items
+
+    def _loop(self, break_label: _Label, continue_label: _Label):
+        def enter():
+            self._breaks.append(break_label)
+            self._continues.append(continue_label)
+            self._enter_scope()
+
+        def leave():
+            self._breaks.pop()
+            self._continues.pop()
+            self._exit_scope()
+
+        return enter, leave
+
+    def _WhileNode(self, node: WhileNode):
+        start, end = _Label(), _Label()
+        enter, leave = self._loop(end, start)
+        self._mark(start)
+        return [
+            node.condition,
+            lambda: self._jump(JUMP_IF_FALSE, end),
+            enter,
+            *node.statements,
+            leave,
+            lambda: self._jump(JUMP, start),
+            lambda: self._mark(end),
+        ]
+
+    def _DoNode(self, node: DoNode):
+        start, test, end = _Label(), _Label(), _Label()
+        enter, leave = self._loop(end, test)
+        self._mark(start)
+        items = [enter, *node.statements, leave, lambda: self._mark(test)]
+        if node.condition is not None:
+            items += [node.condition, lambda: self._jump(JUMP_IF_TRUE, start)]
+        items.append(lambda: self._mark(end))
+        return items
+
+    def _ForNode(self, node: ForNode):
+        test, step, end = _Label(), _Label(), _Label()
+        enter, leave = self._loop(end, step)
+        counter = []
+
+        def declare():
+            self._enter_scope()
+            counter.append(self._declare(node.var, "INT"))
+            self._store(counter[0])
+            self._mark(test)
+            self._load(counter[0])
+
+        def increment():
+            self._mark(step)
+            if node.step is None:
+                self._emit(INC, counter[0].slot)
+                return None
+            self._load(counter[0])
+            return [node.step, add_step]
+
+        def add_step():
+            if scalar_type(node.step.value_type) in ("INT", "BOOL"):
+                self._emit(ADD_INT)
+            else:
+                self._emit(BINARY, _GENERIC_OPS.index("+"))
+                self._emit(CONVERT, TO_INT)
+            self._store(counter[0])
+
+        def close():
+            self._jump(JUMP, test)
+            self._mark(end)
+            self._exit_scope()
+
+        return [
+            node.start,
+            self._convert(node.start, "INT"),
+            declare,
+            node.end,
+            self._then(LE),
+            lambda: self._jump(JUMP_IF_FALSE, end),
+            enter,
+            *node.statements,
+            leave,
+            increment,
+            close,
+        ]
+
+    def _SwitchNode(self, node: SwitchNode):
+        end = _Label()
+        labels = [_Label() for _ in node.cases]
+        default = _Label()
+
+        def enter():
+            # BREAK leaves the SWITCH; CONTINUE still continues the loop around it
+            self._breaks.append(end)
+            self._enter_scope()
+
+        def leave():
+            self._breaks.pop()
+            self._exit_scope()
+
+        items = [node.expr]
+        if node.values is not None:
+            table = {}
+
+            def dispatch():
+                self._emit(SWITCH, self._const((table, -1)))
+                switch_const = len(self._code) - 1
+
+                def fill():
+                    for value, label in zip(node.values, labels):
+                        table.setdefault(value, label.target)
+                    target = default.target if node.default_body is not None else end.target
+                    index = self._code[switch_const]
+                    self._function.consts[index] = (table, target)
+
+                return fill
+
+            fills = []
+            items.append(lambda: fills.append(dispatch()))
+            finish = [lambda: fills[0]()]
+        else:
+            subject = []
+
+            def store_subject():
+                subject.append(self._declare("<switch>", node.expr.value_type))
+                self._store(subject[0])
+
+            items.append(store_subject)
+            for (label, _), target in zip(node.cases, labels):
+                items += [
+                    lambda: self._load(subject[0]),
+                    label,
+                    self._then(EQ),
+                    lambda target=target: self._jump(JUMP_IF_TRUE, target),
+                ]
+            items.append(
+                lambda: self._jump(JUMP, default if node.default_body is not None else end)
+            )
+            finish = []
+
+        items.append(enter)
+        for (_, body), label in zip(node.cases, labels):
+            items += [
+                lambda label=label: self._mark(label),
+                *body,
+                lambda: self._jump(JUMP, end),
+            ]
+        if node.default_body is not None:
+            items += [lambda: self._mark(default), *node.default_body]
+        items += [leave, lambda: self._mark(end), *finish]
+        return items
+
+    def _InputNode(self, node: InputNode):
+        variable = self._lookup(node.name)
+        self._emit(
+            INPUT, self._const((variable.is_global, variable.slot, variable.var_type))
+        )
+
+    def _PrintNode(self, node: PrintNode):
+        color = _COLORS[node.color] if node.color is not None else None
+        return [node.expr, lambda: self._emit(PRINT, self._const(color))]
+
+    def _OpenNode(self, node: OpenNode):
+        variable = self._declare(node.name, None)
+        self._emit(
+            OPEN,
+            self._const((node.file_name, node.mode, variable.is_global, variable.slot)),
+        )
+
+    def _CloseNode(self, node: CloseNode):
+        variable = self._lookup(node.name)
+        self._emit(CLOSE, self._const((variable.is_global, variable.slot)))
+
+    def _BreakNode(self, node: BreakNode):
+        if not self._breaks:
+            raise BackendError("BREAK outside a loop or SWITCH")
+        self._jump(JUMP, self._breaks[-1])
+
+    def _ContinueNode(self, node: ContinueNode):
+        if not self._continues:
+            raise BackendError("CONTINUE outside a loop")
+        self._jump(JUMP, self._continues[-1])
+
+    def _ReturnNode(self, node: ReturnNode):
+        if node.expr is None:
+            self._emit(CONST, self._const(self._default(self._return_type, none_for_other=True)))
+            self._emit(RETURN)
+            return None
+        return [
+            node.expr,
+            self._convert(node.expr, self._return_type),
+            self._then(RETURN),
+        ]
+
+    def _CallStmtNode(self, node: CallStmtNode):
+        return [node.call, self._then(POP)]
+
+    # Expressions
+
+    def _LiteralNode(self, node: LiteralNode):
+        self._emit(CONST, self._const(node.value))
+
+    def _NameNode(self, node: NameNode):
+        if node.constant is not None:
+            self._emit(CONST, self._const(node.constant))
+        else:
+            self._load(self._lookup(node.name))
+
+    def _GroupNode(self, node: GroupNode):
+        return [node.expr]
+
+    def _UnaryNode(self, node: UnaryNode):
+        if node.op == "!":
+            return [node.operand, self._then(NOT)]
+        if node.op == "+":
+            return [node.operand]
+        operand_type = scalar_type(node.operand.value_type)
+        if operand_type in ("INT", "BOOL"):
+            op = NEG_INT
+        elif operand_type == "FLOAT":
+            op = NEG_FLOAT
+        else:
+            op = NEG
+        return [node.operand, self._then(op)]
+
+    def _BinaryNode(self, node: BinaryNode):
+        if node.op in ("&&", "||"):
+            return self._logical(node)
+        if node.op in _COMPARISON_OPS:
+            if float_operands(node.left, node.right):
+                return [
+                    node.left,
+                    self._float_operand(node.left),
+                    node.right,
+                    self._float_operand(node.right),
+                    self._then(_COMPARISON_OPS[node.op]),
+                ]
+            return [node.left, node.right, self._then(_COMPARISON_OPS[node.op])]
+
+        left_type = scalar_type(node.left.value_type)
+        right_type = scalar_type(node.right.value_type)
+        if left_type in ("INT", "BOOL") and right_type in ("INT", "BOOL"):
+            op = _INT_OPS[node.op]
+        elif node.single:
+            # Computed in float as C++ does, not in double
+            return [
+                node.left,
+                self._float_operand(node.left),
+                node.right,
+                self._float_operand(node.right),
+                self._then(_FLOAT_OPS[node.op]),
+                self._then(CONVERT, TO_FLOAT),
+            ]
+        elif left_type in ("INT", "BOOL", "FLOAT") and right_type in ("INT", "BOOL", "FLOAT"):
+            op = _FLOAT_OPS[node.op]
+        elif left_type == right_type == "STRING" and node.op == "+":
+            op = CONCAT
+        else:
+            return [node.left, node.right, self._then(BINARY, _GENERIC_OPS.index(node.op))]
+        return [node.left, node.right, self._then(op)]
+
+    _ModNode = _BinaryNode
+    _PowNode = _BinaryNode
+
+    def _float_operand(self, node):
+        """
+        :return: A callback that rounds an integer operand of a float operator
+            to float, or None for a float one, which holds a float already
+        """
+        if scalar_type(node.value_type) in ("INT", "BOOL"):
+            return self._then(CONVERT, TO_FLOAT)
+        return None
+
+    def _logical(self, node: BinaryNode):
+        """
+        a && b and a || b evaluate b only when needed and give a BOOL
+        """
+        short, end = _Label(), _Label()
+        jump = JUMP_IF_FALSE if node.op == "&&" else JUMP_IF_TRUE
+        return [
+            node.left,
+            lambda: self._jump(jump, short),
+            node.right,
+            lambda: self._jump(jump, short),
+            lambda: self._emit(CONST, self._const(node.op == "&&")),
+            lambda: self._jump(JUMP, end),
+            lambda: self._mark(short),
+            lambda: self._emit(CONST, self._const(node.op != "&&")),
+            lambda: self._mark(end),
+        ]
+
+    def _CallNode(self, node: CallNode):
+        index, function = self._resolve(node)
+        items = []
+        writeback = []
+        for position, (param, arg) in enumerate(zip(function.params, node.args)):
+            items.append(arg)
+            if param.mode == "ref":
+                variable = self._lookup(arg.name)
+                writeback.append((position, variable.is_global, variable.slot))
+            else:
+                items.append(self._convert(arg, param.param_type))
+        items.append(lambda: self._emit(CALL, self._const((index, tuple(writeback)))))
+        return items
+
+    def _resolve(self, node: CallNode):
+        return resolve_call(self._signatures, node)
+
+
+def resolve_call(signatures: dict, node: CallNode):
+    """
+    :param signatures: For each function name, its (index, FunctionNode) overloads
+    :return: The index and node of the function a call refers to, choosing
+        an overload by argument count and types
+    """
+    candidates = [
+        (index, function)
+        for index, function in signatures.get(node.name, ())
+        if len(function.params) == len(node.args)
+    ]
+    if not candidates:
+        raise BackendError(f"No function {node.name} takes {len(node.args)} arguments")
+    for index, function in candidates:
+        if all(
+            scalar_type(param.param_type) == scalar_type(arg.value_type)
+            for param, arg in zip(function.params, node.args)
+        ):
+            return index, function
+    return candidates[0]
+
+
+def compile_program(program: ProgramNode) -> BytecodeProgram:
+    """
+    :raise BackendError: If the program uses what the machine cannot run
+    """
+    return BytecodeCompiler().compile(program)
+
+
+# Run time
+
+_INT_PREFIX = re.compile(r"[+-]?\d+")
+_FLOAT_PREFIX = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?|[+-]?(inf|nan)", re.I)
+
+
+def _convert(value, kind: int):
+    if kind == TO_INT:
+        return to_int(value)
+    if kind == TO_FLOAT:
+        return to_float32(value)
+    return bool(value)
+
+
+def _is_integral(value) -> bool:
+    return isinstance(value, int)
+
+
+def arith(op: str, left, right):
+    """
+    An arithmetic operator whose operand types were not known at compile time
+    """
+    if isinstance(left, str) or isinstance(right, str):
+        if op == "+" and isinstance(left, str) and isinstance(right, str):
+            return left + right
+        raise VMError(f"Cannot apply {op} to a STRING")
+    if _is_integral(left) and _is_integral(right):
+        if op == "+":
+            return to_int(left + right)
+        if op == "-":
+            return to_int(left - right)
+        if op == "*":
+            return to_int(left * right)
+        if op == "/":
+            return int_div(left, right)
+        if op == "%":
+            return int_mod(left, right)
+        return int_pow(left, right)
+    if op == "+":
+        return left + right
+    if op == "-":
+        return left - right
+    if op == "*":
+        return left * right
+    if op == "/":
+        return float_div(left, right)
+    if op == "%":
+        return float_mod(left, right)
+    return float_pow(left, right)
+
+
+def format_value(value) -> str:
+    """
+    :return: The text cout prints for value
+    """
+    if type(value) is str:
+        return value
+    if type(value) is bool:
+        return "1" if value else "0"
+    if type(value) is float:
+        return "%g" % value
+    if type(value) is int:
+        return str(value)
+    raise VMError("Cannot PRINT a STRUCT or an array")
+
+
+def _location(function: BytecodeFunction, pc: int) -> str:
+    """
+    :return: Where the instruction at code index pc comes from, for messages
+    """
+    line_number = function.line_at(pc)
+    if line_number is None:
+        return f"in '{function.name}'"
+    return f"in '{function.name}' at line {line_number}"
+
+
+class InputReader:
+    def __init__(self, stdin, stdout):
+        """
+        :param stdout: Flushed before reading, as cin flushes cout
+        """
+        self._stdin = stdin
+        self._stdout = stdout
+        self._pending = []
+
+    def read_token(self) -> Optional[str]:
+        """
+        :return: The next whitespace-separated word of input, None at the end
+        """
+        self._stdout.flush()
+        while not self._pending:
+            line = self._stdin.readline()
+            if not line:
+                return None
+            self._pending = line.split()[::-1]
+        return self._pending.pop()
+
+    def read_value(self, value_type: Optional[str], old):
+        """
+        :return: The value cin >> reads into a variable of value_type
+        """
+        token = self.read_token()
+        if value_type == "STRING":
+            return old if token is None else token
+        if token is None:
+            return 0.0 if value_type == "FLOAT" else 0
+        if value_type == "FLOAT":
+            match = _FLOAT_PREFIX.match(token)
+            return to_float32(float(match.group())) if match else 0.0
+        match = _INT_PREFIX.match(token)
+        value = to_int(int(match.group())) if match else 0
+        return value != 0 if value_type == "BOOL" else value
+
+
+class Machine:
+    def __init__(self, program: BytecodeProgram, stdin=None, stdout=None):
+        """
+        :param stdin: Where INPUT reads, sys.stdin by default
+        :param stdout: Where PRINT writes, sys.stdout by default
+        """
+        self._program = program
+        self._stdout = stdout or sys.stdout
+        self._input = InputReader(stdin or sys.stdin, self._stdout)
+
+    def run(self) -> int:
+        """
+        Run main()
+
+        :return: What main returned, as the exit status
+        :raise VMError: If the program divides an integer by zero or recurses
+            too deeply
+        """
+        functions = self._program.functions
+        globals_ = [None] * self._program.global_count
+        write = self._stdout.write
+        memo_caches = {}
+        frames = []
+
+        function = functions[self._program.entry]
+        code = function.code
+        consts = function.consts
+        locals_ = []
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        try:
+            while True:
+                op = code[pc]
+                arg = code[pc + 1]
+                pc += 2
+                if op == LOAD:
+                    push(locals_[arg])
+                elif op == CONST:
+                    push(consts[arg])
+                elif op == STORE:
+                    locals_[arg] = pop()
+                elif op == JUMP_IF_FALSE:
+                    if not pop():
+                        pc = arg
+                elif op == JUMP:
+                    pc = arg
+                elif op == INC:
+                    value = locals_[arg] + 1
+                    locals_[arg] = value if value <= INT_MAX else INT_MIN
+                elif op == ADD_INT:
+                    right = pop()
+                    value = pop() + right
+                    push(value if INT_MIN <= value <= INT_MAX else wrap_int(value))
+                elif op == SUB_INT:
+                    right = pop()
+                    value = pop() - right
+                    push(value if INT_MIN <= value <= INT_MAX else wrap_int(value))
+                elif op == MUL_INT:
+                    right = pop()
+                    value = pop() * right
+                    push(value if INT_MIN <= value <= INT_MAX else wrap_int(value))
+                elif op == LT:
+                    right = pop()
+                    push(pop() < right)
+                elif op == LE:
+                    right = pop()
+                    push(pop() <= right)
+                elif op == GT:
+                    right = pop()
+                    push(pop() > right)
+                elif op == GE:
+                    right = pop()
+                    push(pop() >= right)
+                elif op == EQ:
+                    right = pop()
+                    push(pop() == right)
+                elif op == NE:
+                    right = pop()
+                    push(pop() != right)
+                elif op == CALL:
+                    index, writeback = consts[arg]
+                    callee = functions[index]
+                    count = callee.param_count
+                    if count:
+                        args = stack[-count:]
+                        del stack[-count:]
+                    else:
+                        args = []
+                    cache = key = None
+                    if callee.memo:
+                        cache = memo_caches.setdefault(index, {})
+                        key = tuple(args)
+                        if key in cache:
+                            push(cache[key])
+                            continue
+                    if len(frames) >= MAX_CALL_DEPTH:
+                        raise VMError(f"Calls nested too deeply {_location(function, pc - 2)}")
+                    frames.append((function, code, consts, locals_, stack, pc, writeback, cache, key))
+                    function = callee
+                    code = callee.code
+                    consts = callee.consts
+                    locals_ = args
+                    locals_ += [None] * (callee.local_count - count)
+                    stack = []
+                    push = stack.append
+                    pop = stack.pop
+                    pc = 0
+                elif op == RETURN:
+                    value = pop()
+                    if not frames:
+                        return value
+                    returned = locals_
+                    returned_limit = function.memo_limit
+                    function, code, consts, locals_, stack, pc, writeback, cache, key = frames.pop()
+                    push = stack.append
+                    pop = stack.pop
+                    if cache is not None:
+                        # Results of a pure function: which ones are kept
+                        # changes only the speed
+                        if returned_limit is not None and len(cache) >= returned_limit:
+                            del cache[next(iter(cache))]
+                        cache[key] = value
+                    for position, is_global, slot in writeback:
+                        if is_global:
+                            globals_[slot] = returned[position]
+                        else:
+                            locals_[slot] = returned[position]
+                    push(value)
+                elif op == LOAD_GLOBAL:
+                    push(globals_[arg])
+                elif op == STORE_GLOBAL:
+                    globals_[arg] = pop()
+                elif op == JUMP_IF_TRUE:
+                    if pop():
+                        pc = arg
+                elif op == ADD_FLOAT:
+                    right = pop()
+                    push(pop() + right)
+                elif op == SUB_FLOAT:
+                    right = pop()
+                    push(pop() - right)
+                elif op == MUL_FLOAT:
+                    right = pop()
+                    push(pop() * right)
+                elif op == DIV_FLOAT:
+                    right = pop()
+                    push(float_div(pop(), right))
+                elif op == DIV_INT:
+                    right = pop()
+                    push(int_div(pop(), right))
+                elif op == MOD_INT:
+                    right = pop()
+                    push(int_mod(pop(), right))
+                elif op == MOD_FLOAT:
+                    right = pop()
+                    push(float_mod(pop(), right))
+                elif op == POW_INT:
+                    right = pop()
+                    push(int_pow(pop(), right))
+                elif op == POW_FLOAT:
+                    right = pop()
+                    push(float_pow(pop(), right))
+                elif op == CONCAT:
+                    right = pop()
+                    push(pop() + right)
+                elif op == BINARY:
+                    right = pop()
+                    push(arith(_GENERIC_OPS[arg], pop(), right))
+                elif op == NEG_INT:
+                    value = -pop()
+                    push(value if value <= INT_MAX else INT_MIN)
+                elif op == NEG_FLOAT:
+                    push(-pop())
+                elif op == NEG:
+                    value = pop()
+                    if isinstance(value, str):
+                        raise VMError("Cannot negate a STRING")
+                    push(to_int(-value) if _is_integral(value) else -value)
+                elif op == NOT:
+                    push(not pop())
+                elif op == CONVERT:
+                    push(_convert(pop(), arg))
+                elif op == SWITCH:
+                    table, default = consts[arg]
+                    pc = table.get(pop(), default)
+                elif op == PRINT:
+                    color = consts[arg]
+                    if color is None:
+                        write(format_value(pop()) + "\n")
+                    else:
+                        write(f"\033[1;{color}m{format_value(pop())}\033[0m\n")
+                elif op == INPUT:
+                    is_global, slot, value_type = consts[arg]
+                    variables = globals_ if is_global else locals_
+                    variables[slot] = self._input.read_value(value_type, variables[slot])
+                elif op == OPEN:
+                    file_name, mode, is_global, slot = consts[arg]
+                    try:
+                        handle = open(file_name, "r" if mode == "INPUT" else "w")
+                    except OSError:
+                        # An fstream that failed to open is still a closed stream
+                        handle = None
+                    (globals_ if is_global else locals_)[slot] = handle
+                elif op == CLOSE:
+                    is_global, slot = consts[arg]
+                    handle = (globals_ if is_global else locals_)[slot]
+                    if handle is not None:
+                        handle.close()
+                elif op == POP:
+                    pop()
+                elif op == NEW_ARRAY:
+                    push([consts[arg]] * max(0, pop()))
+                elif op == BUILD:
+                    values = stack[-arg:]
+                    del stack[-arg:]
+                    push(tuple(values))
+                else:
+                    raise VMError(f"Unknown opcode {op}")
+        except ZeroDivisionError:
+            raise VMError(f"Integer division by zero {_location(function, pc - 2)}")
+        finally:
+            self._stdout.flush()
+
+
+def run_program(program: BytecodeProgram, stdin=None, stdout=None) -> int:
+    """
+    :return: The exit status of the program
+    """
+    status = Machine(program, stdin, stdout).run()
+    return status & 0xFF if isinstance(status, int) else 0
@@ -0,0 +1,348 @@
+"""
+Bytecode cache files for ``--backend vm``, so a program that has not changed
+runs without lexing or parsing it again.
+
+A cache file holds one BytecodeProgram, little-endian:
+
+    header    magic b"BVM\\0", format version (u16), byte order of the code
+              arrays (u8), compiler version (u16 length + UTF-8), sha256 of
+              the source and the options that change the bytecode (32 bytes)
+    program   global count, entry function, function count (u32 each)
+    function  name, param count, local count (u32), memo limit (i32; -1 no
+              limit, -2 not memoized), then three int32 arrays (u32 length +
+              items): the code, the line table's code indexes and its lines,
+              then the constant pool
+
+The constant pool is a u32 count of constants and of records, then the
+records in postfix order: None, booleans, ints, doubles and strings each
+make one record, and a tuple or a SWITCH table's dict follows its items with
+a record holding their count. Nested constants need no recursion either way.
+
+A file whose header does not match the source, the compiler or this module
+is ignored and replaced. Files are read through mmap and written under a
+temporary name, then renamed over the old one, so a reader never sees half
+a file.
+"""
+
+import array
+import hashlib
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from typing import List, Optional
+
+from basic_compiler.basic_argparser import VERSION
+from basic_compiler.basic_vm import BytecodeFunction, BytecodeProgram
+
+MAGIC = b"BVM\0"
+# Bump whenever the layout or the meaning of the bytecode changes
+FORMAT_VERSION = 2
+SUFFIX = ".bvm"
+
+_BYTE_ORDERS = {"little": 0, "big": 1}
+_NO_LIMIT = -1
+_NOT_MEMO = -2
+
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_I32 = struct.Struct("<i")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+
+# Constant records
+_NONE = 0
+_FALSE = 1
+_TRUE = 2
+_INT = 3
+_BIG_INT = 4
+_FLOAT = 5
+_STR = 6
+_TUPLE = 7
+_DICT = 8
+
+
+class CacheFormatError(Exception):
+    pass
+
+
+def source_digest(source: List[str], ctfe_steps: int) -> bytes:
+    """
+    :param source: The program's lines
+    :param ctfe_steps: Folding calls changes the bytecode, so the budget is
+        part of the key
+    """
+    digest = hashlib.sha256(f"{ctfe_steps}\0".encode())
+    for line in source:
+        digest.update(line.encode())
+    return digest.digest()
+
+
+def cache_path(input: str, cache_dir: str = None) -> str:
+    """
+    :return: Where the bytecode of input is cached: next to it, or in
+        cache_dir under a name derived from its absolute path
+    """
+    if cache_dir is None:
+        return os.path.splitext(input)[0] + SUFFIX
+    name = hashlib.sha256(os.path.abspath(input).encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, name + SUFFIX)
+
+
+class _Close:
+    # Ends the items of a tuple or dict while writing the constant pool
+    def __init__(self, record: int, count: int):
+        self.record = record
+        self.count = count
+
+
+class _Writer:
+    def __init__(self):
+        self._parts = []
+
+    def raw(self, data: bytes) -> None:
+        self._parts.append(data)
+
+    def pack(self, format: struct.Struct, value) -> None:
+        self._parts.append(format.pack(value))
+
+    def text(self, value: str) -> None:
+        data = value.encode()
+        self.pack(_U32, len(data))
+        self.raw(data)
+
+    def ints(self, values: array.array) -> None:
+        self.pack(_U32, len(values))
+        if sys.byteorder == "big":
+            values = array.array("i", values)
+            values.byteswap()
+        self.raw(values.tobytes())
+
+    def consts(self, consts: list) -> None:
+        records = _Writer()
+        count = 0
+        stack = list(reversed(consts))
+        while stack:
+            value = stack.pop()
+            count += 1
+            if isinstance(value, _Close):
+                records.pack(_U8, value.record)
+                records.pack(_U32, value.count)
+            elif value is None:
+                records.pack(_U8, _NONE)
+            elif value is True or value is False:
+                records.pack(_U8, _TRUE if value else _FALSE)
+            elif isinstance(value, int):
+                if -(2**63) <= value < 2**63:
+                    records.pack(_U8, _INT)
+                    records.pack(_I64, value)
+                else:
+                    records.pack(_U8, _BIG_INT)
+                    records.text(str(value))
+            elif isinstance(value, float):
+                records.pack(_U8, _FLOAT)
+                records.pack(_F64, value)
+            elif isinstance(value, str):
+                records.pack(_U8, _STR)
+                records.text(value)
+            elif isinstance(value, tuple):
+                count -= 1
+                stack.append(_Close(_TUPLE, len(value)))
+                stack.extend(reversed(value))
+            elif isinstance(value, dict):
+                count -= 1
+                stack.append(_Close(_DICT, len(value)))
+                for item in reversed(list(value.items())):
+                    stack.extend(reversed(item))
+            else:
+                raise CacheFormatError(
+                    f"Cannot cache a constant of type {type(value).__name__}"
+                )
+        self.pack(_U32, len(consts))
+        self.pack(_U32, count)
+        self.raw(records.getvalue())
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._parts)
+
+
+class _Reader:
+    def __init__(self, data):
+        self._data = data
+        self._offset = 0
+
+    def unpack(self, format: struct.Struct):
+        try:
+            value = format.unpack_from(self._data, self._offset)[0]
+        except struct.error:
+            raise CacheFormatError("The cache file is truncated")
+        self._offset += format.size
+        return value
+
+    def raw(self, size: int) -> bytes:
+        if self._offset + size > len(self._data):
+            raise CacheFormatError("The cache file is truncated")
+        data = self._data[self._offset:self._offset + size]
+        self._offset += size
+        return data
+
+    def text(self) -> str:
+        return self.raw(self.unpack(_U32)).decode()
+
+    def ints(self) -> array.array:
+        values = array.array("i")
+        values.frombytes(self.raw(self.unpack(_U32) * values.itemsize))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def consts(self) -> list:
+        count = self.unpack(_U32)
+        records = self.unpack(_U32)
+        values = []
+        for _ in range(records):
+            record = self.unpack(_U8)
+            if record == _NONE:
+                values.append(None)
+            elif record == _FALSE:
+                values.append(False)
+            elif record == _TRUE:
+                values.append(True)
+            elif record == _INT:
+                values.append(self.unpack(_I64))
+            elif record == _BIG_INT:
+                values.append(int(self.text()))
+            elif record == _FLOAT:
+                values.append(self.unpack(_F64))
+            elif record == _STR:
+                values.append(self.text())
+            elif record in (_TUPLE, _DICT):
+                size = self.unpack(_U32) * (1 if record == _TUPLE else 2)
+                if size > len(values):
+                    raise CacheFormatError("The constant pool is corrupt")
+                items = values[len(values) - size:]
+                del values[len(values) - size:]
+                if record == _TUPLE:
+                    values.append(tuple(items))
+                else:
+                    values.append(dict(zip(items[::2], items[1::2])))
+            else:
+                raise CacheFormatError(f"Unknown constant record {record}")
+        if len(values) != count:
+            raise CacheFormatError("The constant pool is corrupt")
+        return values
+
+    def at_end(self) -> bool:
+        return self._offset == len(self._data)
+
+
+def _header(digest: bytes) -> bytes:
+    version = VERSION.encode()
+    return (
+        MAGIC
+        + _U16.pack(FORMAT_VERSION)
+        + _U8.pack(_BYTE_ORDERS["little"])
+        + _U16.pack(len(version))
+        + version
+        + digest
+    )
+
+
+def dumps(program: BytecodeProgram, digest: bytes) -> bytes:
+    """
+    :param digest: The source_digest the program was compiled from
+    """
+    writer = _Writer()
+    writer.raw(_header(digest))
+    writer.pack(_U32, program.global_count)
+    writer.pack(_U32, program.entry)
+    writer.pack(_U32, len(program.functions))
+    for function in program.functions:
+        writer.text(function.name)
+        writer.pack(_U32, function.param_count)
+        writer.pack(_U32, function.local_count)
+        if not function.memo:
+            writer.pack(_I32, _NOT_MEMO)
+        else:
+            writer.pack(_I32, _NO_LIMIT if function.memo_limit is None else function.memo_limit)
+        writer.ints(function.code)
+        writer.ints(function.line_starts)
+        writer.ints(function.line_numbers)
+        writer.consts(function.consts)
+    return writer.getvalue()
+
+
+def loads(data, digest: bytes) -> Optional[BytecodeProgram]:
+    """
+    :param data: The contents of a cache file, bytes or a mmap
+    :param digest: The source_digest of the program wanted
+    :return: The program, None if data was written for another source,
+        compiler or format
+    :raise CacheFormatError: If data is damaged
+    """
+    header = _header(digest)
+    if data[:len(header)] != header:
+        return None
+    reader = _Reader(data)
+    reader.raw(len(header))
+    global_count = reader.unpack(_U32)
+    entry = reader.unpack(_U32)
+    functions = []
+    for _ in range(reader.unpack(_U32)):
+        name = reader.text()
+        param_count = reader.unpack(_U32)
+        local_count = reader.unpack(_U32)
+        memo_limit = reader.unpack(_I32)
+        function = BytecodeFunction(
+            name,
+            param_count,
+            memo_limit != _NOT_MEMO,
+            memo_limit if memo_limit > 0 else None,
+        )
+        function.local_count = local_count
+        function.code = reader.ints()
+        function.line_starts = reader.ints()
+        function.line_numbers = reader.ints()
+        function.consts = reader.consts()
+        functions.append(function)
+    if not reader.at_end() or entry >= len(functions):
+        raise CacheFormatError("The cache file is corrupt")
+    return BytecodeProgram(functions, global_count, entry)
+
+
+def load(path: str, digest: bytes) -> Optional[BytecodeProgram]:
+    """
+    :return: The cached program, None if there is none for this source, or
+        the file cannot be used
+    """
+    try:
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return loads(data, digest)
+    except (OSError, ValueError, CacheFormatError, UnicodeDecodeError):
+        # A missing, empty or damaged file is recompiled and replaced
+        return None
+
+
+def store(path: str, program: BytecodeProgram, digest: bytes) -> bool:
+    """
+    :return: If the program was cached; a directory that cannot be written
+        only costs the next run a compilation
+    """
+    try:
+        data = dumps(program, digest)
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary = tempfile.mkstemp(dir=directory, prefix=".building-", suffix=SUFFIX)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+        finally:
+            if os.path.exists(temporary):
+                os.unlink(temporary)
+    except (OSError, CacheFormatError):
+        return False
+    return True
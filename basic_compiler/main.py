@@ -1,48 +1,286 @@
+# Only what every run needs is imported here; the compiler, logging and the
+# backends are imported where they are first used, so -V, a cached program or
+# a small file do not wait for modules they never run
+import os
 import sys
-import logging
-from basic_compiler.basic_argparser import parse_args
-from basic_compiler.basic_lex import Lexer
-from basic_compiler.basic_parser import Parser
-from basic_compiler.basic_emitter import Emitter
-from basic_compiler.basic_exceptions import (
-    LexerError,
-    TokenError,
-    ParserError,
-    SymbolTableError,
+from basic_compiler.basic_argparser import build_parser, check_args, parse_args
+from basic_compiler.basic_exceptions import VMError
+
+HEADER = (
+    "=====Basic Compiler=====\n"
+    "|    COPYRIGHT 2024    |\n"
+    "|    Version 1.0.0     |\n"
+    "|    Author: S.C. Lu   |\n"
+    "|  All rights reserved |\n"
+    "========================"
 )
 
 
-def main():
-    args = parse_args(sys.argv[1:])
-    logging.basicConfig(
-        level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s"
+def compile_args(
+    args,
+    log: "logging.Logger" = None,
+    stdout=None,
+    tool_output=None,
+    cache=None,
+    trace_memory: bool = True,
+    stdin=None,
+) -> int:
+    """
+    Compile args.input as the command line asks, see compile_file; with
+    --bench, benchmark it, see bench_args
+
+    :return: The exit status
+    """
+    if getattr(args, "bench", None):
+        return bench_args(args, log, stdout, tool_output)
+    return compile_file(args, log, stdout, tool_output, cache, trace_memory, stdin)[0]
+
+
+def against_args(args):
+    """
+    :return: args with the options of --bench-against added
+    """
+    import copy
+    import shlex
+
+    parser = build_parser()
+    # Options already in the namespace keep their values unless given again
+    against = parser.parse_args(
+        ["-i", args.input, *shlex.split(args.bench_against)], namespace=copy.copy(args)
     )
+    return check_args(parser, against)
+
+
+def bench_label(args) -> str:
+    """
+    :return: What a --bench variant is called in the report
+    """
+    if args.backend != "cpp":
+        return args.backend
+    return f"{args.target} -O{args.opt}"
+
+
+def bench_args(args, log: "logging.Logger" = None, stdout=None, tool_output=None) -> int:
+    """
+    Build args.input, then run it args.bench times after args.bench_warmup
+    runs and report the times; with --bench-against, do the same for the
+    program built with those options added and compare
+
+    :return: The exit status
+    """
+    import copy
+    import logging
+    from basic_compiler import basic_bench
+    from basic_compiler.basic_emitter import program_path
+    from basic_compiler.basic_vm import run_program
+
+    log = log or logging.getLogger()
+    stdout = stdout or sys.stdout
+    variants = [args]
+    if args.bench_against is not None:
+        variants.append(against_args(args))
+
+    records = []
+    for variant in variants:
+        variant = copy.copy(variant)
+        variant.execute = False
+        if variant.backend == "cpp" and not variant.pipe:
+            variant.compile = True
+        status, result = compile_file(variant, log, stdout, tool_output)
+        if status:
+            return status
+        if result.bytecode is not None:
+            bytecode = result.bytecode
+
+            def run_once():
+                return basic_bench.run_here(
+                    lambda stdin, out: run_program(bytecode, stdin, out), args.bench_input
+                )
+        elif result.pycode is not None:
+            pycode = result.pycode
+
+            def run_once():
+                return basic_bench.run_here(pycode.run, args.bench_input)
+        else:
+            program = result.program or program_path(variant.output)
+            if not os.path.exists(program):
+                log.error(f"The program {program} was not built")
+                return 1
+            command = [os.path.abspath(program)]
+
+            def run_once():
+                return basic_bench.run_child(command, args.bench_input)
+
+        label = bench_label(variant)
+        if records and label == records[0]["label"]:
+            label = args.bench_against
+        try:
+            records.append(basic_bench.bench(label, run_once, args.bench, args.bench_warmup))
+        except (OSError, VMError) as e:
+            log.error(f"Runtime error:\n {e}")
+            return 1
 
-    header = (
-        "=====Basic Compiler=====\n"
-        "|    COPYRIGHT 2024    |\n"
-        "|    Version 1.0.0     |\n"
-        "|    Author: S.C. Lu   |\n"
-        "|  All rights reserved |\n"
-        "========================"
+    log.info(f"{args.bench} runs after {args.bench_warmup} warm-up runs:")
+    log.info(basic_bench.report(records))
+    if args.bench_json is not None:
+        record = basic_bench.to_json(
+            records, input=args.input, runs=args.bench, warmup=args.bench_warmup
+        )
+        if args.bench_json == "-":
+            print(record, file=stdout)
+        else:
+            with open(args.bench_json, "w") as f:
+                f.write(record)
+    return 0
+
+
+def compile_file(
+    args,
+    log: "logging.Logger" = None,
+    stdout=None,
+    tool_output=None,
+    cache=None,
+    trace_memory: bool = True,
+    stdin=None,
+) -> "Tuple[int, Optional[CompileResult]]":
+    """
+    Compile args.input as the command line asks
+
+    :param args: The options from parse_args
+    :param log: Receives the messages, the root logger by default
+    :param stdout: Receives --timings-json - and what a program run in this
+        process (--backend vm or python) prints, sys.stdout by default
+    :param tool_output: Receives what clang-format and g++ print, the terminal by default
+    :param cache: Reuses the tokens and trees of sources compiled before, see
+        basic_server.SourceCache
+    :param trace_memory: Let --timings trace Python allocations
+    :param stdin: What a program run in this process reads, sys.stdin by default
+    :return: The exit status, and the result unless compilation failed
+    """
+    import logging
+    from basic_compiler.basic_api import CompileOptions, CompileResult, compile_source
+    from basic_compiler.basic_timings import PhaseTimer
+
+    log = log or logging.getLogger()
+    stdout = stdout or sys.stdout
+
+    timer = PhaseTimer(
+        enabled=args.timings or args.timings_json is not None,
+        trace_memory=trace_memory,
     )
-    logging.info(header)
 
     # try:
-    with open(args.input, "r") as f:
-        source = f.readlines()
+    with timer.phase("read"):
+        with open(args.input, "r") as f:
+            source = f.readlines()
 
     try:
-        lexer = Lexer(source)
-        emitter = Emitter(args)
-        parser = Parser(lexer, emitter)
-        parser.program()
-    except (LexerError, TokenError, ParserError, SymbolTableError) as e:
-        logging.error(f"Compilation error:\n {e}")
-        sys.exit(1)
+        if args.verbose or args.trace:
+            from basic_compiler.basic_trace import ParseTrace
+
+            trace = ParseTrace(echo=log.debug if args.verbose else None)
+        else:
+            trace = None
+        if args.backend == "vm":
+            from basic_compiler import basic_vm_cache
+            from basic_compiler.basic_vm import run_program
+        # A traced compilation has to parse
+        bytecode_path = (
+            basic_vm_cache.cache_path(args.input, args.bytecode_dir)
+            if args.backend == "vm" and not args.no_bytecode_cache and not trace
+            else None
+        )
+        if args.profile_lines and args.execute and args.backend == "cpp":
+            from basic_compiler import basic_profile
+
+            profile = basic_profile.profile_path(args.input)
+        else:
+            profile = None
+        if profile is not None and os.path.exists(profile):
+            # A program that fails must not leave an older profile to show
+            os.unlink(profile)
+        result = None
+        if bytecode_path is not None:
+            digest = basic_vm_cache.source_digest(source, args.ctfe_steps)
+            with timer.phase("load bytecode"):
+                bytecode = basic_vm_cache.load(bytecode_path, digest)
+            if bytecode is not None:
+                result = CompileResult(None, bytecode=bytecode)
+        if result is None:
+            result = compile_source(
+                source,
+                CompileOptions.from_args(args),
+                cache=cache,
+                trace=trace,
+                timer=timer,
+                tool_output=tool_output,
+            )
+            if not result.ok:
+                for message in result.diagnostics:
+                    log.error(f"Compilation error:\n {message}")
+                return 1, None
+            if bytecode_path is not None:
+                with timer.phase("store bytecode"):
+                    basic_vm_cache.store(bytecode_path, result.bytecode, digest)
+        if args.trace:
+            trace.export(args.trace)
+        if getattr(args, "bench", None):
+            # bench_args runs the program
+            pass
+        elif result.bytecode is not None:
+            with timer.phase("execute"):
+                run_program(result.bytecode, stdin, stdout)
+        elif result.pycode is not None:
+            with timer.phase("execute"):
+                result.pycode.run(stdin, stdout)
+        if profile is not None and os.path.exists(profile):
+            log.info(basic_profile.render(source, basic_profile.read_profile(profile)))
+    except VMError as e:
+        log.error(f"Runtime error:\n {e}")
+        return 1, None
     except Exception as e:
-        logging.error(f"Unexpected error:\n {e}")
-        sys.exit(1)
+        log.error(f"Unexpected error:\n {e}")
+        return 1, None
+    finally:
+        timer.stop()
+
+    if args.timings:
+        log.info(timer.report())
+    if args.timings_json == "-":
+        print(timer.to_json(input=args.input), file=stdout)
+    elif args.timings_json is not None:
+        with open(args.timings_json, "w") as f:
+            f.write(timer.to_json(input=args.input))
+    return 0, result
+
+
+def stream_logger(stream, verbose: bool = False) -> "logging.Logger":
+    """
+    :return: A logger that writes plain messages to stream only. It is not
+        registered with logging, so concurrent compilations keep their messages apart
+    """
+    import logging
+
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log = logging.Logger("basic_compiler")
+    log.setLevel(logging.DEBUG if verbose else logging.INFO)
+    log.addHandler(handler)
+    return log
+
+
+def main():
+    # -V and usage errors are answered before anything else is imported
+    args = parse_args(sys.argv[1:])
+    import logging
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO, format="%(message)s"
+    )
+    logging.info(HEADER)
+    status = compile_args(args)
+    if status:
+        sys.exit(status)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,9 @@
+"""
+Performance suite of the compiler's front end:
+
+    python -m benchmarks --lines 1000 10000 100000 1000000
+
+generate builds synthetic programs of any size and shape, phases times the
+lexer, the parser and the emitter of each separately. tests/test_scaling.py
+uses both to fail when a phase stops scaling linearly with the program.
+"""
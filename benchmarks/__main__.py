@@ -0,0 +1,61 @@
+import argparse
+import json
+import sys
+
+from benchmarks.generate import generate
+from benchmarks.phases import PHASES, exponent, time_phases
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="benchmarks",
+        description="Time the lexer, parser and emitter on synthetic programs",
+    )
+    parser.add_argument(
+        "--lines",
+        help="The sizes of the programs (default: 1000 10000 100000)",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 100000],
+    )
+    parser.add_argument(
+        "--functions", help="Functions per program (default: one per 100 lines)", type=int
+    )
+    parser.add_argument("--depth", help="Nesting depth of blocks (default: 2)", type=int, default=2)
+    parser.add_argument(
+        "--density", help="Operators per expression (default: 4)", type=int, default=4
+    )
+    parser.add_argument(
+        "--string-length", help="Length of string literals (default: 16)", type=int, default=16
+    )
+    parser.add_argument(
+        "--repeat", help="Keep the fastest of this many runs (default: 3)", type=int, default=3
+    )
+    parser.add_argument("--json", help="Write the results to this file ('-' for stdout)")
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results = []
+    print(f"{'lines':>10}" + "".join(f"{phase + ' ms':>12}" for phase in PHASES)
+          + "".join(f"{phase + ' k':>10}" for phase in PHASES))
+    for lines in sorted(args.lines):
+        source = generate(lines, args.functions, args.depth, args.density, args.string_length)
+        result = time_phases(source, args.repeat)
+        row = f"{result['lines']:>10}" + "".join(
+            f"{result[phase] * 1000:>12.1f}" for phase in PHASES
+        )
+        if results:
+            # How the time grew since the last size: 1 linear, 2 quadratic
+            row += "".join(f"{exponent(results[-1], result, phase):>10.2f}" for phase in PHASES)
+        print(row)
+        results.append(result)
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+    elif args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
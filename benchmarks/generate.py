@@ -0,0 +1,82 @@
+"""
+Synthetic BASIC programs for benchmarking the compiler
+"""
+
+from typing import List
+
+
+def expression(density: int, names: List[str]) -> str:
+    """
+    :param density: The number of binary operators
+    :param names: INT variables the expression reads
+    :return: An INT expression
+    """
+    operators = ["+", "*", "-", "%"]
+    text = names[0]
+    for index in range(density):
+        operator = operators[index % len(operators)]
+        # % by a constant, so it never divides by zero
+        operand = str(index % 9 + 1) if operator in "%*" else names[(index + 1) % len(names)]
+        text += f" {operator} {operand}"
+    return text
+
+
+def function(
+    index: int, lines: int, depth: int, density: int, string_length: int
+) -> List[str]:
+    """
+    :param index: Numbers the function f<index>; each calls the one before it
+    :param lines: About how many lines the function has
+    :return: The lines of the function
+    """
+    literal = "".join(chr(ord("a") + i % 26) for i in range(string_length))
+    names = ["x", "a", "b"]
+    source = [f"FUNCTION f{index}(a AS INT, b AS INT) AS INT\n", "    LET x AS INT = a\n"]
+    loops = 0
+    while len(source) < lines - 1:
+        indent = "    "
+        closing = []
+        for level in range(depth):
+            if level % 2 == 0:
+                loops += 1
+                source.append(f"{indent}FOR i{loops} = 1 TO b\n")
+                closing.append(f"{indent}ENDFOR\n")
+            else:
+                source.append(f"{indent}IF x > a THEN\n")
+                closing.append(f"{indent}ENDIF\n")
+            indent += "    "
+        source.append(f"{indent}x = {expression(density, names)}\n")
+        source.append(f'{indent}PRINT "{literal}"\n')
+        if index > 0:
+            source.append(f"{indent}x = f{index - 1}(x, b)\n")
+        source.extend(reversed(closing))
+    source.append("    RETURN x\n")
+    source.append("ENDFUNCTION\n")
+    return source
+
+
+def generate(
+    lines: int = 1000,
+    functions: int = None,
+    depth: int = 2,
+    density: int = 4,
+    string_length: int = 16,
+) -> List[str]:
+    """
+    :param lines: About how many lines the program has
+    :param functions: How many functions share the lines, one per 100 lines by default
+    :param depth: How deeply FOR and IF blocks nest in the functions
+    :param density: The number of operators in each expression
+    :param string_length: The length of the string literals printed
+    :return: The program's lines
+    """
+    functions = functions or max(1, lines // 100)
+    source = []
+    for index in range(functions):
+        source += function(index, lines // functions, depth, density, string_length)
+    source += [
+        "FUNCTION main() AS INT\n",
+        f"    PRINT f{functions - 1}(1, 2)\n",
+        "ENDFUNCTION\n",
+    ]
+    return source
@@ -0,0 +1,62 @@
+"""
+Time the lexer, the parser and the emitter separately
+"""
+
+import gc
+import math
+import time
+from typing import List
+
+from basic_compiler.basic_api import CompileOptions
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_lex import Lexer, TokenStream
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_token import TokenType
+
+PHASES = ("lex", "parse", "emit")
+
+
+def _lex(source: List[str]) -> None:
+    lexer = Lexer(source)
+    while lexer.get_token().token_type != TokenType.EOF:
+        pass
+
+
+def time_phases(source: List[str], repeat: int = 3) -> dict:
+    """
+    :param source: The program's lines
+    :param repeat: Time each phase this many times and keep the fastest
+    :return: The number of lines and the seconds of each phase, as
+        {"lines": ..., "lex": ..., "parse": ..., "emit": ...}
+    """
+    times = {phase: math.inf for phase in PHASES}
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        _lex(source)
+        times["lex"] = min(times["lex"], time.perf_counter() - start)
+
+        # The parser reads tokens lexed beforehand, so it is timed alone
+        tokens = TokenStream.tokenize(source)
+        emitter = Emitter(CompileOptions())
+        gc.collect()
+        start = time.perf_counter()
+        program = Parser(tokens, emitter).parse_program()
+        times["parse"] = min(times["parse"], time.perf_counter() - start)
+
+        gc.collect()
+        start = time.perf_counter()
+        program.emit(emitter)
+        emitter.code()
+        times["emit"] = min(times["emit"], time.perf_counter() - start)
+    return {"lines": len(source), **times}
+
+
+def exponent(small: dict, large: dict, phase: str) -> float:
+    """
+    :param small: The times of a program, from time_phases
+    :param large: The times of a larger program
+    :return: k where the time of phase grows like lines ** k between them:
+        about 1 when the phase is linear, 2 when quadratic
+    """
+    return math.log(large[phase] / small[phase]) / math.log(large["lines"] / small["lines"])
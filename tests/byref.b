@@ -0,0 +1,28 @@
+STRUCT point
+    x AS INT
+    y AS INT
+ENDSTRUCT
+
+FUNCTION shout(s AS STRING) AS STRING
+    RETURN s + "!"
+ENDFUNCTION
+
+FUNCTION pad(s AS STRING) AS STRING
+    s = s + " "
+    RETURN s
+ENDFUNCTION
+
+FUNCTION norm(p AS point) AS INT
+    RETURN 0
+ENDFUNCTION
+
+FUNCTION bump(BYREF n AS INT, delta AS INT) AS VOID
+    n = n + delta
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    LET count AS INT = 1
+    bump(count, 41)
+    PRINT count
+    PRINT shout(pad("hi"))
+ENDFUNCTION
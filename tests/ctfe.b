@@ -0,0 +1,21 @@
+CONST LET base AS INT = 4
+
+FUNCTION square(n AS INT) AS INT
+    RETURN n * n
+ENDFUNCTION
+
+FUNCTION table_size(levels AS INT) AS INT
+    LET size AS INT = 1
+    FOR i = 1 TO levels
+        size = size * 2
+    ENDFOR
+    RETURN size + square(base)
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    CONST LET cells AS INT = table_size(base)
+    DIM grid AS INT(table_size(3))
+    LET n AS INT = 5
+    PRINT cells
+    PRINT square(n)
+ENDFUNCTION
@@ -0,0 +1,22 @@
+FUNCTION main() AS INT
+    LET a AS FLOAT = 16777216
+    LET b AS FLOAT = 1
+    LET n AS INT = 16777217
+    LET t AS FLOAT = 0.1
+    LET c AS FLOAT = 4097
+    LET two AS FLOAT = 2
+
+    PRINT (a + b + b > 16777216)
+    PRINT (a + b + 1.0 > 16777216)
+    PRINT (a == n)
+    PRINT (a + n - a == 16777216.0)
+    PRINT t * 3 - 0.3
+    PRINT t * t * 1000000
+    PRINT (-t * 3 == -0.3)
+    PRINT (t / 3 * 3 == t)
+    PRINT (c ^ two == 16785409.0)
+    PRINT (c ^ 2.0 == 16785409.0)
+    PRINT (a + b + b) % 3
+    PRINT ((c * c) % two == 1.0)
+    RETURN 0
+ENDFUNCTION
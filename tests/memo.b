@@ -0,0 +1,23 @@
+MEMO FUNCTION fib(n AS INT) AS INT
+    IF n < 2 THEN
+        RETURN n
+    ENDIF
+    RETURN fib(n - 1) + fib(n - 2)
+ENDFUNCTION
+
+MEMO(64) FUNCTION paths(r AS INT, c AS INT) AS INT
+    IF r == 0 OR c == 0 THEN
+        RETURN 1
+    ENDIF
+    RETURN paths(r - 1, c) + paths(r, c - 1)
+ENDFUNCTION
+
+MEMO FUNCTION twice(s AS STRING) AS STRING
+    RETURN s + s
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    PRINT fib(40)
+    PRINT paths(10, 10)
+    PRINT twice("ab")
+ENDFUNCTION
@@ -0,0 +1,19 @@
+FUNCTION cube(n AS INT) AS INT
+    RETURN n ^ 3
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    LET a AS INT = 3
+    LET b AS INT = 13
+    LET x AS FLOAT = 2.0
+    PRINT a ^ 2
+    PRINT 2 ^ b
+    PRINT 2 ^ 3 ^ 2
+    PRINT -2 ^ 2
+    PRINT x ^ 0.5
+    PRINT b % 5
+    PRINT -b % 5
+    PRINT 7.5 % 2
+    PRINT 2 * a ^ 2 % 7
+    PRINT cube(a) + cube(4)
+ENDFUNCTION
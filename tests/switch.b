@@ -0,0 +1,53 @@
+CONST LET big AS INT = 100000
+
+FUNCTION color(name AS STRING) AS INT
+    SWITCH name
+        CASE "red"
+            RETURN 1
+        CASE "green"
+            RETURN 2
+        CASE "blue"
+            RETURN 3
+        CASE "cyan"
+            RETURN 4
+        CASE "pink"
+            RETURN 5
+        DEFAULT
+            RETURN 0
+    ENDSWITCH
+ENDFUNCTION
+
+FUNCTION bucket(n AS INT) AS INT
+    SWITCH n
+        CASE 1
+            RETURN 1
+        CASE 10
+            RETURN 2
+        CASE 100
+            RETURN 3
+        CASE 1000
+            RETURN 4
+        CASE 10000
+            RETURN 5
+        CASE big
+            RETURN 6
+        CASE -7
+            RETURN 7
+        CASE 999999
+            RETURN 8
+    ENDSWITCH
+    RETURN 0
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    PRINT color("cyan") * 10 + color("blue")
+    PRINT color("pink") * 10 + color("purple")
+    PRINT bucket(100000) * 10 + bucket(-7)
+    PRINT bucket(999999) * 10 + bucket(5)
+    SWITCH 2
+        CASE 1
+            PRINT "one"
+        CASE 2
+            PRINT "two"
+    ENDSWITCH
+ENDFUNCTION
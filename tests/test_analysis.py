@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_exceptions import ParserError
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+
+
+class TestPurity(unittest.TestCase):
+    def compile(self, source: str) -> str:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.cpp")
+            args = Namespace(output=output, format=False, compile=False, execute=False)
+            Parser(Lexer(source.splitlines(keepends=True)), Emitter(args)).program()
+            with open(output) as f:
+                return f.read()
+
+    def test_memo_dense_cache(self):
+        code = self.compile(
+            "MEMO FUNCTION fib(n AS INT) AS INT\n"
+            "    IF n < 2 THEN\n"
+            "        RETURN n\n"
+            "    ENDIF\n"
+            "    RETURN fib(n - 1) + fib(n - 2)\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertIn("int fib__impl(int n) {", code)
+        self.assertIn("static basic_memo_dense<int> fib__cache;", code)
+
+    def test_memo_lru_cache(self):
+        code = self.compile(
+            "MEMO(8) FUNCTION add(a AS INT, b AS INT) AS INT\n"
+            "    RETURN a + b\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertIn("static basic_memo_lru<std::tuple<int, int>, int> add__cache(8);", code)
+
+    def test_memo_rejects_impure(self):
+        sources = [
+            "MEMO FUNCTION f(n AS INT) AS INT\n    PRINT n\n    RETURN n\nENDFUNCTION\n",
+            "LET g AS INT = 0\n"
+            "MEMO FUNCTION f(n AS INT) AS INT\n    g = n\n    RETURN n\nENDFUNCTION\n",
+            "FUNCTION p(n AS INT) AS INT\n    INPUT n\n    RETURN n\nENDFUNCTION\n"
+            "MEMO FUNCTION f(n AS INT) AS INT\n    RETURN p(n)\nENDFUNCTION\n",
+            "MEMO FUNCTION f(n AS INT)\n    RETURN\nENDFUNCTION\n",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaises(ParserError):
+                    self.compile(source)
+
+    def test_memo_rejects_object_params(self):
+        sources = [
+            "STRUCT point\n    x AS INT\nENDSTRUCT\n"
+            "MEMO FUNCTION f(p AS point) AS INT\n    RETURN 1\nENDFUNCTION\n",
+            "CLASS box\n    LET v AS INT = 0\nENDCLASS\n"
+            "MEMO FUNCTION f(n AS INT, b AS box) AS INT\n    RETURN n\nENDFUNCTION\n",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaisesRegex(ParserError, "cannot cache its"):
+                    self.compile(source)
+
+
+class TestParamModes(unittest.TestCase):
+    compile = TestPurity.compile
+
+    def test_unmodified_string_is_const_ref(self):
+        code = self.compile(
+            "FUNCTION shout(s AS STRING, n AS INT) AS STRING\n"
+            "    RETURN s + \"!\"\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertIn("string shout(const string& s, int n) {", code)
+
+    def test_modified_string_is_copied(self):
+        code = self.compile(
+            "FUNCTION pad(s AS STRING) AS STRING\n"
+            "    s = s + \" \"\n"
+            "    RETURN s\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertIn("string pad(string s) {", code)
+
+    def test_byref(self):
+        code = self.compile(
+            "FUNCTION bump(BYREF n AS INT) AS VOID\n"
+            "    n = n + 1\n"
+            "ENDFUNCTION\n"
+            "FUNCTION twice(s AS STRING, BYREF t AS STRING) AS VOID\n"
+            "    t = s + s\n"
+            "ENDFUNCTION\n"
+            "FUNCTION wrap(s AS STRING) AS VOID\n"
+            "    twice(\"x\", s)\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertIn("void bump(int& n) {", code)
+        self.assertIn("void twice(const string& s, string& t) {", code)
+        # s is written through twice's BYREF parameter, so wrap keeps its copy
+        self.assertIn("void wrap(string s) {", code)
+
+    def test_byref_requires_variable(self):
+        with self.assertRaises(ParserError):
+            self.compile(
+                "FUNCTION bump(BYREF n AS INT) AS VOID\n"
+                "    n = n + 1\n"
+                "ENDFUNCTION\n"
+                "FUNCTION main() AS INT\n"
+                "    bump(1 + 2)\n"
+                "ENDFUNCTION\n"
+            )
+
+
+class TestSwitchChecks(unittest.TestCase):
+    compile = TestPurity.compile
+
+    def source(self, subject, *labels):
+        cases = "".join(f"        CASE {label}\n            PRINT 1\n" for label in labels)
+        return (
+            "FUNCTION main() AS INT\n"
+            "    LET s AS STRING = \"a\"\n"
+            "    LET t AS STRING = \"b\"\n"
+            "    LET n AS INT = 1\n"
+            f"    SWITCH {subject}\n{cases}    ENDSWITCH\n"
+            "ENDFUNCTION\n"
+        )
+
+    def test_string_switch_is_hashed(self):
+        code = self.compile(self.source("s", '"ab"', '"cd"', '"e"'))
+        self.assertIn("basic_str_hash(", code)
+        self.assertNotIn("switch (\ns\n)", code)
+
+    def test_string_switch_with_only_default(self):
+        source = self.source("s").replace(
+            "    ENDSWITCH\n", "        DEFAULT\n            PRINT 1\n    ENDSWITCH\n"
+        )
+        code = self.compile(source)
+        self.assertIn("int basic_case1 = -1;", code)
+        self.assertNotIn("switch (\ns\n)", code)
+
+    def test_rejected_labels(self):
+        sources = [
+            self.source("s", '"a"', '"a"'),
+            self.source("s", "t"),
+            self.source("s", "1"),
+            self.source("n", '"a"'),
+            self.source("n", "1", "2 - 1"),
+            self.source("n * 1.5", "1"),
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaises(ParserError):
+                    self.compile(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = ["hello", "for", "if", "math", "struct", "switch", "class", "ctfe"]
+
+
+# Valid BASIC that g++ rejects: the comparison is not parenthesized in the C++
+GXX_FAILS = """FUNCTION main() AS INT
+    LET a AS INT = 1
+    PRINT a == a
+    RETURN 0
+ENDFUNCTION
+"""
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+class TestCompileSource(unittest.TestCase):
+    def test_in_memory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cwd = os.getcwd()
+            os.chdir(tmp_dir)
+            try:
+                result = compile_source(
+                    "FUNCTION main() AS INT\n    PRINT 1 + 2\n    RETURN 0\nENDFUNCTION\n"
+                )
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(tmp_dir), [])
+        self.assertTrue(result.ok)
+        self.assertIn("int main", result.cpp)
+        self.assertEqual(result.diagnostics, [])
+        self.assertEqual(result.timings, [])
+
+    def test_same_code_as_command_line(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.cpp")
+            for name in SAMPLES:
+                with self.subTest(name=name):
+                    args = parse_args(["-i", os.path.join(TESTS_DIR, f"{name}.b"), "-o", output])
+                    self.assertEqual(compile_args(args, stream_logger(io.StringIO())), 0)
+                    with open(output) as f:
+                        self.assertEqual(compile_source(read_sample(name)).cpp, f.read())
+
+    def test_diagnostics_and_timings(self):
+        result = compile_source(read_sample("error1"), CompileOptions(timings=True))
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.cpp)
+        self.assertEqual(len(result.diagnostics), 1)
+        self.assertIn("already declared", result.diagnostics[0])
+        self.assertEqual([phase["name"] for phase in result.timings], ["lex", "parse"])
+
+        result = compile_source(read_sample("for"), CompileOptions(timings=True))
+        self.assertEqual([phase["name"] for phase in result.timings], ["lex", "parse", "emit"])
+
+    def test_file_sink(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "hello.cpp")
+            result = compile_source(read_sample("hello"), CompileOptions(output=output))
+            with open(output) as f:
+                self.assertEqual(f.read(), result.cpp)
+
+    def test_concurrent_calls(self):
+        sources = [read_sample(name) for name in SAMPLES] * 4
+        expected = [compile_source(source).cpp for source in sources]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            actual = [result.cpp for result in pool.map(compile_source, sources)]
+        self.assertEqual(actual, expected)
+
+
+@unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+class TestPipe(unittest.TestCase):
+    def test_builds_into_cache_from_memory(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            cache_dir = os.path.join(tmp_dir, "cache")
+            work_dir = os.path.join(tmp_dir, "work")
+            os.mkdir(work_dir)
+            cwd = os.getcwd()
+            os.chdir(work_dir)
+            try:
+                with mock.patch.dict(os.environ, {"BASIC_COMPILER_CACHE": cache_dir}):
+                    options = CompileOptions(pipe=True, timings=True, output="out.cpp")
+                    first = compile_source(read_sample("hello"), options)
+                    second = compile_source(read_sample("hello"), options)
+            finally:
+                os.chdir(cwd)
+
+            # Nothing but the program cache was written
+            self.assertEqual(os.listdir(work_dir), [])
+            self.assertEqual(os.listdir(cache_dir), [os.path.basename(first.program)])
+            self.assertEqual(os.stat(cache_dir).st_mode & 0o777, 0o700)
+
+            # The unchanged program is not compiled again
+            self.assertEqual(second.program, first.program)
+            self.assertIn("g++", [phase["name"] for phase in first.timings])
+            self.assertNotIn("g++", [phase["name"] for phase in second.timings])
+
+            output = subprocess.run([first.program], capture_output=True, text=True).stdout
+            self.assertIn("HELLO WORLD!", output)
+
+    def test_compiler_failure(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with mock.patch.dict(os.environ, {"BASIC_COMPILER_CACHE": tmp_dir}):
+                result = compile_source(
+                    GXX_FAILS, CompileOptions(pipe=True, execute=True), tool_output=io.StringIO()
+                )
+            self.assertEqual(os.listdir(tmp_dir), [])
+        self.assertFalse(result.ok)
+        self.assertIsNone(result.program)
+        self.assertRegex(result.diagnostics[0], r"^g\+\+ failed with status [1-9]")
+
+        for options in (["--pipe"], ["-o", "fails.cpp", "--compile"]):
+            with self.subTest(options=options), tempfile.TemporaryDirectory() as tmp_dir:
+                input = os.path.join(tmp_dir, "fails.b")
+                with open(input, "w") as f:
+                    f.write(GXX_FAILS)
+                cwd = os.getcwd()
+                os.chdir(tmp_dir)
+                try:
+                    with mock.patch.dict(os.environ, {"BASIC_COMPILER_CACHE": tmp_dir}):
+                        args = parse_args(["-i", input, "--execute", *options])
+                        log = io.StringIO()
+                        status = compile_args(args, stream_logger(log), tool_output=log)
+                finally:
+                    os.chdir(cwd)
+                self.assertEqual(status, 1)
+                self.assertIn("g++ failed with status", log.getvalue())
+                self.assertNotIn("Unexpected error", log.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
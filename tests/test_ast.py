@@ -0,0 +1,69 @@
+import unittest
+
+from basic_compiler.basic_ast import (
+    LiteralNode,
+    ModNode,
+    NameNode,
+    PowNode,
+    SwitchNode,
+    UnaryNode,
+    find_hash_seed,
+    string_hash,
+)
+
+
+class TestOperatorLowering(unittest.TestCase):
+    def test_int_pow(self):
+        x = NameNode("x", "INT")
+        self.assertEqual(PowNode(x, LiteralNode(3, "INT")).code, "(x * x * x)")
+        self.assertEqual(PowNode(x, LiteralNode(0, "INT")).code, "1")
+        self.assertEqual(PowNode(x, LiteralNode(9, "INT")).code, "basic_ipow(x, 9)")
+        self.assertEqual(PowNode(x, NameNode("n", "INT")).code, "basic_ipow(x, n)")
+        self.assertEqual(
+            PowNode(x, UnaryNode("-", LiteralNode(1, "INT"))).code, "basic_ipow(x, -1)"
+        )
+
+    def test_float_and_unknown_pow(self):
+        self.assertEqual(
+            PowNode(NameNode("x", "FLOAT"), LiteralNode(2, "INT")).code, "pow(x, 2)"
+        )
+        self.assertEqual(
+            PowNode(NameNode("s"), LiteralNode(2, "INT")).code, "basic_pow(s, 2)"
+        )
+
+    def test_mod(self):
+        self.assertEqual(ModNode(NameNode("a", "INT"), NameNode("b", "INT")).code, "a % b")
+        self.assertEqual(
+            ModNode(NameNode("a", "FLOAT"), NameNode("b", "INT")).code, "fmod(a, b)"
+        )
+        self.assertEqual(ModNode(NameNode("a"), NameNode("b")).code, "basic_mod(a, b)")
+
+
+class TestSwitchLowering(unittest.TestCase):
+    def switch(self, values, value_type):
+        node = SwitchNode(NameNode("x", value_type))
+        for value in values:
+            node.add_case(LiteralNode(value, value_type))
+        node.set_values(values, value_type)
+        return node
+
+    def test_string_hash_is_fnv1a(self):
+        self.assertEqual(string_hash(b"a", 0), 0xAF63DC4C8601EC8C)
+
+    def test_hash_seed_separates_labels(self):
+        labels = [f"case{i}".encode() for i in range(500)]
+        seed = find_hash_seed(labels)
+        hashes = {(len(label), string_hash(label, seed)) for label in labels}
+        self.assertEqual(len(hashes), len(labels))
+
+    def test_strategies(self):
+        self.assertEqual(self.switch(["a", "b"], "STRING").strategy, "string")
+        self.assertEqual(self.switch(list(range(20)), "INT").strategy, "native")
+        self.assertEqual(self.switch([1, 5, 9], "INT").strategy, "native")
+        sparse = self.switch([10**i for i in range(8)], "INT")
+        self.assertEqual(sparse.strategy, "search")
+        self.assertEqual(sparse.runtime, {"basic_search"})
+
+
+if __name__ == "__main__":
+    unittest.main()
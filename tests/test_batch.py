@@ -0,0 +1,87 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_batch import compile_batch, expand_inputs, read_manifest, report
+from basic_compiler.basic_ctfe import DEFAULT_STEP_BUDGET
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = ["hello", "for", "if", "struct", "error1"]
+OPTIONS = {
+    "opt": 0,
+    "ctfe_steps": DEFAULT_STEP_BUDGET,
+    "explicit_stack": False,
+    "compile": False,
+    "format": False,
+    "verbose": False,
+}
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.inputs = [os.path.join(TESTS_DIR, f"{name}.b") for name in SAMPLES]
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def test_inputs_from_globs_and_manifest(self):
+        manifest = os.path.join(self.tmp_dir, "corpus.txt")
+        with open(manifest, "w") as f:
+            f.write("# regression corpus\nhello.b\n\nsub/if.b  # nested\n")
+        self.assertEqual(
+            read_manifest(manifest),
+            [os.path.join(self.tmp_dir, "hello.b"), os.path.join(self.tmp_dir, "sub/if.b")],
+        )
+
+        inputs = expand_inputs(
+            [os.path.join(TESTS_DIR, "error*.b"), os.path.join(TESTS_DIR, "error1.b")]
+        )
+        self.assertEqual(
+            [os.path.basename(input) for input in inputs],
+            ["error1.b", "error2.b", "error3.b"],
+        )
+
+    def test_same_output_as_single_compiles(self):
+        for jobs in (1, 2):
+            with self.subTest(jobs=jobs):
+                output_dir = os.path.join(self.tmp_dir, str(jobs))
+                os.makedirs(output_dir)
+                results = compile_batch(self.inputs, OPTIONS, output_dir, jobs=jobs)
+                self.assertEqual([r.input for r in results], self.inputs)
+                self.assertEqual([r.status for r in results], [0, 0, 0, 0, 1])
+                self.assertIn("already declared", results[-1].diagnostics)
+
+                for result in results[:-1]:
+                    single = os.path.join(self.tmp_dir, "single.cpp")
+                    args = parse_args(["-i", result.input, "-o", single])
+                    compile_args(args, stream_logger(io.StringIO()))
+                    with open(single) as expected, open(result.output) as actual:
+                        self.assertEqual(actual.read(), expected.read())
+
+    def test_report(self):
+        results = compile_batch(self.inputs, OPTIONS, self.tmp_dir, jobs=1)
+        messages = io.StringIO()
+        status = report(results, stream_logger(messages))
+        self.assertEqual(status, 1)
+        text = messages.getvalue()
+        self.assertIn(f"== {self.inputs[-1]} ==", text)
+        self.assertNotIn(f"== {self.inputs[0]} ==", text)
+        self.assertIn("4 of 5 programs compiled, 1 failed", text)
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_builds_with_gxx(self):
+        options = dict(OPTIONS, compile=True)
+        results = compile_batch(self.inputs[:2], options, self.tmp_dir, jobs=1, cxx_jobs=2)
+        for result in results:
+            self.assertEqual(result.status, 0, result.diagnostics)
+            self.assertTrue(os.path.exists(result.output.replace(".cpp", "")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_bench import Sample, percentile, report, summarize
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DOUBLE = """FUNCTION main() AS INT
+    LET n AS INT = 0
+    INPUT n
+    PRINT n * 2
+ENDFUNCTION
+"""
+
+
+class TestSummary(unittest.TestCase):
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([3.0], 0.95), 3.0)
+        self.assertEqual(percentile([4, 1, 3, 2], 0.5), 2)
+
+    def test_summarize(self):
+        samples = [Sample(0.3, 0.2, 100), Sample(0.1, 0.1, 120), Sample(0.2, 0.1, None)]
+        record = summarize("cpp -O0", samples)
+        self.assertEqual(record["runs"], 3)
+        self.assertEqual(record["wall_s"], {"min": 0.1, "median": 0.2, "p95": 0.3})
+        self.assertEqual(record["max_rss_kib"], 120)
+        self.assertEqual(len(record["samples"]), 3)
+
+    def test_report(self):
+        first = summarize("cpp -O0", [Sample(0.004, 0.004, 1000)])
+        second = summarize("cpp -O2", [Sample(0.002, 0.001, 1000)])
+        lines = report([first, second]).splitlines()
+        self.assertEqual(lines[0].split(), ["cpp", "-O0", "cpp", "-O2", "ratio"])
+        self.assertEqual(lines[1].split(), ["wall", "min", "ms", "4.00", "2.00", "0.50x"])
+        self.assertEqual(lines[-1].split(), ["max", "rss", "KiB", "1000", "1000", "1.00x"])
+        self.assertNotIn("ratio", report([first]))
+
+
+class TestBenchArgs(unittest.TestCase):
+    def bench(self, input: str, *options: str) -> dict:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            results = os.path.join(tmp_dir, "bench.json")
+            args = parse_args(
+                ["-i", input, "-o", os.path.join(tmp_dir, "out.cpp"), "--bench", "3",
+                 "--bench-json", results, *options]
+            )
+            log = io.StringIO()
+            status = compile_args(args, stream_logger(log), tool_output=log)
+            self.assertEqual(status, 0, log.getvalue())
+            self.assertIn("wall median ms", log.getvalue())
+            with open(results) as f:
+                return json.load(f)
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_against_opt_level(self):
+        record = self.bench(os.path.join(TESTS_DIR, "memo.b"), "--bench-against=-O2")
+        self.assertEqual(record["runs"], 3)
+        self.assertEqual(
+            [variant["label"] for variant in record["variants"]], ["cpp -O0", "cpp -O2"]
+        )
+        for variant in record["variants"]:
+            self.assertEqual(len(variant["samples"]), 3)
+            self.assertGreater(variant["wall_s"]["min"], 0)
+
+    def test_backend_with_input(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input = os.path.join(tmp_dir, "double.b")
+            with open(input, "w") as f:
+                f.write(DOUBLE)
+            stdin = os.path.join(tmp_dir, "stdin.txt")
+            with open(stdin, "w") as f:
+                f.write("21\n")
+            record = self.bench(
+                input, "--backend", "vm", "--no-bytecode-cache", "--bench-input", stdin,
+                "--bench-against=--backend python",
+            )
+        self.assertEqual([variant["label"] for variant in record["variants"]], ["vm", "python"])
+
+    def test_runs_checked(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["-i", "a.b", "--bench", "0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
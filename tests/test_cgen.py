@@ -0,0 +1,169 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_emitter import compiler_command
+from basic_compiler.basic_vm import run_program
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = [
+    "hello",
+    "for",
+    "if",
+    "math",
+    "pow",
+    "switch",
+    "memo",
+    "ctfe",
+    "byref",
+    "struct",
+    "class",
+    "float",
+]
+C = CompileOptions(target="c")
+
+OBJECTS = """
+CLASS counter
+    LET count AS INT = 5
+    PUBLIC
+    FUNCTION counter(start AS INT) AS VOID
+        count = start
+    ENDFUNCTION
+    FUNCTION add(n AS INT) AS INT
+        count = count + n
+        RETURN count
+    ENDFUNCTION
+ENDCLASS
+
+FUNCTION twice(x AS INT) AS INT
+    RETURN x * 2
+ENDFUNCTION
+
+FUNCTION twice(x AS FLOAT) AS FLOAT
+    RETURN x * 2.5
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    LET f AS FLOAT = 0.5
+    LET s AS STRING = ""
+    LET c AS counter(3)
+    INPUT s
+    INPUT f
+    PRINT twice(f)
+    PRINT (s < "b")
+    PRINT RED s + "!"
+ENDFUNCTION
+"""
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+def build_and_run(code: str, path: str, target: str, stdin: str = "") -> str:
+    with open(path, "w") as f:
+        f.write(code)
+    subprocess.run(compiler_command(path, target), check=True)
+    return subprocess.run(
+        [os.path.splitext(path)[0]], input=stdin, capture_output=True, text=True
+    ).stdout
+
+
+class TestCTarget(unittest.TestCase):
+    def test_plain_c(self):
+        code = compile_source(read_sample("byref"), C).cpp
+        self.assertIn("#include <stdio.h>", code)
+        self.assertNotIn("iostream", code)
+        self.assertNotIn("using namespace", code)
+        self.assertIn("static void bump(int *n, int delta)", code)
+
+    def test_classes_and_overloads(self):
+        code = compile_source(OBJECTS, C).cpp
+        self.assertIn("typedef struct counter {", code)
+        self.assertIn("static int counter_add(counter *self, int n)", code)
+        self.assertIn("self->count = start;", code)
+        self.assertIn("counter_counter(&c, 3);", code)
+        self.assertIn("static float twice__float(float x)", code)
+        self.assertIn('printf("%g\\n", twice__float(f));', code)
+
+    def test_unsupported(self):
+        result = compile_source("PRINT 1\n", C)
+        self.assertFalse(result.ok)
+        result = compile_source("FUNCTION main() AS INT\n    PRINT m\nENDFUNCTION\n", C)
+        self.assertEqual(result.diagnostics, ["'m' is not a variable"])
+
+    def test_default_output(self):
+        self.assertEqual(parse_args(["-i", "a.b", "--target", "c"]).output, "out.c")
+        self.assertEqual(parse_args(["-i", "a.b"]).output, "out.cpp")
+        self.assertEqual(compiler_command("a/p.c", "c")[-3:], ["-o", "a/p", "-lm"])
+
+
+@unittest.skipUnless(shutil.which("gcc") and shutil.which("g++"), "gcc or g++ is not installed")
+class TestSameOutputAsCpp(unittest.TestCase):
+    def test_samples(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in SAMPLES:
+                with self.subTest(name=name):
+                    source = read_sample(name)
+                    expected = build_and_run(
+                        compile_source(source).cpp, os.path.join(tmp_dir, f"{name}.cpp"), "cpp"
+                    )
+                    output = build_and_run(
+                        compile_source(source, C).cpp, os.path.join(tmp_dir, f"{name}.c"), "c"
+                    )
+                    self.assertEqual(output, expected)
+
+    def test_not_of_a_comparison(self):
+        source = (
+            "FUNCTION main() AS INT\n"
+            "    LET a AS INT = 1\n"
+            "    PRINT (NOT a == 2)\n"
+            "    PRINT (NOT a == 1 OR a > 0)\n"
+            "    IF NOT a == 2 THEN\n"
+            '        PRINT "yes"\n'
+            "    ENDIF\n"
+            "ENDFUNCTION\n"
+        )
+        outputs = {}
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for target in ("cpp", "c"):
+                code = compile_source(source, CompileOptions(target=target)).cpp
+                path = os.path.join(tmp_dir, f"not.{target}")
+                outputs[target] = build_and_run(code, path, target)
+        stdout = io.StringIO()
+        bytecode = compile_source(source, CompileOptions(backend="vm")).bytecode
+        run_program(bytecode, io.StringIO(), stdout)
+        outputs["vm"] = stdout.getvalue()
+        stdout = io.StringIO()
+        pycode = compile_source(source, CompileOptions(backend="python")).pycode
+        pycode.run(io.StringIO(), stdout)
+        outputs["python"] = stdout.getvalue()
+        self.assertEqual(outputs, dict.fromkeys(outputs, "1\n1\nyes\n"))
+
+    def test_input_and_objects(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            code = compile_source(OBJECTS, C).cpp
+            output = build_and_run(code, os.path.join(tmp_dir, "objects.c"), "c", "abc 2.25\n")
+        self.assertEqual(output, "5.625\n1\n\033[1;31mabc!\033[0m\n")
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "byref.c")
+            input = os.path.join(TESTS_DIR, "byref.b")
+            args = parse_args(["-i", input, "-o", output, "--target", "c", "--compile"])
+            log = io.StringIO()
+            status = compile_args(args, stream_logger(log), tool_output=log)
+            self.assertEqual(status, 0, log.getvalue())
+            result = subprocess.run([output[:-2]], capture_output=True, text=True)
+        self.assertEqual(result.stdout, "42\nhi !\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
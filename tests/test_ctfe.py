@@ -0,0 +1,153 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from argparse import Namespace
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_vm import run_program
+
+# h(0) is folded, h(z) runs; both must print what the program computes in
+# single precision: ten times 0.1 reaches 1
+FLOAT_SUM = (
+    "FUNCTION h(x AS INT) AS BOOL\n"
+    "    LET y AS FLOAT = x\n"
+    "    FOR i = 1 TO 10\n"
+    "        y = y + 0.1\n"
+    "    ENDFOR\n"
+    "    RETURN y >= 1\n"
+    "ENDFUNCTION\n"
+    "FUNCTION main() AS INT\n"
+    "    LET z AS INT = 0\n"
+    "    PRINT h(0)\n"
+    "    PRINT h(z)\n"
+    "    RETURN 0\n"
+    "ENDFUNCTION\n"
+)
+
+# a + b is 16777217, which a float cannot hold: C++ rounds it to 16777216
+FLOAT_CARRY = (
+    "FUNCTION h(x AS INT) AS INT\n"
+    "    LET a AS FLOAT = 16777216\n"
+    "    LET b AS FLOAT = 1\n"
+    "    RETURN a + b + b > 16777216\n"
+    "ENDFUNCTION\n"
+    "FUNCTION main() AS INT\n"
+    "    LET z AS INT = 0\n"
+    "    PRINT h(0)\n"
+    "    PRINT h(z)\n"
+    "    RETURN 0\n"
+    "ENDFUNCTION\n"
+)
+
+
+class TestCtfe(unittest.TestCase):
+    def compile(self, source: str, ctfe_steps: int = 100_000) -> str:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.cpp")
+            args = Namespace(output=output, format=False, compile=False, execute=False)
+            lexer = Lexer(source.splitlines(keepends=True))
+            Parser(lexer, Emitter(args), ctfe_steps).program()
+            with open(output) as f:
+                return f.read()
+
+    def test_fold_into_dim_and_const(self):
+        source = (
+            "FUNCTION size(n AS INT) AS INT\n"
+            "    LET total AS INT = 0\n"
+            "    FOR i = 1 TO n\n"
+            "        total = total + i\n"
+            "    ENDFOR\n"
+            "    RETURN total\n"
+            "ENDFUNCTION\n"
+            "CONST LET n AS INT = size(4)\n"
+            "DIM table AS INT(size(n))\n"
+        )
+        code = self.compile(source)
+        self.assertIn("constexpr int size(int n) {", code)
+        self.assertIn("int n = \n10\n;", code)
+        self.assertIn("int table [\n55\n]", code)
+
+    def test_semantics_follow_cpp(self):
+        code = self.compile(
+            "FUNCTION half(n AS INT) AS INT\n    RETURN n / 2\nENDFUNCTION\n"
+            "FUNCTION ratio(n AS INT) AS FLOAT\n    RETURN n / 4.0\nENDFUNCTION\n"
+            "CONST LET a AS INT = half(-7)\n"
+            "CONST LET b AS FLOAT = ratio(1)\n"
+        )
+        self.assertIn("\n-3\n", code)
+        self.assertIn("\n0.25f\n", code)
+
+    def test_budget_and_runtime_values_are_not_folded(self):
+        source = (
+            "FUNCTION spin(n AS INT) AS INT\n"
+            "    LET i AS INT = n\n"
+            "    WHILE TRUE\n"
+            "        i = i + 1\n"
+            "    ENDWHILE\n"
+            "    RETURN i\n"
+            "ENDFUNCTION\n"
+            "FUNCTION one() AS INT\n    RETURN 1\nENDFUNCTION\n"
+            "LET x AS INT = 1\n"
+            "LET y AS INT = spin(1)\n"
+            "LET z AS INT = spin(x)\n"
+            "LET w AS INT = one()\n"
+        )
+        code = self.compile(source)
+        self.assertIn("spin(1)", code)
+        self.assertIn("spin(x)", code)
+        self.assertNotIn("one()", code.split("int w")[1])
+        self.assertIn("one()", self.compile(source, ctfe_steps=0).split("int w")[1])
+
+    def test_impure_functions_are_not_constexpr(self):
+        code = self.compile(
+            "LET g AS INT = 1\n"
+            "FUNCTION get() AS INT\n    RETURN g\nENDFUNCTION\n"
+            "LET y AS INT = get()\n"
+        )
+        self.assertIn("int get() {", code)
+        self.assertNotIn("constexpr", code)
+        self.assertIn("get()", code.split("int y")[1])
+
+    def test_float_folds_in_single_precision(self):
+        code = self.compile(FLOAT_SUM)
+        self.assertIn("h(z)", code)
+        self.assertNotIn("h(0)", code)
+
+        result = compile_source(FLOAT_SUM, CompileOptions(backend="vm"))
+        stdout = io.StringIO()
+        run_program(result.bytecode, io.StringIO(), stdout)
+        self.assertEqual(stdout.getvalue().split(), ["1", "1"])
+
+    def test_float_arithmetic_folds_in_single_precision(self):
+        code = self.compile(FLOAT_CARRY)
+        self.assertNotIn("h(0)", code)
+        self.assertIn("cout << 0 << endl;", code)
+        # A double operand makes it double arithmetic
+        code = self.compile(FLOAT_CARRY.replace("b + b", "b + 1.0"))
+        self.assertIn("cout << 1 << endl;", code)
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_float_fold_matches_cpp(self):
+        for source_text, expected in (
+            (FLOAT_SUM, ["1", "1"]),
+            (FLOAT_CARRY, ["0", "0"]),
+            (FLOAT_CARRY.replace("b + b", "b + 1.0"), ["1", "1"]),
+        ):
+            with self.subTest(source=source_text), tempfile.TemporaryDirectory() as tmp_dir:
+                source = os.path.join(tmp_dir, "sum.cpp")
+                with open(source, "w") as f:
+                    f.write(self.compile(source_text))
+                program = os.path.join(tmp_dir, "sum")
+                subprocess.run(["g++", "-o", program, source], check=True)
+                output = subprocess.run([program], capture_output=True, text=True).stdout
+                self.assertEqual(output.split(), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+import io
+import os
+import re
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_exceptions import LexerError, ParserErrors
+from basic_compiler.basic_lex import Lexer, TokenStream
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_token import TokenType
+from basic_compiler.main import compile_args, stream_logger
+
+BROKEN = """LET a AS INT = 1 +
+LET b AS INT = 2
+
+FUNCTION f(x AS INT) AS INT
+    LET y AS INT = x * $ 2
+    RETURN y +
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    WHILE 1
+        IF a == THEN
+            FOR i = 1 TO 3
+                PRINT i
+            ENDFOR
+        ENDIF
+        ENDFOR
+        SWITCH b
+            CASE 1
+                PRINT (
+            CASE 1
+        ENDSWITCH
+        DO
+            PRINT 1
+        ENDDO WHILE 1 +
+    ENDWHILE
+    RETURN 0
+ENDFUNCTION
+
+CLASS C
+    PUBLIC
+    PRINT 1
+    LET c AS INT = 1
+ENDCLASS
+PRINT b
+"""
+
+# Where each error of BROKEN is reported, one per line
+EXPECTED = [(1, 19), (5, 24), (6, 15), (11, 17), (16, 9), (19, 24), (20, 18), (24, 24), (31, 5)]
+
+
+def locations(diagnostics):
+    return [
+        tuple(map(int, re.match(r"Line (\d+), column (\d+): ", message).groups()))
+        for message in diagnostics
+    ]
+
+
+class TestRecovery(unittest.TestCase):
+    def test_every_error_in_one_pass(self):
+        for explicit_stack in (False, True):
+            with self.subTest(explicit_stack=explicit_stack):
+                options = CompileOptions(explicit_stack=explicit_stack)
+                result = compile_source(BROKEN, options)
+                self.assertIsNone(result.cpp)
+                self.assertEqual(locations(result.diagnostics), EXPECTED)
+                self.assertIn("Unknown token: '$'", result.diagnostics[1])
+                self.assertIn("Duplicate CASE 1", result.diagnostics[6])
+
+    def test_broken_method_is_one_error(self):
+        for header, error in [
+            ("MEMO FUNCTION get(n AS INT) AS INT", (4, 5)),
+            ("FUNCTION get(n AS) AS INT", (4, 22)),
+        ]:
+            source = (
+                "CLASS counter\n"
+                "    LET count AS INT = 0\n"
+                "    PUBLIC\n"
+                f"    {header}\n"
+                "        IF n > 0 THEN\n"
+                "            RETURN count\n"
+                "        ENDIF\n"
+                "        RETURN n\n"
+                "    ENDFUNCTION\n"
+                "    PRIVATE\n"
+                "    LET total AS INT = 0\n"
+                "ENDCLASS\n"
+                "FUNCTION main() AS INT\n"
+                "    PRINT 1 +\n"
+                "ENDFUNCTION\n"
+            )
+            for explicit_stack in (False, True):
+                with self.subTest(header=header, explicit_stack=explicit_stack):
+                    options = CompileOptions(explicit_stack=explicit_stack)
+                    diagnostics = compile_source(source, options).diagnostics
+                    self.assertEqual(locations(diagnostics), [error, (14, 14)])
+
+        # An access modifier with no member keeps the ENDCLASS after it
+        source = "CLASS counter\n    PUBLIC\nENDCLASS\nFUNCTION main() AS INT\nENDFUNCTION\n"
+        self.assertEqual(locations(compile_source(source).diagnostics), [(3, 1)])
+
+    def test_limit(self):
+        diagnostics = compile_source(BROKEN, CompileOptions(max_errors=3)).diagnostics
+        self.assertEqual(locations(diagnostics[:3]), EXPECTED[:3])
+        self.assertEqual(diagnostics[3], "Stopped after 3 errors")
+        self.assertEqual(len(compile_source(BROKEN, CompileOptions(max_errors=0)).diagnostics), 9)
+
+    def test_first_error_only(self):
+        diagnostics = compile_source(BROKEN, CompileOptions(max_errors=1)).diagnostics
+        self.assertEqual(len(diagnostics), 1)
+        self.assertEqual(diagnostics[0], "Line 1, column 19: Expected expression at")
+
+    def test_end_of_file(self):
+        diagnostics = compile_source("FUNCTION main() AS INT\n    PRINT 1 +\n").diagnostics
+        # The missing ENDFUNCTION ends the parse
+        self.assertEqual(len(diagnostics), 2)
+        self.assertEqual(locations(diagnostics), [(2, 14), (1, 10)])
+        self.assertEqual(diagnostics[1], "Line 1, column 10: Missing ENDFUNCTION")
+
+        source = "FUNCTION main() AS INT\n    WHILE 1\n        IF 1 THEN\n"
+        for max_errors in (1, 20):
+            with self.subTest(max_errors=max_errors):
+                diagnostics = compile_source(source, CompileOptions(max_errors=max_errors)).diagnostics
+                self.assertEqual(diagnostics, ["Line 3, column 9: Missing ENDIF"])
+
+    def test_error_token(self):
+        source = "FUNCTION main() AS INT\n    LET a AS INT = 1\n    LET a AS INT = 2\nENDFUNCTION\n"
+        for max_errors in (1, 20):
+            with self.subTest(max_errors=max_errors):
+                diagnostics = compile_source(source, CompileOptions(max_errors=max_errors)).diagnostics
+                self.assertEqual(diagnostics, ["Line 3, column 9: Variable 'a' already declared."])
+
+    def test_lexes_once(self):
+        source = ["FUNCTION main() AS INT\n"]
+        for line in range(200):
+            source.append(f"    LET v{line} AS INT = {line} + $\n")
+        source.append("ENDFUNCTION\n")
+
+        class CountingLexer(Lexer):
+            tokens = 0
+
+            def get_token(self):
+                CountingLexer.tokens += 1
+                return super().get_token()
+
+        lexer = CountingLexer(source)
+        token = None
+        while token is None or token.token_type != TokenType.EOF:
+            try:
+                token = lexer.get_token()
+            except LexerError:
+                pass
+        lexed = CountingLexer.tokens
+        CountingLexer.tokens = 0
+
+        with self.assertRaises(ParserErrors) as errors:
+            Parser(CountingLexer(source), max_errors=0).parse_program()
+        self.assertEqual(len(errors.exception.diagnostics), 200)
+        # The parser looks past EOF once
+        self.assertEqual(CountingLexer.tokens, lexed + 1)
+
+    def test_token_stream_goes_on_after_errors(self):
+        source = ["PRINT $ 1\n", "PRINT ! 2\n"]
+        lexer = Lexer(source)
+        expected = []
+        while not expected or expected[-1] != TokenType.EOF:
+            try:
+                expected.append(lexer.get_token().token_type)
+            except LexerError as e:
+                expected.append(str(e))
+        self.assertEqual(expected[1], "Line 1, column 7: Unknown token: '$'")
+        self.assertEqual(expected[5], "Line 2, column 7: Unexpected character '!'")
+
+        stream = TokenStream.tokenize(source)
+        actual = []
+        while not actual or actual[-1] != TokenType.EOF:
+            try:
+                actual.append(stream.get_token().token_type)
+            except LexerError as e:
+                actual.append(str(e))
+        self.assertEqual(actual, expected)
+
+    def test_command_line(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input = os.path.join(tmp_dir, "broken.b")
+            with open(input, "w") as f:
+                f.write(BROKEN)
+            args = parse_args(["-i", input, "-o", os.path.join(tmp_dir, "broken.cpp")])
+            log = io.StringIO()
+            self.assertEqual(compile_args(args, stream_logger(log)), 1)
+        self.assertEqual(log.getvalue().count("Compilation error"), 9)
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["-i", "a.b", "--max-errors", "-1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from argparse import Namespace
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_exceptions import ParserError, SymbolTableError
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parallel import parse_parallel, split_blocks
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_vm import run_program
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = [
+    "hello",
+    "for",
+    "if",
+    "math",
+    "pow",
+    "switch",
+    "memo",
+    "ctfe",
+    "byref",
+    "struct",
+    "class",
+]
+
+SOURCE = (
+    "CONST LET limit AS INT = 10\n"
+    "STRUCT point\n"
+    "    x AS INT\n"
+    "    y AS INT\n"
+    "ENDSTRUCT\n"
+    "FUNCTION norm(p AS point) AS INT\n"
+    "    RETURN limit\n"
+    "ENDFUNCTION\n"
+    "LET total AS INT = 0\n"
+    "CLASS counter\n"
+    "    FUNCTION counter()\n"
+    "    ENDFUNCTION\n"
+    "    FUNCTION next(n AS INT) AS INT\n"
+    "        RETURN n + limit\n"
+    "    ENDFUNCTION\n"
+    "ENDCLASS\n"
+    "MEMO FUNCTION tri(n AS INT) AS INT\n"
+    "    IF n < 1 THEN\n"
+    "        RETURN 0\n"
+    "    ENDIF\n"
+    "    RETURN n + tri(n - 1)\n"
+    "ENDFUNCTION\n"
+    "FUNCTION main() AS INT\n"
+    "    LET n AS INT = 3\n"
+    "    PRINT tri(n) + total\n"
+    "    RETURN 0\n"
+    "ENDFUNCTION\n"
+)
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+def emit(program) -> str:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        output = os.path.join(tmp_dir, "out.cpp")
+        emitter = Emitter(Namespace(output=output, format=False, compile=False, execute=False))
+        program.emit(emitter)
+        emitter.write_file()
+        with open(output) as f:
+            return f.read()
+
+
+class TestParallel(unittest.TestCase):
+    def test_split_blocks(self):
+        lines = SOURCE.splitlines(keepends=True)
+        self.assertEqual(
+            split_blocks(lines),
+            [
+                (False, 0, 1),
+                (True, 1, 5),
+                (True, 5, 8),
+                (False, 8, 9),
+                (True, 9, 16),
+                (True, 16, 22),
+                (True, 22, 27),
+            ],
+        )
+        self.assertIsNone(split_blocks(["FUNCTION f()\n", "    RETURN\n"]))
+
+    def test_same_program_as_sequential(self):
+        lines = SOURCE.splitlines(keepends=True)
+        sequential = emit(Parser(Lexer(lines)).parse_program())
+        self.assertEqual(emit(parse_parallel(lines, jobs=2)), sequential)
+
+    def test_earliest_error_is_reported(self):
+        sources = [
+            # Two failing blocks: the first one in source order wins
+            "FUNCTION f() AS INT\n    RETURN x\nENDFUNCTION\n"
+            "FUNCTION g() AS INT\n    RETURN y +\nENDFUNCTION\n",
+            # A block fails before a global statement does
+            "FUNCTION f() AS INT\n    RETURN x\nENDFUNCTION\n"
+            "LET a AS INT = 1\nLET a AS INT = 2\n",
+            # A block cannot see a function declared after it
+            "FUNCTION f() AS INT\n    later()\n    RETURN 0\nENDFUNCTION\n"
+            "FUNCTION later()\nENDFUNCTION\n",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                lines = source.splitlines(keepends=True)
+                with self.assertRaises((ParserError, SymbolTableError)) as expected:
+                    Parser(Lexer(lines)).parse_program()
+                with self.assertRaises(type(expected.exception)) as actual:
+                    parse_parallel(lines, jobs=2)
+                self.assertEqual(str(actual.exception), str(expected.exception))
+                self.assertRegex(str(actual.exception), r"^Line \d+, column \d+: ")
+
+    def test_samples_print_the_same(self):
+        # A block cannot fold calls to functions of other blocks at compile
+        # time, so the code of -j may differ from sequential; its output may not
+        for name in SAMPLES:
+            with self.subTest(name=name):
+                outputs = []
+                for jobs in (1, 2):
+                    options = CompileOptions(backend="vm", jobs=jobs)
+                    result = compile_source(read_sample(name), options)
+                    self.assertTrue(result.ok, result.diagnostics)
+                    stdout = io.StringIO()
+                    run_program(result.bytecode, io.StringIO(), stdout)
+                    outputs.append(stdout.getvalue())
+                self.assertEqual(outputs[1], outputs[0])
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_samples_run_the_same(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in SAMPLES:
+                with self.subTest(name=name):
+                    outputs = []
+                    for jobs in (1, 2):
+                        cpp = os.path.join(tmp_dir, f"{name}{jobs}.cpp")
+                        with open(cpp, "w") as f:
+                            options = CompileOptions(jobs=jobs)
+                            f.write(compile_source(read_sample(name), options).cpp)
+                        subprocess.run(["g++", cpp, "-o", cpp[:-4]], check=True)
+                        outputs.append(
+                            subprocess.run(
+                                [cpp[:-4]], input="", capture_output=True, text=True
+                            ).stdout
+                        )
+                    self.assertEqual(outputs[1], outputs[0])
+
+    def test_explicit_stack(self):
+        # Deeper than pickle can send back from a worker
+        depth = 5000
+        lines = (
+            ["LET total AS INT = 0\n", "FUNCTION main() AS INT\n"]
+            + ["IF 1 THEN\n"] * depth
+            + ["total = total + 1\n"]
+            + ["ENDIF\n"] * depth
+            + ["RETURN 0\n", "ENDFUNCTION\n"]
+            + ["FUNCTION one() AS INT\n", "RETURN 1\n", "ENDFUNCTION\n"]
+        )
+        sequential = compile_source(lines, CompileOptions(explicit_stack=True))
+        parallel = compile_source(lines, CompileOptions(explicit_stack=True, jobs=2))
+        self.assertTrue(parallel.ok, parallel.diagnostics)
+        self.assertEqual(parallel.cpp, sequential.cpp)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -60,3 +60,167 @@
 #
 # if __name__ == "__main__":
 #     unittest.main()
+
+
+import json
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_exceptions import ParserError
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_symbol_set import SymbolKind
+from basic_compiler.basic_token import Token, TokenType
+from basic_compiler.basic_trace import ParseTrace
+
+
+class TestExpr(unittest.TestCase):
+    explicit_stack = False
+
+    @classmethod
+    def parse(cls, source: str) -> str:
+        parser = Parser(Lexer([source + "\n"]), explicit_stack=cls.explicit_stack)
+        for name in "abc":
+            parser._symbol_table.insert(
+                Token(name, TokenType.IDENT, 0, ""), SymbolKind.VARIABLE, "INT"
+            )
+        node = parser.expr()
+        parser.match(TokenType.NEWLINE)
+        return node.code
+
+    def test_precedence(self):
+        test_cases = [
+            ("a + b * c", "a + b * c"),
+            ("a - b - c", "a - b - c"),
+            ("-a * b", "-a * b"),
+            ("-2 ^ 2", "-(2 * 2)"),
+            ("a ^ b ^ c", "basic_ipow(a, basic_ipow(b, c))"),
+            ("a ^ -1", "basic_ipow(a, -1)"),
+            ("a % b + c", "a % b + c"),
+            ("NOT a == b AND c > 1 OR b", "!(a == b) && c > 1 || b"),
+            ("a < b + 1 AND NOT c", "a < b + 1 && !(c)"),
+        ]
+        for source, code in test_cases:
+            with self.subTest(source=source):
+                self.assertEqual(self.parse(source), code)
+
+    def test_rejected(self):
+        for source in ["a < b < c", "NOT a == b > c", "- -a", "a == NOT b", "a +"]:
+            with self.subTest(source=source):
+                with self.assertRaises(ParserError):
+                    self.parse(source)
+
+
+class TestFuncHeader(unittest.TestCase):
+    def test_memo_limit(self):
+        parser = Parser(Lexer(["MEMO(64) FUNCTION f() AS INT\n"]))
+        self.assertEqual(parser.func_header()[4:], (True, 64))
+        for limit in ["x", "1.5", "-1", "0"]:
+            with self.subTest(limit=limit):
+                parser = Parser(Lexer([f"MEMO({limit}) FUNCTION f() AS INT\n"]))
+                with self.assertRaises(ParserError):
+                    parser.func_header()
+
+
+class TestExplicitStackExpr(TestExpr):
+    explicit_stack = True
+
+
+class TestExplicitStack(unittest.TestCase):
+    @staticmethod
+    def compile(lines, explicit_stack: bool) -> str:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.cpp")
+            args = Namespace(output=output, format=False, compile=False, execute=False)
+            Parser(Lexer(lines), Emitter(args), explicit_stack=explicit_stack).program()
+            with open(output) as f:
+                return f.read()
+
+    def test_samples_unchanged(self):
+        tests_dir = os.path.dirname(__file__)
+        for name in ["byref.b", "class.b", "ctfe.b", "for.b", "if.b", "switch.b"]:
+            with self.subTest(name=name):
+                with open(os.path.join(tests_dir, name)) as f:
+                    lines = f.readlines()
+                self.assertEqual(self.compile(lines, True), self.compile(lines, False))
+
+    def test_deep_nesting(self):
+        depth = 10000
+        openers = ["IF x < 5 THEN\n", "WHILE x < 5\n", "FOR i = 1 TO 2\n", "DO\n"]
+        closers = ["ENDIF\n", "ENDWHILE\n", "ENDFOR\n", "ENDDO\n"]
+        lines = ["FUNCTION twice(n AS INT) AS INT\n", "RETURN 2 * n\n", "ENDFUNCTION\n"]
+        lines += ["FUNCTION main() AS INT\n", "LET x AS INT = 0\n"]
+        lines += [openers[level % 4] for level in range(depth)]
+        lines.append(
+            "x = x + " + "-(" * depth + "x" + ")" * depth
+            + " * " + "twice(" * depth + "x" + ")" * depth + "\n"
+        )
+        lines += [closers[level % 4] for level in reversed(range(depth))]
+        lines += ["RETURN x\n", "ENDFUNCTION\n"]
+
+        code = self.compile(lines, explicit_stack=True)
+        self.assertEqual(code.count("while ("), depth // 2)
+        self.assertIn("x + -(-(-(", code)
+        self.assertIn("x)))", code)
+        with self.assertRaises(RecursionError):
+            self.compile(lines, explicit_stack=False)
+
+
+class TestTrace(unittest.TestCase):
+    def trace(self, source: str, trace: ParseTrace) -> ParseTrace:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            args = Namespace(
+                output=os.path.join(tmp_dir, "out.cpp"),
+                format=False,
+                compile=False,
+                execute=False,
+            )
+            lexer = Lexer(source.splitlines(keepends=True))
+            Parser(lexer, Emitter(args), trace=trace).program()
+        return trace
+
+    def test_productions(self):
+        trace = self.trace("PRINT 1\n", ParseTrace())
+        self.assertEqual(
+            trace.productions(),
+            [
+                "PROGRAM",
+                "STMT",
+                "STMT-NORMAL",
+                "STMT-PRINT",
+                "EXPR",
+                "ARITH-BASE",
+                "NL",
+            ],
+        )
+        events = trace.events()
+        self.assertEqual(len(events), 14)
+        self.assertEqual(events[0].kind, "enter")
+        self.assertEqual(events[0].token, "PRINT")
+        self.assertEqual(events[-1].kind, "exit")
+        self.assertEqual(events[-1].production, "PROGRAM")
+        self.assertEqual(trace.timings()["EXPR"][0], 1)
+
+    def test_ring_buffer_and_export(self):
+        trace = self.trace("PRINT 1\nPRINT 2\n", ParseTrace(capacity=4))
+        self.assertEqual(len(trace.events()), 4)
+        self.assertEqual(trace.dropped, 22)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "trace.jsonl")
+            trace.export(path)
+            with open(path) as f:
+                lines = [json.loads(line) for line in f]
+        self.assertEqual(lines[-1]["production"], "PROGRAM")
+        self.assertEqual(lines[-1]["kind"], "exit")
+
+    def test_untraced_parser_is_not_wrapped(self):
+        parser = Parser(Lexer(["PRINT 1\n"]))
+        self.assertNotIn("expr", vars(parser))
+        self.assertNotIn("stmt", vars(parser))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_profile import LineProfile, read_profile, render
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestRender(unittest.TestCase):
+    def test_listing(self):
+        source = ["FUNCTION main() AS INT\n", "    PRINT 1\n", "ENDFUNCTION\n"]
+        listing = render(source, {2: LineProfile(3, 0)}).splitlines()
+        self.assertEqual(len(listing), 4)
+        self.assertNotIn("Time", listing[0])
+        self.assertEqual(listing[2].split(), ["2", "3", "PRINT", "1"])
+        self.assertEqual(listing[3].split(), ["3", "ENDFUNCTION"])
+
+        listing = render(source, {2: LineProfile(3, 2_000_000)}).splitlines()
+        self.assertIn("%Time", listing[0])
+        self.assertEqual(listing[2].split(), ["2", "3", "2.000", "100.0", "PRINT", "1"])
+
+    def test_read(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "p.lines")
+            with open(path, "w") as f:
+                f.write("# basic_compiler line profile: line hits nanoseconds\n4 10 0\n7 1 25\n")
+            self.assertEqual(read_profile(path), {4: LineProfile(10, 0), 7: LineProfile(1, 25)})
+
+
+class TestProfileLines(unittest.TestCase):
+    def test_counters_only_when_asked(self):
+        with open(os.path.join(TESTS_DIR, "ctfe.b")) as f:
+            source = f.read()
+        self.assertNotIn("basic_lines", compile_source(source).cpp)
+        code = compile_source(source, CompileOptions(profile_lines="ctfe.lines")).cpp
+        self.assertIn('basic_profile basic_lines("ctfe.lines", 21, false);', code)
+        self.assertIn("basic_lines.hit(4);", code)
+        # A function that counts its lines cannot be constexpr
+        self.assertNotIn("constexpr int square", code)
+
+    def run_profiled(self, *options: str) -> str:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input = os.path.join(tmp_dir, "memo.b")
+            shutil.copy(os.path.join(TESTS_DIR, "memo.b"), input)
+            output = os.path.join(tmp_dir, "memo.c" if "c" in options else "memo.cpp")
+            args = parse_args(
+                ["-i", input, "-o", output, "--profile-lines", "--compile", "--execute", *options]
+            )
+            log = io.StringIO()
+            status = compile_args(args, stream_logger(log), tool_output=log)
+            self.assertEqual(status, 0, log.getvalue())
+            profile = read_profile(os.path.join(tmp_dir, "memo.lines"))
+        # fib(40) runs its body once per argument thanks to MEMO
+        self.assertEqual(profile[2].hits, 41)
+        self.assertEqual(profile[5].hits, 39)
+        self.assertNotIn(1, profile)
+        return log.getvalue()
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_cpp(self):
+        log = self.run_profiled("--profile-time")
+        self.assertIn("%Time", log)
+        self.assertRegex(log, r"\n +5 +39 +[\d.]+ +[\d.]+ +RETURN fib")
+
+    @unittest.skipUnless(shutil.which("gcc"), "gcc is not installed")
+    def test_c(self):
+        log = self.run_profiled("--target", "c")
+        self.assertRegex(log, r"\n +5 +39 +RETURN fib")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import ast
+import io
+import os
+import unittest
+from unittest import mock
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_exceptions import VMError
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_pycode import PythonTranslator
+from basic_compiler.basic_vm import run_program
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = [
+    "hello",
+    "for",
+    "if",
+    "math",
+    "pow",
+    "switch",
+    "memo",
+    "ctfe",
+    "byref",
+    "struct",
+    "class",
+    "float",
+]
+
+JUMPS = """
+FUNCTION jumps(n AS INT) AS INT
+    LET total AS INT = 0
+    FOR i = 1 TO n
+        SWITCH i % 4
+            CASE 0
+                CONTINUE
+            CASE 1
+                total = total + 1
+                BREAK
+            CASE 2
+                SWITCH i % 3
+                    CASE 0
+                        CONTINUE
+                    CASE 1
+                        BREAK
+                ENDSWITCH
+                total = total + 100
+        ENDSWITCH
+        total = total + 1000
+        IF i > 20 THEN
+            BREAK
+        ENDIF
+    ENDFOR
+    LET k AS INT = 0
+    DO
+        k = k + 1
+        IF k % 2 == 0 THEN
+            CONTINUE
+        ENDIF
+        total = total + k
+    ENDDO WHILE k < 9
+    FOR j = 10 TO k
+        k = k - 1
+        total = total + j
+    ENDFOR
+    RETURN total
+ENDFUNCTION
+
+FUNCTION main() AS INT
+    PRINT jumps(30)
+    LET b AS BOOL = 5
+    LET n AS INT = b
+    PRINT n
+ENDFUNCTION
+"""
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+def run(source: str, backend: str, stdin: str = "") -> str:
+    result = compile_source(source, CompileOptions(backend=backend))
+    if not result.ok:
+        raise AssertionError(result.diagnostics)
+    stdout = io.StringIO()
+    if backend == "vm":
+        run_program(result.bytecode, io.StringIO(stdin), stdout)
+    else:
+        result.pycode.run(io.StringIO(stdin), stdout)
+    return stdout.getvalue()
+
+
+def translate(source: str) -> ast.Module:
+    lines = source.splitlines(keepends=True)
+    program = Parser(Lexer(lines), mock.Mock()).parse_program()
+    return PythonTranslator().translate(program)
+
+
+class TestPythonBackend(unittest.TestCase):
+    def test_same_output_as_vm(self):
+        for name in SAMPLES:
+            with self.subTest(name=name):
+                source = read_sample(name)
+                self.assertEqual(run(source, "python"), run(source, "vm"))
+
+    def test_break_and_continue(self):
+        self.assertEqual(run(JUMPS, "python"), run(JUMPS, "vm"))
+        self.assertEqual(run(JUMPS, "python"), "14331\n1\n")
+
+    def test_for_uses_range_when_it_can(self):
+        loops = [
+            node
+            for node in ast.walk(translate(JUMPS))
+            if isinstance(node, (ast.For, ast.While))
+        ]
+        # FOR i counts up to n; FOR j's bound k changes in its body
+        self.assertIsInstance(loops[0], ast.For)
+        self.assertEqual(loops[0].iter.func.id, "range")
+        self.assertEqual(
+            [type(loop).__name__ for loop in loops[1:]], ["While", "While", "While", "While"]
+        )
+
+    def test_dim_uses_array(self):
+        module = translate(
+            "DIM counts AS INT(8)\n"
+            "FUNCTION main() AS INT\n"
+            "    DIM weights AS FLOAT(4)\n"
+            "    DIM names AS STRING(2)\n"
+            "ENDFUNCTION\n"
+        )
+        calls = [
+            node.func.id
+            for node in ast.walk(module)
+            if isinstance(node, ast.Call) and isinstance(node.func, ast.Name)
+        ]
+        self.assertEqual(calls.count("_array"), 2)
+
+    def test_input_and_deep_recursion(self):
+        source = (
+            "FUNCTION depth(n AS INT) AS INT\n"
+            "    IF n == 0 THEN\n"
+            "        RETURN 0\n"
+            "    ENDIF\n"
+            "    RETURN depth(n - 1) + 1\n"
+            "ENDFUNCTION\n"
+            "FUNCTION main() AS INT\n"
+            "    LET n AS INT = 0\n"
+            "    INPUT n\n"
+            "    PRINT depth(n)\n"
+            "ENDFUNCTION\n"
+        )
+        self.assertEqual(run(source, "python", "100000\n"), "100000\n")
+
+    def test_division_by_zero_names_the_line(self):
+        result = compile_source(
+            "FUNCTION main() AS INT\n"
+            "    LET z AS INT = 0\n"
+            "    PRINT 1 / z\n"
+            "ENDFUNCTION\n",
+            CompileOptions(backend="python"),
+        )
+        with self.assertRaisesRegex(VMError, "division by zero in 'main' at line 3"):
+            result.pycode.run(io.StringIO(), io.StringIO())
+
+    def test_command_line(self):
+        stdout = io.StringIO()
+        log = io.StringIO()
+        args = parse_args(["-i", os.path.join(TESTS_DIR, "byref.b"), "--backend", "python"])
+        status = compile_args(args, stream_logger(log), stdout, stdin=io.StringIO())
+        self.assertEqual(status, 0, log.getvalue())
+        self.assertEqual(stdout.getvalue(), "42\nhi !\n")
+        self.assertFalse(os.path.exists(os.path.join(TESTS_DIR, "byref.bvm")))
+
+
+if __name__ == "__main__":
+    unittest.main()
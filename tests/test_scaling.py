@@ -0,0 +1,55 @@
+import os
+import unittest
+
+from basic_compiler import compile_source
+from benchmarks.generate import generate
+from benchmarks.phases import PHASES, exponent, time_phases
+
+# A linear phase measures about 1 here; a quadratic one about 2
+MAX_EXPONENT = 1.4
+
+
+class TestGenerate(unittest.TestCase):
+    def test_shapes_compile(self):
+        for options in (
+            {},
+            {"functions": 1, "depth": 5},
+            {"depth": 0, "density": 20, "string_length": 500},
+        ):
+            with self.subTest(**options):
+                source = generate(400, **options)
+                self.assertLess(abs(len(source) - 400), 40)
+                result = compile_source(source)
+                self.assertTrue(result.ok, result.diagnostics)
+                self.assertEqual(
+                    sum(line.startswith("FUNCTION") for line in source),
+                    options.get("functions", 4) + 1,
+                )
+
+
+# Timing on a shared machine is noisy: set BASIC_PERF_TESTS to run it
+@unittest.skipUnless(os.environ.get("BASIC_PERF_TESTS"), "BASIC_PERF_TESTS is not set")
+class TestScaling(unittest.TestCase):
+    def assert_linear(self, small: dict, large: dict) -> None:
+        for phase in PHASES:
+            with self.subTest(phase=phase):
+                k = exponent(small, large, phase)
+                self.assertLess(
+                    k,
+                    MAX_EXPONENT,
+                    f"{phase} took {small[phase]:.3f}s for {small['lines']} lines and"
+                    f" {large[phase]:.3f}s for {large['lines']} lines",
+                )
+
+    def test_program_size(self):
+        self.assert_linear(time_phases(generate(2000)), time_phases(generate(16000)))
+
+    def test_long_strings(self):
+        self.assert_linear(
+            time_phases(generate(250, string_length=20000)),
+            time_phases(generate(2000, string_length=20000)),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from basic_compiler.basic_client import request
+from basic_compiler.basic_exceptions import LexerError
+from basic_compiler.basic_lex import Lexer, TokenStream
+from basic_compiler.basic_server import CompileServer
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class TestTokenStream(unittest.TestCase):
+    def test_replays_tokens_and_lexer_error(self):
+        source = ["LET a AS INT = 1\n", "PRINT a $\n"]
+        expected = []
+        lexer = Lexer(source)
+        with self.assertRaises(LexerError) as error:
+            while True:
+                expected.append(lexer.get_token().token_text)
+
+        stream = TokenStream.tokenize(source)
+        for _ in range(2):
+            replay = stream.replay()
+            actual = []
+            with self.assertRaises(LexerError) as replayed:
+                while True:
+                    actual.append(replay.get_token().token_text)
+            self.assertEqual(actual, expected)
+            self.assertEqual(str(replayed.exception), str(error.exception))
+
+
+class TestCompileServer(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.server = CompileServer(
+            os.path.join(self.tmp_dir, "server.sock"), workers=4, idle_timeout=30
+        )
+        self.server.bind()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            request({"command": "stop"}, self.server.socket_path)
+            self.thread.join()
+        self._tmp_dir.cleanup()
+
+    def compile(self, *argv: str) -> dict:
+        return request(
+            {"command": "compile", "argv": list(argv), "cwd": self.tmp_dir},
+            self.server.socket_path,
+        )
+
+    def test_compiles_relative_to_client_directory(self):
+        source = os.path.join(TESTS_DIR, "hello.b")
+        response = self.compile("-i", source, "-o", "hello.cpp")
+        self.assertEqual(response["status"], 0, response["stderr"])
+        self.assertIn("Basic Compiler", response["stderr"])
+        with open(os.path.join(self.tmp_dir, "hello.cpp")) as f:
+            first = f.read()
+        self.assertIn("int main", first)
+
+        # Unchanged source: the tree comes from the cache and emits the same code
+        response = self.compile("-i", source, "-o", "again.cpp")
+        self.assertEqual(response["status"], 0, response["stderr"])
+        with open(os.path.join(self.tmp_dir, "again.cpp")) as f:
+            self.assertEqual(f.read(), first)
+        stats = request({"command": "stats"}, self.server.socket_path)["stats"]
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_concurrent_requests(self):
+        names = ["for", "if", "math", "struct", "switch", "class"]
+
+        def compile_sample(name):
+            return self.compile("-i", os.path.join(TESTS_DIR, f"{name}.b"), "-o", f"{name}.cpp")
+
+        with ThreadPoolExecutor(max_workers=len(names)) as pool:
+            responses = list(pool.map(compile_sample, names))
+        for name, response in zip(names, responses):
+            self.assertEqual(response["status"], 0, response["stderr"])
+            self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, f"{name}.cpp")))
+
+    def test_errors(self):
+        response = self.compile("-i", os.path.join(TESTS_DIR, "error1.b"), "-o", "error.cpp")
+        self.assertEqual(response["status"], 1)
+        self.assertIn("Compilation error", response["stderr"])
+
+        response = self.compile("--no-such-option")
+        self.assertEqual(response["status"], 2)
+        self.assertIn("usage:", response["stderr"])
+
+        response = self.compile("--version")
+        self.assertEqual(response["status"], 0)
+        self.assertTrue(response["stdout"])
+
+        # The server is still serving
+        self.assertEqual(request({"command": "stats"}, self.server.socket_path)["status"], 0)
+
+    def test_execute_is_left_to_client(self):
+        response = self.compile(
+            "-i", os.path.join(TESTS_DIR, "hello.b"), "-o", "hello.cpp", "--execute"
+        )
+        self.assertEqual(response["execute"], os.path.join(self.tmp_dir, "hello"))
+
+    def test_idle_timeout(self):
+        request({"command": "stop"}, self.server.socket_path)
+        self.thread.join()
+
+        server = CompileServer(self.server.socket_path, idle_timeout=0.2)
+        server.serve_forever()
+        self.assertFalse(os.path.exists(server.socket_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
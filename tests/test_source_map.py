@@ -0,0 +1,128 @@
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+
+from basic_compiler import CompileOptions, compile_source
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = ["for", "if", "switch", "memo", "ctfe", "class"]
+
+BROKEN = """FUNCTION main() AS INT
+    LET a AS INT = 1
+    LET b AS INT = 2
+    PRINT a == b
+ENDFUNCTION
+"""
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+def presumed_lines(code: str) -> dict:
+    """
+    :return: The file and line the compiler assumes for each line of code
+        that is not a directive, by the line's number in code
+    """
+    lines = {}
+    file, line = "<stdin>", 1
+    for number, text in enumerate(code.split("\n"), start=1):
+        directive = re.match(r'#line (\d+) "(.*)"$', text)
+        if directive:
+            file, line = directive.group(2), int(directive.group(1))
+            continue
+        lines[number] = (file, line)
+        line += 1
+    return lines
+
+
+class TestSourceMap(unittest.TestCase):
+    def test_off_by_default(self):
+        result = compile_source(read_sample("ctfe"))
+        self.assertNotIn("#line", result.cpp)
+        self.assertIsNone(result.source_map)
+
+    def test_directives_match_the_map(self):
+        for target in ("cpp", "c"):
+            for name in SAMPLES:
+                with self.subTest(target=target, name=name):
+                    options = CompileOptions(target=target, source_map=f"/src/{name}.b")
+                    result = compile_source(read_sample(name), options)
+                    self.assertTrue(result.ok, result.diagnostics)
+                    presumed = presumed_lines(result.cpp)
+                    mapped = {line: source for line, source, _ in result.source_map["mappings"]}
+                    self.assertTrue(mapped)
+                    for number, (file, line) in presumed.items():
+                        if number in mapped:
+                            self.assertEqual((file, line), (f"/src/{name}.b", mapped[number]))
+                        else:
+                            # Generated code keeps its own line numbers
+                            self.assertEqual((file, line), ("<stdin>", number))
+
+    def test_columns(self):
+        options = CompileOptions(source_map="ctfe.b")
+        source = read_sample("ctfe")
+        mappings = compile_source(source, options).source_map["mappings"]
+        lines = source.splitlines()
+        for _, line, column in mappings:
+            self.assertEqual(column, len(lines[line - 1]) - len(lines[line - 1].lstrip()) + 1)
+        self.assertIn(10, [line for _, line, column in mappings if column == 9])
+
+    def test_memo_wrapper(self):
+        # The cached wrapper follows the body, but comes from the header line
+        wrappers = {"cpp": "int fib(int n) {", "c": "static int fib(int n) {"}
+        for target, wrapper in wrappers.items():
+            with self.subTest(target=target):
+                options = CompileOptions(target=target, source_map="memo.b")
+                code = compile_source(read_sample("memo"), options).cpp
+                number = code.split("\n").index(wrapper) + 1
+                self.assertEqual(presumed_lines(code)[number], ("memo.b", 1))
+
+    def test_format_rejected(self):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_args(["-i", "a.b", "--source-map", "--format"])
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_compiler_reports_source_lines(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input = os.path.join(tmp_dir, "broken.b")
+            with open(input, "w") as f:
+                f.write(BROKEN)
+            output = os.path.join(tmp_dir, "broken.cpp")
+            args = parse_args(["-i", input, "-o", output, "--source-map", "--compile"])
+            log = io.StringIO()
+            compile_args(args, stream_logger(log), tool_output=log)
+            with open(output + ".map.json") as f:
+                source_map = json.load(f)
+        self.assertIn(f"{input}:4:", log.getvalue())
+        self.assertEqual(source_map["file"], output)
+        self.assertEqual(source_map["source"], input)
+
+    @unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+    def test_same_output(self):
+        outputs = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, options in (("plain", []), ("mapped", ["--source-map"])):
+                output = os.path.join(tmp_dir, f"{name}.cpp")
+                args = parse_args(
+                    ["-i", os.path.join(TESTS_DIR, "memo.b"), "-o", output, "--compile", *options]
+                )
+                log = io.StringIO()
+                self.assertEqual(compile_args(args, stream_logger(log), tool_output=log), 0)
+                result = subprocess.run([output[:-4]], capture_output=True, text=True)
+                outputs.append(result.stdout)
+        self.assertTrue(outputs[0])
+        self.assertEqual(outputs[1], outputs[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
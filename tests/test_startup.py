@@ -0,0 +1,104 @@
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+import basic_compiler
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TESTS_DIR = os.path.join(ROOT_DIR, "tests")
+# Microseconds the modules of the package may take to import for -V
+IMPORT_BUDGET_US = 50_000
+# Milliseconds -V may take beyond starting the interpreter
+STARTUP_BUDGET_MS = 100
+# What only compiling, running a tool or a backend needs
+HEAVY = {
+    "subprocess",
+    "logging",
+    "multiprocessing",
+    "basic_compiler.basic_api",
+    "basic_compiler.basic_emitter",
+    "basic_compiler.basic_lex",
+    "basic_compiler.basic_parser",
+    "basic_compiler.basic_cgen",
+    "basic_compiler.basic_vm",
+    "basic_compiler.basic_pycode",
+}
+# Timing on a shared machine is noisy: set BASIC_PERF_TESTS to check the budgets
+perf_test = unittest.skipUnless(os.environ.get("BASIC_PERF_TESTS"), "BASIC_PERF_TESTS is not set")
+
+
+def import_times(*args: str, cwd: str = ROOT_DIR) -> dict:
+    """
+    :param args: The command line after python -X importtime
+    :return: The cumulative microseconds of every module imported, by name
+    """
+    env = {**os.environ, "PYTHONPATH": ROOT_DIR}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args], cwd=cwd, env=env, capture_output=True, text=True
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestLazyImports(unittest.TestCase):
+    def test_package(self):
+        imported = import_times("-c", "import basic_compiler")
+        self.assertFalse(HEAVY & set(imported), sorted(HEAVY & set(imported)))
+        # The names are still there, on first use
+        self.assertIs(basic_compiler.CompileOptions, basic_compiler.basic_api.CompileOptions)
+        self.assertIn("compile_source", dir(basic_compiler))
+        with self.assertRaises(AttributeError):
+            basic_compiler.no_such_name
+
+    def test_version(self):
+        imported = import_times("-m", "basic_compiler.main", "-V")
+        self.assertFalse(HEAVY & set(imported), sorted(HEAVY & set(imported)))
+
+    @perf_test
+    def test_import_time(self):
+        imported = import_times("-m", "basic_compiler.main", "-V")
+        # The package and the modules it imports directly, with what they import
+        own = sum(
+            time for name, time in imported.items()
+            if name.split(".")[0] == "basic_compiler" and name.count(".") <= 1
+        )
+        self.assertLess(own, IMPORT_BUDGET_US)
+
+    def test_cached_bytecode_skips_the_compiler(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            shutil.copy(os.path.join(TESTS_DIR, "hello.b"), tmp_dir)
+            command = ("-m", "basic_compiler.main", "-i", "hello.b", "--backend", "vm")
+            self.assertIn("basic_compiler.basic_parser", import_times(*command, cwd=tmp_dir))
+            imported = set(import_times(*command, cwd=tmp_dir))
+        front_end = {"basic_compiler.basic_lex", "basic_compiler.basic_parser"}
+        self.assertFalse(front_end & imported, sorted(front_end & imported))
+        self.assertIn("basic_compiler.basic_vm", imported)
+
+    @perf_test
+    def test_startup_time(self):
+        env = {**os.environ, "PYTHONPATH": ROOT_DIR}
+
+        def median_ms(*args: str) -> float:
+            times = []
+            for _ in range(5):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *args], env=env, capture_output=True)
+                times.append((time.perf_counter() - start) * 1000)
+            return statistics.median(times)
+
+        overhead = median_ms("-m", "basic_compiler.main", "-V") - median_ms("-c", "pass")
+        self.assertLess(overhead, STARTUP_BUDGET_MS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import tempfile
+import unittest
+from argparse import Namespace
+
+from basic_compiler.basic_emitter import Emitter
+from basic_compiler.basic_exceptions import ParserError, SymbolTableError
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_parser import Parser
+from basic_compiler.basic_symbol_set import SymbolKind, SymbolTable
+from basic_compiler.basic_token import Token, TokenType
+
+
+def ident(name: str) -> Token:
+    return Token(name, TokenType.IDENT, 0, name)
+
+
+class TestSymbolTable(unittest.TestCase):
+    def test_scope_chain(self):
+        table = SymbolTable()
+        table.insert(ident("x"), SymbolKind.CONSTANT, "INT")
+        table.insert(ident("f"), SymbolKind.FUNCTION, "FLOAT")
+        self.assertEqual(table.kind("f"), SymbolKind.FUNCTION)
+
+        table.push_scope("FUNCTION", "f")
+        self.assertEqual(table.lookup("x").kind, SymbolKind.CONSTANT)
+        table.insert(ident("x"), SymbolKind.PARAMETER, "string")
+        self.assertEqual(table.lookup("x").kind, SymbolKind.PARAMETER)
+        self.assertEqual(table.lookup("x").type, "STRING")
+        with self.assertRaises(SymbolTableError):
+            table.insert(ident("x"))
+
+        table.push_scope("BLOCK")
+        table.insert(ident("y"))
+        self.assertEqual(table.lookup("x").kind, SymbolKind.PARAMETER)
+        table.pop_scope()
+        self.assertIsNone(table.find("y"))
+        table.pop_scope()
+
+        self.assertEqual(table.lookup("x").kind, SymbolKind.CONSTANT)
+        with self.assertRaises(SymbolTableError):
+            table.lookup("y")
+        with self.assertRaises(SymbolTableError):
+            table.pop_scope()
+
+
+class TestScopes(unittest.TestCase):
+    def compile(self, source: str) -> str:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output = os.path.join(tmp_dir, "out.cpp")
+            args = Namespace(output=output, format=False, compile=False, execute=False)
+            Parser(Lexer(source.splitlines(keepends=True)), Emitter(args)).program()
+            with open(output) as f:
+                return f.read()
+
+    def test_locals_per_function(self):
+        code = self.compile(
+            "CONST LET n AS INT = 3\n"
+            "FUNCTION twice(k AS INT) AS INT\n"
+            "    RETURN k * 2\n"
+            "ENDFUNCTION\n"
+            "FUNCTION f() AS INT\n"
+            "    LET n AS INT = 5\n"
+            "    n = n + 1\n"
+            "    RETURN twice(n)\n"
+            "ENDFUNCTION\n"
+            "FUNCTION g() AS INT\n"
+            "    LET n AS STRING = \"s\"\n"
+            "    FOR i = 1 TO 3\n"
+            "        LET t AS INT = i\n"
+            "        i = i + t\n"
+            "    ENDFOR\n"
+            "    FOR i = 1 TO 3\n"
+            "        LET t AS INT = i\n"
+            "    ENDFOR\n"
+            "    RETURN 0\n"
+            "ENDFUNCTION\n"
+        )
+        # The local n shadows the CONST, so twice(n) is not folded to 6
+        self.assertIn("return \ntwice(n)\n;", code)
+        self.assertIn("string n = ", code)
+
+    def test_scope_errors(self):
+        sources = [
+            "CONST LET n AS INT = 3\nFUNCTION f() AS INT\n    n = 4\nENDFUNCTION\n",
+            "FUNCTION f() AS INT\n"
+            "    IF TRUE THEN\n"
+            "        FOR i = 1 TO 2\n"
+            "        ENDFOR\n"
+            "    ENDIF\n"
+            "    i = 1\n"
+            "ENDFUNCTION\n",
+            "FUNCTION f(a AS INT) AS INT\n    LET a AS INT = 1\nENDFUNCTION\n",
+        ]
+        for source in sources:
+            with self.subTest(source=source):
+                with self.assertRaises((ParserError, SymbolTableError)):
+                    self.compile(source)
+
+
+if __name__ == "__main__":
+    unittest.main()
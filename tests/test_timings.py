@@ -0,0 +1,45 @@
+import json
+import subprocess
+import sys
+import unittest
+
+from basic_compiler.basic_lex import Lexer
+from basic_compiler.basic_timings import PhaseTimer
+
+
+class TestPhaseTimer(unittest.TestCase):
+    def test_disabled_records_nothing(self):
+        timer = PhaseTimer()
+        with timer.phase("parse"):
+            pass
+        self.assertEqual(timer.phases, [])
+
+    def test_phases_and_accumulated_lexer(self):
+        timer = PhaseTimer(enabled=True)
+        try:
+            lexer = Lexer(["PRINT 1 + 2\n"] * 50)
+            timer.accumulate(lexer, "get_token", "lex")
+            with timer.phase("parse"):
+                while lexer.get_token().token_text != "":
+                    pass
+            with timer.phase("g++"):
+                subprocess.run([sys.executable, "-c", "sum(range(100000))"])
+
+            results = timer.results()
+            self.assertEqual([r["name"] for r in results], ["lex", "parse", "g++"])
+            lex, parse, child = results
+            self.assertGreater(lex["wall_s"], 0)
+            self.assertGreaterEqual(parse["wall_s"], 0)
+            self.assertGreater(child["child_cpu_s"], 0)
+            self.assertGreater(parse["py_peak_bytes"], 0)
+
+            record = json.loads(timer.to_json(input="x.b"))
+            self.assertEqual(record["input"], "x.b")
+            self.assertEqual(record["total"]["name"], "total")
+            self.assertIn("g++", timer.report())
+        finally:
+            timer.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
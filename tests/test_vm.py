@@ -0,0 +1,240 @@
+import io
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+
+from basic_compiler import CompileOptions, compile_source, basic_vm_cache
+from basic_compiler.basic_argparser import parse_args
+from basic_compiler.basic_ctfe import DEFAULT_STEP_BUDGET
+from basic_compiler.basic_exceptions import VMError
+from basic_compiler.basic_vm import run_program
+from basic_compiler.main import compile_args, stream_logger
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SAMPLES = [
+    "hello",
+    "for",
+    "if",
+    "math",
+    "pow",
+    "switch",
+    "memo",
+    "ctfe",
+    "byref",
+    "struct",
+    "class",
+    "float",
+]
+VM = CompileOptions(backend="vm")
+
+
+def read_sample(name: str) -> str:
+    with open(os.path.join(TESTS_DIR, f"{name}.b")) as f:
+        return f.read()
+
+
+def run(source: str, stdin: str = "") -> str:
+    result = compile_source(source, VM)
+    if not result.ok:
+        raise AssertionError(result.diagnostics)
+    stdout = io.StringIO()
+    run_program(result.bytecode, io.StringIO(stdin), stdout)
+    return stdout.getvalue()
+
+
+def main_body(*lines: str) -> str:
+    body = "".join(f"    {line}\n" for line in lines)
+    return f"FUNCTION main() AS INT\n{body}ENDFUNCTION\n"
+
+
+class TestVM(unittest.TestCase):
+    def test_no_cpp(self):
+        result = compile_source(read_sample("hello"), VM)
+        self.assertTrue(result.ok)
+        self.assertIsNone(result.cpp)
+        self.assertIsNotNone(result.bytecode)
+
+    def test_int_semantics(self):
+        output = run(
+            main_body(
+                "LET big AS INT = 2147483647",
+                "PRINT big + 1",
+                "PRINT -7 / 2",
+                "PRINT -7 % 3",
+                "PRINT 2 ^ 31",
+                "LET t AS INT = 3.99",
+                "PRINT t",
+            )
+        )
+        self.assertEqual(output.split(), ["-2147483648", "-3", "-1", "-2147483648", "3"])
+
+    def test_float_semantics(self):
+        output = run(
+            main_body(
+                "LET f AS FLOAT = 16777217",
+                "PRINT f",
+                "PRINT 1.0 / 3",
+                "PRINT 10.0 / 4",
+            )
+        )
+        self.assertEqual(output.split(), ["1.67772e+07", "0.333333", "2.5"])
+
+    def test_float_precision(self):
+        # The C++ output: float where C++ computes in float, double elsewhere
+        expected = ["0", "1", "1", "1", "1.19209e-08", "10000", "0", "0", "0", "1", "1", "0"]
+        self.assertEqual(run(read_sample("float")).split(), expected)
+
+    def test_loops_and_switch(self):
+        output = run(
+            main_body(
+                "FOR i = 1 TO 10 STEP 3",
+                "    IF i == 7 THEN",
+                "        CONTINUE",
+                "    ENDIF",
+                "    PRINT i",
+                "ENDFOR",
+                "LET k AS INT = 0",
+                "DO",
+                "    k = k + 1",
+                "    SWITCH k",
+                "        CASE 2",
+                "            BREAK",
+                "        CASE 3",
+                '            PRINT "three"',
+                "    ENDSWITCH",
+                "ENDDO WHILE k < 5",
+                "PRINT k",
+            )
+        )
+        self.assertEqual(output.split(), ["1", "4", "10", "three", "5"])
+
+    def test_input(self):
+        source = main_body(
+            'LET name AS STRING = ""',
+            "LET n AS INT = 0",
+            "INPUT name",
+            "INPUT n",
+            "PRINT name",
+            "PRINT n * 2",
+        )
+        self.assertEqual(run(source, "bob\n  21\n").split(), ["bob", "42"])
+
+    def test_deep_recursion(self):
+        source = (
+            "FUNCTION depth(n AS INT) AS INT\n"
+            "    IF n == 0 THEN\n"
+            "        RETURN 0\n"
+            "    ENDIF\n"
+            "    RETURN depth(n - 1) + 1\n"
+            "ENDFUNCTION\n" + main_body("PRINT depth(100000)")
+        )
+        self.assertEqual(run(source), "100000\n")
+
+    def test_division_by_zero(self):
+        result = compile_source(main_body("LET z AS INT = 0", "PRINT 1 / z"), VM)
+        with self.assertRaisesRegex(VMError, "division by zero in 'main'"):
+            run_program(result.bytecode, io.StringIO(), io.StringIO())
+
+    def test_unsupported(self):
+        result = compile_source("PRINT 1\n", VM)
+        self.assertFalse(result.ok)
+
+    def test_command_line(self):
+        stdout = io.StringIO()
+        log = io.StringIO()
+        args = parse_args(
+            ["-i", os.path.join(TESTS_DIR, "byref.b"), "--backend", "vm", "--no-bytecode-cache"]
+        )
+        status = compile_args(args, stream_logger(log), stdout, stdin=io.StringIO())
+        self.assertEqual(status, 0, log.getvalue())
+        self.assertEqual(stdout.getvalue(), "42\nhi !\n")
+
+
+class TestBytecodeCache(unittest.TestCase):
+    def setUp(self):
+        self._tmp_dir = tempfile.TemporaryDirectory()
+        self.tmp_dir = self._tmp_dir.name
+        self.input = os.path.join(self.tmp_dir, "memo.b")
+        shutil.copy(os.path.join(TESTS_DIR, "memo.b"), self.input)
+
+    def tearDown(self):
+        self._tmp_dir.cleanup()
+
+    def run_input(self, *options: str) -> str:
+        stdout = io.StringIO()
+        log = io.StringIO()
+        args = parse_args(["-i", self.input, "--backend", "vm", *options])
+        status = compile_args(args, stream_logger(log), stdout, stdin=io.StringIO())
+        self.assertEqual(status, 0, log.getvalue())
+        return stdout.getvalue()
+
+    def test_round_trip(self):
+        for name in SAMPLES:
+            with self.subTest(name=name):
+                source = read_sample(name)
+                program = compile_source(source, VM).bytecode
+                digest = basic_vm_cache.source_digest(source.splitlines(keepends=True), 0)
+                loaded = basic_vm_cache.loads(basic_vm_cache.dumps(program, digest), digest)
+                self.assertEqual(loaded.disassemble(), program.disassemble())
+                for function, copy in zip(program.functions, loaded.functions):
+                    self.assertEqual(copy.line_numbers, function.line_numbers)
+
+    def test_warm_start_skips_lexer_and_parser(self):
+        expected = self.run_input()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir, "memo.bvm")))
+        with mock.patch("basic_compiler.basic_lex.Lexer") as lexer, mock.patch(
+            "basic_compiler.basic_parser.Parser"
+        ) as parser:
+            self.assertEqual(self.run_input(), expected)
+        lexer.assert_not_called()
+        parser.assert_not_called()
+
+    def test_cache_dir(self):
+        cache_dir = os.path.join(self.tmp_dir, "cache")
+        self.run_input("--bytecode-dir", cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir, "memo.bvm")))
+
+    def test_stale_or_damaged_files_are_replaced(self):
+        self.run_input()
+        path = os.path.join(self.tmp_dir, "memo.bvm")
+        with open(self.input, "a") as f:
+            f.write('\nFUNCTION unused() AS STRING\n    RETURN "x"\nENDFUNCTION\n')
+        source = open(self.input).readlines()
+        digest = basic_vm_cache.source_digest(source, DEFAULT_STEP_BUDGET)
+        self.assertIsNone(basic_vm_cache.load(path, digest))
+
+        self.run_input()
+        self.assertIsNotNone(basic_vm_cache.load(path, digest))
+        with mock.patch.object(basic_vm_cache, "VERSION", "basic_compiler 9.9.9"):
+            self.assertIsNone(basic_vm_cache.load(path, digest))
+
+        with open(path, "r+b") as f:
+            f.truncate(os.path.getsize(path) - 10)
+        self.assertIsNone(basic_vm_cache.load(path, digest))
+        self.assertEqual(self.run_input().split()[0], "102334155")
+        self.assertIsNotNone(basic_vm_cache.load(path, digest))
+
+
+@unittest.skipUnless(shutil.which("g++"), "g++ is not installed")
+class TestSameOutputAsCpp(unittest.TestCase):
+    def test_samples(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in SAMPLES:
+                with self.subTest(name=name):
+                    source = read_sample(name)
+                    cpp = os.path.join(tmp_dir, f"{name}.cpp")
+                    with open(cpp, "w") as f:
+                        f.write(compile_source(source).cpp)
+                    subprocess.run(["g++", cpp, "-o", cpp[:-4]], check=True)
+                    expected = subprocess.run(
+                        [cpp[:-4]], input="", capture_output=True, text=True
+                    ).stdout
+                    self.assertEqual(run(source), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()